@@ -14,6 +14,7 @@ import json
 import sqlite3
 import logging
 import os
+import sys
 import time
 from datetime import datetime, timezone, timedelta
 from typing import Dict, List, Any, Optional, Tuple
@@ -21,8 +22,12 @@ from dataclasses import dataclass, asdict
 from enum import Enum
 import threading
 from collections import defaultdict, deque
+from pathlib import Path
 import statistics
 
+sys.path.append(str(Path(__file__).parent / "src" / "monitoring"))
+from metrics_registry import HistogramSnapshot, MetricsFlusher, MetricsRegistry, RollupRow
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -70,7 +75,7 @@ class Alert:
 class PerformanceTracker:
     """Tracks and analyzes agent performance metrics in real-time"""
     
-    def __init__(self, db_path: str = "agent_analytics.db"):
+    def __init__(self, db_path: str = "agent_analytics.db", flush_interval: float = 5.0):
         self.db_path = db_path
         self.metrics_buffer = deque(maxlen=1000)  # Recent metrics cache
         self.agent_stats = defaultdict(lambda: {
@@ -100,7 +105,20 @@ class PerformanceTracker:
             'token_spike': 10000  # Token usage spike
         }
         
+        # Task metrics are recorded in memory and written to SQLite in one
+        # transaction per flush, together with the hourly rollups that
+        # get_performance_trends reads
+        self.metrics = MetricsRegistry()
+        self.pending_lock = threading.Lock()
+        self.pending_metrics: List[tuple] = []
+        self.pending_timeline: List[tuple] = []
+        self.dirty_agents: Dict[str, str] = {}
+        
         self._init_database()
+        self.flusher = MetricsFlusher(self.metrics, db_path, interval=flush_interval)
+        self.flusher.add_writer(self._write_pending)
+        self._backfill_rollups()
+        self.flusher.start()
         self._start_background_processing()
     
     def _init_database(self):
@@ -202,20 +220,6 @@ class PerformanceTracker:
             )
         """)
         
-        # Hourly performance aggregates
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS hourly_performance (
-                hour_timestamp DATETIME NOT NULL,
-                agent_type TEXT NOT NULL,
-                tasks_completed INTEGER DEFAULT 0,
-                success_rate REAL DEFAULT 0.0,
-                avg_response_time REAL DEFAULT 0.0,
-                total_cost REAL DEFAULT 0.0,
-                total_tokens INTEGER DEFAULT 0,
-                PRIMARY KEY (hour_timestamp, agent_type)
-            ) WITHOUT ROWID
-        """)
-        
         conn.commit()
         conn.close()
         logger.info("✅ Agent analytics database initialized")
@@ -288,6 +292,13 @@ class PerformanceTracker:
             for metric in metrics:
                 self.record_metric(metric)
             
+            # Pre-aggregated for trends
+            self.metrics.histogram('task_duration_ms', agent_type=agent_type).record(duration_ms)
+            if success:
+                self.metrics.counter('tasks_succeeded', agent_type=agent_type).inc()
+            self.metrics.counter('task_cost_usd', agent_type=agent_type).inc(cost)
+            self.metrics.counter('task_tokens', agent_type=agent_type).inc(tokens_used)
+            
             # Update agent stats
             self._update_agent_stats(agent_id, agent_type, success, duration_ms, tokens_used, cost, provider)
             
@@ -307,36 +318,24 @@ class PerformanceTracker:
     
     def record_metric(self, metric: PerformanceMetric):
         """Record a single performance metric"""
-        try:
-            # Add to buffer for real-time access
-            self.metrics_buffer.append(metric)
-            
-            # Store in database
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT OR REPLACE INTO performance_metrics 
-                (metric_id, agent_id, agent_type, metric_type, value, unit, timestamp, task_id, provider, metadata)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                metric.metric_id,
-                metric.agent_id,
-                metric.agent_type,
-                metric.metric_type.value,
-                metric.value,
-                metric.unit,
-                metric.timestamp,
-                metric.task_id,
-                metric.provider,
-                json.dumps(metric.metadata) if metric.metadata else None
-            ))
-            
-            conn.commit()
-            conn.close()
-            
-        except Exception as e:
-            logger.error(f"Failed to record metric: {e}")
+        # Add to buffer for real-time access
+        self.metrics_buffer.append(metric)
+        
+        # Stored on the next flush
+        row = (
+            metric.metric_id,
+            metric.agent_id,
+            metric.agent_type,
+            metric.metric_type.value,
+            metric.value,
+            metric.unit,
+            metric.timestamp,
+            metric.task_id,
+            metric.provider,
+            json.dumps(metric.metadata) if metric.metadata else None
+        )
+        with self.pending_lock:
+            self.pending_metrics.append(row)
     
     def _update_agent_stats(self, agent_id: str, agent_type: str, success: bool, 
                            duration_ms: float, tokens_used: int, cost: float, provider: str):
@@ -383,69 +382,149 @@ class PerformanceTracker:
             stats['avg_response_time'] = statistics.mean(stats['response_times'])
     
     def _record_task_timeline(self, task_data: Dict[str, Any]):
-        """Record task execution in timeline table"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO task_execution_timeline 
-                (task_id, agent_id, agent_type, task_name, status, started_at, completed_at, 
-                 duration_ms, tokens_used, cost, provider, success, error_message, 
-                 files_created, files_modified)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                task_data.get('task_id'),
-                task_data.get('agent_id'),
-                task_data.get('agent_type'),
-                task_data.get('task_name', 'Unknown Task'),
-                task_data.get('status', 'completed'),
-                task_data.get('started_at'),
-                task_data.get('completed_at'),
-                task_data.get('duration_ms', 0),
-                task_data.get('tokens_used', 0),
-                task_data.get('cost', 0.0),
-                task_data.get('provider'),
-                task_data.get('success', False),
-                task_data.get('error_message'),
-                len(task_data.get('files_created', [])),
-                len(task_data.get('files_modified', []))
-            ))
-            
-            conn.commit()
-            conn.close()
-            
-        except Exception as e:
-            logger.error(f"Failed to record task timeline: {e}")
+        """Queue the task for the timeline table"""
+        row = (
+            task_data.get('task_id'),
+            task_data.get('agent_id'),
+            task_data.get('agent_type'),
+            task_data.get('task_name', 'Unknown Task'),
+            task_data.get('status', 'completed'),
+            task_data.get('started_at'),
+            task_data.get('completed_at'),
+            task_data.get('duration_ms', 0),
+            task_data.get('tokens_used', 0),
+            task_data.get('cost', 0.0),
+            task_data.get('provider'),
+            task_data.get('success', False),
+            task_data.get('error_message'),
+            len(task_data.get('files_created', [])),
+            len(task_data.get('files_modified', []))
+        )
+        with self.pending_lock:
+            self.pending_timeline.append(row)
     
     def _update_agent_summary_db(self, agent_id: str, agent_type: str, stats: Dict[str, Any]):
-        """Update agent performance summary in database"""
+        """Mark the agent's summary row for rewriting on the next flush"""
+        with self.pending_lock:
+            self.dirty_agents[agent_id] = agent_type
+    
+    def _write_pending(self, conn: sqlite3.Connection):
+        """Write queued rows; runs inside the flusher's transaction"""
+        with self.pending_lock:
+            metric_rows, self.pending_metrics = self.pending_metrics, []
+            timeline_rows, self.pending_timeline = self.pending_timeline, []
+            dirty_agents, self.dirty_agents = self.dirty_agents, {}
+        
+        try:
+            if metric_rows:
+                conn.executemany("""
+                    INSERT OR REPLACE INTO performance_metrics 
+                    (metric_id, agent_id, agent_type, metric_type, value, unit, timestamp, task_id, provider, metadata)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, metric_rows)
+            
+            if timeline_rows:
+                conn.executemany("""
+                    INSERT INTO task_execution_timeline 
+                    (task_id, agent_id, agent_type, task_name, status, started_at, completed_at, 
+                     duration_ms, tokens_used, cost, provider, success, error_message, 
+                     files_created, files_modified)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, timeline_rows)
+            
+            summary_rows = []
+            now = datetime.now(timezone.utc)
+            for agent_id, agent_type in dirty_agents.items():
+                stats = self.agent_stats[agent_id]
+                total_tasks = max(stats['total_tasks'], 1)
+                summary_rows.append((
+                    agent_id, agent_type, stats['total_tasks'], stats['successful_tasks'],
+                    stats['failed_tasks'], stats['total_cost'], stats['total_tokens'],
+                    stats['avg_response_time'], stats['last_active'],
+                    (stats['successful_tasks'] / total_tasks) * 100,
+                    stats['total_cost'] / total_tasks, stats['total_tokens'] / total_tasks, now
+                ))
+            if summary_rows:
+                conn.executemany("""
+                    INSERT OR REPLACE INTO agent_performance_summary 
+                    (agent_id, agent_type, total_tasks, successful_tasks, failed_tasks, 
+                     total_cost, total_tokens, avg_response_time, last_active, success_rate, 
+                     cost_per_task, tokens_per_task, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, summary_rows)
+        except sqlite3.Error:
+            # Put the rows back so the retried flush writes them
+            with self.pending_lock:
+                self.pending_metrics[:0] = metric_rows
+                self.pending_timeline[:0] = timeline_rows
+                for agent_id, agent_type in dirty_agents.items():
+                    self.dirty_agents.setdefault(agent_id, agent_type)
+            raise
+    
+    def flush(self):
+        """Write queued rows and metric rollups to the database now"""
+        try:
+            self.flusher.flush()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to flush performance data: {e}")
+    
+    def _backfill_rollups(self):
+        """Build hourly rollups from the task timeline the first time they are used"""
         try:
             conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            success_rate = (stats['successful_tasks'] / max(stats['total_tasks'], 1)) * 100
-            cost_per_task = stats['total_cost'] / max(stats['total_tasks'], 1)
-            tokens_per_task = stats['total_tokens'] / max(stats['total_tasks'], 1)
-            
-            cursor.execute("""
-                INSERT OR REPLACE INTO agent_performance_summary 
-                (agent_id, agent_type, total_tasks, successful_tasks, failed_tasks, 
-                 total_cost, total_tokens, avg_response_time, last_active, success_rate, 
-                 cost_per_task, tokens_per_task, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                agent_id, agent_type, stats['total_tasks'], stats['successful_tasks'],
-                stats['failed_tasks'], stats['total_cost'], stats['total_tokens'],
-                stats['avg_response_time'], stats['last_active'], success_rate,
-                cost_per_task, tokens_per_task, datetime.now(timezone.utc)
-            ))
-            
-            conn.commit()
+            has_rollups = conn.execute(
+                "SELECT 1 FROM metric_rollups WHERE metric = 'task_duration_ms' LIMIT 1"
+            ).fetchone()
+            if has_rollups:
+                conn.close()
+                return
+            
+            since_time = datetime.now(timezone.utc) - timedelta(days=30)
+            rows = conn.execute("""
+                SELECT agent_type, completed_at, duration_ms, success, cost, tokens_used
+                FROM task_execution_timeline
+                WHERE completed_at >= ?
+            """, (since_time,)).fetchall()
             conn.close()
+            if not rows:
+                return
+            
+            # (hour, agent_type) -> duration histogram, successes, cost, tokens
+            hours: Dict[Tuple[int, str], list] = {}
+            for agent_type, completed_at, duration_ms, success, cost, tokens_used in rows:
+                try:
+                    completed = datetime.fromisoformat(str(completed_at))
+                except ValueError:
+                    continue
+                if completed.tzinfo is None:
+                    completed = completed.replace(tzinfo=timezone.utc)
+                hour = int(completed.timestamp()) // 3600 * 3600
+                bucket = hours.get((hour, agent_type or 'unknown'))
+                if bucket is None:
+                    bucket = hours[(hour, agent_type or 'unknown')] = [
+                        HistogramSnapshot(self.metrics.precision_bits), 0, 0.0, 0
+                    ]
+                bucket[0].add(duration_ms or 0)
+                bucket[1] += 1 if success else 0
+                bucket[2] += cost or 0.0
+                bucket[3] += tokens_used or 0
+            
+            rollups = []
+            for (hour, agent_type), (histogram, succeeded, total_cost, tokens) in hours.items():
+                labels = {'agent_type': agent_type}
+                rollups += [
+                    RollupRow('task_duration_ms', labels, 'histogram', 3600, hour,
+                              histogram.count, histogram.total, None, histogram),
+                    RollupRow('tasks_succeeded', labels, 'counter', 3600, hour, 0, succeeded, None, None),
+                    RollupRow('task_cost_usd', labels, 'counter', 3600, hour, 0, total_cost, None, None),
+                    RollupRow('task_tokens', labels, 'counter', 3600, hour, 0, tokens, None, None)
+                ]
+            self.flusher.write_rollups(rollups)
+            
+            logger.info(f"📊 Built hourly rollups from {len(rows)} timeline rows")
             
         except Exception as e:
-            logger.error(f"Failed to update agent summary: {e}")
+            logger.error(f"Failed to backfill metric rollups: {e}")
     
     def _check_performance_alerts(self, agent_id: str, agent_type: str, 
                                  duration_ms: float, cost: float, tokens_used: int):
@@ -535,6 +614,7 @@ class PerformanceTracker:
     def get_agent_performance_summary(self) -> Dict[str, Any]:
         """Get comprehensive agent performance summary"""
         try:
+            self.flush()
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
@@ -620,62 +700,57 @@ class PerformanceTracker:
     def get_performance_trends(self, hours: int = 24) -> Dict[str, Any]:
         """Get performance trends over time"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Get hourly task completion trends
+            # Hourly rollups, pre-aggregated per agent type at flush time
+            self.flush()
             since_time = datetime.now(timezone.utc) - timedelta(hours=hours)
+            rollups = self.flusher.read_rollups(
+                ['task_duration_ms', 'tasks_succeeded', 'task_cost_usd', 'task_tokens'],
+                resolution=3600, since=since_time.timestamp()
+            )
             
-            cursor.execute("""
-                SELECT 
-                    strftime('%Y-%m-%d %H:00:00', completed_at) as hour,
-                    COUNT(*) as tasks_completed,
-                    AVG(CASE WHEN success = 1 THEN 1.0 ELSE 0.0 END) * 100 as success_rate,
-                    AVG(duration_ms) as avg_duration,
-                    SUM(cost) as total_cost,
-                    SUM(tokens_used) as total_tokens
-                FROM task_execution_timeline 
-                WHERE completed_at >= ? 
-                GROUP BY hour 
-                ORDER BY hour
-            """, (since_time,))
+            by_hour: Dict[int, Dict[str, Any]] = {}
+            by_agent_type: Dict[str, Dict[str, Any]] = {}
+            for row in rollups:
+                agent_type = row.labels.get('agent_type', 'unknown')
+                for totals in (
+                    by_hour.setdefault(row.bucket_start, self._empty_trend()),
+                    by_agent_type.setdefault(agent_type, self._empty_trend())
+                ):
+                    if row.metric == 'task_duration_ms':
+                        totals['durations'].merge(row.histogram)
+                    elif row.metric == 'tasks_succeeded':
+                        totals['succeeded'] += row.total
+                    elif row.metric == 'task_cost_usd':
+                        totals['total_cost'] += row.total
+                    else:
+                        totals['total_tokens'] += row.total
             
             hourly_trends = []
-            for row in cursor.fetchall():
+            for hour in sorted(by_hour):
+                totals = by_hour[hour]
+                durations = totals['durations']
                 hourly_trends.append({
-                    'hour': row[0],
-                    'tasks_completed': row[1],
-                    'success_rate': row[2] or 0.0,
-                    'avg_duration': row[3] or 0.0,
-                    'total_cost': row[4] or 0.0,
-                    'total_tokens': row[5] or 0
+                    'hour': datetime.fromtimestamp(hour, timezone.utc).strftime('%Y-%m-%d %H:00:00'),
+                    'tasks_completed': durations.count,
+                    'success_rate': totals['succeeded'] / max(durations.count, 1) * 100,
+                    'avg_duration': durations.mean,
+                    'p95_duration': durations.percentile(95),
+                    'total_cost': totals['total_cost'],
+                    'total_tokens': int(totals['total_tokens'])
                 })
             
-            # Get agent type performance comparison
-            cursor.execute("""
-                SELECT 
-                    agent_type,
-                    COUNT(*) as total_tasks,
-                    AVG(CASE WHEN success = 1 THEN 1.0 ELSE 0.0 END) * 100 as success_rate,
-                    AVG(duration_ms) as avg_duration,
-                    SUM(cost) as total_cost
-                FROM task_execution_timeline 
-                WHERE completed_at >= ? 
-                GROUP BY agent_type 
-                ORDER BY total_tasks DESC
-            """, (since_time,))
-            
             agent_type_performance = []
-            for row in cursor.fetchall():
+            for agent_type, totals in by_agent_type.items():
+                durations = totals['durations']
                 agent_type_performance.append({
-                    'agent_type': row[0],
-                    'total_tasks': row[1],
-                    'success_rate': row[2] or 0.0,
-                    'avg_duration': row[3] or 0.0,
-                    'total_cost': row[4] or 0.0
+                    'agent_type': agent_type,
+                    'total_tasks': durations.count,
+                    'success_rate': totals['succeeded'] / max(durations.count, 1) * 100,
+                    'avg_duration': durations.mean,
+                    'p95_duration': durations.percentile(95),
+                    'total_cost': totals['total_cost']
                 })
-            
-            conn.close()
+            agent_type_performance.sort(key=lambda item: item['total_tasks'], reverse=True)
             
             return {
                 'time_range_hours': hours,
@@ -687,13 +762,19 @@ class PerformanceTracker:
             logger.error(f"Failed to get performance trends: {e}")
             return {'error': str(e)}
     
+    def _empty_trend(self) -> Dict[str, Any]:
+        return {
+            'durations': HistogramSnapshot(self.metrics.precision_bits),
+            'succeeded': 0.0,
+            'total_cost': 0.0,
+            'total_tokens': 0.0
+        }
+    
     def _start_background_processing(self):
-        """Start background thread for periodic data aggregation"""
+        """Start background thread for periodic data cleanup"""
         def background_worker():
             while True:
                 try:
-                    # Aggregate hourly data every hour
-                    self._aggregate_hourly_data()
                     # Clean old metrics (keep 30 days)
                     self._cleanup_old_data()
                     time.sleep(3600)  # Run every hour
@@ -705,57 +786,6 @@ class PerformanceTracker:
         thread.start()
         logger.info("📊 Background analytics processing started")
     
-    def _aggregate_hourly_data(self):
-        """Aggregate performance data by hour"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Get the last hour that was aggregated
-            cursor.execute("SELECT MAX(hour_timestamp) FROM hourly_performance")
-            last_aggregated = cursor.fetchone()[0]
-            
-            if last_aggregated:
-                start_time = datetime.fromisoformat(last_aggregated) + timedelta(hours=1)
-            else:
-                start_time = datetime.now(timezone.utc) - timedelta(days=1)
-            
-            end_time = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
-            
-            # Aggregate data for each hour
-            current_hour = start_time
-            while current_hour < end_time:
-                next_hour = current_hour + timedelta(hours=1)
-                
-                cursor.execute("""
-                    SELECT 
-                        agent_type,
-                        COUNT(*) as tasks_completed,
-                        AVG(CASE WHEN success = 1 THEN 1.0 ELSE 0.0 END) * 100 as success_rate,
-                        AVG(duration_ms) as avg_response_time,
-                        SUM(cost) as total_cost,
-                        SUM(tokens_used) as total_tokens
-                    FROM task_execution_timeline 
-                    WHERE completed_at >= ? AND completed_at < ?
-                    GROUP BY agent_type
-                """, (current_hour, next_hour))
-                
-                for row in cursor.fetchall():
-                    cursor.execute("""
-                        INSERT OR REPLACE INTO hourly_performance 
-                        (hour_timestamp, agent_type, tasks_completed, success_rate, 
-                         avg_response_time, total_cost, total_tokens)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
-                    """, (current_hour, row[0], row[1], row[2], row[3], row[4], row[5]))
-                
-                current_hour = next_hour
-            
-            conn.commit()
-            conn.close()
-            
-        except Exception as e:
-            logger.error(f"Failed to aggregate hourly data: {e}")
-    
     def _cleanup_old_data(self):
         """Clean up old performance data to prevent database bloat"""
         try:
@@ -5,17 +5,18 @@ Handles long-running operations with progress tracking and notifications
 """
 
 import asyncio
+import heapq
+import itertools
 import logging
 import threading
 import uuid
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional, Callable
+from typing import Dict, List, Any, Optional, Callable, Set, Tuple
 from dataclasses import dataclass, asdict
 from enum import Enum
 import json
 import time
 from pathlib import Path
-from queue import Queue, PriorityQueue, Empty
 from concurrent.futures import ThreadPoolExecutor, Future
 import sqlite3
 
@@ -138,22 +139,44 @@ class BackgroundJob:
             data['progress']['updated_at'] = data['progress']['updated_at'].isoformat()
         return data
 
+# Structured columns of the background_jobs table, alongside the job_data document
+JOB_COLUMNS = [
+    ('job_type', 'TEXT'),
+    ('status', 'TEXT'),
+    ('priority', 'INTEGER'),
+    ('retry_count', 'INTEGER'),
+    ('started_at', 'TEXT'),
+    ('completed_at', 'TEXT'),
+    ('progress_current', 'INTEGER'),
+    ('progress_total', 'INTEGER'),
+    ('progress_message', 'TEXT')
+]
+
 class BackgroundProcessingService:
     """Service for managing background jobs with progress tracking"""
     
-    def __init__(self):
+    def __init__(self, max_concurrent_jobs: int = 3, job_type_limits: Optional[Dict[str, int]] = None):
         self.db = NotionLikeDatabase()
         
         # Job management
         self.jobs: Dict[str, BackgroundJob] = {}
-        self.job_queue = PriorityQueue()
-        self.executor = ThreadPoolExecutor(max_workers=4)
+        self.job_queue: List[Tuple[int, int, str]] = []  # heap of (priority, sequence, job_id) ready to run
+        self._queue_sequence = itertools.count()
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent_jobs, thread_name_prefix="background-job")
         self.futures: Dict[str, Future] = {}
         
+        # Scheduling state, all guarded by one condition that the scheduler thread waits on
+        self._scheduler = threading.Condition()
+        self.job_type_limits: Dict[str, int] = dict(job_type_limits or {})
+        self.running_by_type: Dict[str, int] = {}
+        self.waiting_jobs: Dict[str, Set[str]] = {}  # job_id -> dependencies not yet completed
+        self.dependents: Dict[str, Set[str]] = {}    # dependency job_id -> jobs waiting on it
+        self._stop_event = threading.Event()
+        
         # Service state
         self.is_running = False
         self.worker_threads = []
-        self.max_concurrent_jobs = 3
+        self.max_concurrent_jobs = max_concurrent_jobs
         self.current_jobs = 0
         
         # Progress tracking
@@ -164,7 +187,15 @@ class BackgroundProcessingService:
         self.job_handlers = {}
         self.job_estimators = {}
         
-        # Persistence
+        # Persistence: one shared connection, progress events written in batches
+        self._db_lock = threading.Lock()
+        self._progress_lock = threading.Lock()
+        self._progress_buffer: List[Tuple] = []
+        self._progress_flush_event = threading.Event()
+        self.progress_flush_interval = 2.0  # seconds
+        self.progress_batch_size = 200
+        self.job_retention_days = 7
+        self.finished_job_memory_hours = 1  # finished jobs stay queryable from storage afterwards
         self._init_job_storage()
         
         # Statistics
@@ -173,7 +204,8 @@ class BackgroundProcessingService:
             'completed_jobs': 0,
             'failed_jobs': 0,
             'start_time': None,
-            'average_job_time': 0
+            'average_job_time': 0,
+            'progress_events_flushed': 0
         }
         
         logger.info("🔄 Background Processing Service initialized")
@@ -185,14 +217,12 @@ class BackgroundProcessingService:
         
         try:
             self.is_running = True
+            self._stop_event.clear()
             self.stats['start_time'] = datetime.now()
             
-            # Start worker threads
-            for i in range(2):  # Main worker and monitor worker
-                if i == 0:
-                    worker = threading.Thread(target=self._job_worker, daemon=True)
-                else:
-                    worker = threading.Thread(target=self._monitor_worker, daemon=True)
+            # Start worker threads: scheduler, monitor and progress flusher
+            for target in (self._job_worker, self._monitor_worker, self._progress_flusher):
+                worker = threading.Thread(target=target, daemon=True)
                 worker.start()
                 self.worker_threads.append(worker)
             
@@ -218,14 +248,26 @@ class BackgroundProcessingService:
             return {"success": False, "error": "Service not running"}
         
         try:
-            self.is_running = False
-            
-            # Cancel running jobs
-            for job_id, future in self.futures.items():
-                if not future.done():
-                    future.cancel()
-                    if job_id in self.jobs:
-                        self.jobs[job_id].status = JobStatus.CANCELLED
+            with self._scheduler:
+                self.is_running = False
+                self._stop_event.set()
+                self._progress_flush_event.set()
+                self._scheduler.notify_all()
+                
+                # Jobs that never started on the executor go back to pending and are
+                # re-queued, so a restart (in-process or from storage) runs them
+                for job_id, future in list(self.futures.items()):
+                    if future.cancel():
+                        self.futures.pop(job_id, None)
+                        self.current_jobs -= 1
+                        if job_id in self.jobs:
+                            job = self.jobs[job_id]
+                            self.running_by_type[job.job_type] -= 1
+                            job.status = JobStatus.PENDING
+                            job.started_at = None
+                            job.progress.started_at = None
+                            job.progress.message = "Re-queued: service stopped before the job started"
+                            self._enqueue_job(job)
             
             # Wait for workers to finish
             for thread in self.worker_threads:
@@ -251,7 +293,12 @@ class BackgroundProcessingService:
                    parameters: Dict[str, Any], priority: JobPriority = JobPriority.NORMAL,
                    tags: List[str] = None, dependencies: List[str] = None,
                    estimated_duration: int = None) -> Dict[str, Any]:
-        """Submit a new background job"""
+        """
+        Submit a new background job.
+        
+        Jobs with dependencies wait until every dependency has completed and
+        fail if a dependency fails or is cancelled.
+        """
         try:
             job_id = str(uuid.uuid4())
             
@@ -274,27 +321,25 @@ class BackgroundProcessingService:
             # Check dependencies
             if dependencies:
                 for dep_id in dependencies:
-                    if dep_id not in self.jobs:
+                    dependency = self._find_job(dep_id)
+                    if dependency is None:
                         return {"success": False, "error": f"Dependency job not found: {dep_id}"}
-                    if self.jobs[dep_id].status not in [JobStatus.COMPLETED]:
-                        return {"success": False, "error": f"Dependency job not completed: {dep_id}"}
+                    if dependency.status in [JobStatus.FAILED, JobStatus.CANCELLED]:
+                        return {"success": False, "error": f"Dependency job {dependency.status.value}: {dep_id}"}
             
             # Estimate duration if not provided
             if estimated_duration is None and job_type in self.job_estimators:
                 job.estimated_duration = self.job_estimators[job_type](parameters)
             
-            # Store job
-            self.jobs[job_id] = job
-            
-            # Add to queue
-            self.job_queue.put((priority.value, job_id))
-            
-            # Update stats
-            self.stats['total_jobs'] += 1
-            
-            # Save job
+            # Save job before the scheduler can pick it up
             self._save_job(job)
             
+            # Store job and queue it (or park it behind its dependencies)
+            with self._scheduler:
+                self.jobs[job_id] = job
+                self.stats['total_jobs'] += 1
+                self._enqueue_job(job)
+            
             logger.info(f"📋 Job submitted: {title} ({job_id})")
             return {
                 "success": True,
@@ -308,10 +353,10 @@ class BackgroundProcessingService:
     
     def get_job_status(self, job_id: str) -> Dict[str, Any]:
         """Get status of a specific job"""
-        if job_id not in self.jobs:
+        job = self._find_job(job_id)
+        if job is None:
             return {"success": False, "error": "Job not found"}
         
-        job = self.jobs[job_id]
         return {
             "success": True,
             "job": job.to_dict()
@@ -322,7 +367,10 @@ class BackgroundProcessingService:
                      limit: int = 100) -> Dict[str, Any]:
         """Get all jobs with optional filtering"""
         try:
-            jobs = list(self.jobs.values())
+            # Stored jobs (including finished ones no longer in memory), overlaid with live state
+            jobs_by_id = {job.job_id: job for job in self._query_stored_jobs(status_filter, type_filter, limit)}
+            jobs_by_id.update(self.jobs)
+            jobs = list(jobs_by_id.values())
             
             # Apply filters
             if status_filter:
@@ -349,11 +397,10 @@ class BackgroundProcessingService:
     
     def cancel_job(self, job_id: str) -> Dict[str, Any]:
         """Cancel a running or pending job"""
-        if job_id not in self.jobs:
+        job = self._find_job(job_id, track=True)
+        if job is None:
             return {"success": False, "error": "Job not found"}
         
-        job = self.jobs[job_id]
-        
         if job.status == JobStatus.COMPLETED:
             return {"success": False, "error": "Job already completed"}
         
@@ -361,14 +408,21 @@ class BackgroundProcessingService:
             return {"success": False, "error": "Job already cancelled"}
         
         try:
-            # Cancel future if running
-            if job_id in self.futures:
-                self.futures[job_id].cancel()
-            
-            # Update job status
-            job.status = JobStatus.CANCELLED
-            job.completed_at = datetime.now()
-            job.progress.message = "Job cancelled"
+            with self._scheduler:
+                # Cancel future if not started; a running handler finishes but its result is discarded
+                if job_id in self.futures and self.futures[job_id].cancel():
+                    del self.futures[job_id]
+                    self.current_jobs -= 1
+                    self.running_by_type[job.job_type] -= 1
+                
+                # Update job status; a queued entry is skipped when the scheduler reaches it
+                job.status = JobStatus.CANCELLED
+                job.completed_at = datetime.now()
+                job.progress.message = "Job cancelled"
+                
+                self._forget_waiting(job_id)
+                self._release_dependents(job)
+                self._scheduler.notify()
             
             # Save job
             self._save_job(job)
@@ -382,11 +436,10 @@ class BackgroundProcessingService:
     
     def retry_job(self, job_id: str) -> Dict[str, Any]:
         """Retry a failed job"""
-        if job_id not in self.jobs:
+        job = self._find_job(job_id, track=True)
+        if job is None:
             return {"success": False, "error": "Job not found"}
         
-        job = self.jobs[job_id]
-        
         if job.status != JobStatus.FAILED:
             return {"success": False, "error": "Job is not in failed state"}
         
@@ -394,16 +447,17 @@ class BackgroundProcessingService:
             return {"success": False, "error": "Maximum retries exceeded"}
         
         try:
-            # Reset job state
-            job.status = JobStatus.PENDING
-            job.error = ""
-            job.started_at = None
-            job.completed_at = None
-            job.retry_count += 1
-            job.progress = JobProgress()
-            
-            # Re-add to queue
-            self.job_queue.put((job.priority.value, job_id))
+            with self._scheduler:
+                # Reset job state
+                job.status = JobStatus.PENDING
+                job.error = ""
+                job.started_at = None
+                job.completed_at = None
+                job.retry_count += 1
+                job.progress = JobProgress()
+                
+                # Re-add to queue
+                self._enqueue_job(job)
             
             # Save job
             self._save_job(job)
@@ -415,13 +469,25 @@ class BackgroundProcessingService:
             logger.error(f"Error retrying job: {e}")
             return {"success": False, "error": str(e)}
     
-    def register_job_handler(self, job_type: str, handler: Callable, estimator: Callable = None):
-        """Register a handler for a specific job type"""
+    def register_job_handler(self, job_type: str, handler: Callable, estimator: Callable = None,
+                             max_concurrent: Optional[int] = None):
+        """Register a handler for a specific job type, optionally capping how many run at once"""
         self.job_handlers[job_type] = handler
         if estimator:
             self.job_estimators[job_type] = estimator
+        if max_concurrent is not None:
+            self.set_job_type_limit(job_type, max_concurrent)
         logger.info(f"📝 Registered handler for job type: {job_type}")
     
+    def set_job_type_limit(self, job_type: str, max_concurrent: Optional[int]):
+        """Cap concurrent jobs of one type (None removes the cap)"""
+        with self._scheduler:
+            if max_concurrent is None:
+                self.job_type_limits.pop(job_type, None)
+            else:
+                self.job_type_limits[job_type] = max_concurrent
+            self._scheduler.notify()
+    
     def add_progress_callback(self, job_id: str, callback: Callable):
         """Add a progress callback for a specific job"""
         if job_id not in self.progress_callbacks:
@@ -440,6 +506,7 @@ class BackgroundProcessingService:
         if job_id in self.jobs:
             job = self.jobs[job_id]
             job.progress.update(current, total, message, details)
+            self._record_progress(job, details)
             
             # Call progress callbacks
             if job_id in self.progress_callbacks:
@@ -458,7 +525,10 @@ class BackgroundProcessingService:
             'is_running': self.is_running,
             'current_jobs': self.current_jobs,
             'max_concurrent': self.max_concurrent_jobs,
-            'queue_size': self.job_queue.qsize(),
+            'queue_size': len(self.job_queue),
+            'waiting_on_dependencies': len(self.waiting_jobs),
+            'running_by_type': {t: n for t, n in self.running_by_type.items() if n},
+            'job_type_limits': dict(self.job_type_limits),
             'total_stored_jobs': len(self.jobs),
             'worker_threads': len(self.worker_threads)
         })
@@ -478,45 +548,125 @@ class BackgroundProcessingService:
         
         return stats
     
+    def _enqueue_job(self, job: BackgroundJob):
+        """Queue a pending job, or park it until its dependencies complete (scheduler lock held)"""
+        unfinished = set()
+        for dep_id in job.dependencies:
+            dependency = self._find_job(dep_id)
+            if dependency is None or dependency.status == JobStatus.COMPLETED:
+                continue  # dependencies compacted out of storage finished long ago
+            if dependency.status in [JobStatus.FAILED, JobStatus.CANCELLED]:
+                self._fail_for_dependency(job, dep_id, dependency.status)
+                return
+            unfinished.add(dep_id)
+        
+        if unfinished:
+            self.waiting_jobs[job.job_id] = unfinished
+            for dep_id in unfinished:
+                self.dependents.setdefault(dep_id, set()).add(job.job_id)
+            return
+        
+        heapq.heappush(self.job_queue, (job.priority.value, next(self._queue_sequence), job.job_id))
+        self._scheduler.notify()
+    
+    def _forget_waiting(self, job_id: str):
+        """Stop tracking a job that was waiting on dependencies (scheduler lock held)"""
+        for dep_id in self.waiting_jobs.pop(job_id, ()):
+            waiting = self.dependents.get(dep_id)
+            if waiting:
+                waiting.discard(job_id)
+                if not waiting:
+                    del self.dependents[dep_id]
+    
+    def _release_dependents(self, job: BackgroundJob):
+        """Queue or fail the jobs waiting on a job that reached a final state (scheduler lock held)"""
+        for dependent_id in self.dependents.pop(job.job_id, set()):
+            unfinished = self.waiting_jobs.get(dependent_id)
+            dependent = self.jobs.get(dependent_id)
+            if unfinished is None or dependent is None or dependent.status != JobStatus.PENDING:
+                continue
+            
+            if job.status == JobStatus.COMPLETED:
+                unfinished.discard(job.job_id)
+                if not unfinished:
+                    del self.waiting_jobs[dependent_id]
+                    self._enqueue_job(dependent)
+            else:
+                self._forget_waiting(dependent_id)
+                self._fail_for_dependency(dependent, job.job_id, job.status)
+    
+    def _fail_for_dependency(self, job: BackgroundJob, dependency_id: str, dependency_status: JobStatus):
+        """Fail a job whose dependency failed or was cancelled, and everything waiting on it"""
+        job.status = JobStatus.FAILED
+        job.error = f"Dependency job {dependency_status.value}: {dependency_id}"
+        job.completed_at = datetime.now()
+        job.progress.message = f"Job failed: {job.error}"
+        self.stats['failed_jobs'] += 1
+        logger.warning(f"⛔ Job not run: {job.title} ({job.job_id}) - {job.error}")
+        self._save_job(job)
+        self._release_dependents(job)
+    
+    def _next_runnable_job(self) -> Optional[BackgroundJob]:
+        """Pop the highest-priority queued job that fits the concurrency limits (scheduler lock held)"""
+        if self.current_jobs >= self.max_concurrent_jobs:
+            return None
+        
+        deferred = []
+        runnable = None
+        while self.job_queue:
+            entry = heapq.heappop(self.job_queue)
+            job = self.jobs.get(entry[2])
+            if job is None or job.status != JobStatus.PENDING:
+                continue  # cancelled or cleaned up while queued
+            
+            limit = self.job_type_limits.get(job.job_type)
+            if limit is not None and self.running_by_type.get(job.job_type, 0) >= limit:
+                deferred.append(entry)
+                continue
+            
+            runnable = job
+            break
+        
+        # Jobs held back by their type's cap keep their place in line
+        for entry in deferred:
+            heapq.heappush(self.job_queue, entry)
+        return runnable
+    
     def _job_worker(self):
-        """Main worker thread for executing jobs"""
-        while self.is_running:
-            try:
-                # Get job from queue
-                priority, job_id = self.job_queue.get(timeout=30)
-                
-                if job_id not in self.jobs:
+        """Scheduler thread: dispatches queued jobs to the executor within the concurrency limits"""
+        with self._scheduler:
+            while self.is_running:
+                job = self._next_runnable_job()
+                if job is None:
+                    # Woken when a job is queued, a job finishes, a limit changes or the service stops
+                    self._scheduler.wait()
                     continue
                 
-                job = self.jobs[job_id]
+                job.status = JobStatus.RUNNING
+                job.started_at = datetime.now()
+                job.progress.started_at = job.started_at
+                job.progress.message = "Job started"
                 
-                # Check if we can run more jobs
-                if self.current_jobs >= self.max_concurrent_jobs:
-                    # Put job back in queue
-                    self.job_queue.put((priority, job_id))
-                    time.sleep(1)
-                    continue
+                self.current_jobs += 1
+                self.running_by_type[job.job_type] = self.running_by_type.get(job.job_type, 0) + 1
                 
-                # Execute job
-                self._execute_job(job)
-                
-            except Empty:
-                continue  # Timeout, check if still running
-            except Exception as e:
-                logger.error(f"Job worker error: {e}")
-                time.sleep(5)
+                try:
+                    self.futures[job.job_id] = self.executor.submit(self._execute_job, job)
+                except Exception as e:
+                    logger.error(f"Job worker error: {e}")
+                    self.current_jobs -= 1
+                    self.running_by_type[job.job_type] -= 1
+                    job.status = JobStatus.FAILED
+                    job.error = str(e)
+                    job.completed_at = datetime.now()
+                    self._release_dependents(job)
     
     def _execute_job(self, job: BackgroundJob):
-        """Execute a specific job"""
+        """Execute a specific job on an executor thread"""
+        error = None
+        result = None
+        self._save_job_state(job)
         try:
-            # Update job status
-            job.status = JobStatus.RUNNING
-            job.started_at = datetime.now()
-            job.progress.started_at = job.started_at
-            job.progress.message = "Job started"
-            
-            self.current_jobs += 1
-            
             # Get handler
             handler = self.job_handlers.get(job.job_type)
             if not handler:
@@ -528,105 +678,118 @@ class BackgroundProcessingService:
             def progress_updater(current, total=None, message=None, details=None):
                 self.update_job_progress(job.job_id, current, total, message, details)
             
-            # Execute handler
-            future = self.executor.submit(handler, job.parameters, progress_updater)
-            self.futures[job.job_id] = future
+            result = handler(job.parameters, progress_updater)
             
-            # Wait for completion
-            try:
-                result = future.result()
-                
-                # Job completed successfully
-                job.status = JobStatus.COMPLETED
-                job.result = result
-                job.completed_at = datetime.now()
-                job.progress.current = job.progress.total
-                job.progress.message = "Job completed successfully"
-                
-                self.stats['completed_jobs'] += 1
-                
-                logger.info(f"✅ Job completed: {job.title} ({job.job_id})")
-                
-            except Exception as e:
-                # Job failed
-                job.status = JobStatus.FAILED
-                job.error = str(e)
-                job.completed_at = datetime.now()
-                job.progress.message = f"Job failed: {str(e)}"
+        except Exception as e:
+            error = e
+        
+        try:
+            with self._scheduler:
+                self.current_jobs -= 1
+                self.running_by_type[job.job_type] -= 1
+                self.futures.pop(job.job_id, None)
                 
-                self.stats['failed_jobs'] += 1
+                if job.status == JobStatus.CANCELLED:
+                    logger.info(f"❌ Cancelled job finished, result discarded: {job.title} ({job.job_id})")
+                elif error is None:
+                    # Job completed successfully
+                    job.status = JobStatus.COMPLETED
+                    job.result = result
+                    job.completed_at = datetime.now()
+                    job.progress.current = job.progress.total
+                    job.progress.message = "Job completed successfully"
+                    
+                    self.stats['completed_jobs'] += 1
+                    
+                    logger.info(f"✅ Job completed: {job.title} ({job.job_id})")
+                else:
+                    # Job failed
+                    job.status = JobStatus.FAILED
+                    job.error = str(error)
+                    job.completed_at = datetime.now()
+                    job.progress.message = f"Job failed: {str(error)}"
+                    
+                    self.stats['failed_jobs'] += 1
+                    
+                    logger.error(f"❌ Job failed: {job.title} ({job.job_id}) - {error}")
                 
-                logger.error(f"❌ Job failed: {job.title} ({job.job_id}) - {e}")
+                # Update average job time
+                finished = self.stats['completed_jobs'] + self.stats['failed_jobs']
+                if job.elapsed_time and finished:
+                    total_time = self.stats['average_job_time'] * (finished - 1)
+                    total_time += job.elapsed_time.total_seconds()
+                    self.stats['average_job_time'] = total_time / finished
                 
-                # Auto-retry if possible
-                if job.retry_count < job.max_retries:
+                # Auto-retry if possible; otherwise the job is final and its dependents can move
+                if job.status == JobStatus.FAILED and job.retry_count < job.max_retries:
                     logger.info(f"🔄 Auto-retrying job: {job.title} ({job.job_id})")
                     self.retry_job(job.job_id)
-            
-            finally:
-                # Cleanup
-                self.current_jobs -= 1
-                if job.job_id in self.futures:
-                    del self.futures[job.job_id]
-                
-                # Save job
-                self._save_job(job)
-                
-                # Call completion callbacks
-                if job.job_id in self.completion_callbacks:
-                    for callback in self.completion_callbacks[job.job_id]:
-                        try:
-                            callback(job)
-                        except Exception as e:
-                            logger.error(f"Completion callback error: {e}")
+                else:
+                    self._release_dependents(job)
                 
-                # Update average job time
-                if job.elapsed_time:
-                    total_time = self.stats['average_job_time'] * self.stats['completed_jobs']
-                    total_time += job.elapsed_time.total_seconds()
-                    self.stats['average_job_time'] = total_time / (self.stats['completed_jobs'] + self.stats['failed_jobs'])
+                # A slot is free
+                self._scheduler.notify()
+            
+            # Save job, with its progress up to this point
+            self._flush_progress()
+            self._save_job(job)
+            
+            # Call completion callbacks
+            if job.job_id in self.completion_callbacks:
+                for callback in self.completion_callbacks[job.job_id]:
+                    try:
+                        callback(job)
+                    except Exception as e:
+                        logger.error(f"Completion callback error: {e}")
                 
         except Exception as e:
             logger.error(f"Error executing job {job.job_id}: {e}")
-            job.status = JobStatus.FAILED
-            job.error = str(e)
-            job.completed_at = datetime.now()
-            self.current_jobs -= 1
     
     def _monitor_worker(self):
         """Monitor worker for cleanup and maintenance"""
+        last_compaction = None
         while self.is_running:
             try:
-                # Clean up old completed jobs (older than 7 days)
-                cutoff_date = datetime.now() - timedelta(days=7)
-                jobs_to_remove = []
+                # Evict finished jobs from memory; they stay in storage until compaction
+                cutoff_date = datetime.now() - timedelta(hours=self.finished_job_memory_hours)
                 
-                for job_id, job in self.jobs.items():
-                    if (job.status in [JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED] and 
-                        job.completed_at and job.completed_at < cutoff_date):
-                        jobs_to_remove.append(job_id)
+                with self._scheduler:
+                    jobs_to_remove = [
+                        job_id for job_id, job in self.jobs.items()
+                        if (job.status in [JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED] and 
+                            job.completed_at and job.completed_at < cutoff_date)
+                    ]
+                    
+                    for job_id in jobs_to_remove:
+                        del self.jobs[job_id]
+                        logger.debug(f"🗑️ Evicted finished job from memory: {job_id}")
+                    
+                    jobs = list(self.jobs.values())
                 
-                for job_id in jobs_to_remove:
-                    del self.jobs[job_id]
-                    logger.debug(f"🗑️ Cleaned up old job: {job_id}")
+                # Apply storage retention hourly
+                if last_compaction is None or datetime.now() - last_compaction > timedelta(hours=1):
+                    self.compact_job_storage()
+                    last_compaction = datetime.now()
                 
                 # Monitor for stuck jobs
-                for job in self.jobs.values():
+                for job in jobs:
                     if (job.status == JobStatus.RUNNING and job.started_at and 
                         datetime.now() - job.started_at > timedelta(hours=2)):
                         logger.warning(f"⚠️ Long-running job detected: {job.title} ({job.job_id})")
                 
-                time.sleep(300)  # Run every 5 minutes
+                self._stop_event.wait(300)  # Run every 5 minutes
                 
             except Exception as e:
                 logger.error(f"Monitor worker error: {e}")
-                time.sleep(60)
+                self._stop_event.wait(60)
     
     def _init_job_storage(self):
         """Initialize job storage in database"""
         try:
-            conn = sqlite3.connect(self.db.db_path)
-            cursor = conn.cursor()
+            self._db_conn = sqlite3.connect(self.db.db_path, timeout=30.0, check_same_thread=False)
+            self._db_conn.execute('PRAGMA journal_mode=WAL')
+            self._db_conn.execute('PRAGMA synchronous=NORMAL')
+            cursor = self._db_conn.cursor()
             
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS background_jobs (
@@ -637,97 +800,345 @@ class BackgroundProcessingService:
                 )
             ''')
             
-            conn.commit()
-            conn.close()
+            # Structured columns, added in place to tables created before they existed
+            existing = {row[1] for row in cursor.execute('PRAGMA table_info(background_jobs)')}
+            for column, column_type in JOB_COLUMNS:
+                if column not in existing:
+                    cursor.execute(f'ALTER TABLE background_jobs ADD COLUMN {column} {column_type}')
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS background_job_progress (
+                    event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_id TEXT NOT NULL,
+                    current INTEGER,
+                    total INTEGER,
+                    message TEXT,
+                    details TEXT,
+                    recorded_at TEXT NOT NULL
+                )
+            ''')
+            
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_background_jobs_status ON background_jobs(status, completed_at)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_background_jobs_created ON background_jobs(created_at)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_background_jobs_type ON background_jobs(job_type, created_at)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_background_job_progress_job ON background_job_progress(job_id, event_id)')
+            
+            self._backfill_job_columns(cursor)
+            
+            self._db_conn.commit()
             logger.info("📊 Job storage initialized")
             
         except Exception as e:
             logger.error(f"Error initializing job storage: {e}")
     
+    def _backfill_job_columns(self, cursor: sqlite3.Cursor):
+        """Fill the structured columns of rows written as JSON only"""
+        rows = cursor.execute('SELECT job_data FROM background_jobs WHERE status IS NULL').fetchall()
+        for (job_data,) in rows:
+            try:
+                job = self._job_from_dict(json.loads(job_data))
+            except (ValueError, KeyError) as e:
+                logger.warning(f"Skipping unreadable stored job: {e}")
+                continue
+            cursor.execute(f'''
+                UPDATE background_jobs SET {", ".join(f"{column} = ?" for column, _ in JOB_COLUMNS)}
+                WHERE job_id = ?
+            ''', (*self._job_columns(job), job.job_id))
+        if rows:
+            logger.info(f"📊 Indexed {len(rows)} stored jobs")
+    
+    @staticmethod
+    def _job_columns(job: BackgroundJob) -> Tuple:
+        """Values for JOB_COLUMNS"""
+        return (
+            job.job_type,
+            job.status.value,
+            job.priority.value,
+            job.retry_count,
+            job.started_at.isoformat() if job.started_at else None,
+            job.completed_at.isoformat() if job.completed_at else None,
+            job.progress.current,
+            job.progress.total,
+            job.progress.message
+        )
+    
     def _save_job(self, job: BackgroundJob):
         """Save job to persistent storage"""
         try:
-            conn = sqlite3.connect(self.db.db_path)
-            cursor = conn.cursor()
-            
-            job_data = json.dumps(job.to_dict())
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO background_jobs (job_id, job_data, updated_at)
-                VALUES (?, ?, ?)
-            ''', (job.job_id, job_data, datetime.now().isoformat()))
+            job_data = json.dumps(job.to_dict(), default=str)
+            columns = ", ".join(column for column, _ in JOB_COLUMNS)
+            placeholders = ", ".join("?" for _ in JOB_COLUMNS)
             
-            conn.commit()
-            conn.close()
+            with self._db_lock:
+                self._db_conn.execute(f'''
+                    INSERT OR REPLACE INTO background_jobs (job_id, job_data, created_at, updated_at, {columns})
+                    VALUES (?, ?, ?, ?, {placeholders})
+                ''', (job.job_id, job_data, job.created_at.isoformat(), datetime.now().isoformat(),
+                      *self._job_columns(job)))
+                self._db_conn.commit()
             
         except Exception as e:
             logger.error(f"Error saving job {job.job_id}: {e}")
     
-    def _load_jobs(self):
-        """Load jobs from persistent storage"""
+    def _save_job_state(self, job: BackgroundJob):
+        """Persist a status transition without rewriting the job document"""
+        try:
+            with self._db_lock:
+                self._db_conn.execute('''
+                    UPDATE background_jobs
+                    SET status = ?, started_at = ?, retry_count = ?, progress_message = ?, updated_at = ?
+                    WHERE job_id = ?
+                ''', (job.status.value, job.started_at.isoformat() if job.started_at else None,
+                      job.retry_count, job.progress.message, datetime.now().isoformat(), job.job_id))
+                self._db_conn.commit()
+        except Exception as e:
+            logger.error(f"Error saving state of job {job.job_id}: {e}")
+    
+    def _record_progress(self, job: BackgroundJob, details: Optional[Dict[str, Any]]):
+        """Buffer a progress event; flushed in batches by the progress flusher"""
+        event = (
+            job.job_id,
+            job.progress.current,
+            job.progress.total,
+            job.progress.message,
+            json.dumps(details, default=str) if details else None,
+            job.progress.updated_at.isoformat()
+        )
+        with self._progress_lock:
+            self._progress_buffer.append(event)
+            full = len(self._progress_buffer) >= self.progress_batch_size
+        if full:
+            self._progress_flush_event.set()
+    
+    def _flush_progress(self) -> int:
+        """Write buffered progress events and the latest progress of each job in one transaction"""
+        with self._progress_lock:
+            events, self._progress_buffer = self._progress_buffer, []
+        if not events:
+            return 0
+        
+        # Only the newest event per job updates the job row
+        latest = {event[0]: event for event in events}
+        try:
+            with self._db_lock:
+                self._db_conn.executemany('''
+                    INSERT INTO background_job_progress (job_id, current, total, message, details, recorded_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', events)
+                self._db_conn.executemany('''
+                    UPDATE background_jobs
+                    SET progress_current = ?, progress_total = ?, progress_message = ?, updated_at = ?
+                    WHERE job_id = ?
+                ''', [(current, total, message, recorded_at, job_id)
+                      for job_id, current, total, message, _, recorded_at in latest.values()])
+                self._db_conn.commit()
+            self.stats['progress_events_flushed'] += len(events)
+        except Exception as e:
+            logger.error(f"Error flushing {len(events)} progress events: {e}")
+        return len(events)
+    
+    def _progress_flusher(self):
+        """Flush progress events every few seconds, or sooner when a batch fills up"""
+        while self.is_running:
+            self._progress_flush_event.wait(self.progress_flush_interval)
+            self._progress_flush_event.clear()
+            self._flush_progress()
+        self._flush_progress()
+    
+    def get_job_progress_history(self, job_id: str, limit: int = 100) -> Dict[str, Any]:
+        """Get the most recent progress events for a job, oldest first"""
+        self._flush_progress()
         try:
-            conn = sqlite3.connect(self.db.db_path)
-            cursor = conn.cursor()
+            with self._db_lock:
+                rows = self._db_conn.execute('''
+                    SELECT current, total, message, details, recorded_at FROM background_job_progress
+                    WHERE job_id = ? ORDER BY event_id DESC LIMIT ?
+                ''', (job_id, limit)).fetchall()
+            events = [
+                {
+                    'current': current,
+                    'total': total,
+                    'message': message,
+                    'details': json.loads(details) if details else {},
+                    'recorded_at': recorded_at
+                }
+                for current, total, message, details, recorded_at in reversed(rows)
+            ]
+            return {"success": True, "job_id": job_id, "events": events}
+        except Exception as e:
+            logger.error(f"Error reading progress for job {job_id}: {e}")
+            return {"success": False, "error": str(e)}
+    
+    def _job_from_dict(self, data: Dict[str, Any]) -> BackgroundJob:
+        """Rebuild a job from its stored document"""
+        job = BackgroundJob(
+            job_id=data['job_id'],
+            job_type=data['job_type'],
+            title=data['title'],
+            description=data['description'],
+            parameters=data['parameters'],
+            priority=JobPriority(data['priority']),
+            status=JobStatus(data['status']),
+            result=data.get('result'),
+            error=data.get('error', ''),
+            max_retries=data.get('max_retries', 3),
+            retry_count=data.get('retry_count', 0),
+            tags=data.get('tags', []),
+            dependencies=data.get('dependencies', []),
+            estimated_duration=data.get('estimated_duration')
+        )
+        
+        # Convert datetime fields
+        for field in ['created_at', 'started_at', 'completed_at']:
+            if data.get(field):
+                setattr(job, field, datetime.fromisoformat(data[field]))
+        
+        # Convert progress
+        if data.get('progress'):
+            progress_data = data['progress']
+            job.progress = JobProgress(
+                current=progress_data.get('current', 0),
+                total=progress_data.get('total', 100),
+                message=progress_data.get('message', ''),
+                details=progress_data.get('details', {})
+            )
             
-            cursor.execute('SELECT job_data FROM background_jobs')
-            rows = cursor.fetchall()
+            for field in ['started_at', 'updated_at']:
+                if progress_data.get(field):
+                    setattr(job.progress, field, datetime.fromisoformat(progress_data[field]))
+        
+        return job
+    
+    def _find_job(self, job_id: str, track: bool = False) -> Optional[BackgroundJob]:
+        """
+        Look up a job in memory, falling back to storage for finished jobs
+        that were evicted or not loaded at startup. With track, a stored job
+        is taken back into memory so it can be changed and rescheduled.
+        """
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return job
+        try:
+            job = self._load_stored_job(job_id)
+        except Exception as e:
+            logger.error(f"Error reading job {job_id}: {e}")
+            return None
+        if job is not None and track:
+            with self._scheduler:
+                job = self.jobs.setdefault(job_id, job)
+        return job
+    
+    def _load_stored_job(self, job_id: str) -> Optional[BackgroundJob]:
+        """Read a job that is no longer held in memory"""
+        with self._db_lock:
+            row = self._db_conn.execute('SELECT job_data FROM background_jobs WHERE job_id = ?', (job_id,)).fetchone()
+        return self._job_from_dict(json.loads(row[0])) if row else None
+    
+    def _query_stored_jobs(self, status_filter: Optional[JobStatus], type_filter: Optional[str],
+                           limit: int) -> List[BackgroundJob]:
+        """Newest stored jobs matching the filters, via the indexed columns"""
+        conditions, params = [], []
+        if status_filter:
+            conditions.append('status = ?')
+            params.append(status_filter.value)
+        if type_filter:
+            conditions.append('job_type = ?')
+            params.append(type_filter)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        with self._db_lock:
+            rows = self._db_conn.execute(
+                f'SELECT job_data FROM background_jobs {where} ORDER BY created_at DESC LIMIT ?',
+                (*params, limit)
+            ).fetchall()
+        return [self._job_from_dict(json.loads(job_data)) for (job_data,) in rows]
+    
+    def _load_jobs(self):
+        """Load unfinished jobs from persistent storage"""
+        try:
+            active = [status.value for status in (JobStatus.PENDING, JobStatus.RUNNING, JobStatus.PAUSED)]
+            with self._db_lock:
+                rows = self._db_conn.execute(
+                    f'SELECT job_data FROM background_jobs WHERE status IN ({", ".join("?" for _ in active)})',
+                    active
+                ).fetchall()
+            loaded = []
             
             for (job_data,) in rows:
                 data = json.loads(job_data)
                 
-                # Convert back to enums and datetime objects
-                job = BackgroundJob(
-                    job_id=data['job_id'],
-                    job_type=data['job_type'],
-                    title=data['title'],
-                    description=data['description'],
-                    parameters=data['parameters'],
-                    priority=JobPriority(data['priority']),
-                    status=JobStatus(data['status']),
-                    result=data.get('result'),
-                    error=data.get('error', ''),
-                    max_retries=data.get('max_retries', 3),
-                    retry_count=data.get('retry_count', 0),
-                    tags=data.get('tags', []),
-                    dependencies=data.get('dependencies', []),
-                    estimated_duration=data.get('estimated_duration')
-                )
-                
-                # Convert datetime fields
-                for field in ['created_at', 'started_at', 'completed_at']:
-                    if data.get(field):
-                        setattr(job, field, datetime.fromisoformat(data[field]))
+                # Jobs submitted since startup are already tracked
+                if data['job_id'] in self.jobs:
+                    continue
                 
-                # Convert progress
-                if data.get('progress'):
-                    progress_data = data['progress']
-                    job.progress = JobProgress(
-                        current=progress_data.get('current', 0),
-                        total=progress_data.get('total', 100),
-                        message=progress_data.get('message', ''),
-                        details=progress_data.get('details', {})
-                    )
-                    
-                    for field in ['started_at', 'updated_at']:
-                        if progress_data.get(field):
-                            setattr(job.progress, field, datetime.fromisoformat(progress_data[field]))
+                job = self._job_from_dict(data)
                 
-                self.jobs[job.job_id] = job
+                # A job that was running when the service went down starts over
+                if job.status == JobStatus.RUNNING:
+                    job.status = JobStatus.PENDING
+                    job.started_at = None
+                    job.progress.message = "Re-queued after restart"
                 
-                # Re-queue pending jobs
-                if job.status == JobStatus.PENDING:
-                    self.job_queue.put((job.priority.value, job.job_id))
+                with self._scheduler:
+                    self.jobs[job.job_id] = job
+                loaded.append(job)
+            
+            # Re-queue pending jobs once every dependency they might wait on is loaded;
+            # finished dependencies are looked up in storage
+            with self._scheduler:
+                for job in loaded:
+                    if job.status == JobStatus.PENDING:
+                        self._enqueue_job(job)
             
-            conn.close()
-            logger.info(f"📥 Loaded {len(rows)} jobs from storage")
+            logger.info(f"📥 Loaded {len(loaded)} unfinished jobs from storage")
             
         except Exception as e:
             logger.error(f"Error loading jobs: {e}")
     
     def _save_jobs(self):
-        """Save all jobs to persistent storage"""
-        for job in self.jobs.values():
-            self._save_job(job)
+        """Save unfinished jobs to persistent storage (finished ones were saved when they ended)"""
+        self._flush_progress()
+        for job in list(self.jobs.values()):
+            if job.is_active:
+                self._save_job(job)
+    
+    def compact_job_storage(self, retention_days: Optional[int] = None) -> Dict[str, int]:
+        """
+        Delete finished jobs older than the retention period with their
+        progress events, and thin the progress history of other finished
+        jobs down to their final event.
+        """
+        retention_days = self.job_retention_days if retention_days is None else retention_days
+        cutoff = (datetime.now() - timedelta(days=retention_days)).isoformat()
+        terminal = [status.value for status in (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)]
+        placeholders = ", ".join("?" for _ in terminal)
+        
+        try:
+            with self._db_lock:
+                cursor = self._db_conn.cursor()
+                expired = f'''
+                    SELECT job_id FROM background_jobs
+                    WHERE status IN ({placeholders}) AND completed_at < ?
+                '''
+                cursor.execute(f'DELETE FROM background_job_progress WHERE job_id IN ({expired})', (*terminal, cutoff))
+                cursor.execute(f'DELETE FROM background_jobs WHERE job_id IN ({expired})', (*terminal, cutoff))
+                jobs_removed = cursor.rowcount
+                
+                cursor.execute(f'''
+                    DELETE FROM background_job_progress
+                    WHERE job_id IN (SELECT job_id FROM background_jobs WHERE status IN ({placeholders}))
+                      AND event_id NOT IN (SELECT MAX(event_id) FROM background_job_progress GROUP BY job_id)
+                ''', terminal)
+                events_removed = cursor.rowcount
+                self._db_conn.commit()
+            
+            if jobs_removed or events_removed:
+                logger.info(f"🗜️ Compacted job storage: {jobs_removed} jobs, {events_removed} progress events removed")
+            return {'jobs_removed': jobs_removed, 'progress_events_removed': events_removed}
+            
+        except Exception as e:
+            logger.error(f"Error compacting job storage: {e}")
+            return {'jobs_removed': 0, 'progress_events_removed': 0}
 
 # Global instance
 background_service = BackgroundProcessingService()
\ No newline at end of file
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Benchmark shared memory value codecs.
+
+Compares the legacy pickle + gzip path (with the len(str(value)) size
+estimate SharedMemory.store used to compute) against the ValueCodec
+configurations available in this environment, on payloads shaped like the
+task_context / proposal / execution_result entries the orchestrator stores.
+
+Usage:
+    python scripts/benchmark_memory_codec.py [--iterations 2000]
+"""
+
+import argparse
+import gzip
+import pickle
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from uuid import uuid4
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.core.memory_codec import (
+    ValueCodec, MSGPACK_AVAILABLE, ZSTD_AVAILABLE, LZ4_AVAILABLE
+)
+
+
+def make_task_context() -> dict:
+    return {
+        'task_id': str(uuid4()),
+        'task_type': 'code_generation',
+        'description': "Refactor the ingestion pipeline to batch Notion writes " * 4,
+        'input_data': {'files': [f"src/module_{i}.py" for i in range(10)], 'depth': 3},
+        'parameters': {'temperature': 0.2, 'max_tokens': 4000},
+        'constraints': {'max_cost': 0.5},
+        'priority': 'normal',
+        'timeout': 300,
+        'max_retries': 3,
+        'created_at': datetime.utcnow(),
+        'deadline': None,
+        'tags': ['workflow', 'active'],
+        'metadata': {}
+    }
+
+
+def make_proposal() -> dict:
+    return {
+        'proposal_id': str(uuid4()),
+        'agent_id': 'claude_primary',
+        'task_context': make_task_context(),
+        'approach': "1. Analyse call sites\n2. Introduce a batching layer\n3. Migrate callers\n" * 20,
+        'estimated_time': timedelta(minutes=12),
+        'estimated_cost': 0.12,
+        'confidence': 0.82,
+        'required_tools': ['code_executor', 'file_system'],
+        'dependencies': [],
+        'risks': ['Behaviour change under partial failure'] * 3,
+        'mitigation_strategies': ['Feature flag the batching layer'] * 3,
+        'expected_output': {'files_changed': 4},
+        'created_at': datetime.utcnow(),
+        'metadata': {}
+    }
+
+
+def make_execution_result() -> dict:
+    return {
+        'result_id': str(uuid4()),
+        'action_id': str(uuid4()),
+        'agent_id': 'gpt_executor',
+        'status': 'completed',
+        'output': {
+            'stdout': "\n".join(f"test_case_{i} ... ok" for i in range(400)),
+            'files': {f"src/module_{i}.py": "def f():\n    return 42\n" * 30 for i in range(5)}
+        },
+        'artifacts': [],
+        'error_message': None,
+        'error_code': None,
+        'performance_metrics': {'latency_ms': 1234.5},
+        'resource_usage': {'memory_mb': 80.0},
+        'execution_time': timedelta(seconds=42),
+        'tokens_used': 5120,
+        'cost': 0.08,
+        'quality_score': 0.9,
+        'confidence': 0.85,
+        'created_at': datetime.utcnow(),
+        'completed_at': datetime.utcnow(),
+        'metadata': {}
+    }
+
+
+def bench_legacy(value, iterations: int):
+    # Mirrors the old SharedMemory.store + MemoryDatabase.store_entry path
+    start = time.perf_counter()
+    for _ in range(iterations):
+        compressed = len(str(value)) > 1024
+        data = pickle.dumps(value)
+        if compressed:
+            data = gzip.compress(data)
+    encode_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        pickle.loads(gzip.decompress(data) if compressed else data)
+    decode_time = time.perf_counter() - start
+
+    return len(data), encode_time, decode_time, 'pickle+gzip' if compressed else 'pickle'
+
+
+def bench_codec(codec: ValueCodec, value, iterations: int):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        data, fmt, _ = codec.encode(value)
+    encode_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        codec.decode(data, fmt)
+    decode_time = time.perf_counter() - start
+
+    return len(data), encode_time, decode_time, fmt
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    payloads = {
+        'task_context': make_task_context(),
+        'proposal': make_proposal(),
+        'execution_result': make_execution_result()
+    }
+
+    configs = [('json+gzip', ValueCodec('json', 'gzip'))]
+    if ZSTD_AVAILABLE:
+        configs.append(('json+zstd', ValueCodec('json', 'zstd')))
+    if LZ4_AVAILABLE:
+        configs.append(('json+lz4', ValueCodec('json', 'lz4')))
+    if MSGPACK_AVAILABLE:
+        configs.append(('msgpack+' + ValueCodec().compressor.name, ValueCodec('msgpack')))
+    configs.append(('default', ValueCodec()))
+
+    n = args.iterations
+    print(f"{'payload':<18} {'codec':<16} {'format':<14} {'bytes':>8} {'enc us':>9} {'dec us':>9}")
+    for name, value in payloads.items():
+        size, enc, dec, fmt = bench_legacy(value, n)
+        print(f"{name:<18} {'legacy':<16} {fmt:<14} {size:>8} {enc / n * 1e6:>9.1f} {dec / n * 1e6:>9.1f}")
+        for label, codec in configs:
+            size, enc, dec, fmt = bench_codec(codec, value, n)
+            print(f"{name:<18} {label:<16} {fmt:<14} {size:>8} {enc / n * 1e6:>9.1f} {dec / n * 1e6:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark caption parsing and the transcript cache.
+
+Generates YouTube-style auto-generated WebVTT files (rolling cues with
+per-word timing tags, each line repeated as the captions scroll) and
+compares the legacy in-memory regex parser YouTubeChannelProcessor used to
+run against the streaming caption_parser, then times a transcript cache
+hit for the same transcript.
+
+Usage:
+    python scripts/benchmark_transcript_parser.py [--minutes 10 60 180] [--repeat 3]
+"""
+
+import argparse
+import random
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "processors"))
+
+from caption_parser import parse_caption_file
+from transcript_cache import TranscriptCache
+
+
+WORDS = (
+    "so today we are going to look at how the agent pipeline handles retries "
+    "and what happens when the upstream api starts returning errors you can "
+    "see the queue depth here and this is where the worker picks up the next job"
+).split()
+
+
+def _ts(seconds: float) -> str:
+    hours, rem = divmod(seconds, 3600)
+    minutes, secs = divmod(rem, 60)
+    return f"{int(hours):02d}:{int(minutes):02d}:{secs:06.3f}"
+
+
+def make_auto_captions(path: Path, minutes: int, seed: int = 7):
+    """Write a rolling auto-caption VTT file covering `minutes` of speech."""
+    rng = random.Random(seed)
+    t = 0.0
+    previous = ""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("WEBVTT\nKind: captions\nLanguage: en\n\n")
+        while t < minutes * 60:
+            words = [rng.choice(WORDS) for _ in range(rng.randint(5, 9))]
+            timed = words[0] + "".join(
+                f"<{_ts(t + 0.3 * i)}><c> {word}</c>" for i, word in enumerate(words[1:], 1)
+            )
+            if rng.random() < 0.05:
+                timed = "[Music] " + timed
+            # Cue 1: previous line plus the new line with word timings
+            f.write(f"{_ts(t)} --> {_ts(t + 2.6)} align:start position:0%\n{previous}\n{timed}\n\n")
+            # Cue 2: the 10 ms "settle" cue repeating the new line plainly
+            plain = " ".join(words)
+            f.write(f"{_ts(t + 2.6)} --> {_ts(t + 2.61)} align:start position:0%\n{plain}\n \n\n")
+            previous = plain
+            t += 2.61
+
+
+def parse_legacy(vtt_content: str) -> str:
+    # Mirrors the old YouTubeChannelProcessor._parse_vtt_content
+    lines = vtt_content.split('\n')
+    text_lines = []
+    in_cue = False
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('WEBVTT') or line.startswith('NOTE'):
+            continue
+        if '-->' in line and re.match(r'\d{2}:\d{2}:\d{2}\.\d{3}', line):
+            in_cue = True
+            continue
+        if in_cue and (line.startswith('align:') or line.startswith('position:') or line.startswith('size:')):
+            continue
+        if in_cue and line:
+            cleaned_line = re.sub(r'<[^>]+>', '', line)
+            cleaned_line = re.sub(r'\{[^}]+\}', '', cleaned_line)
+            cleaned_line = cleaned_line.replace('&gt;', '>').replace('&lt;', '<').replace('&amp;', '&')
+            cleaned_line = re.sub(r'\[.*?\]', '', cleaned_line)
+            cleaned_line = re.sub(r'\(.*?\)', '', cleaned_line)
+            if cleaned_line.strip():
+                text_lines.append(cleaned_line.strip())
+        if not line:
+            in_cue = False
+    full_text = ' '.join(text_lines)
+    full_text = re.sub(r'\s+', ' ', full_text)
+    return full_text.strip()
+
+
+def best_of(repeat: int, fn, *args):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--minutes', type=int, nargs='+', default=[10, 60, 180])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = TranscriptCache(str(Path(temp_dir) / "cache"))
+
+        print(f"{'minutes':>7} {'file KB':>8} {'parser':<10} {'ms':>9} {'words':>8}")
+        for minutes in args.minutes:
+            path = Path(temp_dir) / f"captions_{minutes}.en.vtt"
+            make_auto_captions(path, minutes)
+            size_kb = path.stat().st_size / 1024
+
+            legacy_time, legacy_text = best_of(args.repeat, lambda: parse_legacy(path.read_text(encoding='utf-8')))
+            stream_time, stream_text = best_of(args.repeat, parse_caption_file, str(path))
+
+            video_id = f"bench{minutes:06d}"
+            cache.put(video_id, 'en', 'auto', stream_text)
+            cache_time, _ = best_of(args.repeat, cache.find, video_id)
+
+            for label, elapsed, text in (
+                ('legacy', legacy_time, legacy_text),
+                ('streaming', stream_time, stream_text),
+                ('cache hit', cache_time, stream_text)
+            ):
+                print(f"{minutes:>7} {size_kb:>8.0f} {label:<10} {elapsed * 1000:>9.2f} {len(text.split()):>8}")
+
+
+if __name__ == '__main__':
+    main()
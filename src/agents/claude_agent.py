@@ -309,7 +309,7 @@ If you identify any safety or ethical concerns, please address them in your resp
         """
         
         try:
-            response = await self._actual_api_call(
+            response = await self._make_api_call(
                 prompt=prompt,
                 system_prompt=self.system_prompts["proposal"],
                 temperature=0.7,
@@ -403,7 +403,7 @@ If you identify any safety or ethical concerns, please address them in your resp
         """
         
         try:
-            response = await self._actual_api_call(
+            response = await self._make_api_call(
                 prompt=prompt,
                 system_prompt=self.system_prompts["voter"],
                 temperature=0.5,
@@ -545,7 +545,7 @@ If you identify any safety or ethical concerns, please address them in your resp
         """
         
         try:
-            response = await self._actual_api_call(
+            response = await self._make_api_call(
                 prompt=prompt,
                 temperature=0.1,
                 max_tokens=800,
@@ -595,7 +595,7 @@ If you identify any safety or ethical concerns, please address them in your resp
         - confidence: Confidence in the result (0.0-1.0)
         """
         
-        response = await self._actual_api_call(
+        response = await self._make_api_call(
             prompt=prompt,
             system_prompt=self.system_prompts["executor"],
             temperature=0.3,
@@ -653,7 +653,7 @@ If you identify any safety or ethical concerns, please address them in your resp
         Return results in JSON format with ethical considerations noted.
         """
         
-        response = await self._actual_api_call(
+        response = await self._make_api_call(
             prompt=prompt,
             system_prompt=self.system_prompts["executor"],
             temperature=0.5,
@@ -709,7 +709,7 @@ If you identify any safety or ethical concerns, please address them in your resp
         """
         
         try:
-            response = await self._actual_api_call(
+            response = await self._make_api_call(
                 prompt=prompt,
                 system_prompt=self.system_prompts["validator"],
                 temperature=0.3,
@@ -814,7 +814,7 @@ If you identify any safety or ethical concerns, please address them in your resp
         """
         
         try:
-            response = await self._actual_api_call(
+            response = await self._make_api_call(
                 prompt=prompt,
                 system_prompt=self.system_prompts["reflector"],
                 temperature=0.6,
@@ -921,7 +921,7 @@ If you identify any safety or ethical concerns, please address them in your resp
         Please provide detailed analysis addressing the query with specific references to the documents.
         """
         
-        response = await self._actual_api_call(
+        response = await self._make_api_call(
             prompt=prompt,
             temperature=0.3,
             max_tokens=4000,
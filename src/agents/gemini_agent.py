@@ -275,7 +275,7 @@ class GeminiAgent(BaseAgent):
         """
         
         try:
-            response = await self._actual_api_call(
+            response = await self._make_api_call(
                 prompt=prompt,
                 temperature=0.8,  # Higher temperature for creativity
                 max_tokens=2500
@@ -372,7 +372,7 @@ class GeminiAgent(BaseAgent):
         """
         
         try:
-            response = await self._actual_api_call(
+            response = await self._make_api_call(
                 prompt=prompt,
                 temperature=0.6,
                 max_tokens=1200
@@ -510,7 +510,7 @@ class GeminiAgent(BaseAgent):
         - confidence: Confidence in the result (0.0-1.0)
         """
         
-        response = await self._actual_api_call(
+        response = await self._make_api_call(
             prompt=prompt,
             temperature=0.4,
             max_tokens=2000
@@ -567,7 +567,7 @@ class GeminiAgent(BaseAgent):
         Provide results with innovation and speed focus in JSON format.
         """
         
-        response = await self._actual_api_call(
+        response = await self._make_api_call(
             prompt=prompt,
             temperature=0.6,
             max_tokens=1200
@@ -634,7 +634,7 @@ class GeminiAgent(BaseAgent):
         """
         
         try:
-            response = await self._actual_api_call(
+            response = await self._make_api_call(
                 prompt=prompt,
                 temperature=0.3,
                 max_tokens=1200
@@ -737,7 +737,7 @@ class GeminiAgent(BaseAgent):
         """
         
         try:
-            response = await self._actual_api_call(
+            response = await self._make_api_call(
                 prompt=prompt,
                 temperature=0.7,
                 max_tokens=2000
@@ -860,7 +860,7 @@ class GeminiAgent(BaseAgent):
         """
         
         try:
-            response = await self._actual_api_call(
+            response = await self._make_api_call(
                 prompt=prompt,
                 temperature=0.5,
                 max_tokens=1500,
@@ -926,7 +926,7 @@ class GeminiAgent(BaseAgent):
         """
         
         try:
-            response = await self._actual_api_call(
+            response = await self._make_api_call(
                 prompt=batch_prompt,
                 temperature=0.4,
                 max_tokens=3000
@@ -977,7 +977,7 @@ class GeminiAgent(BaseAgent):
         """
         
         try:
-            response = await self._actual_api_call(
+            response = await self._make_api_call(
                 prompt=prompt,
                 temperature=0.5,
                 max_tokens=1000
@@ -330,7 +330,7 @@ class GPTAgent(BaseAgent):
         """
         
         try:
-            response = await self._actual_api_call(
+            response = await self._make_api_call(
                 prompt=prompt,
                 system_prompt=self.system_prompts["proposal"],
                 temperature=0.7,
@@ -409,7 +409,7 @@ class GPTAgent(BaseAgent):
         """
         
         try:
-            response = await self._actual_api_call(
+            response = await self._make_api_call(
                 prompt=prompt,
                 system_prompt=self.system_prompts["voter"],
                 temperature=0.5,
@@ -530,7 +530,7 @@ class GPTAgent(BaseAgent):
         Return your response as JSON with: result, steps_completed, quality_notes, status
         """
         
-        response = await self._actual_api_call(
+        response = await self._make_api_call(
             prompt=prompt,
             system_prompt=self.system_prompts["executor"],
             temperature=0.3,
@@ -581,7 +581,7 @@ class GPTAgent(BaseAgent):
         Return results as JSON with relevant fields for this action type.
         """
         
-        response = await self._actual_api_call(
+        response = await self._make_api_call(
             prompt=prompt,
             system_prompt=self.system_prompts["executor"],
             temperature=0.5,
@@ -625,7 +625,7 @@ class GPTAgent(BaseAgent):
         """
         
         try:
-            response = await self._actual_api_call(
+            response = await self._make_api_call(
                 prompt=prompt,
                 system_prompt=self.system_prompts["validator"],
                 temperature=0.3,
@@ -690,7 +690,7 @@ class GPTAgent(BaseAgent):
         """
         
         try:
-            response = await self._actual_api_call(
+            response = await self._make_api_call(
                 prompt=prompt,
                 system_prompt=self.system_prompts["reflector"],
                 temperature=0.6,
@@ -758,7 +758,7 @@ class GPTAgent(BaseAgent):
         """
         
         try:
-            response = await self._actual_api_call(
+            response = await self._make_api_call(
                 prompt=prompt,
                 temperature=0.3,
                 max_tokens=1000,
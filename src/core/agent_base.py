@@ -14,7 +14,7 @@ import hashlib
 from abc import ABC, abstractmethod
 from typing import Dict, List, Any, Optional, Union, Tuple, Set
 from datetime import datetime, timedelta
-from collections import defaultdict, deque
+from collections import defaultdict, deque, OrderedDict
 
 from pydantic import BaseModel, ValidationError
 from loguru import logger
@@ -25,54 +25,243 @@ from ..models.schemas import (
     VoteType, Proposal, Vote, Action, ExecutionResult, ValidationResult,
     TaskContext, AgentConfig, PlanStep, ImprovementPlan, PerformanceMetrics
 )
+from .tokenizers import get_tokenizer
+from .response_cache import ResponseCache
+
+
+class TokenBucket:
+    """Continuously refilling token bucket."""
+    
+    def __init__(self, capacity: float, window_seconds: float):
+        self.capacity = capacity
+        self.refill_rate = capacity / window_seconds
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+    
+    def _refill(self, now: float):
+        if now > self.updated_at:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_rate)
+            self.updated_at = now
+    
+    def time_until_available(self, amount: float, now: float) -> float:
+        """Seconds until `amount` tokens can be taken (0 if available now)."""
+        self._refill(now)
+        # Requests larger than the bucket go through once it is full
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.refill_rate
+    
+    def consume(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+    
+    def reset(self):
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+    
+    def tighten(self, capacity: float, window_seconds: float):
+        """Lower the limit if a stricter one is registered."""
+        if capacity < self.capacity:
+            self.capacity = capacity
+            self.refill_rate = capacity / window_seconds
+            self.tokens = min(self.tokens, capacity)
 
 
 class RateLimiter:
-    """Token bucket rate limiter for API calls."""
+    """
+    Token bucket rate limiter for API calls.
     
-    def __init__(self, max_requests: int, window_seconds: int = 60):
+    Every call consumes one request plus an optional weight (e.g. prompt
+    tokens) from a second bucket. Waiters are served strictly FIFO and are
+    woken by a timer set for the exact moment the head of the queue can
+    proceed, rather than by polling. Limiters obtained via shared() are
+    common to all agents of the same provider.
+    """
+    
+    _shared: Dict[str, "RateLimiter"] = {}
+    
+    def __init__(self, max_requests: int, window_seconds: int = 60,
+                 max_tokens: Optional[int] = None):
         self.max_requests = max_requests
         self.window_seconds = window_seconds
-        self.requests = deque()
-        self._lock = asyncio.Lock()
+        self.max_tokens = max_tokens
+        self.request_bucket = TokenBucket(max_requests, window_seconds)
+        self.token_bucket = TokenBucket(max_tokens, window_seconds) if max_tokens else None
+        
+        self._waiters: deque = deque()  # (future, tokens)
+        self._timer: Optional[asyncio.TimerHandle] = None
+        
+        self.granted = 0
+        self.total_wait_seconds = 0.0
+    
+    @classmethod
+    def shared(cls, key: str, max_requests: int, window_seconds: int = 60,
+               max_tokens: Optional[int] = None) -> "RateLimiter":
+        """Get the limiter shared by every caller using `key` (typically the provider)."""
+        limiter = cls._shared.get(key)
+        if limiter is None:
+            limiter = cls(max_requests, window_seconds, max_tokens)
+            cls._shared[key] = limiter
+        else:
+            # Agents sharing a provider account are bound by the strictest configured limit
+            limiter.request_bucket.tighten(max_requests, window_seconds)
+            limiter.max_requests = min(limiter.max_requests, max_requests)
+            if max_tokens:
+                if limiter.token_bucket:
+                    limiter.token_bucket.tighten(max_tokens, window_seconds)
+                    limiter.max_tokens = min(limiter.max_tokens, max_tokens)
+                else:
+                    limiter.token_bucket = TokenBucket(max_tokens, window_seconds)
+                    limiter.max_tokens = max_tokens
+        return limiter
+    
+    def _time_until_available(self, tokens: int, now: float) -> float:
+        delay = self.request_bucket.time_until_available(1, now)
+        if self.token_bucket and tokens:
+            delay = max(delay, self.token_bucket.time_until_available(tokens, now))
+        return delay
+    
+    def _take(self, tokens: int):
+        self.request_bucket.consume(1)
+        if self.token_bucket and tokens:
+            self.token_bucket.consume(tokens)
+        self.granted += 1
+    
+    async def acquire(self, tokens: int = 0) -> bool:
+        """Acquire a rate limit token without waiting."""
+        # Never jump ahead of queued waiters
+        if self._waiters:
+            return False
+        
+        if self._time_until_available(tokens, time.monotonic()) > 0:
+            return False
+        
+        self._take(tokens)
+        return True
     
-    async def acquire(self) -> bool:
-        """Acquire a rate limit token."""
-        async with self._lock:
-            now = time.time()
-            
-            # Remove old requests outside the window
-            while self.requests and now - self.requests[0] > self.window_seconds:
-                self.requests.popleft()
+    async def wait_for_availability(self, tokens: int = 0) -> None:
+        """Wait until a rate limit token (and `tokens` weight) becomes available."""
+        if await self.acquire(tokens):
+            return
+        
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._waiters.append((future, tokens))
+        started = time.monotonic()
+        self._dispatch()
+        
+        try:
+            await future
+        except asyncio.CancelledError:
+            if not (future.done() and not future.cancelled()):
+                # Give up our place so later waiters are not held behind us
+                try:
+                    self._waiters.remove((future, tokens))
+                except ValueError:
+                    pass
+                self._dispatch()
+            raise
+        
+        self.total_wait_seconds += time.monotonic() - started
+    
+    def _dispatch(self):
+        """Grant waiters in FIFO order and arm a timer for the next one."""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        
+        while self._waiters:
+            future, tokens = self._waiters[0]
+            if future.done():
+                self._waiters.popleft()
+                continue
             
-            # Check if we can make a request
-            if len(self.requests) < self.max_requests:
-                self.requests.append(now)
-                return True
+            delay = self._time_until_available(tokens, time.monotonic())
+            if delay > 0:
+                self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
             
-            return False
-    
-    async def wait_for_availability(self) -> None:
-        """Wait until a rate limit token becomes available."""
-        while not await self.acquire():
-            await asyncio.sleep(1)
+            self._waiters.popleft()
+            self._take(tokens)
+            future.set_result(None)
+    
+    def reset(self):
+        """Refill the buckets (queued waiters are released as capacity allows)."""
+        self.request_bucket.reset()
+        if self.token_bucket:
+            self.token_bucket.reset()
+        if self._waiters:
+            self._dispatch()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Current bucket levels and wait statistics."""
+        now = time.monotonic()
+        self.request_bucket._refill(now)
+        return {
+            'max_requests': self.max_requests,
+            'window_seconds': self.window_seconds,
+            'available_requests': self.request_bucket.tokens,
+            'max_tokens': self.max_tokens,
+            'available_tokens': self.token_bucket.tokens if self.token_bucket else None,
+            'queued_waiters': len(self._waiters),
+            'granted': self.granted,
+            'average_wait_seconds': self.total_wait_seconds / self.granted if self.granted else 0.0
+        }
+
+
+# Provider per agent type, used for tokenizers and shared rate limits.
+# Custom agents have their tokenizer detected from the model name.
+_AGENT_PROVIDERS = {
+    AgentType.GPT: "openai",
+    AgentType.CLAUDE: "anthropic",
+    AgentType.GEMINI: "google"
+}
 
 
 class TokenCounter:
-    """Utility class for counting tokens in text."""
+    """
+    Utility class for counting tokens in text.
+    
+    Uses the provider's tokenizer where one is available offline and a
+    calibrated estimator otherwise (see tokenizers.py). Counts for texts
+    above a small size are memoized in an LRU keyed by content hash, so
+    repeated prompts and retries are counted once.
+    """
     
-    def __init__(self, model: str = "gpt-4"):
+    # Below this length hashing costs about as much as counting
+    MIN_CACHED_LENGTH = 64
+    
+    def __init__(self, model: str = "gpt-4", provider: Optional[str] = None,
+                 cache_size: int = 4096):
         self.model = model
-        self._encoding_cache = {}
+        self.tokenizer = get_tokenizer(model, provider)
+        self.cache_size = cache_size
+        self._encoding_cache: "OrderedDict[bytes, int]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
     
     def count_tokens(self, text: str) -> int:
-        """Count tokens in text using approximation."""
+        """Count tokens in text."""
         if not text:
             return 0
         
-        # Simple approximation: ~4 characters per token for most models
-        # This is rough but sufficient for rate limiting
-        return max(1, len(text) // 4)
+        if len(text) < self.MIN_CACHED_LENGTH:
+            return self.tokenizer.count(text)
+        
+        key = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        count = self._encoding_cache.get(key)
+        if count is not None:
+            self._encoding_cache.move_to_end(key)
+            self.cache_hits += 1
+            return count
+        
+        self.cache_misses += 1
+        count = self.tokenizer.count(text)
+        self._encoding_cache[key] = count
+        if len(self._encoding_cache) > self.cache_size:
+            self._encoding_cache.popitem(last=False)
+        
+        return count
     
     def estimate_cost(self, input_tokens: int, output_tokens: int, 
                      cost_per_input: float, cost_per_output: float) -> float:
@@ -130,14 +319,20 @@ class BaseAgent(ABC):
         self.agent_type = config.agent_type
         self.model = config.model
         
-        # Rate limiting
-        self.rate_limiter = RateLimiter(
+        # Rate limiting (buckets are shared by all agents of the same provider)
+        provider = _AGENT_PROVIDERS.get(config.agent_type)
+        self.rate_limiter = RateLimiter.shared(
+            provider or f"custom:{config.agent_id}",
             max_requests=config.rate_limit,
-            window_seconds=60
+            window_seconds=60,
+            max_tokens=config.metadata.get('tokens_per_minute')
         )
         
         # Token counting
-        self.token_counter = TokenCounter(model=config.model)
+        self.token_counter = TokenCounter(model=config.model, provider=_AGENT_PROVIDERS.get(config.agent_type))
+        
+        # Response caching (opt-in via metadata['response_cache']: True or cache options)
+        self.response_cache = self._init_response_cache(config.metadata.get('response_cache'))
         
         # Capabilities management
         self.capabilities = AgentCapabilities(
@@ -153,7 +348,10 @@ class BaseAgent(ABC):
             'total_tokens_used': 0,
             'total_cost': 0.0,
             'average_response_time': 0.0,
-            'last_request_time': None
+            'last_request_time': None,
+            'cache_hits': 0,
+            'cache_misses': 0,
+            'cache_hit_rate': 0.0
         }
         
         # Error tracking
@@ -169,6 +367,19 @@ class BaseAgent(ABC):
         
         logger.info(f"Initialized {self.agent_type.value} agent: {self.agent_id}")
     
+    @staticmethod
+    def _init_response_cache(settings: Union[bool, Dict[str, Any], None]) -> Optional[ResponseCache]:
+        """Resolve the shared response cache for the configured settings."""
+        if not settings:
+            return None
+        
+        options = settings if isinstance(settings, dict) else {}
+        return ResponseCache.shared(
+            max_entries=options.get('max_entries', 1024),
+            ttl_seconds=options.get('ttl_seconds', 3600),
+            cache_dir=options.get('cache_dir')
+        )
+    
     @property
     def is_healthy(self) -> bool:
         """Check if agent is healthy and available."""
@@ -265,19 +476,44 @@ class BaseAgent(ABC):
         """Get proficiency score for a specific task type."""
         return self.capabilities.get_proficiency_score(task_type)
     
+    async def _make_api_call(self, prompt: str, use_cache: bool = True, **kwargs) -> str:
+        """
+        Make an API call with response caching, rate limiting, retries, and error handling.
+        
+        When a response cache is configured, identical requests (provider, model,
+        prompt and call parameters such as system_prompt and temperature) are
+        served from it; pass use_cache=False to always reach the provider.
+        """
+        if self.response_cache is None or not use_cache:
+            return await self._call_provider(prompt, **kwargs)
+        
+        start_time = time.time()
+        cache_key = ResponseCache.make_key(
+            _AGENT_PROVIDERS.get(self.agent_type, "custom"), self.model, prompt, kwargs
+        )
+        
+        response, cache_hit = await self.response_cache.get_or_call(
+            cache_key,
+            lambda: self._call_provider(prompt, cache_hit=False, **kwargs)
+        )
+        
+        if cache_hit:
+            await self._update_metrics(True, time.time() - start_time, 0, 0.0, cache_hit=True)
+        
+        return response
+    
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=2, max=10),
         retry=retry_if_exception_type((ConnectionError, TimeoutError))
     )
-    async def _make_api_call(self, prompt: str, **kwargs) -> str:
-        """
-        Make an API call with rate limiting, retries, and error handling.
+    async def _call_provider(self, prompt: str, cache_hit: Optional[bool] = None, **kwargs) -> str:
+        """Call the provider with rate limiting and metrics tracking."""
+        # Count input tokens so the rate limiter can weight the request
+        input_tokens = self.token_counter.count_tokens(prompt)
         
-        This is a template method that subclasses should override.
-        """
         # Wait for rate limit availability
-        await self.rate_limiter.wait_for_availability()
+        await self.rate_limiter.wait_for_availability(tokens=input_tokens)
         
         start_time = time.time()
         
@@ -285,9 +521,6 @@ class BaseAgent(ABC):
             self.busy = True
             self.current_task = prompt[:100] + "..." if len(prompt) > 100 else prompt
             
-            # Count input tokens
-            input_tokens = self.token_counter.count_tokens(prompt)
-            
             # This should be implemented by subclasses
             response = await self._actual_api_call(prompt, **kwargs)
             
@@ -301,7 +534,7 @@ class BaseAgent(ABC):
                 self.config.cost_per_token, self.config.cost_per_token
             )
             
-            await self._update_metrics(True, execution_time, input_tokens + output_tokens, cost)
+            await self._update_metrics(True, execution_time, input_tokens + output_tokens, cost, cache_hit)
             
             return response
             
@@ -328,8 +561,14 @@ class BaseAgent(ABC):
         pass
     
     async def _update_metrics(self, success: bool, execution_time: float, 
-                            tokens_used: int, cost: float):
-        """Update agent performance metrics."""
+                            tokens_used: int, cost: float, cache_hit: Optional[bool] = None):
+        """Update agent performance metrics (cache_hit is None when no cache was consulted)."""
+        if cache_hit is not None:
+            self.metrics['cache_hits' if cache_hit else 'cache_misses'] += 1
+            self.metrics['cache_hit_rate'] = self.metrics['cache_hits'] / (
+                self.metrics['cache_hits'] + self.metrics['cache_misses']
+            )
+        
         self.metrics['total_requests'] += 1
         self.metrics['total_tokens_used'] += tokens_used
         self.metrics['total_cost'] += cost
@@ -416,8 +655,7 @@ class BaseAgent(ABC):
         self.last_failure_time = None
         self.health_score = 1.0
         
-        # Clear rate limiter
-        self.rate_limiter.requests.clear()
+        # Rate limit buckets are shared per provider, so they are not reset here
         
         logger.info(f"Agent {self.agent_id} reset complete")
     
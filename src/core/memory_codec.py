@@ -0,0 +1,380 @@
+"""
+Value codecs for the shared memory system.
+
+Memory entries are serialized with a pluggable codec and optionally
+compressed once the encoded payload crosses a size threshold. The codec and
+compressor names are stored alongside each row so entries written by older
+versions (pickle + gzip) remain readable.
+"""
+
+import gzip
+import json
+import pickle
+import threading
+import zlib
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+try:
+    import lz4.frame
+    LZ4_AVAILABLE = True
+except ImportError:
+    LZ4_AVAILABLE = False
+
+
+# Marker used to tag values JSON cannot represent natively
+_TYPE_TAG = "__mt__"
+
+# Exact types the serializers emit as-is, and those _encode_special tags
+_PLAIN_TYPES = frozenset((str, int, float, bool, type(None)))
+_HOOK_TYPES = frozenset((datetime, date, timedelta, bytes))
+
+
+def _prepare(obj: Any) -> Any:
+    """
+    Rewrite values the serializers would silently change into tagged forms.
+
+    Tuples, sets, dicts with non-string keys and UUIDs (which orjson would
+    emit as plain strings) are tagged so they decode as the same types.
+    Anything else whose exact type cannot be restored (Enum members,
+    subclasses of builtins, arbitrary objects) raises TypeError so
+    ValueCodec falls back to pickle. Returns obj itself when nothing changed.
+    """
+    kind = type(obj)
+    if kind in _PLAIN_TYPES or kind in _HOOK_TYPES:
+        return obj
+    
+    if kind is list:
+        prepared = None
+        for index, item in enumerate(obj):
+            if type(item) in _PLAIN_TYPES:
+                continue
+            new = _prepare(item)
+            if new is not item:
+                if prepared is None:
+                    prepared = list(obj)
+                prepared[index] = new
+        return obj if prepared is None else prepared
+    
+    if kind is dict:
+        if _TYPE_TAG in obj or any(type(key) is not str for key in obj):
+            return {_TYPE_TAG: "dict", "v": [[_prepare(key), _prepare(item)] for key, item in obj.items()]}
+        prepared = None
+        for key, item in obj.items():
+            if type(item) in _PLAIN_TYPES:
+                continue
+            new = _prepare(item)
+            if new is not item:
+                if prepared is None:
+                    prepared = dict(obj)
+                prepared[key] = new
+        return obj if prepared is None else prepared
+    
+    if kind is tuple or kind is set or kind is frozenset:
+        return {_TYPE_TAG: kind.__name__, "v": [_prepare(item) for item in obj]}
+    
+    if kind is UUID:
+        return {_TYPE_TAG: "uuid", "v": str(obj)}
+    
+    raise TypeError(f"Type {kind.__name__} does not round-trip through JSON")
+
+
+def _encode_special(obj: Any) -> Any:
+    """Convert non-JSON scalar types into tagged, reversible representations."""
+    kind = type(obj)
+    if kind is datetime:
+        return {_TYPE_TAG: "datetime", "v": obj.isoformat()}
+    if kind is date:
+        return {_TYPE_TAG: "date", "v": obj.isoformat()}
+    if kind is timedelta:
+        return {_TYPE_TAG: "timedelta", "v": obj.total_seconds()}
+    if kind is bytes:
+        return {_TYPE_TAG: "bytes", "v": obj.hex()}
+    raise TypeError(f"Type {kind.__name__} is not serializable")
+
+
+def _decode_special(obj: Any) -> Any:
+    """Restore values tagged by _encode_special (mutates freshly decoded containers in place)."""
+    if type(obj) is dict:
+        tag = obj.get(_TYPE_TAG)
+        if tag is not None and len(obj) == 2:
+            value = obj["v"]
+            if tag == "datetime":
+                return datetime.fromisoformat(value)
+            if tag == "date":
+                return date.fromisoformat(value)
+            if tag == "timedelta":
+                return timedelta(seconds=value)
+            if tag == "uuid":
+                return UUID(value)
+            if tag == "bytes":
+                return bytes.fromhex(value)
+            if tag == "tuple":
+                return tuple(_decode_special(item) for item in value)
+            if tag == "set":
+                return set(_decode_special(item) for item in value)
+            if tag == "frozenset":
+                return frozenset(_decode_special(item) for item in value)
+            if tag == "dict":
+                return {_decode_special(key): _decode_special(item) for key, item in value}
+        for key, item in obj.items():
+            if type(item) in _CONTAINER_TYPES:
+                obj[key] = _decode_special(item)
+    elif type(obj) is list:
+        for index, item in enumerate(obj):
+            if type(item) in _CONTAINER_TYPES:
+                obj[index] = _decode_special(item)
+    return obj
+
+
+_CONTAINER_TYPES = (dict, list)
+
+
+class MemoryCodec:
+    """Base class for value serializers."""
+
+    name = "base"
+
+    def encode(self, value: Any) -> bytes:
+        """Serialize a value to bytes. Raises TypeError for unsupported values."""
+        raise NotImplementedError
+
+    def decode(self, data: bytes) -> Any:
+        """Deserialize bytes produced by encode()."""
+        raise NotImplementedError
+
+
+class PickleCodec(MemoryCodec):
+    """Pickle codec; handles arbitrary Python objects."""
+
+    name = "pickle"
+
+    def encode(self, value: Any) -> bytes:
+        return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def decode(self, data: bytes) -> Any:
+        return pickle.loads(data)
+
+
+class JsonCodec(MemoryCodec):
+    """JSON codec backed by orjson when installed, stdlib json otherwise."""
+
+    name = "json"
+
+    def encode(self, value: Any) -> bytes:
+        value = _prepare(value)
+        if ORJSON_AVAILABLE:
+            # Pass datetimes through to the default hook so they round-trip as datetimes
+            return orjson.dumps(
+                value,
+                default=_encode_special,
+                option=orjson.OPT_PASSTHROUGH_DATETIME
+            )
+        return json.dumps(value, default=_encode_special, separators=(",", ":")).encode()
+
+    def decode(self, data: bytes) -> Any:
+        value = orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
+        # Only walk the structure when it actually contains tagged values
+        if _TYPE_TAG.encode() in data:
+            return _decode_special(value)
+        return value
+
+
+class MsgpackCodec(MemoryCodec):
+    """MessagePack codec (requires the msgpack package)."""
+
+    name = "msgpack"
+
+    def encode(self, value: Any) -> bytes:
+        return msgpack.packb(_prepare(value), default=_encode_special, use_bin_type=True)
+
+    def decode(self, data: bytes) -> Any:
+        value = msgpack.unpackb(data, raw=False, strict_map_key=False)
+        if _TYPE_TAG.encode() in data:
+            return _decode_special(value)
+        return value
+
+
+class Compressor:
+    """Base class for byte compressors."""
+
+    name = "none"
+
+    def compress(self, data: bytes) -> bytes:
+        return data
+
+    def decompress(self, data: bytes) -> bytes:
+        return data
+
+
+class GzipCompressor(Compressor):
+    name = "gzip"
+
+    def __init__(self, level: int = 1):
+        self.level = level
+
+    def compress(self, data: bytes) -> bytes:
+        return gzip.compress(data, compresslevel=self.level)
+
+    def decompress(self, data: bytes) -> bytes:
+        # zlib handles the gzip framing directly without GzipFile's per-call overhead
+        return zlib.decompress(data, wbits=31)
+
+
+class ZstdCompressor(Compressor):
+    name = "zstd"
+
+    def __init__(self, level: int = 3):
+        self.level = level
+        # zstd contexts must not be shared between the memory I/O threads
+        self._local = threading.local()
+
+    def _contexts(self):
+        if not hasattr(self._local, "compressor"):
+            self._local.compressor = zstandard.ZstdCompressor(level=self.level)
+            self._local.decompressor = zstandard.ZstdDecompressor()
+        return self._local.compressor, self._local.decompressor
+
+    def compress(self, data: bytes) -> bytes:
+        return self._contexts()[0].compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._contexts()[1].decompress(data)
+
+
+class Lz4Compressor(Compressor):
+    name = "lz4"
+
+    def compress(self, data: bytes) -> bytes:
+        return lz4.frame.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return lz4.frame.decompress(data)
+
+
+def get_codec(name: str) -> MemoryCodec:
+    """Get a codec instance by name."""
+    if name == "pickle":
+        return PickleCodec()
+    if name == "json":
+        return JsonCodec()
+    if name == "msgpack":
+        if not MSGPACK_AVAILABLE:
+            raise ValueError("msgpack codec requires: pip install msgpack")
+        return MsgpackCodec()
+    raise ValueError(f"Unknown memory codec: {name}")
+
+
+def get_compressor(name: str) -> Compressor:
+    """Get a compressor instance by name."""
+    if name == "gzip":
+        return GzipCompressor()
+    if name == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise ValueError("zstd compression requires: pip install zstandard")
+        return ZstdCompressor()
+    if name == "lz4":
+        if not LZ4_AVAILABLE:
+            raise ValueError("lz4 compression requires: pip install lz4")
+        return Lz4Compressor()
+    if name == "none":
+        return Compressor()
+    raise ValueError(f"Unknown memory compressor: {name}")
+
+
+def default_codec_name() -> str:
+    """Fastest safe codec available in this environment."""
+    if ORJSON_AVAILABLE or not MSGPACK_AVAILABLE:
+        return "json"
+    return "msgpack"
+
+
+def default_compressor_name() -> str:
+    """Fastest compressor available in this environment."""
+    if ZSTD_AVAILABLE:
+        return "zstd"
+    if LZ4_AVAILABLE:
+        return "lz4"
+    return "gzip"
+
+
+class ValueCodec:
+    """
+    Encodes memory values with a primary codec and threshold-based compression.
+
+    Values the primary codec cannot represent fall back to pickle when
+    allow_pickle is set. The returned format string ("codec" or
+    "codec+compressor") is persisted with the row and drives decoding.
+    """
+
+    def __init__(self, codec: str = None, compressor: str = None,
+                 compression_threshold: int = 1024, allow_pickle: bool = True):
+        self.codec = get_codec(codec or default_codec_name())
+        self.compressor = get_compressor(compressor or default_compressor_name())
+        self.compression_threshold = compression_threshold
+        self.allow_pickle = allow_pickle
+        self._codecs: Dict[str, MemoryCodec] = {self.codec.name: self.codec}
+        self._compressors: Dict[str, Compressor] = {self.compressor.name: self.compressor}
+
+    def encode(self, value: Any) -> Tuple[bytes, str, bool]:
+        """Encode a value. Returns (data, format, compressed)."""
+        codec = self.codec
+        try:
+            data = codec.encode(value)
+        except (TypeError, ValueError, OverflowError):
+            if not self.allow_pickle:
+                raise
+            codec = self._get_codec("pickle")
+            data = codec.encode(value)
+
+        if self.compressor.name != "none" and len(data) >= self.compression_threshold:
+            compressed = self.compressor.compress(data)
+            # Incompressible payloads are stored as-is
+            if len(compressed) < len(data):
+                return compressed, f"{codec.name}+{self.compressor.name}", True
+
+        return data, codec.name, False
+
+    def decode(self, data: bytes, fmt: Optional[str], legacy_compressed: bool = False) -> Any:
+        """Decode a value stored with the given format string."""
+        if not fmt:
+            # Rows written before codecs existed: pickle, optionally gzipped
+            fmt = "pickle+gzip" if legacy_compressed else "pickle"
+
+        codec_name, _, compressor_name = fmt.partition("+")
+        if compressor_name:
+            data = self._get_compressor(compressor_name).decompress(data)
+
+        if codec_name == "pickle" and not self.allow_pickle:
+            raise ValueError("Refusing to unpickle memory entry (allow_pickle=False)")
+
+        return self._get_codec(codec_name).decode(data)
+
+    def _get_codec(self, name: str) -> MemoryCodec:
+        if name not in self._codecs:
+            self._codecs[name] = get_codec(name)
+        return self._codecs[name]
+
+    def _get_compressor(self, name: str) -> Compressor:
+        if name not in self._compressors:
+            self._compressors[name] = get_compressor(name)
+        return self._compressors[name]
@@ -15,9 +15,11 @@ import json
 import traceback
 import time
 import os
+import uuid
 from typing import Dict, List, Any, Optional, Tuple, Set
 from datetime import datetime, timedelta
-from collections import defaultdict
+from collections import OrderedDict, defaultdict, namedtuple
+from contextlib import asynccontextmanager, contextmanager
 
 from loguru import logger
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
@@ -31,6 +33,7 @@ from ..models.schemas import (
 )
 from .agent_base import BaseAgent, AgentPool
 from .shared_memory import SharedMemory
+from ..monitoring.observability import get_observability_system
 
 
 class WorkflowResult:
@@ -107,6 +110,84 @@ class ConsensusManager:
                     f"Score: {consensus_score:.2f}")
         
         return has_consensus, consensus_score, reasoning
+    
+    def consensus_bounds(self, votes: List[Vote], pending: int) -> Tuple[bool, bool, float, float]:
+        """
+        Bound the consensus outcome over every way `pending` outstanding votes could be cast.
+        
+        Returns (consensus_possible, consensus_certain, min_score, max_score).
+        The score is linear in each approval's confidence, so the extremes are
+        reached with outstanding approvals all at confidence 0 or all at 1.
+        """
+        if pending == 0:
+            has_consensus, score, _ = self.calculate_consensus(votes)
+            return has_consensus, has_consensus, score, score
+        
+        possible, certain = False, True
+        min_score, max_score = float('inf'), float('-inf')
+        
+        for approvals in range(pending + 1):
+            for rejections in range(pending - approvals + 1):
+                abstentions = pending - approvals - rejections
+                for confidence in (0.0, 1.0):
+                    outcome = (
+                        list(votes)
+                        + [_PendingVote(VoteType.APPROVE, confidence)] * approvals
+                        + [_PendingVote(VoteType.REJECT, 0.0)] * rejections
+                        + [_PendingVote(VoteType.ABSTAIN, 0.0)] * abstentions
+                    )
+                    has_consensus, score, _ = self.calculate_consensus(outcome)
+                    possible = possible or has_consensus
+                    certain = certain and has_consensus
+                    min_score = min(min_score, score)
+                    max_score = max(max_score, score)
+        
+        return possible, certain, min_score, max_score
+    
+    def decided_proposal(self, tallies: Dict[str, Tuple[List[Vote], int]]) -> Optional[str]:
+        """
+        Return the proposal that will be selected however outstanding votes are cast.
+        
+        `tallies` maps proposal_id to (votes so far, outstanding vote count).
+        Selection prefers the highest scoring proposal with consensus and falls
+        back to the highest score overall, so a proposal is decided when its
+        worst case beats the best case of every rival that could still compete.
+        Returns None while the outcome can still change.
+        """
+        bounds = {
+            proposal_id: self.consensus_bounds(votes, pending)
+            for proposal_id, (votes, pending) in tallies.items()
+            if votes or pending
+        }
+        if not bounds:
+            return None
+        
+        any_possible = any(b[0] for b in bounds.values())
+        
+        for proposal_id, (possible, certain, min_score, _) in bounds.items():
+            votes, pending = tallies[proposal_id]
+            
+            # Stopping now scores each proposal on the votes gathered so far, so
+            # the winner needs enough of them to be scored at all
+            if pending and len(votes) < self.min_votes:
+                continue
+            
+            if any_possible:
+                # The votes gathered so far must already show consensus on their own
+                if not certain:
+                    continue
+                rivals = [b for pid, b in bounds.items() if pid != proposal_id and b[0]]
+            else:
+                rivals = [b for pid, b in bounds.items() if pid != proposal_id]
+            
+            if all(rival[3] < min_score for rival in rivals):
+                return proposal_id
+        
+        return None
+
+
+# Stand-in for a vote that has not been cast yet (only the fields consensus reads)
+_PendingVote = namedtuple('_PendingVote', ['vote_type', 'confidence'])
 
 
 class ExecutionEngine:
@@ -217,22 +298,110 @@ class Orchestrator:
         self.voting_timeout = self.config.get('voting_timeout', 60)  # seconds
         self.execution_timeout = self.config.get('execution_timeout', 300)  # seconds
         self.enable_rollback = self.config.get('enable_rollback', True)
+        self.early_consensus = self.config.get('early_consensus', True)
+        self.proposal_quorum = self.config.get('proposal_quorum')  # None waits for every agent
+        
+        # Pipelining: how many tasks may be in each phase at once
+        self.phase_concurrency = {
+            WorkflowPhase.PROPOSAL_GENERATION: 4,
+            WorkflowPhase.VOTING: 4,
+            WorkflowPhase.EXECUTION: 1,  # execution history and rollback are shared
+            WorkflowPhase.VALIDATION: 4
+        }
+        self.phase_concurrency.update(self.config.get('phase_concurrency', {}))
+        self._phase_semaphores: Dict[str, asyncio.Semaphore] = {}
         
         # State tracking
         self.current_phase = WorkflowPhase.PROPOSAL_GENERATION
-        self.workflow_state = {}
+        self.workflow_state = {}  # task_id -> per-task phase tracking, only while the task runs
+        self.finished_phases: OrderedDict = OrderedDict()  # task_id -> final phase, most recent last
+        self.workflow_history_size = self.config.get('workflow_history_size', 1000)
         self.metrics = defaultdict(int)
         
         logger.info("Orchestrator initialized with 1-3-1 workflow pattern")
     
+    async def process_tasks(self, task_contexts: List[TaskContext]) -> List[ExecutionResult]:
+        """
+        Process several tasks as a pipeline.
+        
+        Tasks move through the 1-3-1 phases independently, so one task can be
+        voting while another generates proposals and a third executes. The
+        number of tasks in each phase is capped by phase_concurrency.
+        Results are returned in input order.
+        """
+        return list(await asyncio.gather(
+            *(self.process_task(task_context) for task_context in task_contexts)
+        ))
+    
+    @asynccontextmanager
+    async def _phase(self, task_id: str, phase: str):
+        """Hold a concurrency slot for `phase` and record it as the task's current phase."""
+        semaphore = self._phase_semaphores.get(phase)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.phase_concurrency.get(phase, 1))
+            self._phase_semaphores[phase] = semaphore
+        
+        async with semaphore:
+            self._set_phase(task_id, phase)
+            with self._trace_span(task_id, phase):
+                yield
+    
+    def _trace_collector(self):
+        observability = get_observability_system()
+        return observability.trace_collector if observability else None
+    
+    def _start_trace(self, task_context: TaskContext):
+        """Open the root span of a workflow trace, if tracing is enabled."""
+        collector = self._trace_collector()
+        if collector is None:
+            return
+        trace_id = uuid.uuid4().hex
+        span_id = collector.start_span(
+            "orchestrator.process_task",
+            trace_id=trace_id,
+            tags={"task_id": task_context.task_id, "task_type": str(task_context.task_type)}
+        )
+        self.workflow_state[task_context.task_id]['trace'] = (collector, trace_id, span_id)
+    
+    def _finish_trace(self, task_id: str, status: str, tags: Optional[Dict[str, Any]] = None):
+        trace = self.workflow_state.get(task_id, {}).pop('trace', None)
+        if trace:
+            collector, _, span_id = trace
+            collector.finish_span(span_id, status, tags)
+    
+    @contextmanager
+    def _trace_span(self, task_id: str, operation_name: str):
+        """Child span of the task's workflow trace; a no-op when the task is not traced."""
+        trace = self.workflow_state.get(task_id, {}).get('trace')
+        if not trace:
+            yield
+            return
+        
+        collector, trace_id, root_span_id = trace
+        span_id = collector.start_span(operation_name, parent_span_id=root_span_id, trace_id=trace_id)
+        status = "error"
+        try:
+            yield
+            status = "success"
+        finally:
+            collector.finish_span(span_id, status)
+    
+    def _set_phase(self, task_id: str, phase: str):
+        self.current_phase = phase
+        self.workflow_state.setdefault(task_id, {})['phase'] = phase
+    
     async def process_task(self, task_context: TaskContext) -> ExecutionResult:
         """
         Main entry point for processing tasks using the 1-3-1 workflow.
         
+        Safe to call concurrently; see process_tasks for pipelined processing.
         Returns an ExecutionResult containing the final outcome.
         """
         workflow_id = f"workflow_{task_context.task_id}"
+        task_id = task_context.task_id
         start_time = time.time()
+        self.workflow_state[task_id] = {'phase': None, 'started_at': datetime.utcnow()}
+        self._start_trace(task_context)
         
         logger.info(f"Starting 1-3-1 workflow for task: {task_context.description}")
         
@@ -246,33 +415,33 @@ class Orchestrator:
             )
             
             # Phase 1: Proposal Generation (parallel)
-            self.current_phase = WorkflowPhase.PROPOSAL_GENERATION
-            proposals = await self._generate_proposals_parallel(task_context)
+            async with self._phase(task_id, WorkflowPhase.PROPOSAL_GENERATION):
+                proposals = await self._generate_proposals_parallel(task_context)
             
             if not proposals:
                 raise RuntimeError("No valid proposals generated")
             
             # Phase 2: Voting with consensus
-            self.current_phase = WorkflowPhase.VOTING
-            selected_proposal, consensus_result = await self._conduct_voting(proposals, task_context)
+            async with self._phase(task_id, WorkflowPhase.VOTING):
+                selected_proposal, consensus_result = await self._conduct_voting(proposals, task_context)
             
             if not selected_proposal:
                 raise RuntimeError("No proposal achieved consensus")
             
             # Phase 3: Execution with validation
-            self.current_phase = WorkflowPhase.EXECUTION
-            execution_result = await self._execute_proposal(selected_proposal, task_context)
+            async with self._phase(task_id, WorkflowPhase.EXECUTION):
+                execution_result = await self._execute_proposal(selected_proposal, task_context)
             
             # Phase 4: Validation
-            self.current_phase = WorkflowPhase.VALIDATION
-            validation_result = await self._validate_result(execution_result, task_context)
+            async with self._phase(task_id, WorkflowPhase.VALIDATION):
+                validation_result = await self._validate_result(execution_result, task_context)
             
             # Update execution result with validation
             if validation_result:
                 execution_result.metadata['validation'] = validation_result.dict()
             
             # Mark as completed
-            self.current_phase = WorkflowPhase.COMPLETED
+            self._set_phase(task_id, WorkflowPhase.COMPLETED)
             
             # Calculate final metrics
             total_time = time.time() - start_time
@@ -288,10 +457,12 @@ class Orchestrator:
             )
             
             logger.info(f"Workflow completed successfully in {total_time:.2f}s")
+            self._finish_trace(task_id, "success")
             return execution_result
             
         except Exception as e:
-            self.current_phase = WorkflowPhase.FAILED
+            failed_phase = self.workflow_state[task_id]['phase']
+            self._set_phase(task_id, WorkflowPhase.FAILED)
             total_time = time.time() - start_time
             
             error_msg = f"Workflow failed: {str(e)}"
@@ -309,7 +480,7 @@ class Orchestrator:
                 error_message=error_msg,
                 execution_time=timedelta(seconds=total_time),
                 metadata={
-                    'workflow_phase': self.current_phase,
+                    'workflow_phase': failed_phase,
                     'error_type': type(e).__name__,
                     'traceback': traceback.format_exc()
                 }
@@ -323,7 +494,20 @@ class Orchestrator:
                 tags=["workflow", "failed"]
             )
             
+            self._finish_trace(task_id, "error", {'error_type': type(e).__name__, 'failed_phase': failed_phase})
             return error_result
+        
+        finally:
+            self._finish_trace(task_id, "cancelled")  # no-op unless the task was cancelled mid-phase
+            self._retire_task(task_id)
+    
+    def _retire_task(self, task_id: str):
+        """Drop a finished task's live state, keeping its final phase in a bounded history."""
+        state = self.workflow_state.pop(task_id, None) or {}
+        self.finished_phases[task_id] = state.get('phase')
+        self.finished_phases.move_to_end(task_id)
+        while len(self.finished_phases) > self.workflow_history_size:
+            self.finished_phases.popitem(last=False)
     
     async def _generate_proposals_parallel(self, task_context: TaskContext) -> List[Proposal]:
         """Generate proposals from multiple agents in parallel."""
@@ -349,24 +533,43 @@ class Orchestrator:
             )
             proposal_tasks.append(task)
         
-        # Wait for all proposals with timeout
+        # Wait for proposals with timeout, stopping early once the quorum is reached
+        quorum = self.proposal_quorum or len(proposal_tasks)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.proposal_timeout
+        pending = set(proposal_tasks)
+        received = 0
+        
         try:
-            results = await asyncio.wait_for(
-                asyncio.gather(*proposal_tasks, return_exceptions=True),
-                timeout=self.proposal_timeout
-            )
-        except asyncio.TimeoutError:
-            logger.error("Proposal generation timed out")
+            while pending and received < quorum:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=deadline - loop.time(),
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    logger.error("Proposal generation timed out")
+                    raise RuntimeError("Proposal generation timeout")
+                
+                received += sum(1 for task in done if not task.cancelled() and task.exception() is None)
+        finally:
             # Cancel remaining tasks
-            for task in proposal_tasks:
-                if not task.done():
-                    task.cancel()
-            raise RuntimeError("Proposal generation timeout")
+            for task in pending:
+                task.cancel()
+        
+        if pending:
+            logger.info(f"Proposal quorum of {quorum} reached, cancelled {len(pending)} outstanding proposals")
         
-        # Process results and filter valid proposals
+        # Process results (in agent order) and filter valid proposals
         valid_proposals = []
-        for i, result in enumerate(results):
-            agent = available_agents[i]
+        for agent, task in zip(available_agents, proposal_tasks):
+            if task in pending:
+                continue
+            if task.cancelled():
+                logger.warning(f"Proposal from agent {agent.agent_id} was cancelled")
+                continue
+            
+            result = task.exception() or task.result()
             
             if isinstance(result, Exception):
                 logger.error(f"Agent {agent.agent_id} failed to generate proposal: {result}")
@@ -429,9 +632,10 @@ class Orchestrator:
         if len(voting_agents) < self.consensus_manager.min_votes:
             logger.warning(f"Only {len(voting_agents)} voting agents available, minimum is {self.consensus_manager.min_votes}")
         
-        # Collect votes for all proposals
-        all_votes = []
+        # Request all votes concurrently
         proposal_votes = defaultdict(list)
+        outstanding = defaultdict(int)
+        vote_tasks = {}
         
         for proposal in proposals:
             # Get voters (exclude proposal author if possible)
@@ -444,23 +648,49 @@ class Orchestrator:
             if len(proposal_voters) < self.consensus_manager.min_votes:
                 proposal_voters = voting_agents
             
-            # Get votes for this proposal
             for voter in proposal_voters:
-                try:
-                    vote = await self._get_single_vote(voter, proposal, task_context)
-                    all_votes.append(vote)
-                    proposal_votes[proposal.proposal_id].append(vote)
-                    
-                    # Store vote in shared memory
-                    await self.shared_memory.store(
-                        f"vote_{vote.vote_id}",
-                        vote.dict(),
-                        entry_type="vote",
-                        tags=["workflow", "voting", voter.agent_id]
-                    )
+                task = asyncio.create_task(
+                    self._collect_vote(voter, proposal, task_context),
+                    name=f"vote_{voter.agent_id}_{proposal.proposal_id}"
+                )
+                vote_tasks[task] = (voter, proposal)
+                outstanding[proposal.proposal_id] += 1
+        
+        # Gather votes as they arrive, stopping once the selection is decided
+        pending = set(vote_tasks)
+        early_terminated = False
+        
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                
+                for task in done:
+                    voter, proposal = vote_tasks[task]
+                    outstanding[proposal.proposal_id] -= 1
                     
-                except Exception as e:
-                    logger.error(f"Failed to get vote from {voter.agent_id} for proposal {proposal.proposal_id}: {e}")
+                    if task.cancelled():
+                        logger.warning(f"Vote from {voter.agent_id} for proposal {proposal.proposal_id} was cancelled")
+                    elif task.exception():
+                        logger.error(f"Failed to get vote from {voter.agent_id} for proposal {proposal.proposal_id}: {task.exception()}")
+                    else:
+                        proposal_votes[proposal.proposal_id].append(task.result())
+                
+                if pending and self.early_consensus:
+                    tallies = {
+                        proposal.proposal_id: (proposal_votes[proposal.proposal_id], outstanding[proposal.proposal_id])
+                        for proposal in proposals
+                    }
+                    if self.consensus_manager.decided_proposal(tallies):
+                        early_terminated = True
+                        break
+        finally:
+            for task in pending:
+                task.cancel()
+        
+        if early_terminated:
+            self.metrics['early_consensus_terminations'] += 1
+            self.metrics['votes_skipped'] += len(pending)
+            logger.info(f"Selection decided early, cancelled {len(pending)} outstanding votes")
         
         # Calculate consensus for each proposal
         proposal_scores = {}
@@ -474,7 +704,8 @@ class Orchestrator:
                     'votes': votes,
                     'has_consensus': has_consensus,
                     'score': score,
-                    'reasoning': reasoning
+                    'reasoning': reasoning,
+                    'early_terminated': early_terminated
                 }
         
         # Select the proposal with highest consensus score
@@ -501,6 +732,23 @@ class Orchestrator:
         
         return best_proposal, consensus_result
     
+    async def _collect_vote(self, voter: BaseAgent, proposal: Proposal, task_context: TaskContext) -> Vote:
+        """Get a vote and store it in shared memory."""
+        vote = await self._get_single_vote(voter, proposal, task_context)
+        
+        # Store vote in shared memory
+        try:
+            await self.shared_memory.store(
+                f"vote_{vote.vote_id}",
+                vote.dict(),
+                entry_type="vote",
+                tags=["workflow", "voting", voter.agent_id]
+            )
+        except Exception as e:
+            logger.error(f"Failed to store vote from {voter.agent_id} for proposal {proposal.proposal_id}: {e}")
+        
+        return vote
+    
     async def _get_single_vote(self, agent: BaseAgent, proposal: Proposal, task_context: TaskContext) -> Vote:
         """Get a vote from a single agent with timeout handling."""
         try:
@@ -663,7 +911,7 @@ class Orchestrator:
             
             return {
                 'task_id': task_id,
-                'current_phase': self.current_phase,
+                'current_phase': self._task_phase(task_id),
                 'task_context': task_data,
                 'proposals': proposals,
                 'votes': votes,
@@ -675,6 +923,11 @@ class Orchestrator:
             logger.error(f"Failed to get workflow status: {e}")
             return {'error': str(e)}
     
+    def _task_phase(self, task_id: str) -> str:
+        if task_id in self.workflow_state:
+            return self.workflow_state[task_id].get('phase') or self.current_phase
+        return self.finished_phases.get(task_id) or self.current_phase
+    
     async def get_performance_metrics(self) -> PerformanceMetrics:
         """Get orchestrator performance metrics."""
         total_workflows = self.metrics['total_workflows']
@@ -706,6 +959,7 @@ class Orchestrator:
         
         self.current_phase = WorkflowPhase.PROPOSAL_GENERATION
         self.workflow_state.clear()
+        self.finished_phases.clear()
         self.execution_engine.execution_history.clear()
         
         logger.info("Orchestrator state reset complete")
@@ -0,0 +1,227 @@
+"""
+Content-addressed response cache for agent API calls.
+
+Responses are keyed on a hash of the provider, model, system prompt, call
+parameters and prompt, so identical requests from any agent instance (or a
+retried workflow) are answered without another provider round trip. Entries
+live in an in-memory LRU and, optionally, in a directory of JSON files that
+survives restarts. Both tiers honour the same TTL.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from loguru import logger
+
+
+class ResponseCache:
+    """Two-tier (memory + disk) TTL cache for provider responses."""
+
+    _shared: Dict[Tuple[Optional[str], int, float], "ResponseCache"] = {}
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600,
+                 cache_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()  # key -> (stored_at, response)
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def shared(cls, max_entries: int = 1024, ttl_seconds: float = 3600,
+               cache_dir: Optional[str] = None) -> "ResponseCache":
+        """Get the process-wide cache for a configuration so agent instances share hits."""
+        config = (str(Path(cache_dir).resolve()) if cache_dir else None, max_entries, ttl_seconds)
+        cache = cls._shared.get(config)
+        if cache is None:
+            cache = cls(max_entries, ttl_seconds, cache_dir)
+            cls._shared[config] = cache
+        return cache
+
+    @staticmethod
+    def make_key(provider: str, model: str, prompt: str, params: Dict[str, Any]) -> str:
+        """Content address of a request (system prompt travels in params)."""
+        prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        material = json.dumps(
+            {'provider': provider, 'model': model, 'params': params, 'prompt': prompt_hash},
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        """Look up a response, falling back to the disk tier."""
+        response = await self._lookup(key)
+        if response is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return response
+
+    async def _lookup(self, key: str) -> Optional[str]:
+        now = time.time()
+
+        cached = self._memory.get(key)
+        if cached is not None:
+            stored_at, response = cached
+            if now - stored_at < self.ttl_seconds:
+                self._memory.move_to_end(key)
+                return response
+            del self._memory[key]
+
+        if self.cache_dir:
+            loop = asyncio.get_running_loop()
+            cached = await loop.run_in_executor(None, self._read_file, key, now)
+            if cached is not None:
+                self._remember(key, *cached)
+                self.disk_hits += 1
+                return cached[1]
+
+        return None
+
+    async def set(self, key: str, response: str):
+        """Store a response in both tiers."""
+        stored_at = time.time()
+        self._remember(key, stored_at, response)
+
+        if self.cache_dir:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._write_file, key, stored_at, response)
+
+    async def get_or_call(self, key: str, call) -> Tuple[str, bool]:
+        """
+        Return (response, cache_hit), invoking `call()` on a miss.
+
+        Concurrent misses for the same key share a single provider call.
+        """
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            try:
+                response = await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # The lookup we were waiting on was cancelled; do our own
+            else:
+                self.hits += 1
+                self.coalesced += 1
+                return response, True
+
+        # Register before the (possibly disk-backed) lookup so concurrent misses coalesce
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response = await self.get(key)
+            cache_hit = response is not None
+            if not cache_hit:
+                response = await call()
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception retrieved in case nobody was waiting
+            future.exception()
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        else:
+            future.set_result(response)
+            if not cache_hit:
+                await self.set(key, response)
+            return response, cache_hit
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def _remember(self, key: str, stored_at: float, response: str):
+        self._memory[key] = (stored_at, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _read_file(self, key: str, now: float) -> Optional[Tuple[float, str]]:
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable response cache entry {key[:8]}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+        if now - data['stored_at'] >= self.ttl_seconds:
+            path.unlink(missing_ok=True)
+            return None
+        return data['stored_at'], data['response']
+
+    def _write_file(self, key: str, stored_at: float, response: str):
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            path.parent.mkdir(exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'stored_at': stored_at, 'response': response}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write response cache entry {key[:8]}: {e}")
+            tmp_path.unlink(missing_ok=True)
+
+    def purge_expired(self) -> int:
+        """Remove expired entries from both tiers. Returns the number removed."""
+        now = time.time()
+        expired = [k for k, (stored_at, _) in self._memory.items() if now - stored_at >= self.ttl_seconds]
+        for key in expired:
+            del self._memory[key]
+        removed = len(expired)
+
+        if self.cache_dir:
+            for path in self.cache_dir.glob("*/*.json"):
+                try:
+                    if now - path.stat().st_mtime >= self.ttl_seconds:
+                        path.unlink()
+                        removed += 1
+                except OSError:
+                    pass
+
+        return removed
+
+    def clear(self):
+        """Drop every cached response."""
+        self._memory.clear()
+        if self.cache_dir:
+            for path in self.cache_dir.glob("*/*.json"):
+                path.unlink(missing_ok=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for the cache."""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._memory),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'disk_tier': str(self.cache_dir) if self.cache_dir else None,
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
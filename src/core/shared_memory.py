@@ -7,22 +7,27 @@ context window management, and memory optimization features.
 
 import asyncio
 import sqlite3
+import sys
 import json
-import pickle
-import gzip
 import threading
+import queue
 import time
 import hashlib
 from typing import Dict, List, Any, Optional, Union, Set, Tuple
 from datetime import datetime, timedelta
+from bisect import bisect_left
 from collections import defaultdict, OrderedDict
 from dataclasses import asdict
-from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from functools import partial
 
 from loguru import logger
 from pydantic import ValidationError
 
 from ..models.schemas import MemoryEntry, TaskContext, ExecutionResult, AgentConfig
+from .memory_codec import ValueCodec
+from .agent_base import TokenCounter
 
 
 class MemoryType:
@@ -66,16 +71,92 @@ class MemoryManager:
 
 
 class MemoryDatabase:
-    """SQLite-based persistent storage for memory entries."""
+    """
+    SQLite-based persistent storage for memory entries.
+    
+    Connections are pooled and opened in WAL mode so readers never block the
+    writer. Stores and access-count bumps go through a write-behind queue that
+    a background thread flushes in batched transactions; the read path never
+    writes.
+    """
     
-    def __init__(self, db_path: str = "memory.db"):
+    def __init__(self, db_path: str = "memory.db", pool_size: int = 4,
+                 flush_interval: float = 0.5, max_batch_size: int = 256,
+                 write_behind: bool = True, codec: ValueCodec = None):
         self.db_path = db_path
-        self._lock = threading.Lock()
+        self.codec = codec or ValueCodec()
+        self.pool_size = max(1, pool_size)
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+        self.write_behind = write_behind
+        self._in_memory = db_path == ":memory:"
+        
+        # Single writer connection; readers are pooled
+        self._write_lock = threading.RLock()
+        self._write_conn = self._open_connection()
+        self._read_pool: "queue.Queue[sqlite3.Connection]" = queue.Queue(maxsize=self.pool_size)
+        self._read_conns: List[sqlite3.Connection] = []
+        self._pool_lock = threading.Lock()
+        
+        # Write-behind buffers
+        self._pending_lock = threading.Lock()
+        self._pending_stores: Dict[str, Tuple[MemoryEntry, tuple]] = {}
+        self._pending_access: Dict[str, List[Any]] = {}
+        # Batch being written by flush(); still served to readers until it commits
+        self._inflight_stores: Dict[str, Tuple[MemoryEntry, tuple]] = {}
+        self._flush_event = threading.Event()
+        self._closed = threading.Event()
+        self._writer_thread = None
+        
         self._init_database()
+        
+        if self.write_behind:
+            self._writer_thread = threading.Thread(
+                target=self._writer_loop, name="memory-db-writer", daemon=True
+            )
+            self._writer_thread.start()
+    
+    def _open_connection(self) -> sqlite3.Connection:
+        """Open a connection configured for concurrent access."""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        if not self._in_memory:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        # REPLACE must fire the delete triggers that maintain the tag and search indexes
+        conn.execute("PRAGMA recursive_triggers=ON")
+        return conn
+    
+    @contextmanager
+    def _read_connection(self):
+        """Borrow a pooled read connection."""
+        if self._in_memory:
+            # Every :memory: connection is a separate database, so share the writer
+            with self._write_lock:
+                yield self._write_conn
+            return
+        
+        try:
+            conn = self._read_pool.get_nowait()
+        except queue.Empty:
+            with self._pool_lock:
+                if len(self._read_conns) < self.pool_size:
+                    conn = self._open_connection()
+                    self._read_conns.append(conn)
+                else:
+                    conn = None
+            if conn is None:
+                conn = self._read_pool.get()
+        
+        try:
+            yield conn
+        finally:
+            self._read_pool.put(conn)
     
     def _init_database(self):
         """Initialize the SQLite database with required tables."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._write_lock:
+            conn = self._write_conn
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS memory_entries (
                     entry_id TEXT PRIMARY KEY,
@@ -91,10 +172,16 @@ class MemoryDatabase:
                     tags TEXT,
                     size_bytes INTEGER DEFAULT 0,
                     compression INTEGER DEFAULT 0,
-                    metadata TEXT
+                    metadata TEXT,
+                    codec TEXT
                 )
             """)
             
+            # Databases created before the codec layer lack the codec column
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(memory_entries)")}
+            if 'codec' not in columns:
+                conn.execute("ALTER TABLE memory_entries ADD COLUMN codec TEXT")
+            
             conn.execute("""
                 CREATE INDEX IF NOT EXISTS idx_key ON memory_entries(key)
             """)
@@ -111,43 +198,128 @@ class MemoryDatabase:
                 CREATE INDEX IF NOT EXISTS idx_accessed_at ON memory_entries(accessed_at)
             """)
             
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_type_accessed ON memory_entries(entry_type, accessed_at)
+            """)
+            
+            self._init_tag_index(conn)
+            self._fts_enabled = self._init_search_index(conn)
+            
             conn.commit()
     
+    def _init_tag_index(self, conn: sqlite3.Connection):
+        """Create the normalized tag table, kept in sync by triggers."""
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'memory_tags'"
+        ).fetchone()
+        
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS memory_tags (
+                tag TEXT NOT NULL,
+                entry_id TEXT NOT NULL,
+                PRIMARY KEY (tag, entry_id)
+            ) WITHOUT ROWID
+        """)
+        
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_tags_entry_id ON memory_tags(entry_id)
+        """)
+        
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS memory_tags_ai AFTER INSERT ON memory_entries
+            BEGIN
+                INSERT OR IGNORE INTO memory_tags (tag, entry_id)
+                SELECT value, new.entry_id FROM json_each(COALESCE(new.tags, '[]'));
+            END
+        """)
+        
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS memory_tags_ad AFTER DELETE ON memory_entries
+            BEGIN
+                DELETE FROM memory_tags WHERE entry_id = old.entry_id;
+            END
+        """)
+        
+        if not exists:
+            # Backfill tags for entries written before the index existed
+            conn.execute("""
+                INSERT OR IGNORE INTO memory_tags (tag, entry_id)
+                SELECT json_each.value, memory_entries.entry_id
+                FROM memory_entries, json_each(COALESCE(memory_entries.tags, '[]'))
+            """)
+    
+    def _init_search_index(self, conn: sqlite3.Connection) -> bool:
+        """Create the FTS5 index over keys and metadata. Returns False if FTS5 is unavailable."""
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'memory_fts'"
+        ).fetchone()
+        
+        try:
+            # Trigram tokens give substring matching, which is what key search needs
+            conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS memory_fts USING fts5(
+                    key, metadata, tokenize = 'trigram'
+                )
+            """)
+        except sqlite3.OperationalError as e:
+            logger.warning(f"FTS5 trigram index unavailable, memory search will scan keys: {e}")
+            return False
+        
+        # Maps entries to stable FTS rowids (implicit rowids may change on VACUUM)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS memory_fts_map (
+                fts_rowid INTEGER PRIMARY KEY,
+                entry_id TEXT NOT NULL UNIQUE
+            )
+        """)
+        
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS memory_fts_ai AFTER INSERT ON memory_entries
+            BEGIN
+                INSERT INTO memory_fts_map (entry_id) VALUES (new.entry_id);
+                INSERT INTO memory_fts (rowid, key, metadata)
+                VALUES (last_insert_rowid(), new.key, new.metadata);
+            END
+        """)
+        
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS memory_fts_ad AFTER DELETE ON memory_entries
+            BEGIN
+                DELETE FROM memory_fts WHERE rowid =
+                    (SELECT fts_rowid FROM memory_fts_map WHERE entry_id = old.entry_id);
+                DELETE FROM memory_fts_map WHERE entry_id = old.entry_id;
+            END
+        """)
+        
+        if not exists:
+            conn.execute("""
+                INSERT INTO memory_fts_map (entry_id) SELECT entry_id FROM memory_entries
+            """)
+            conn.execute("""
+                INSERT INTO memory_fts (rowid, key, metadata)
+                SELECT m.fts_rowid, e.key, e.metadata
+                FROM memory_fts_map m JOIN memory_entries e ON e.entry_id = m.entry_id
+            """)
+        
+        return True
+    
     def store_entry(self, entry: MemoryEntry) -> bool:
         """Store a memory entry in the database."""
         try:
-            # Serialize the value
-            value_data = pickle.dumps(entry.value)
-            
-            # Compress if enabled
-            if entry.compression:
-                value_data = gzip.compress(value_data)
-            
-            with self._lock:
-                with sqlite3.connect(self.db_path) as conn:
-                    conn.execute("""
-                        INSERT OR REPLACE INTO memory_entries 
-                        (entry_id, key, value_data, entry_type, created_at, updated_at, 
-                         accessed_at, access_count, ttl_seconds, expires_at, tags, 
-                         size_bytes, compression, metadata)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        entry.entry_id,
-                        entry.key,
-                        value_data,
-                        entry.entry_type,
-                        entry.created_at.isoformat(),
-                        entry.updated_at.isoformat(),
-                        entry.accessed_at.isoformat(),
-                        entry.access_count,
-                        entry.ttl_seconds,
-                        entry.expires_at.isoformat() if entry.expires_at else None,
-                        json.dumps(entry.tags),
-                        len(value_data),
-                        1 if entry.compression else 0,
-                        json.dumps(entry.metadata)
-                    ))
-                    conn.commit()
+            row = self._entry_to_row(entry)
+            
+            if not self.write_behind:
+                with self._write_lock:
+                    self._write_rows([row], [])
+                return True
+            
+            with self._pending_lock:
+                # A newer store for the same key supersedes the queued one
+                self._pending_stores[entry.key] = (entry, row)
+                pending_count = len(self._pending_stores) + len(self._pending_access)
+            
+            if pending_count >= self.max_batch_size:
+                self._flush_event.set()
             
             return True
         
@@ -158,26 +330,53 @@ class MemoryDatabase:
     def get_entry(self, key: str) -> Optional[MemoryEntry]:
         """Retrieve a memory entry by key."""
         try:
-            with self._lock:
-                with sqlite3.connect(self.db_path) as conn:
-                    cursor = conn.execute("""
-                        SELECT * FROM memory_entries WHERE key = ? 
-                        AND (expires_at IS NULL OR expires_at > ?)
-                    """, (key, datetime.utcnow().isoformat()))
-                    
-                    row = cursor.fetchone()
-                    if not row:
+            now = datetime.utcnow()
+            
+            # Read-your-writes for entries still sitting in the write-behind queue
+            with self._pending_lock:
+                pending = self._pending_stores.get(key)
+                if pending:
+                    entry = pending[0]
+                    if entry.expires_at and entry.expires_at <= now:
+                        return None
+                    entry.access_count += 1
+                    entry.accessed_at = now
+                    row = pending[1]
+                    self._pending_stores[key] = (entry, self._entry_to_row(entry, (row[2], row[14])))
+                    return entry
+                
+                inflight = self._inflight_stores.get(key)
+                if inflight:
+                    entry = inflight[0]
+                    if entry.expires_at and entry.expires_at <= now:
                         return None
-                    
-                    # Update access count and time
-                    conn.execute("""
-                        UPDATE memory_entries 
-                        SET access_count = access_count + 1, accessed_at = ?
-                        WHERE entry_id = ?
-                    """, (datetime.utcnow().isoformat(), row[0]))
-                    conn.commit()
+                    entry.access_count += 1
+                    entry.accessed_at = now
+                    # The row is being written as-is; bump the count once it lands
+                    pending = self._pending_access.get(entry.entry_id)
+                    if pending:
+                        pending[0] += 1
+                        pending[1] = now.isoformat()
+                    else:
+                        self._pending_access[entry.entry_id] = [1, now.isoformat()]
+                    return entry
+            
+            with self._read_connection() as conn:
+                row = conn.execute("""
+                    SELECT * FROM memory_entries WHERE key = ? 
+                    AND (expires_at IS NULL OR expires_at > ?)
+                    ORDER BY updated_at DESC LIMIT 1
+                """, (key, now.isoformat())).fetchone()
             
-            return self._row_to_entry(row)
+            if not row:
+                return None
+            
+            entry = self._row_to_entry(row)
+            if entry:
+                self._record_access(entry.entry_id, now)
+                entry.access_count += 1
+                entry.accessed_at = now
+            return entry
         
         except Exception as e:
             logger.error(f"Failed to get memory entry for key {key}: {e}")
@@ -186,11 +385,13 @@ class MemoryDatabase:
     def delete_entry(self, key: str) -> bool:
         """Delete a memory entry."""
         try:
-            with self._lock:
-                with sqlite3.connect(self.db_path) as conn:
-                    cursor = conn.execute("DELETE FROM memory_entries WHERE key = ?", (key,))
-                    conn.commit()
-                    return cursor.rowcount > 0
+            with self._write_lock:
+                with self._pending_lock:
+                    pending = self._pending_stores.pop(key, None)
+                
+                cursor = self._write_conn.execute("DELETE FROM memory_entries WHERE key = ?", (key,))
+                self._write_conn.commit()
+                return cursor.rowcount > 0 or pending is not None
         
         except Exception as e:
             logger.error(f"Failed to delete memory entry {key}: {e}")
@@ -200,31 +401,20 @@ class MemoryDatabase:
                     limit: int = 100) -> List[MemoryEntry]:
         """List memory entries with optional filtering."""
         try:
-            query = """
-                SELECT * FROM memory_entries 
-                WHERE (expires_at IS NULL OR expires_at > ?)
-            """
-            params = [datetime.utcnow().isoformat()]
-            
-            if entry_type:
-                query += " AND entry_type = ?"
-                params.append(entry_type)
+            self.flush()
             
-            query += " ORDER BY accessed_at DESC LIMIT ?"
+            where, params = self._filter_clause(entry_type, tags)
+            query = f"SELECT * FROM memory_entries e WHERE {where} ORDER BY e.accessed_at DESC LIMIT ?"
             params.append(limit)
             
-            with self._lock:
-                with sqlite3.connect(self.db_path) as conn:
-                    cursor = conn.execute(query, params)
-                    rows = cursor.fetchall()
+            with self._read_connection() as conn:
+                rows = conn.execute(query, params).fetchall()
             
             entries = []
             for row in rows:
                 entry = self._row_to_entry(row)
                 if entry:
-                    # Filter by tags if specified
-                    if not tags or any(tag in entry.tags for tag in tags):
-                        entries.append(entry)
+                    entries.append(entry)
             
             return entries
         
@@ -232,17 +422,98 @@ class MemoryDatabase:
             logger.error(f"Failed to list memory entries: {e}")
             return []
     
+    def list_keys(self, entry_type: str = None, tags: List[str] = None,
+                  limit: int = 100) -> List[str]:
+        """List entry keys without loading their values."""
+        try:
+            self.flush()
+            
+            where, params = self._filter_clause(entry_type, tags)
+            query = f"SELECT e.key FROM memory_entries e WHERE {where} ORDER BY e.accessed_at DESC LIMIT ?"
+            params.append(limit)
+            
+            with self._read_connection() as conn:
+                return [row[0] for row in conn.execute(query, params)]
+        
+        except Exception as e:
+            logger.error(f"Failed to list memory keys: {e}")
+            return []
+    
+    def search_keys(self, query: str, entry_type: str = None, tags: List[str] = None,
+                    limit: int = 100, include_metadata: bool = False) -> List[str]:
+        """
+        Find keys containing the query string (case-insensitive).
+        
+        Served by the FTS5 trigram index when available; queries shorter than
+        a trigram, or databases without FTS5, fall back to a LIKE scan over
+        keys. Value blobs are never read.
+        """
+        try:
+            self.flush()
+            
+            where, params = self._filter_clause(entry_type, tags)
+            
+            if self._fts_enabled and len(query) >= 3:
+                columns = "{key metadata}" if include_metadata else "key"
+                match = f'{columns} : "{query.replace(chr(34), chr(34) * 2)}"'
+                sql = f"""
+                    SELECT e.key FROM memory_fts f
+                    JOIN memory_fts_map m ON m.fts_rowid = f.rowid
+                    JOIN memory_entries e ON e.entry_id = m.entry_id
+                    WHERE memory_fts MATCH ? AND {where}
+                    ORDER BY e.accessed_at DESC LIMIT ?
+                """
+                params = [match] + params + [limit]
+            else:
+                pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                fields = "e.key LIKE ? ESCAPE '\\'"
+                if include_metadata:
+                    fields = f"({fields} OR e.metadata LIKE ? ESCAPE '\\')"
+                sql = f"""
+                    SELECT e.key FROM memory_entries e
+                    WHERE {fields} AND {where}
+                    ORDER BY e.accessed_at DESC LIMIT ?
+                """
+                params = [pattern] * (2 if include_metadata else 1) + params + [limit]
+            
+            with self._read_connection() as conn:
+                return [row[0] for row in conn.execute(sql, params)]
+        
+        except Exception as e:
+            logger.error(f"Failed to search memory keys: {e}")
+            return []
+    
+    def _filter_clause(self, entry_type: str = None, tags: List[str] = None) -> Tuple[str, List[Any]]:
+        """Build the WHERE clause shared by listing and search queries (table alias e)."""
+        clauses = ["(e.expires_at IS NULL OR e.expires_at > ?)"]
+        params: List[Any] = [datetime.utcnow().isoformat()]
+        
+        if entry_type:
+            clauses.append("e.entry_type = ?")
+            params.append(entry_type)
+        
+        if tags:
+            # Entries carrying any of the requested tags
+            placeholders = ", ".join("?" for _ in tags)
+            clauses.append(
+                f"e.entry_id IN (SELECT entry_id FROM memory_tags WHERE tag IN ({placeholders}))"
+            )
+            params.extend(tags)
+        
+        return " AND ".join(clauses), params
+    
     def cleanup_expired(self) -> int:
         """Remove expired memory entries."""
         try:
-            with self._lock:
-                with sqlite3.connect(self.db_path) as conn:
-                    cursor = conn.execute("""
-                        DELETE FROM memory_entries 
-                        WHERE expires_at IS NOT NULL AND expires_at <= ?
-                    """, (datetime.utcnow().isoformat(),))
-                    conn.commit()
-                    return cursor.rowcount
+            self.flush()
+            
+            with self._write_lock:
+                cursor = self._write_conn.execute("""
+                    DELETE FROM memory_entries 
+                    WHERE expires_at IS NOT NULL AND expires_at <= ?
+                """, (datetime.utcnow().isoformat(),))
+                self._write_conn.commit()
+                return cursor.rowcount
         
         except Exception as e:
             logger.error(f"Failed to cleanup expired entries: {e}")
@@ -251,26 +522,27 @@ class MemoryDatabase:
     def get_memory_stats(self) -> Dict[str, Any]:
         """Get memory database statistics."""
         try:
-            with self._lock:
-                with sqlite3.connect(self.db_path) as conn:
-                    cursor = conn.execute("""
-                        SELECT 
-                            COUNT(*) as total_entries,
-                            SUM(size_bytes) as total_size,
-                            AVG(access_count) as avg_access_count,
-                            COUNT(CASE WHEN expires_at IS NOT NULL AND expires_at <= ? THEN 1 END) as expired_entries
-                        FROM memory_entries
-                    """, (datetime.utcnow().isoformat(),))
-                    
-                    stats = cursor.fetchone()
-                    
-                    cursor = conn.execute("""
-                        SELECT entry_type, COUNT(*) as count 
-                        FROM memory_entries 
-                        GROUP BY entry_type
-                    """)
-                    
-                    type_counts = dict(cursor.fetchall())
+            self.flush()
+            
+            with self._read_connection() as conn:
+                cursor = conn.execute("""
+                    SELECT 
+                        COUNT(*) as total_entries,
+                        SUM(size_bytes) as total_size,
+                        AVG(access_count) as avg_access_count,
+                        COUNT(CASE WHEN expires_at IS NOT NULL AND expires_at <= ? THEN 1 END) as expired_entries
+                    FROM memory_entries
+                """, (datetime.utcnow().isoformat(),))
+                
+                stats = cursor.fetchone()
+                
+                cursor = conn.execute("""
+                    SELECT entry_type, COUNT(*) as count 
+                    FROM memory_entries 
+                    GROUP BY entry_type
+                """)
+                
+                type_counts = dict(cursor.fetchall())
             
             return {
                 'total_entries': stats[0] or 0,
@@ -284,15 +556,151 @@ class MemoryDatabase:
             logger.error(f"Failed to get memory stats: {e}")
             return {}
     
+    def flush(self) -> int:
+        """Write all queued stores and access bumps in a single transaction."""
+        with self._write_lock:
+            with self._pending_lock:
+                if not self._pending_stores and not self._pending_access:
+                    return 0
+                batch_stores = self._pending_stores
+                batch_access = self._pending_access
+                stores = [row for _, row in batch_stores.values()]
+                accesses = [
+                    (count, accessed_at, entry_id)
+                    for entry_id, (count, accessed_at) in batch_access.items()
+                ]
+                self._inflight_stores = batch_stores
+                self._pending_stores = {}
+                self._pending_access = {}
+            
+            try:
+                self._write_rows(stores, accesses)
+            except Exception as e:
+                logger.error(f"Failed to flush {len(stores)} memory writes, requeued: {e}")
+                self._requeue(batch_stores, batch_access)
+                return 0
+            finally:
+                with self._pending_lock:
+                    self._inflight_stores = {}
+            
+            return len(stores) + len(accesses)
+    
+    def _requeue(self, stores: Dict[str, Tuple[MemoryEntry, tuple]], accesses: Dict[str, List[Any]]):
+        """Put a failed batch back without overwriting anything queued since."""
+        with self._pending_lock:
+            for key, pending in stores.items():
+                self._pending_stores.setdefault(key, pending)
+            
+            for entry_id, (count, accessed_at) in accesses.items():
+                pending = self._pending_access.get(entry_id)
+                if pending:
+                    # The newer bump already carries the later access time
+                    pending[0] += count
+                else:
+                    self._pending_access[entry_id] = [count, accessed_at]
+    
+    def close(self):
+        """Flush pending writes, stop the writer thread and close connections."""
+        if self._closed.is_set():
+            return
+        
+        self._closed.set()
+        self._flush_event.set()
+        if self._writer_thread:
+            self._writer_thread.join(timeout=5)
+        
+        self.flush()
+        
+        with self._pool_lock:
+            for conn in self._read_conns:
+                conn.close()
+            self._read_conns.clear()
+        
+        with self._write_lock:
+            # Refresh planner statistics for the tag and search indexes
+            self._write_conn.execute("PRAGMA optimize")
+            self._write_conn.close()
+    
+    def _record_access(self, entry_id: str, accessed_at: datetime):
+        """Queue an access-count bump instead of writing on the read path."""
+        if not self.write_behind:
+            with self._write_lock:
+                self._write_rows([], [(1, accessed_at.isoformat(), entry_id)])
+            return
+        
+        with self._pending_lock:
+            pending = self._pending_access.get(entry_id)
+            if pending:
+                pending[0] += 1
+                pending[1] = accessed_at.isoformat()
+            else:
+                self._pending_access[entry_id] = [1, accessed_at.isoformat()]
+    
+    def _write_rows(self, stores: List[tuple], accesses: List[tuple]):
+        """Apply stores and access bumps in one transaction (caller holds the write lock)."""
+        conn = self._write_conn
+        with conn:
+            if stores:
+                # Keep a single row per key so reads never see stale versions
+                conn.executemany(
+                    "DELETE FROM memory_entries WHERE key = ? AND entry_id != ?",
+                    [(row[1], row[0]) for row in stores]
+                )
+                conn.executemany("""
+                    INSERT OR REPLACE INTO memory_entries 
+                    (entry_id, key, value_data, entry_type, created_at, updated_at, 
+                     accessed_at, access_count, ttl_seconds, expires_at, tags, 
+                     size_bytes, compression, metadata, codec)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, stores)
+            if accesses:
+                conn.executemany("""
+                    UPDATE memory_entries 
+                    SET access_count = access_count + ?, accessed_at = ?
+                    WHERE entry_id = ?
+                """, accesses)
+    
+    def _writer_loop(self):
+        """Background thread that flushes the write-behind queue."""
+        while not self._closed.is_set():
+            self._flush_event.wait(timeout=self.flush_interval)
+            self._flush_event.clear()
+            self.flush()
+    
+    def _entry_to_row(self, entry: MemoryEntry, encoded: Tuple[bytes, str] = None) -> tuple:
+        """Serialize a MemoryEntry into a database row."""
+        if encoded is None:
+            value_data, codec_format, compressed = self.codec.encode(entry.value)
+            
+            # Report the real encoded size back to callers (cache accounting, stats)
+            entry.size_bytes = len(value_data)
+            entry.compression = compressed
+        else:
+            value_data, codec_format = encoded
+        
+        return (
+            entry.entry_id,
+            entry.key,
+            value_data,
+            entry.entry_type,
+            entry.created_at.isoformat(),
+            entry.updated_at.isoformat(),
+            entry.accessed_at.isoformat(),
+            entry.access_count,
+            entry.ttl_seconds,
+            entry.expires_at.isoformat() if entry.expires_at else None,
+            json.dumps(entry.tags),
+            len(value_data),
+            1 if entry.compression else 0,
+            json.dumps(entry.metadata),
+            codec_format
+        )
+    
     def _row_to_entry(self, row: tuple) -> Optional[MemoryEntry]:
         """Convert database row to MemoryEntry object."""
         try:
-            # Deserialize value data
-            value_data = row[2]
-            if row[12]:  # compression flag
-                value_data = gzip.decompress(value_data)
-            
-            value = pickle.loads(value_data)
+            # Deserialize value data (row[14] is the codec format, NULL for legacy rows)
+            value = self.codec.decode(row[2], row[14], legacy_compressed=bool(row[12]))
             
             return MemoryEntry(
                 entry_id=row[0],
@@ -316,96 +724,459 @@ class MemoryDatabase:
             return None
 
 
+class AsyncMemoryBackend:
+    """
+    Async facade over MemoryDatabase.
+    
+    SQLite I/O and value serialization run on a dedicated thread pool so the
+    event loop stays free; a semaphore bounds how many operations are in
+    flight at once.
+    """
+    
+    def __init__(self, db: MemoryDatabase, io_threads: int = 4, max_concurrency: int = 16):
+        self.db = db
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=io_threads, thread_name_prefix="memory-io")
+        self._semaphore: Optional[asyncio.Semaphore] = None
+    
+    async def _run(self, func, *args, **kwargs):
+        """Run a blocking database call on the I/O pool."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+    
+    async def store_entry(self, entry: MemoryEntry) -> bool:
+        """Store a memory entry."""
+        return await self._run(self.db.store_entry, entry)
+    
+    async def get_entry(self, key: str) -> Optional[MemoryEntry]:
+        """Retrieve a memory entry by key."""
+        return await self._run(self.db.get_entry, key)
+    
+    async def delete_entry(self, key: str) -> bool:
+        """Delete a memory entry."""
+        return await self._run(self.db.delete_entry, key)
+    
+    async def list_entries(self, entry_type: str = None, tags: List[str] = None,
+                           limit: int = 100) -> List[MemoryEntry]:
+        """List memory entries with optional filtering."""
+        return await self._run(self.db.list_entries, entry_type=entry_type, tags=tags, limit=limit)
+    
+    async def list_keys(self, entry_type: str = None, tags: List[str] = None,
+                        limit: int = 100) -> List[str]:
+        """List entry keys without loading their values."""
+        return await self._run(self.db.list_keys, entry_type=entry_type, tags=tags, limit=limit)
+    
+    async def search_keys(self, query: str, entry_type: str = None, tags: List[str] = None,
+                          limit: int = 100, include_metadata: bool = False) -> List[str]:
+        """Find keys containing the query string."""
+        return await self._run(
+            self.db.search_keys, query, entry_type=entry_type, tags=tags,
+            limit=limit, include_metadata=include_metadata
+        )
+    
+    async def cleanup_expired(self) -> int:
+        """Remove expired memory entries."""
+        return await self._run(self.db.cleanup_expired)
+    
+    async def get_memory_stats(self) -> Dict[str, Any]:
+        """Get memory database statistics."""
+        return await self._run(self.db.get_memory_stats)
+    
+    async def flush(self) -> int:
+        """Flush queued writes to disk."""
+        return await self._run(self.db.flush)
+    
+    async def close(self):
+        """Close the database and release the I/O threads."""
+        await self._run(self.db.close)
+        self._executor.shutdown(wait=True)
+
+
+class AgentContextHistory:
+    """
+    Context history for a single agent.
+    
+    Items live in a list consumed from a moving head offset, alongside the
+    running token offset at which each item starts. The total is kept
+    incrementally and "newest items fitting in N tokens" is a bisect over
+    the start offsets, so neither adds nor window queries rescan history.
+    """
+    
+    def __init__(self):
+        self.items: List[Dict[str, Any]] = []
+        self._starts: List[int] = []
+        self._head = 0
+        self._added_tokens = 0    # tokens ever appended
+        self._removed_tokens = 0  # tokens trimmed from the front
+        self.lock = asyncio.Lock()
+    
+    def __len__(self) -> int:
+        return len(self.items) - self._head
+    
+    @property
+    def total_tokens(self) -> int:
+        return self._added_tokens - self._removed_tokens
+    
+    def append(self, item: Dict[str, Any], tokens: int):
+        self.items.append(item)
+        self._starts.append(self._added_tokens)
+        self._added_tokens += tokens
+    
+    def trim(self, max_tokens: int):
+        """Drop the oldest items until the history fits in max_tokens."""
+        while self.total_tokens > max_tokens and self._head < len(self.items):
+            next_start = (self._starts[self._head + 1] if self._head + 1 < len(self.items)
+                          else self._added_tokens)
+            self._removed_tokens = next_start
+            self._head += 1
+        
+        # Compact once the consumed prefix dominates, keeping trims amortized O(1)
+        if self._head > 64 and self._head * 2 > len(self.items):
+            del self.items[:self._head]
+            del self._starts[:self._head]
+            self._head = 0
+    
+    def window(self, max_tokens: int) -> List[Dict[str, Any]]:
+        """Newest items whose combined tokens fit in max_tokens, oldest first."""
+        # Item i fits (with everything after it) when added_tokens - start[i] <= max_tokens
+        index = bisect_left(self._starts, self._added_tokens - max_tokens, lo=self._head)
+        return self.items[index:]
+    
+    def clear(self):
+        self.items.clear()
+        self._starts.clear()
+        self._head = 0
+        self._removed_tokens = self._added_tokens
+
+
 class ContextWindowManager:
     """Manages context windows for different agents and tasks."""
     
-    def __init__(self, default_max_tokens: int = 8000):
+    def __init__(self, default_max_tokens: int = 8000, model: str = "gpt-4"):
         self.default_max_tokens = default_max_tokens
+        self.token_counter = TokenCounter(model=model)
         self.agent_windows: Dict[str, int] = {}
-        self.context_histories: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
-        self._lock = asyncio.Lock()
+        self.context_histories: Dict[str, AgentContextHistory] = defaultdict(AgentContextHistory)
     
     async def set_agent_window_size(self, agent_id: str, max_tokens: int):
         """Set context window size for a specific agent."""
-        async with self._lock:
-            self.agent_windows[agent_id] = max_tokens
+        self.agent_windows[agent_id] = max_tokens
     
     async def add_to_context(self, agent_id: str, context_item: Dict[str, Any]):
         """Add an item to the agent's context history."""
-        async with self._lock:
+        history = self.context_histories[agent_id]
+        async with history.lock:
             max_tokens = self.agent_windows.get(agent_id, self.default_max_tokens)
             
             # Add timestamp and token estimate
             context_item['timestamp'] = datetime.utcnow().isoformat()
             context_item['estimated_tokens'] = self._estimate_tokens(context_item)
             
-            self.context_histories[agent_id].append(context_item)
+            history.append(context_item, context_item['estimated_tokens'])
             
             # Trim context to fit within window
-            await self._trim_context(agent_id, max_tokens)
+            history.trim(max_tokens)
     
     async def get_context_for_agent(self, agent_id: str, max_tokens: int = None) -> List[Dict[str, Any]]:
         """Get context history for an agent within token limits."""
-        async with self._lock:
-            if agent_id not in self.context_histories:
-                return []
-            
+        if agent_id not in self.context_histories:
+            return []
+        
+        history = self.context_histories[agent_id]
+        async with history.lock:
             max_tokens = max_tokens or self.agent_windows.get(agent_id, self.default_max_tokens)
-            
-            # Return context items that fit within the token limit
-            context = []
-            current_tokens = 0
-            
-            # Start from most recent items
-            for item in reversed(self.context_histories[agent_id]):
-                item_tokens = item.get('estimated_tokens', 0)
-                if current_tokens + item_tokens <= max_tokens:
-                    context.insert(0, item)
-                    current_tokens += item_tokens
-                else:
-                    break
-            
-            return context
+            return history.window(max_tokens)
     
     async def clear_context(self, agent_id: str):
         """Clear context history for an agent."""
-        async with self._lock:
-            if agent_id in self.context_histories:
-                self.context_histories[agent_id].clear()
+        if agent_id in self.context_histories:
+            history = self.context_histories[agent_id]
+            async with history.lock:
+                history.clear()
     
     async def get_context_stats(self, agent_id: str) -> Dict[str, Any]:
         """Get context statistics for an agent."""
-        async with self._lock:
-            if agent_id not in self.context_histories:
-                return {'total_items': 0, 'estimated_tokens': 0}
-            
-            history = self.context_histories[agent_id]
-            total_tokens = sum(item.get('estimated_tokens', 0) for item in history)
-            
-            return {
-                'total_items': len(history),
-                'estimated_tokens': total_tokens,
-                'max_tokens': self.agent_windows.get(agent_id, self.default_max_tokens),
-                'utilization': total_tokens / self.agent_windows.get(agent_id, self.default_max_tokens)
-            }
-    
-    async def _trim_context(self, agent_id: str, max_tokens: int):
-        """Trim context history to fit within token limits."""
-        history = self.context_histories[agent_id]
+        if agent_id not in self.context_histories:
+            return {'total_items': 0, 'estimated_tokens': 0}
         
-        # Calculate total tokens
-        total_tokens = sum(item.get('estimated_tokens', 0) for item in history)
+        history = self.context_histories[agent_id]
+        max_tokens = self.agent_windows.get(agent_id, self.default_max_tokens)
         
-        # Remove oldest items until we're under the limit
-        while total_tokens > max_tokens and history:
-            removed_item = history.pop(0)
-            total_tokens -= removed_item.get('estimated_tokens', 0)
+        return {
+            'total_items': len(history),
+            'estimated_tokens': history.total_tokens,
+            'max_tokens': max_tokens,
+            'utilization': history.total_tokens / max_tokens
+        }
     
     def _estimate_tokens(self, context_item: Dict[str, Any]) -> int:
         """Estimate token count for a context item."""
-        text_content = str(context_item)
-        # Simple approximation: ~4 characters per token
-        return max(1, len(text_content) // 4)
+        # Count the serialized content, not the bookkeeping fields we add
+        content = {k: v for k, v in context_item.items() if k not in ('timestamp', 'estimated_tokens')}
+        text_content = json.dumps(content, default=str, ensure_ascii=False)
+        return max(1, self.token_counter.count_tokens(text_content))
+
+
+def estimate_object_size(value: Any) -> int:
+    """Approximate the in-memory footprint of a decoded value (deep sys.getsizeof)."""
+    seen: Set[int] = set()
+    stack = [value]
+    total = 0
+    
+    while stack:
+        obj = stack.pop()
+        obj_id = id(obj)
+        if obj_id in seen:
+            continue
+        seen.add(obj_id)
+        total += sys.getsizeof(obj)
+        
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+    
+    return total
+
+
+class FrequencySketch:
+    """
+    Count-min sketch with 4-bit saturating counters and periodic aging.
+    
+    Used as the TinyLFU admission filter: it estimates how often a key has
+    been requested recently without keeping per-key state.
+    """
+    
+    _SEEDS = (0x9E3779B1, 0x85EBCA77, 0xC2B2AE3D, 0x27D4EB2F)
+    
+    def __init__(self, width: int = 16384):
+        # Power of two so indexes can be masked
+        self.width = 1 << max(4, (width - 1).bit_length())
+        self._mask = self.width - 1
+        self._rows = [bytearray(self.width) for _ in self._SEEDS]
+        self._sample_size = self.width * 10
+        self._additions = 0
+    
+    def _indexes(self, key: str):
+        h = hash(key)
+        for seed in self._SEEDS:
+            mixed = (h * seed) & 0xFFFFFFFFFFFFFFFF
+            yield (mixed ^ (mixed >> 29)) & self._mask
+    
+    def increment(self, key: str):
+        """Record one access to key."""
+        added = False
+        for row, index in zip(self._rows, self._indexes(key)):
+            if row[index] < 15:
+                row[index] += 1
+                added = True
+        
+        if added:
+            self._additions += 1
+            if self._additions >= self._sample_size:
+                self._age()
+    
+    def frequency(self, key: str) -> int:
+        """Estimated recent access count for key."""
+        return min(row[index] for row, index in zip(self._rows, self._indexes(key)))
+    
+    def _age(self):
+        """Halve all counters so old popularity decays."""
+        for row in self._rows:
+            for i in range(self.width):
+                row[i] >>= 1
+        self._additions //= 2
+
+
+class SizeAwareCache:
+    """
+    Byte-budgeted W-TinyLFU cache for memory entries.
+    
+    New entries land in a small LRU window; entries leaving the window must
+    beat the main region's eviction victim on estimated access frequency to
+    be admitted. The main region is a segmented LRU (probation/protected).
+    All budgets are in bytes, so a handful of large execution results cannot
+    crowd out the cache the way an entry-count bound allows.
+    """
+    
+    def __init__(self, max_bytes: int, window_ratio: float = 0.01,
+                 protected_ratio: float = 0.8, sketch_width: int = 16384):
+        self.max_bytes = max_bytes
+        self.window_max_bytes = max(1, int(max_bytes * window_ratio))
+        self.main_max_bytes = max_bytes - self.window_max_bytes
+        self.protected_max_bytes = int(self.main_max_bytes * protected_ratio)
+        
+        self._window: "OrderedDict[str, Tuple[MemoryEntry, int]]" = OrderedDict()
+        self._probation: "OrderedDict[str, Tuple[MemoryEntry, int]]" = OrderedDict()
+        self._protected: "OrderedDict[str, Tuple[MemoryEntry, int]]" = OrderedDict()
+        self._window_bytes = 0
+        self._probation_bytes = 0
+        self._protected_bytes = 0
+        self._sketch = FrequencySketch(sketch_width)
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.rejections = 0
+    
+    def __len__(self) -> int:
+        return len(self._window) + len(self._probation) + len(self._protected)
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self._window or key in self._probation or key in self._protected
+    
+    @property
+    def size_bytes(self) -> int:
+        return self._window_bytes + self._probation_bytes + self._protected_bytes
+    
+    def get(self, key: str, now: datetime = None) -> Optional[MemoryEntry]:
+        """Return the cached entry, or None on a miss or if it has expired."""
+        self._sketch.increment(key)
+        now = now or datetime.utcnow()
+        
+        if key in self._window:
+            entry, _ = self._window[key]
+            if self._is_expired(entry, now):
+                return self._expire(key)
+            self._window.move_to_end(key)
+        
+        elif key in self._probation:
+            entry, size = self._probation[key]
+            if self._is_expired(entry, now):
+                return self._expire(key)
+            # Second hit in the main region: promote to protected
+            del self._probation[key]
+            self._probation_bytes -= size
+            self._protected[key] = (entry, size)
+            self._protected_bytes += size
+            self._demote_protected()
+        
+        elif key in self._protected:
+            entry, _ = self._protected[key]
+            if self._is_expired(entry, now):
+                return self._expire(key)
+            self._protected.move_to_end(key)
+        
+        else:
+            self.misses += 1
+            return None
+        
+        self.hits += 1
+        return entry
+    
+    def put(self, key: str, entry: MemoryEntry, size: int = None):
+        """Insert or replace an entry."""
+        size = size if size is not None else estimate_object_size(entry.value)
+        self.pop(key)
+        
+        if size > self.main_max_bytes:
+            # Larger than the whole main region; caching it would flush everything else
+            self.rejections += 1
+            return
+        
+        self._window[key] = (entry, size)
+        self._window_bytes += size
+        
+        while self._window_bytes > self.window_max_bytes and self._window:
+            candidate_key, (candidate, candidate_size) = self._window.popitem(last=False)
+            self._window_bytes -= candidate_size
+            self._admit(candidate_key, candidate, candidate_size)
+    
+    def pop(self, key: str) -> Optional[MemoryEntry]:
+        """Remove an entry without counting it as an eviction."""
+        for segment, attr in ((self._window, '_window_bytes'),
+                              (self._probation, '_probation_bytes'),
+                              (self._protected, '_protected_bytes')):
+            if key in segment:
+                entry, size = segment.pop(key)
+                setattr(self, attr, getattr(self, attr) - size)
+                return entry
+        return None
+    
+    def expire(self, now: datetime = None) -> int:
+        """Drop all expired entries. Returns the number removed."""
+        now = now or datetime.utcnow()
+        expired = [
+            key
+            for segment in (self._window, self._probation, self._protected)
+            for key, (entry, _) in segment.items()
+            if self._is_expired(entry, now)
+        ]
+        for key in expired:
+            self._expire(key)
+        return len(expired)
+    
+    def clear(self):
+        """Remove everything (counters are kept)."""
+        for segment in (self._window, self._probation, self._protected):
+            segment.clear()
+        self._window_bytes = self._probation_bytes = self._protected_bytes = 0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Cache counters and utilization."""
+        lookups = self.hits + self.misses
+        return {
+            'cache_size': len(self),
+            'cache_bytes': self.size_bytes,
+            'cache_max_bytes': self.max_bytes,
+            'cache_utilization': self.size_bytes / self.max_bytes if self.max_bytes else 0.0,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'rejections': self.rejections,
+            'window_bytes': self._window_bytes,
+            'probation_bytes': self._probation_bytes,
+            'protected_bytes': self._protected_bytes
+        }
+    
+    def _admit(self, key: str, entry: MemoryEntry, size: int):
+        """TinyLFU admission of a window evictee into the main region."""
+        candidate_freq = self._sketch.frequency(key)
+        
+        while self._probation_bytes + self._protected_bytes + size > self.main_max_bytes:
+            victims = self._probation if self._probation else self._protected
+            victim_key = next(iter(victims))
+            if self._sketch.frequency(victim_key) >= candidate_freq:
+                self.rejections += 1
+                return
+            self._evict(victims, victim_key)
+        
+        self._probation[key] = (entry, size)
+        self._probation_bytes += size
+    
+    def _evict(self, segment: "OrderedDict[str, Tuple[MemoryEntry, int]]", key: str):
+        _, size = segment.pop(key)
+        if segment is self._probation:
+            self._probation_bytes -= size
+        else:
+            self._protected_bytes -= size
+        self.evictions += 1
+    
+    def _demote_protected(self):
+        """Move protected LRU entries back to probation when over budget."""
+        while self._protected_bytes > self.protected_max_bytes and len(self._protected) > 1:
+            key, (entry, size) = self._protected.popitem(last=False)
+            self._protected_bytes -= size
+            self._probation[key] = (entry, size)
+            self._probation_bytes += size
+    
+    def _expire(self, key: str) -> None:
+        self.pop(key)
+        self.expirations += 1
+        self.misses += 1
+        return None
+    
+    @staticmethod
+    def _is_expired(entry: MemoryEntry, now: datetime) -> bool:
+        return entry.expires_at is not None and entry.expires_at <= now
 
 
 class MemoryOptimizer:
@@ -418,11 +1189,7 @@ class MemoryOptimizer:
         self.last_cleanup = time.time()
     
     async def optimize_entry(self, entry: MemoryEntry) -> MemoryEntry:
-        """Optimize a memory entry for storage."""
-        # Enable compression for large entries
-        if entry.size_bytes > self.compression_threshold:
-            entry.compression = True
-        
+        """Optimize a memory entry for storage (compression is decided by the value codec)."""
         # Set reasonable TTL if not specified
         if entry.ttl_seconds is None:
             entry.ttl_seconds = self._get_default_ttl(entry.entry_type)
@@ -493,14 +1260,20 @@ class SharedMemory:
     autonomous multi-LLM agent system.
     """
     
-    def __init__(self, db_path: str = "memory.db", max_memory_mb: int = 500):
-        self.db = MemoryDatabase(db_path)
-        self.context_manager = ContextWindowManager()
+    def __init__(self, db_path: str = "memory.db", max_memory_mb: int = 500,
+                 io_threads: int = 4, max_io_concurrency: int = 16,
+                 codec: str = None, compressor: str = None):
         self.optimizer = MemoryOptimizer(max_memory_mb)
+        self.db = MemoryDatabase(db_path, codec=ValueCodec(
+            codec=codec,
+            compressor=compressor,
+            compression_threshold=self.optimizer.compression_threshold
+        ))
+        self.backend = AsyncMemoryBackend(self.db, io_threads, max_io_concurrency)
+        self.context_manager = ContextWindowManager()
         
         # In-memory cache for frequently accessed items
-        self._cache: OrderedDict[str, MemoryEntry] = OrderedDict()
-        self._cache_max_size = 1000
+        self._cache = SizeAwareCache(max_bytes=max_memory_mb * 1024 * 1024)
         self._cache_lock = asyncio.Lock()
         
         # Background cleanup task
@@ -530,14 +1303,11 @@ class SharedMemory:
                 metadata=metadata or {}
             )
             
-            # Calculate size
-            entry.size_bytes = len(str(value))
-            
-            # Optimize entry
+            # Optimize entry (size_bytes is filled in from the encoded payload on store)
             entry = await self.optimizer.optimize_entry(entry)
             
             # Store in database
-            success = self.db.store_entry(entry)
+            success = await self.backend.store_entry(entry)
             
             if success:
                 # Update cache
@@ -555,15 +1325,13 @@ class SharedMemory:
         try:
             # Check cache first
             async with self._cache_lock:
-                if key in self._cache:
-                    entry = self._cache[key]
-                    # Move to end (most recently used)
-                    self._cache.move_to_end(key)
+                entry = self._cache.get(key)
+                if entry:
                     logger.debug(f"Retrieved from cache: {key}")
                     return entry.value
             
             # Get from database
-            entry = self.db.get_entry(key)
+            entry = await self.backend.get_entry(key)
             if entry:
                 # Update cache
                 await self._update_cache(key, entry)
@@ -581,10 +1349,10 @@ class SharedMemory:
         try:
             # Remove from cache
             async with self._cache_lock:
-                self._cache.pop(key, None)
+                self._cache.pop(key)
             
             # Remove from database
-            success = self.db.delete_entry(key)
+            success = await self.backend.delete_entry(key)
             
             if success:
                 logger.debug(f"Deleted memory entry: {key}")
@@ -595,22 +1363,24 @@ class SharedMemory:
             logger.error(f"Failed to delete memory entry {key}: {e}")
             return False
     
-    async def list_keys(self, entry_type: str = None, tags: List[str] = None) -> List[str]:
+    async def list_keys(self, entry_type: str = None, tags: List[str] = None,
+                        limit: int = 100) -> List[str]:
         """List all keys in memory with optional filtering."""
         try:
-            entries = self.db.list_entries(entry_type=entry_type, tags=tags)
-            return [entry.key for entry in entries]
+            return await self.backend.list_keys(entry_type=entry_type, tags=tags, limit=limit)
         
         except Exception as e:
             logger.error(f"Failed to list memory keys: {e}")
             return []
     
-    async def search(self, query: str, entry_type: str = None) -> List[str]:
-        """Search for keys containing the query string."""
+    async def search(self, query: str, entry_type: str = None, tags: List[str] = None,
+                     limit: int = 100, include_metadata: bool = False) -> List[str]:
+        """Search for keys (and optionally metadata) containing the query string."""
         try:
-            all_keys = await self.list_keys(entry_type=entry_type)
-            matching_keys = [key for key in all_keys if query.lower() in key.lower()]
-            return matching_keys
+            return await self.backend.search_keys(
+                query, entry_type=entry_type, tags=tags,
+                limit=limit, include_metadata=include_metadata
+            )
         
         except Exception as e:
             logger.error(f"Failed to search memory: {e}")
@@ -619,14 +1389,10 @@ class SharedMemory:
     async def get_memory_stats(self) -> Dict[str, Any]:
         """Get comprehensive memory statistics."""
         try:
-            db_stats = self.db.get_memory_stats()
+            db_stats = await self.backend.get_memory_stats()
             
             async with self._cache_lock:
-                cache_stats = {
-                    'cache_size': len(self._cache),
-                    'cache_max_size': self._cache_max_size,
-                    'cache_utilization': len(self._cache) / self._cache_max_size
-                }
+                cache_stats = self._cache.get_stats()
             
             optimization_stats = await self.optimizer.cleanup_recommendation(db_stats)
             
@@ -643,17 +1409,11 @@ class SharedMemory:
     async def cleanup_expired(self) -> int:
         """Clean up expired memory entries."""
         try:
-            removed_count = self.db.cleanup_expired()
+            removed_count = await self.backend.cleanup_expired()
             
             # Also clean cache
             async with self._cache_lock:
-                expired_keys = []
-                for key, entry in self._cache.items():
-                    if entry.expires_at and entry.expires_at <= datetime.utcnow():
-                        expired_keys.append(key)
-                
-                for key in expired_keys:
-                    del self._cache[key]
+                self._cache.expire()
             
             if removed_count > 0:
                 logger.info(f"Cleaned up {removed_count} expired memory entries")
@@ -689,11 +1449,11 @@ class SharedMemory:
         async with self._cache_lock:
             # Check if entry should be cached
             if await self.optimizer.should_cache_entry(entry):
-                self._cache[key] = entry
-                
-                # Trim cache if needed
-                while len(self._cache) > self._cache_max_size:
-                    self._cache.popitem(last=False)  # Remove oldest item
+                # Admission and eviction are byte-budgeted against max_memory_mb
+                self._cache.put(key, entry, estimate_object_size(entry.value))
+            else:
+                # Never serve a stale version of a key we declined to re-cache
+                self._cache.pop(key)
     
     async def _background_cleanup(self):
         """Background task for periodic cleanup."""
@@ -724,6 +1484,9 @@ class SharedMemory:
             except asyncio.TimeoutError:
                 self._cleanup_task.cancel()
         
+        # Persist anything still queued for write-behind
+        await self.backend.close()
+        
         logger.info("SharedMemory shutdown complete")
     
     @asynccontextmanager
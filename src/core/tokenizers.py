@@ -0,0 +1,216 @@
+"""
+Provider-aware token counting for the autonomous multi-LLM agent system.
+
+OpenAI models are counted with tiktoken's BPE tables when the package and
+its encoding files are already in tiktoken's local cache (TIKTOKEN_CACHE_DIR,
+or pre-seeded from a bundled copy); tables are never downloaded, since the
+first lookup happens inside agent and SharedMemory constructors. Other
+providers (and OpenAI when tiktoken is unavailable) use a calibrated
+estimator that approximates BPE pre-tokenization: words, digit groups,
+punctuation runs and CJK characters are counted separately and scaled by a
+per-provider factor.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from typing import Dict, Optional
+
+from loguru import logger
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+
+# Pre-tokenization pieces, roughly mirroring BPE split patterns
+_PIECE_PATTERN = re.compile(
+    r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]"  # CJK, kana, hangul
+    r"|[^\W\d_]+"     # letters
+    r"|\d+"           # digits
+    r"|\s+"           # whitespace
+    r"|[^\w\s]+|_+"   # punctuation and symbols
+)
+
+
+# Files each OpenAI encoding loads through tiktoken's download cache
+_BLOB_ROOT = "https://openaipublic.blob.core.windows.net/"
+_ENCODING_FILES = {
+    'gpt2': ("gpt-2/encodings/main/vocab.bpe", "gpt-2/encodings/main/encoder.json"),
+    'r50k_base': ("encodings/r50k_base.tiktoken",),
+    'p50k_base': ("encodings/p50k_base.tiktoken",),
+    'p50k_edit': ("encodings/p50k_base.tiktoken",),
+    'cl100k_base': ("encodings/cl100k_base.tiktoken",),
+    'o200k_base': ("encodings/o200k_base.tiktoken",),
+    'o200k_harmony': ("encodings/o200k_base.tiktoken",),
+}
+
+
+def _tiktoken_cache_dir() -> Optional[str]:
+    """Directory tiktoken reads cached encoding files from, mirroring tiktoken.load; None if disabled."""
+    if "TIKTOKEN_CACHE_DIR" in os.environ:
+        cache_dir = os.environ["TIKTOKEN_CACHE_DIR"]
+    elif "DATA_GYM_CACHE_DIR" in os.environ:
+        cache_dir = os.environ["DATA_GYM_CACHE_DIR"]
+    else:
+        cache_dir = os.path.join(tempfile.gettempdir(), "data-gym-cache")
+    return cache_dir or None
+
+
+def encoding_cached(encoding_name: str) -> bool:
+    """Whether tiktoken can load an encoding without network access."""
+    files = _ENCODING_FILES.get(encoding_name)
+    cache_dir = _tiktoken_cache_dir()
+    if not files or not cache_dir:
+        return False
+    return all(
+        os.path.exists(os.path.join(cache_dir, hashlib.sha1((_BLOB_ROOT + path).encode()).hexdigest()))
+        for path in files
+    )
+
+
+class Tokenizer:
+    """Base class for token counters."""
+
+    name = "base"
+
+    def count(self, text: str) -> int:
+        raise NotImplementedError
+
+
+class TiktokenTokenizer(Tokenizer):
+    """Exact counts from tiktoken BPE tables."""
+
+    def __init__(self, encoding):
+        self._encoding = encoding
+        self.name = f"tiktoken:{encoding.name}"
+
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+class CalibratedEstimator(Tokenizer):
+    """
+    Heuristic BPE approximation.
+
+    Letters are charged one token per word_chars characters, digits one per
+    three (BPE vocabularies split numbers into short groups), punctuation
+    one per two characters, CJK one per character, and whitespace other than
+    a single separating space one token per run. The total is multiplied by
+    a provider scale calibrated against that provider's tokenizer.
+    """
+
+    def __init__(self, name: str = "estimator", scale: float = 1.0, word_chars: int = 6):
+        self.name = name
+        self.scale = scale
+        self.word_chars = word_chars
+
+    def count(self, text: str) -> int:
+        tokens = 0
+        word_chars = self.word_chars
+
+        for match in _PIECE_PATTERN.finditer(text):
+            piece = match.group()
+            first = piece[0]
+            length = len(piece)
+
+            if first.isspace():
+                if piece != " ":
+                    tokens += 1
+            elif first.isdigit():
+                tokens += (length + 2) // 3
+            elif first.isalpha():
+                tokens += 1 if length == 1 else (length + word_chars - 1) // word_chars
+            else:
+                tokens += (length + 1) // 2
+
+        return max(1, round(tokens * self.scale))
+
+
+# Provider scales relative to the estimator's cl100k-like baseline
+_PROVIDER_SCALES = {
+    'openai': 1.0,
+    'anthropic': 1.15,
+    'google': 0.95,
+    'default': 1.0
+}
+
+
+def detect_provider(model: str) -> str:
+    """Infer the provider from a model name."""
+    model = (model or "").lower()
+    if model.startswith(("gpt", "o1", "o3", "o4", "text-", "chatgpt")) or "davinci" in model:
+        return "openai"
+    if "claude" in model:
+        return "anthropic"
+    if "gemini" in model or "palm" in model:
+        return "google"
+    return "default"
+
+
+class TokenizerRegistry:
+    """Resolves and caches the tokenizer to use for a provider/model pair."""
+
+    def __init__(self):
+        self._tokenizers: Dict[str, Tokenizer] = {}
+        self._failed_encodings: set = set()
+        self._lock = threading.Lock()
+
+    def get(self, model: str, provider: Optional[str] = None) -> Tokenizer:
+        provider = provider or detect_provider(model)
+        cache_key = f"{provider}:{model}"
+
+        tokenizer = self._tokenizers.get(cache_key)
+        if tokenizer is None:
+            with self._lock:
+                tokenizer = self._tokenizers.get(cache_key)
+                if tokenizer is None:
+                    tokenizer = self._resolve(model, provider)
+                    self._tokenizers[cache_key] = tokenizer
+
+        return tokenizer
+
+    def _resolve(self, model: str, provider: str) -> Tokenizer:
+        if provider == "openai" and TIKTOKEN_AVAILABLE:
+            encoding = self._load_encoding(model)
+            if encoding is not None:
+                return TiktokenTokenizer(encoding)
+
+        scale = _PROVIDER_SCALES.get(provider, _PROVIDER_SCALES['default'])
+        return CalibratedEstimator(name=f"estimator:{provider}", scale=scale)
+
+    def _load_encoding(self, model: str):
+        """Load the BPE encoding for a model; None if the tables cannot be loaded."""
+        try:
+            encoding_name = tiktoken.encoding_name_for_model(model)
+        except KeyError:
+            encoding_name = "cl100k_base"
+
+        if encoding_name in self._failed_encodings:
+            return None
+
+        # get_encoding would download missing tables, blocking whichever constructor asked
+        if not encoding_cached(encoding_name):
+            self._failed_encodings.add(encoding_name)
+            logger.info(f"tiktoken encoding {encoding_name} not cached locally, using estimator")
+            return None
+
+        try:
+            return tiktoken.get_encoding(encoding_name)
+        except Exception as e:
+            # Unreadable or corrupt cache entry
+            self._failed_encodings.add(encoding_name)
+            logger.warning(f"tiktoken encoding {encoding_name} unavailable, using estimator: {e}")
+            return None
+
+
+_registry = TokenizerRegistry()
+
+
+def get_tokenizer(model: str, provider: Optional[str] = None) -> Tokenizer:
+    """Get the shared tokenizer for a model."""
+    return _registry.get(model, provider)
@@ -23,6 +23,11 @@ from .github_client import (
     NotionBlockBuilder
 )
 
+from .notion_async_client import (
+    AsyncNotionClient,
+    NotionAPIError
+)
+
 from .manager import (
     IntegrationManager,
     IntegrationType,
@@ -48,6 +53,8 @@ __all__ = [
     "NotionDashboard",
     "NotionPropertyBuilder",
     "NotionBlockBuilder",
+    "AsyncNotionClient",
+    "NotionAPIError",
     
     # Integration manager
     "IntegrationManager",
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Async Notion Client
+===================
+
+Shared non-blocking client for the Notion REST API.
+
+- One aiohttp session per API key with a keep-alive connection pool
+- Identical in-flight reads (GETs, database queries, searches) share one request
+- 429 and transient 5xx responses are retried with backoff, honouring
+  Retry-After; a 429 pauses every caller of the client, not just the one
+  that hit it
+- Cursor pagination helpers for database queries and search
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+from typing import Dict, List, Any, Optional, Callable, AsyncIterator, Tuple
+
+import aiohttp
+
+try:
+    from loguru import logger
+except ImportError:
+    import logging
+    logger = logging.getLogger(__name__)
+
+
+NOTION_API_URL = "https://api.notion.com/v1"
+NOTION_VERSION = "2022-06-28"
+
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class NotionAPIError(Exception):
+    """Error response from the Notion API."""
+
+    def __init__(self, status: int, code: Optional[str] = None, message: str = ""):
+        self.status = status
+        self.code = code
+        self.message = message
+        super().__init__(f"Notion API error {status}" + (f" ({code})" if code else "") + (f": {message}" if message else ""))
+
+
+class AsyncNotionClient:
+    """Pooled, coalescing, throttle-aware Notion API client."""
+
+    _shared: Dict[Optional[str], "AsyncNotionClient"] = {}
+
+    def __init__(self, api_key: Optional[str] = None, max_connections: int = 10,
+                 max_retries: int = 5, timeout: float = 30, base_url: str = NOTION_API_URL):
+        self.api_key = api_key or os.getenv("NOTION_API_KEY")
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.base_url = base_url.rstrip('/')
+
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._inflight: Dict[Tuple[str, str, str], asyncio.Future] = {}
+        self._blocked_until = 0.0
+        self._throttle_listeners: List[Callable[[Optional[float]], None]] = []
+
+        self.stats = {
+            'requests': 0,
+            'coalesced': 0,
+            'throttled': 0,
+            'retries': 0,
+            'errors': 0
+        }
+
+    @classmethod
+    def shared(cls, api_key: Optional[str] = None, **kwargs) -> "AsyncNotionClient":
+        """Process-wide client for an API key, so all callers share one connection pool."""
+        api_key = api_key or os.getenv("NOTION_API_KEY")
+        client = cls._shared.get(api_key)
+        if client is None:
+            client = cls(api_key, **kwargs)
+            cls._shared[api_key] = client
+        return client
+
+    @classmethod
+    async def close_all(cls):
+        """Close every shared client's session."""
+        for client in list(cls._shared.values()):
+            await client.close()
+        cls._shared.clear()
+
+    def add_throttle_listener(self, callback: Callable[[Optional[float]], None]):
+        """Call `callback(retry_after)` whenever Notion answers 429."""
+        if callback not in self._throttle_listeners:
+            self._throttle_listeners.append(callback)
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Get or create the pooled aiohttp session."""
+        if self.session is None or self.session.closed:
+            headers = {
+                'Notion-Version': NOTION_VERSION,
+                'Content-Type': 'application/json'
+            }
+            if self.api_key:
+                headers['Authorization'] = f'Bearer {self.api_key}'
+
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60)
+            self.session = aiohttp.ClientSession(
+                headers=headers,
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+
+        return self.session
+
+    @staticmethod
+    def _is_read(method: str, path: str) -> bool:
+        return method == 'GET' or (method == 'POST' and path.rstrip('/').endswith(('/query', '/search')))
+
+    async def request(self, method: str, path: str, json_body: Optional[Dict[str, Any]] = None,
+                      params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Make an API request and return the decoded response.
+
+        Raises NotionAPIError for error responses that survive retries.
+        """
+        method = method.upper()
+        if not self._is_read(method, path):
+            return await self._send(method, path, json_body, params)
+
+        key = (method, path, json.dumps([json_body, params], sort_keys=True, default=str))
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            try:
+                data = await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # The request we were waiting on was cancelled; make our own
+            else:
+                self.stats['coalesced'] += 1
+                return data
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            data = await self._send(method, path, json_body, params)
+        except BaseException as e:
+            if isinstance(e, Exception):
+                future.set_exception(e)
+                future.exception()  # retrieved, in case nobody was waiting
+            else:
+                future.cancel()
+            raise
+        else:
+            future.set_result(data)
+            return data
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def _send(self, method: str, path: str, json_body: Optional[Dict[str, Any]],
+                    params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        session = await self._get_session()
+        url = f"{self.base_url}/{path.lstrip('/')}"
+
+        for attempt in range(self.max_retries + 1):
+            pause = self._blocked_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+
+            self.stats['requests'] += 1
+            try:
+                async with session.request(method, url, json=json_body, params=params) as response:
+                    if response.status in _RETRY_STATUSES and attempt < self.max_retries:
+                        delay = self._retry_delay(response.headers.get('Retry-After'), attempt)
+                        if response.status == 429:
+                            self._on_throttle(delay)
+                        self.stats['retries'] += 1
+                        logger.warning(f"Notion {method} {path} returned {response.status}, retrying in {delay:.1f}s")
+                        await asyncio.sleep(delay)
+                        continue
+
+                    data = await response.json(content_type=None)
+                    if response.status >= 400:
+                        if response.status == 429:
+                            self._on_throttle(self._retry_delay(response.headers.get('Retry-After'), attempt))
+                        self.stats['errors'] += 1
+                        data = data if isinstance(data, dict) else {}
+                        raise NotionAPIError(response.status, data.get('code'), data.get('message', ''))
+                    return data
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt >= self.max_retries:
+                    self.stats['errors'] += 1
+                    raise
+                delay = self._retry_delay(None, attempt)
+                self.stats['retries'] += 1
+                logger.warning(f"Notion {method} {path} failed ({e!r}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+        raise NotionAPIError(0, message=f"{method} {path} exhausted retries")
+
+    @staticmethod
+    def _retry_delay(retry_after: Optional[str], attempt: int) -> float:
+        if retry_after is not None:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                pass
+        return min(30.0, 0.5 * 2 ** attempt) * (0.5 + random.random())
+
+    def _on_throttle(self, delay: float):
+        self.stats['throttled'] += 1
+        self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+        for callback in self._throttle_listeners:
+            try:
+                callback(delay)
+            except Exception as e:
+                logger.debug(f"Notion throttle listener failed: {e}")
+
+    # Endpoints
+
+    async def retrieve_page(self, page_id: str) -> Dict[str, Any]:
+        return await self.request('GET', f"pages/{page_id}")
+
+    async def update_page(self, page_id: str, properties: Dict[str, Any], **fields) -> Dict[str, Any]:
+        return await self.request('PATCH', f"pages/{page_id}", {'properties': properties, **fields})
+
+    async def create_page(self, parent: Dict[str, Any], properties: Dict[str, Any], **fields) -> Dict[str, Any]:
+        return await self.request('POST', "pages", {'parent': parent, 'properties': properties, **fields})
+
+    async def query_database(self, database_id: str, filter: Optional[Dict[str, Any]] = None,
+                             sorts: Optional[List[Dict[str, Any]]] = None, start_cursor: Optional[str] = None,
+                             page_size: int = 100) -> Dict[str, Any]:
+        """One page of database query results (with `next_cursor`/`has_more`)."""
+        body: Dict[str, Any] = {'page_size': page_size}
+        if filter:
+            body['filter'] = filter
+        if sorts:
+            body['sorts'] = sorts
+        if start_cursor:
+            body['start_cursor'] = start_cursor
+        return await self.request('POST', f"databases/{database_id}/query", body)
+
+    async def search(self, query: str = "", filter: Optional[Dict[str, Any]] = None,
+                     start_cursor: Optional[str] = None, page_size: int = 100) -> Dict[str, Any]:
+        """One page of search results."""
+        body: Dict[str, Any] = {'query': query, 'page_size': page_size}
+        if filter:
+            body['filter'] = filter
+        if start_cursor:
+            body['start_cursor'] = start_cursor
+        return await self.request('POST', "search", body)
+
+    # Pagination
+
+    async def paginate(self, fetch: Callable[..., Any], limit: Optional[int] = None, **kwargs) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield results across pages of a cursor-paginated endpoint.
+
+        `fetch` is query_database, search or any coroutine function taking
+        start_cursor and returning a Notion list object.
+        """
+        cursor = None
+        yielded = 0
+        while True:
+            data = await fetch(start_cursor=cursor, **kwargs)
+            for result in data.get('results', []):
+                yield result
+                yielded += 1
+                if limit is not None and yielded >= limit:
+                    return
+            cursor = data.get('next_cursor')
+            if not data.get('has_more') or not cursor:
+                return
+
+    async def query_all(self, database_id: str, limit: Optional[int] = None, **kwargs) -> List[Dict[str, Any]]:
+        """Every page (up to `limit`) matching a database query."""
+        return [page async for page in self.paginate(self.query_database, limit=limit, database_id=database_id, **kwargs)]
+
+    async def search_all(self, query: str = "", limit: Optional[int] = None, **kwargs) -> List[Dict[str, Any]]:
+        """Every search result (up to `limit`)."""
+        return [result async for result in self.paginate(self.search, limit=limit, query=query, **kwargs)]
+
+    async def close(self):
+        """Close the session."""
+        if self.session and not self.session.closed:
+            await self.session.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats)
@@ -45,6 +45,7 @@ from temp_stubs import (
 # Real Notion integration - import directly to avoid dependency issues
 sys.path.insert(0, str(Path(__file__).parent / "integrations"))
 from notion_mcp_client 
+from notion_async_client import AsyncNotionClient, NotionAPIError
 # Content processing integration
 sys.path.insert(0, str(Path(__file__).parent / "processors"))
 from content_processor_factory import content_factory
@@ -602,34 +603,19 @@ class AutonomousAgentSystem:
     
         """Find Knowledge Hub database using direct API."""
         try:
-            import requests
-            
-            headers = {
-                'Notion-Version': '2022-06-28',
-                'Content-Type': 'application/json'
-            }
-            
-            response = requests.post(
-                headers=headers,
-                json={
-                    'query': 'Knowledge Hub',
-                    'filter': {'property': 'object', 'value': 'database'},
-                    'page_size': 10
-                },
-                timeout=10
+            data = await self._notion_api().search(
+                'Knowledge Hub',
+                filter={'property': 'object', 'value': 'database'},
+                page_size=10
             )
             
-            if response.status_code == 200:
-                data = response.json()
-                results = data.get('results', [])
-                
-                for item in results:
-                    if item.get('object') == 'database':
-                        title_list = item.get('title', [])
-                        if title_list:
-                            title = title_list[0].get('plain_text', '')
-                            if 'Knowledge Hub' in title:
-                                return item['id']
+            for item in data.get('results', []):
+                if item.get('object') == 'database':
+                    title_list = item.get('title', [])
+                    if title_list:
+                        title = title_list[0].get('plain_text', '')
+                        if 'Knowledge Hub' in title:
+                            return item['id']
             
             return None
             
@@ -639,13 +625,6 @@ class AutonomousAgentSystem:
     
         """Get content items that need processing."""
         try:
-            import requests
-            
-            headers = {
-                'Notion-Version': '2022-06-28',
-                'Content-Type': 'application/json'
-            }
-            
             # Query for items with 🚀 Yes = true and Status != ✅ Completed
             
             filter_data = {
@@ -663,18 +642,11 @@ class AutonomousAgentSystem:
                 "page_size": 10
             }
             
-            response = requests.post(
-                query_url,
-                headers=headers,
-                json=filter_data,
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
+            try:
+                data = await self._notion_api().query_database(knowledge_db_id, **filter_data)
                 return data.get('results', [])
-            else:
-                logger.error(f"Query failed: {response.status_code}")
+            except NotionAPIError as e:
+                logger.error(f"Query failed: {e.status}")
                 return []
                 
         except Exception as e:
@@ -734,13 +706,6 @@ class AutonomousAgentSystem:
     
         """Update Notion page status."""
         try:
-            import requests
-            
-            headers = {
-                'Notion-Version': '2022-06-28',
-                'Content-Type': 'application/json'
-            }
-            
             properties = {
                 "Status": {"select": {"name": status}}
             }
@@ -751,28 +716,16 @@ class AutonomousAgentSystem:
                     "rich_text": [{"text": {"content": current_notes}}]
                 }
             
-            response = requests.patch(
-                update_url,
-                headers=headers,
-                json={"properties": properties},
-                timeout=10
-            )
-            
-            if response.status_code != 200:
-                logger.error(f"Failed to update status: {response.status_code}")
+            try:
+                await self._notion_api().update_page(page_id, properties)
+            except NotionAPIError as e:
+                logger.error(f"Failed to update status: {e.status}")
                 
         except Exception as e:
             logger.error(f"Error updating Notion status: {e}")
     
         """Update Notion page with processing results."""
         try:
-            import requests
-            
-            headers = {
-                'Notion-Version': '2022-06-28',
-                'Content-Type': 'application/json'
-            }
-            
             properties = {}
             
             # Get data from processing results
@@ -821,21 +774,20 @@ class AutonomousAgentSystem:
                 }
             
             # Update the page
-            response = requests.patch(
-                update_url,
-                headers=headers,
-                json={"properties": properties},
-                timeout=15
-            )
-            
-            if response.status_code == 200:
+            try:
+                await self._notion_api().update_page(page_id, properties)
                 logger.debug(f"Successfully updated Notion page {page_id[:8]}")
-            else:
-                logger.error(f"Failed to update Notion page: {response.status_code}")
+            except NotionAPIError as e:
+                logger.error(f"Failed to update Notion page: {e.status}")
                 
         except Exception as e:
             logger.error(f"Error updating Notion with results: {e}")
     
+    def _notion_api(self) -> AsyncNotionClient:
+        """Shared async Notion client (pooled with the YouTube channel processor's)."""
+        notion_config = self.config.get("api", {}).get("notion", {})
+        return AsyncNotionClient.shared(notion_config.get("api_key"))
+    
     def _generate_enhanced_notes(self, metadata: dict, knowledge_hub: dict, content_type: str) -> str:
         """Generate enhanced notes for any content type."""
         try:
@@ -1049,6 +1001,9 @@ class AutonomousAgentSystem:
         if self.observability:
             self.observability.stop()
         
+        # Close pooled Notion connections
+        await AsyncNotionClient.close_all()
+        
         logger.info("✅ Graceful shutdown completed")
 
 
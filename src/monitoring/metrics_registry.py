@@ -0,0 +1,485 @@
+"""
+In-process metrics registry with batched SQLite rollups.
+
+Recording a value takes no lock. Each counter and histogram keeps one cell
+per thread, found via threading.local, and readers merge the cells.
+Histograms bucket values log-linearly like HdrHistogram: every power of two
+is split into 2**precision_bits sub-buckets. A percentile is therefore
+reported within about 2**-(precision_bits + 1) relative error, using only a
+few hundred buckets to span microseconds to hours.
+
+MetricsFlusher periodically turns what was recorded since the previous
+flush into per-minute and per-hour rollup rows and writes them to SQLite in
+a single transaction. Readers query a few rollup rows instead of scanning
+raw events.
+
+Only the standard library is used, so root-level scripts can load this
+module directly as well as through the package.
+"""
+
+import atexit
+import json
+import logging
+import math
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Rollup resolutions in seconds, and how long each is kept
+DEFAULT_RESOLUTIONS = {60: 2 * 86400, 3600: 90 * 86400}
+
+# Bucket key for zero and negative values
+_ZERO_BUCKET = -(1 << 40)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def format_metric(name: str, labels: Dict[str, str]) -> str:
+    """Prometheus-style display name, e.g. task_duration_ms{agent_type="coder"}."""
+    if not labels:
+        return name
+    inner = ",".join(f'{key}="{value}"' for key, value in sorted(labels.items()))
+    return f"{name}{{{inner}}}"
+
+
+def bucket_index(value: float, precision_bits: int) -> int:
+    """Histogram bucket of `value`: its power of two, then the linear sub-bucket within it."""
+    if value <= 0:
+        return _ZERO_BUCKET
+    sub_buckets = 1 << precision_bits
+    mantissa, exponent = math.frexp(value)
+    return exponent * sub_buckets + int((mantissa - 0.5) * 2 * sub_buckets)
+
+
+class _ThreadCells:
+    """One cell per writing thread; a thread only ever writes its own cell."""
+
+    __slots__ = ("_factory", "_local", "_cells", "_lock")
+
+    def __init__(self, factory: Callable[[], Any]):
+        self._factory = factory
+        self._local = threading.local()
+        self._cells: List[Any] = []
+        self._lock = threading.Lock()
+
+    def local(self) -> Any:
+        try:
+            return self._local.cell
+        except AttributeError:
+            cell = self._factory()
+            with self._lock:
+                self._cells.append(cell)
+            self._local.cell = cell
+            return cell
+
+    def all(self) -> List[Any]:
+        with self._lock:
+            return list(self._cells)
+
+
+class Counter:
+    """Monotonically increasing total."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, labels: Dict[str, str]):
+        self.name = name
+        self.labels = labels
+        self._cells = _ThreadCells(lambda: [0.0])
+
+    def inc(self, amount: float = 1.0):
+        self._cells.local()[0] += amount
+
+    @property
+    def value(self) -> float:
+        return sum(cell[0] for cell in self._cells.all())
+
+
+class Gauge:
+    """Last value set."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, labels: Dict[str, str]):
+        self.name = name
+        self.labels = labels
+        self.value: Optional[float] = None
+
+    def set(self, value: float):
+        self.value = value
+
+
+class _HistogramCell:
+    __slots__ = ("buckets", "total")
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.total = 0.0
+
+
+@dataclass
+class HistogramSnapshot:
+    """Merged bucket counts of a histogram at one point in time (or a difference of two)."""
+    precision_bits: int
+    buckets: Dict[int, int] = field(default_factory=dict)
+    total: float = 0.0
+
+    @property
+    def count(self) -> int:
+        return sum(self.buckets.values())
+
+    @property
+    def mean(self) -> float:
+        count = self.count
+        return self.total / count if count else 0.0
+
+    def bucket_value(self, key: int) -> float:
+        """Midpoint of a bucket."""
+        if key == _ZERO_BUCKET:
+            return 0.0
+        sub_buckets = 1 << self.precision_bits
+        exponent, index = divmod(key, sub_buckets)
+        lower = math.ldexp(0.5 + index / (2 * sub_buckets), exponent)
+        return lower + math.ldexp(1 / (4 * sub_buckets), exponent)
+
+    def percentile(self, q: float) -> float:
+        """Value at percentile `q` (0-100), or 0.0 when empty."""
+        count = self.count
+        if not count:
+            return 0.0
+        rank = max(1, math.ceil(q / 100 * count))
+        seen = 0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen >= rank:
+                return self.bucket_value(key)
+        return self.bucket_value(max(self.buckets))
+
+    def add(self, value: float):
+        key = bucket_index(value, self.precision_bits)
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+        self.total += value
+
+    def merge(self, other: "HistogramSnapshot"):
+        buckets = self.buckets
+        for key, value in other.buckets.items():
+            buckets[key] = buckets.get(key, 0) + value
+        self.total += other.total
+
+    def minus(self, earlier: "HistogramSnapshot") -> "HistogramSnapshot":
+        buckets = {}
+        for key, value in self.buckets.items():
+            delta = value - earlier.buckets.get(key, 0)
+            if delta:
+                buckets[key] = delta
+        return HistogramSnapshot(self.precision_bits, buckets, self.total - earlier.total)
+
+    def to_json(self) -> str:
+        return json.dumps({"p": self.precision_bits, "b": self.buckets}, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, text: str, total: float = 0.0) -> "HistogramSnapshot":
+        data = json.loads(text)
+        return cls(data["p"], {int(key): value for key, value in data["b"].items()}, total)
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.percentile(100)
+        }
+
+
+class Histogram:
+    """Log-linear bucketed distribution of recorded values."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, labels: Dict[str, str], precision_bits: int = 6):
+        self.name = name
+        self.labels = labels
+        self.precision_bits = precision_bits
+        self._cells = _ThreadCells(_HistogramCell)
+
+    def record(self, value: float):
+        cell = self._cells.local()
+        key = bucket_index(value, self.precision_bits)
+        buckets = cell.buckets
+        buckets[key] = buckets.get(key, 0) + 1
+        cell.total += value
+
+    def snapshot(self) -> HistogramSnapshot:
+        merged = HistogramSnapshot(self.precision_bits)
+        for cell in self._cells.all():
+            # dict.copy() is atomic, so a concurrent record() can't break iteration
+            merged.merge(HistogramSnapshot(self.precision_bits, cell.buckets.copy(), cell.total))
+        return merged
+
+
+Metric = Union[Counter, Gauge, Histogram]
+
+
+class MetricsRegistry:
+    """Named, labelled metrics; get-or-create lookups are lock-free after creation."""
+
+    def __init__(self, precision_bits: int = 6):
+        self.precision_bits = precision_bits
+        self._metrics: Dict[Tuple[str, LabelKey], Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, kind: type, name: str, labels: Dict[str, Any]) -> Any:
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    if kind is Histogram:
+                        metric = Histogram(name, dict(key[1]), self.precision_bits)
+                    else:
+                        metric = kind(name, dict(key[1]))
+                    self._metrics[key] = metric
+        if not isinstance(metric, kind):
+            raise TypeError(f"{format_metric(name, metric.labels)} is a {metric.kind}, not a {kind.kind}")
+        return metric
+
+    def counter(self, name: str, **labels) -> Counter:
+        return self._get(Counter, name, labels)
+
+    def gauge(self, name: str, **labels) -> Gauge:
+        return self._get(Gauge, name, labels)
+
+    def histogram(self, name: str, **labels) -> Histogram:
+        return self._get(Histogram, name, labels)
+
+    def collect(self) -> List[Metric]:
+        with self._lock:
+            return list(self._metrics.values())
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current value of every metric, keyed by display name."""
+        values: Dict[str, Any] = {}
+        for metric in self.collect():
+            if isinstance(metric, Histogram):
+                values[format_metric(metric.name, metric.labels)] = metric.snapshot().summary()
+            else:
+                values[format_metric(metric.name, metric.labels)] = metric.value
+        return values
+
+
+@dataclass
+class RollupRow:
+    """One metric's aggregate over one rollup bucket."""
+    metric: str
+    labels: Dict[str, str]
+    kind: str
+    resolution: int
+    bucket_start: int
+    count: int
+    total: float
+    last: Optional[float]
+    histogram: Optional[HistogramSnapshot]
+
+
+class MetricsFlusher:
+    """
+    Writes registry deltas to SQLite rollup tables in one transaction per flush.
+
+    Deltas land in the rollup bucket that contains the flush time, so a
+    value can be attributed up to `interval` seconds late. Writers added
+    with add_writer() run inside the same transaction, which lets callers
+    batch their own row inserts with the rollups.
+    """
+
+    def __init__(self, registry: MetricsRegistry, db_path: str, interval: float = 10.0,
+                 resolutions: Optional[Dict[int, int]] = None):
+        self.registry = registry
+        self.db_path = db_path
+        self.interval = interval
+        self.resolutions = dict(resolutions or DEFAULT_RESOLUTIONS)
+        self.writers: List[Callable[[sqlite3.Connection], None]] = []
+
+        self._previous: Dict[int, Any] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_prune = 0.0
+        self._closed = False
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS metric_rollups (
+                metric TEXT NOT NULL,
+                labels TEXT NOT NULL,
+                resolution INTEGER NOT NULL,
+                bucket_start INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                total REAL NOT NULL DEFAULT 0,
+                last REAL,
+                histogram TEXT,
+                PRIMARY KEY (metric, resolution, bucket_start, labels)
+            ) WITHOUT ROWID
+        """)
+        self._conn.commit()
+
+    def add_writer(self, writer: Callable[[sqlite3.Connection], None]):
+        self.writers.append(writer)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-flusher", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Metrics flush failed: {e}")
+
+    def _deltas(self) -> List[Tuple[Metric, int, float, Optional[float], Optional[HistogramSnapshot]]]:
+        """(metric, count, total, last, histogram) for everything that changed since the last flush."""
+        deltas = []
+        for metric in self.registry.collect():
+            key = id(metric)
+            if isinstance(metric, Histogram):
+                current = metric.snapshot()
+                previous = self._previous.get(key)
+                delta = current.minus(previous) if previous else current
+                self._previous[key] = current
+                if delta.buckets:
+                    deltas.append((metric, delta.count, delta.total, None, delta))
+            elif isinstance(metric, Counter):
+                current = metric.value
+                delta = current - self._previous.get(key, 0.0)
+                self._previous[key] = current
+                if delta:
+                    deltas.append((metric, 0, delta, None, None))
+            elif metric.value is not None:
+                # Gauges: one sample per flush, so total / count is the average level
+                deltas.append((metric, 1, metric.value, metric.value, None))
+        return deltas
+
+    def merge_rollup(self, conn: sqlite3.Connection, metric: str, labels: Dict[str, str], kind: str,
+                     resolution: int, bucket_start: int, count: int, total: float,
+                     last: Optional[float] = None, histogram: Optional[HistogramSnapshot] = None):
+        """Add an aggregate into its rollup row; call inside a transaction."""
+        labels_json = json.dumps(labels, sort_keys=True, separators=(",", ":"))
+        histogram_json = None
+        if histogram is not None:
+            row = conn.execute(
+                "SELECT histogram FROM metric_rollups "
+                "WHERE metric = ? AND resolution = ? AND bucket_start = ? AND labels = ?",
+                (metric, resolution, bucket_start, labels_json)
+            ).fetchone()
+            merged = HistogramSnapshot(histogram.precision_bits)
+            if row and row[0]:
+                merged.merge(HistogramSnapshot.from_json(row[0]))
+            merged.merge(histogram)
+            histogram_json = merged.to_json()
+
+        conn.execute("""
+            INSERT INTO metric_rollups
+                (metric, labels, resolution, bucket_start, kind, count, total, last, histogram)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (metric, resolution, bucket_start, labels) DO UPDATE SET
+                count = count + excluded.count,
+                total = total + excluded.total,
+                last = COALESCE(excluded.last, last),
+                histogram = COALESCE(excluded.histogram, histogram)
+        """, (metric, labels_json, resolution, bucket_start, kind, count, total, last, histogram_json))
+
+    def write_rollups(self, rollups: Iterable[RollupRow]):
+        """Merge externally computed aggregates, e.g. a backfill, in one transaction."""
+        with self._lock, self._conn as conn:
+            for row in rollups:
+                self.merge_rollup(conn, row.metric, row.labels, row.kind, row.resolution,
+                                  row.bucket_start, row.count, row.total, row.last, row.histogram)
+
+    def flush(self, now: Optional[float] = None) -> int:
+        """Write everything recorded since the last flush; returns the number of metrics written."""
+        now = time.time() if now is None else now
+        with self._lock:
+            if self._closed:
+                return 0
+            # Baselines to restore if the transaction rolls back
+            previous = dict(self._previous)
+            deltas = self._deltas()
+            conn = self._conn
+            try:
+                with conn:
+                    for metric, count, total, last, histogram in deltas:
+                        for resolution in self.resolutions:
+                            self.merge_rollup(
+                                conn, metric.name, metric.labels, metric.kind, resolution,
+                                int(now // resolution * resolution), count, total, last, histogram
+                            )
+                    for writer in self.writers:
+                        writer(conn)
+                    if now - self._last_prune >= 3600:
+                        self._prune(conn, now)
+                        self._last_prune = now
+            except Exception:
+                # The transaction rolled back; record these deltas again next time
+                self._previous = previous
+                raise
+        return len(deltas)
+
+    def _prune(self, conn: sqlite3.Connection, now: float):
+        for resolution, retention in self.resolutions.items():
+            conn.execute(
+                "DELETE FROM metric_rollups WHERE resolution = ? AND bucket_start < ?",
+                (resolution, int(now - retention))
+            )
+
+    def read_rollups(self, metrics: Iterable[str], resolution: int, since: float,
+                     until: Optional[float] = None) -> List[RollupRow]:
+        names = list(metrics)
+        placeholders = ",".join("?" * len(names))
+        query = (
+            f"SELECT metric, labels, kind, bucket_start, count, total, last, histogram FROM metric_rollups "
+            f"WHERE metric IN ({placeholders}) AND resolution = ? AND bucket_start >= ?"
+        )
+        params: List[Any] = [*names, resolution, int(since // resolution * resolution)]
+        if until is not None:
+            query += " AND bucket_start < ?"
+            params.append(int(until))
+        query += " ORDER BY bucket_start"
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [
+            RollupRow(
+                metric=metric, labels=json.loads(labels), kind=kind, resolution=resolution,
+                bucket_start=bucket_start, count=count, total=total, last=last,
+                histogram=HistogramSnapshot.from_json(histogram, total) if histogram else None
+            )
+            for metric, labels, kind, bucket_start, count, total, last, histogram in rows
+        ]
+
+    def close(self):
+        self.stop()
+        atexit.unregister(self.stop)
+        with self._lock:
+            self._closed = True
+            self._conn.close()
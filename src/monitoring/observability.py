@@ -3,13 +3,15 @@ import json
 import time
 import threading
 import traceback
+import hashlib
+import random
 import psutil
 import statistics
 from typing import Dict, List, Any, Optional, Callable, Union
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field, asdict
 from enum import Enum
-from collections import defaultdict, deque
+from collections import OrderedDict, defaultdict, deque
 from pathlib import Path
 import logging
 import uuid
@@ -35,6 +37,9 @@ except ImportError:
 
 from loguru import logger
 
+from .metrics_registry import MetricsFlusher, MetricsRegistry
+from .online_detection import OnlineAnomalyDetector
+
 
 class AlertSeverity(Enum):
     INFO = "info"
@@ -177,60 +182,28 @@ class AnomalyDetector:
     def __init__(self, window_size: int = 100, threshold_factor: float = 3.0):
         self.window_size = window_size
         self.threshold_factor = threshold_factor
-        self.metric_windows: Dict[str, deque] = defaultdict(lambda: deque(maxlen=window_size))
+        # Running window statistics, so checks never rescan the window
+        self.detector = OnlineAnomalyDetector(window_size=window_size, threshold_factor=threshold_factor)
+        self.lock = threading.Lock()
     
     def add_value(self, metric_name: str, value: float):
         """Add a new value to the metric window."""
-        self.metric_windows[metric_name].append(value)
+        with self.lock:
+            self.detector.update(metric_name, value)
     
     def is_anomaly(self, metric_name: str, value: float) -> bool:
-        """Detect if a value is anomalous using statistical methods."""
-        window = self.metric_windows[metric_name]
-        
-        if len(window) < 10:  # Need minimum data points
-            return False
-        
-        try:
-            if REQUESTS_AVAILABLE:
-                # Use z-score method
-                mean = np.mean(window)
-                std = np.std(window)
-                z_score = abs((value - mean) / std) if std > 0 else 0
-                return z_score > self.threshold_factor
-            else:
-                # Fallback to simple statistical method
-                mean = statistics.mean(window)
-                stdev = statistics.stdev(window) if len(window) > 1 else 0
-                z_score = abs((value - mean) / stdev) if stdev > 0 else 0
-                return z_score > self.threshold_factor
-        except:
-            return False
+        """Detect if a value is anomalous using its z-score against the window."""
+        with self.lock:
+            return self.detector.is_anomaly(metric_name, value)
     
     def get_statistics(self, metric_name: str) -> Dict[str, float]:
         """Get statistical summary of a metric."""
-        window = self.metric_windows[metric_name]
-        
-        if not window:
-            return {}
-        
-        try:
-            if REQUESTS_AVAILABLE:
-                return {
-                    "mean": float(np.mean(window)),
-                    "std": float(np.std(window)),
-                    "min": float(np.min(window)),
-                    "max": float(np.max(window)),
-                    "median": float(np.median(window))
-                }
-            else:
-                return {
-                    "mean": statistics.mean(window),
-                    "min": min(window),
-                    "max": max(window),
-                    "median": statistics.median(window)
-                }
-        except:
-            return {}
+        with self.lock:
+            summary = self.detector.statistics(metric_name)
+            if summary:
+                # Over the same window as mean/min/max; p50 is the all-time P² estimate
+                summary["median"] = statistics.median(self.detector.streams[metric_name].window.values)
+        return summary
 
 
 class NotificationChannel:
@@ -553,20 +526,123 @@ class PrometheusExporter:
         ).inc()
 
 
+@dataclass
+class TraceRecord:
+    """Spans of one trace plus what tail sampling needs to judge it."""
+    trace_id: str
+    start_time: datetime
+    spans: List[TraceEvent] = field(default_factory=list)
+    open_spans: set = field(default_factory=set)
+    dropped_spans: int = 0
+    has_root: bool = False
+    has_error: bool = False
+    end_time: Optional[datetime] = None
+    
+    @property
+    def duration_ms(self) -> float:
+        end_time = self.end_time or datetime.now()
+        return (end_time - self.start_time).total_seconds() * 1000
+
+
+def _otlp_id(value: str, length: int) -> str:
+    """Hex trace/span ID of `length` characters, hashing IDs that are not hex already."""
+    candidate = value.replace("-", "").lower()
+    if len(candidate) == length and all(c in "0123456789abcdef" for c in candidate):
+        return candidate
+    return hashlib.sha256(value.encode()).hexdigest()[:length]
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(values: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": str(key), "value": _otlp_value(value)} for key, value in values.items()]
+
+
+def _unix_nanos(moment: datetime) -> str:
+    # OTLP JSON encodes 64-bit integers as strings
+    return str(round(moment.timestamp() * 1_000_000) * 1000)
+
+
+def spans_to_otlp(spans: List[TraceEvent], service_name: str = "autonomous-agents") -> Dict[str, Any]:
+    """Build an OTLP/JSON ExportTraceServiceRequest from finished spans."""
+    otlp_spans = []
+    for span in spans:
+        otlp_span = {
+            "traceId": _otlp_id(span.trace_id, 32),
+            "spanId": _otlp_id(span.span_id, 16),
+            "name": span.operation_name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": _unix_nanos(span.start_time),
+            "endTimeUnixNano": _unix_nanos(span.end_time or span.start_time),
+            "attributes": _otlp_attributes(span.tags),
+            "events": [
+                {
+                    "timeUnixNano": _unix_nanos(datetime.fromisoformat(log["timestamp"])),
+                    "name": str(log.get("message", "")),
+                    "attributes": _otlp_attributes({k: v for k, v in log.items() if k not in ("timestamp", "message")})
+                }
+                for log in span.logs
+            ],
+            # STATUS_CODE_OK / STATUS_CODE_ERROR
+            "status": {"code": 1} if span.status == "success" else {"code": 2, "message": span.status}
+        }
+        if span.parent_span_id:
+            otlp_span["parentSpanId"] = _otlp_id(span.parent_span_id, 16)
+        otlp_spans.append(otlp_span)
+    
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": service_name})},
+            "scopeSpans": [{"scope": {"name": "src.monitoring.observability"}, "spans": otlp_spans}]
+        }]
+    }
+
+
 class TraceCollector:
-    """Distributed tracing collector."""
+    """
+    Distributed tracing collector.
+    
+    Traces are kept in start order and the oldest is evicted once more than
+    `max_traces` are held. Each trace keeps at most `max_spans_per_trace`
+    finished spans, one slot of which is held for the root span since it
+    finishes last. When a trace's last open span finishes, tail sampling
+    decides whether it is kept: errored traces and traces slower than
+    `slow_trace_ms` always are, the rest with probability `sample_rate`.
+    Kept traces are appended to `export_path` as OTLP/JSON lines on flush().
+    """
     
-    def __init__(self, max_traces: int = 10000):
+    def __init__(self, max_traces: int = 10000, max_spans_per_trace: int = 1000,
+                 sample_rate: float = 1.0, slow_trace_ms: float = 5000.0,
+                 export_path: Optional[str] = None, export_batch_size: int = 100,
+                 service_name: str = "autonomous-agents"):
         self.max_traces = max_traces
-        self.traces: Dict[str, List[TraceEvent]] = {}
+        self.max_spans_per_trace = max_spans_per_trace
+        self.sample_rate = sample_rate
+        self.slow_trace_ms = slow_trace_ms
+        self.export_path = Path(export_path) if export_path else None
+        self.export_batch_size = export_batch_size
+        self.service_name = service_name
+        
+        self.traces: "OrderedDict[str, TraceRecord]" = OrderedDict()
         self.active_spans: Dict[str, TraceEvent] = {}
+        self.pending_export: List[TraceRecord] = []
+        self.stats = defaultdict(int)
         self.lock = threading.RLock()
+        self.export_lock = threading.Lock()
     
     def start_span(self, operation_name: str, parent_span_id: Optional[str] = None, 
                    trace_id: Optional[str] = None, tags: Optional[Dict[str, Any]] = None) -> str:
         """Start a new trace span."""
-        span_id = str(uuid.uuid4())
-        trace_id = trace_id or str(uuid.uuid4())
+        span_id = uuid.uuid4().hex[:16]
+        trace_id = trace_id or uuid.uuid4().hex
         
         span = TraceEvent(
             trace_id=trace_id,
@@ -581,15 +657,20 @@ class TraceCollector:
         )
         
         with self.lock:
-            self.active_spans[span_id] = span
-            
-            if trace_id not in self.traces:
-                self.traces[trace_id] = []
+            record = self.traces.get(trace_id)
+            if record is None:
+                record = self.traces[trace_id] = TraceRecord(trace_id=trace_id, start_time=span.start_time)
+                self.stats["traces_started"] += 1
+                
+                # Limit traces to prevent memory issues; the front is the oldest
+                while len(self.traces) > self.max_traces:
+                    _, evicted = self.traces.popitem(last=False)
+                    for open_span_id in evicted.open_spans:
+                        self.active_spans.pop(open_span_id, None)
+                    self.stats["traces_evicted"] += 1
             
-            # Limit traces to prevent memory issues
-            if len(self.traces) > self.max_traces:
-                oldest_trace = min(self.traces.keys())
-                del self.traces[oldest_trace]
+            record.open_spans.add(span_id)
+            self.active_spans[span_id] = span
         
         return span_id
     
@@ -607,7 +688,47 @@ class TraceCollector:
             if tags:
                 span.tags.update(tags)
             
-            self.traces[span.trace_id].append(span)
+            record = self.traces.get(span.trace_id)
+            if record is None:
+                return
+            
+            record.open_spans.discard(span_id)
+            if status != "success":
+                record.has_error = True
+            is_root = span.parent_span_id is None
+            # Children leave a slot for the root, which finishes after them
+            limit = self.max_spans_per_trace
+            if not (is_root or record.has_root):
+                limit -= 1
+            if len(record.spans) < limit:
+                record.spans.append(span)
+                record.has_root = record.has_root or is_root
+            else:
+                record.dropped_spans += 1
+                self.stats["spans_dropped"] += 1
+            
+            if not record.open_spans:
+                record.end_time = span.end_time
+                self._sample_trace(record)
+        
+        if self.export_path and len(self.pending_export) >= self.export_batch_size:
+            self.flush()
+    
+    def _sample_trace(self, record: TraceRecord):
+        """Tail-sampling decision for a trace whose spans have all finished."""
+        keep = (
+            record.has_error
+            or record.duration_ms >= self.slow_trace_ms
+            or random.random() < self.sample_rate
+        )
+        if not keep:
+            del self.traces[record.trace_id]
+            self.stats["traces_sampled_out"] += 1
+            return
+        
+        self.stats["traces_kept"] += 1
+        if self.export_path:
+            self.pending_export.append(record)
     
     def add_log(self, span_id: str, message: str, level: str = "info", **kwargs):
         """Add a log entry to a span."""
@@ -621,13 +742,62 @@ class TraceCollector:
                 })
     
     def get_trace(self, trace_id: str) -> List[TraceEvent]:
-        """Get all spans for a trace."""
-        return self.traces.get(trace_id, [])
+        """Get all finished spans for a trace."""
+        with self.lock:
+            record = self.traces.get(trace_id)
+            return list(record.spans) if record else []
     
     def get_active_spans(self) -> List[TraceEvent]:
         """Get all currently active spans."""
         with self.lock:
             return list(self.active_spans.values())
+    
+    def flush(self) -> int:
+        """Append traces kept since the last flush to the export file; returns the trace count."""
+        with self.lock:
+            records, self.pending_export = self.pending_export, []
+        if not records or not self.export_path:
+            return 0
+        
+        lines = [
+            json.dumps(spans_to_otlp(record.spans, self.service_name), separators=(",", ":"), default=str)
+            for record in records
+        ]
+        try:
+            with self.export_lock:
+                self.export_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.export_path, "a", encoding="utf-8") as f:
+                    f.write("\n".join(lines) + "\n")
+        except OSError as e:
+            logger.error(f"Failed to export traces to {self.export_path}: {e}")
+            return 0
+        
+        self.stats["traces_exported"] += len(records)
+        return len(records)
+    
+    def export_otlp(self, path: str, trace_ids: Optional[List[str]] = None) -> int:
+        """Write stored traces (all finished ones by default) to `path` as OTLP/JSON lines."""
+        with self.lock:
+            if trace_ids is None:
+                records = [r for r in self.traces.values() if r.end_time is not None]
+            else:
+                records = [self.traces[t] for t in trace_ids if t in self.traces]
+            snapshots = [list(record.spans) for record in records]
+        
+        with open(path, "w", encoding="utf-8") as f:
+            for spans in snapshots:
+                f.write(json.dumps(spans_to_otlp(spans, self.service_name), separators=(",", ":"), default=str))
+                f.write("\n")
+        return len(snapshots)
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                **self.stats,
+                "stored_traces": len(self.traces),
+                "active_spans": len(self.active_spans),
+                "pending_export": len(self.pending_export)
+            }
 
 
 class ExecutionRecorder:
@@ -786,10 +956,25 @@ class ObservabilitySystem:
             window_size=config.get("anomaly_window_size", 100),
             threshold_factor=config.get("anomaly_threshold", 3.0)
         )
-        self.trace_collector = TraceCollector(config.get("max_traces", 10000))
+        self.trace_collector = TraceCollector(
+            max_traces=config.get("max_traces", 10000),
+            max_spans_per_trace=config.get("max_spans_per_trace", 1000),
+            sample_rate=config.get("trace_sample_rate", 1.0),
+            slow_trace_ms=config.get("slow_trace_ms", 5000.0),
+            export_path=config.get("trace_export_path")
+        )
         self.execution_recorder = ExecutionRecorder(config.get("max_snapshots", 1000))
         self.dashboard_generator = DashboardGenerator()
         
+        # Lock-free in-process metrics, rolled up into SQLite when a path is configured
+        self.metrics = MetricsRegistry()
+        self.metrics_flusher: Optional[MetricsFlusher] = None
+        if config.get("metrics_db_path"):
+            self.metrics_flusher = MetricsFlusher(
+                self.metrics, config["metrics_db_path"],
+                interval=config.get("metrics_flush_interval", 10.0)
+            )
+        
         # Metrics storage
         self.task_metrics: Dict[str, TaskMetrics] = {}
         self.agent_metrics: Dict[str, AgentMetrics] = {}
@@ -800,10 +985,10 @@ class ObservabilitySystem:
         self.active_alerts: Dict[str, Alert] = {}
         self.notification_channels: Dict[str, NotificationChannel] = {}
         
-        # Background tasks
+        # Background work runs on one thread
         self.running = False
         self.monitoring_thread: Optional[threading.Thread] = None
-        self.alert_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
         
         # Locks
         self.metrics_lock = threading.RLock()
@@ -895,48 +1080,63 @@ class ObservabilitySystem:
         # Start Prometheus server
         self.prometheus_exporter.start_server()
         
-        # Start monitoring threads
-        self.monitoring_thread = threading.Thread(target=self._monitoring_loop, daemon=True)
+        # Start the background thread
+        self._stop_event.clear()
+        self.monitoring_thread = threading.Thread(target=self._background_loop, daemon=True)
         self.monitoring_thread.start()
         
-        self.alert_thread = threading.Thread(target=self._alerting_loop, daemon=True)
-        self.alert_thread.start()
+        if self.metrics_flusher:
+            self.metrics_flusher.start()
         
         logger.info("ObservabilitySystem started")
     
     def stop(self):
         """Stop the observability system."""
         self.running = False
+        self._stop_event.set()
         
         if self.monitoring_thread:
             self.monitoring_thread.join(timeout=5)
         
-        if self.alert_thread:
-            self.alert_thread.join(timeout=5)
+        if self.metrics_flusher:
+            self.metrics_flusher.stop()
+        
+        self.trace_collector.flush()
         
         logger.info("ObservabilitySystem stopped")
     
-    def _monitoring_loop(self):
-        """Background monitoring loop."""
+    def _background_loop(self):
+        """Run monitoring and alerting on their own intervals from one thread."""
+        jobs = [
+            # [interval, next run, job, error label]
+            [self.config.get("monitoring_interval", 30), 0.0, self._monitoring_tick, "monitoring"],
+            [self.config.get("alert_evaluation_interval", 10), 0.0, self._alerting_tick, "alerting"]
+        ]
+        
         while self.running:
-            try:
-                self._collect_system_metrics()
-                self._update_agent_performance_scores()
-                time.sleep(self.config.get("monitoring_interval", 30))
-            except Exception as e:
-                logger.error(f"Error in monitoring loop: {e}")
-                time.sleep(5)
+            for job in jobs:
+                interval, next_run, run, label = job
+                now = time.monotonic()
+                if now < next_run:
+                    continue
+                try:
+                    run()
+                    job[1] = now + interval
+                except Exception as e:
+                    logger.error(f"Error in {label} loop: {e}")
+                    job[1] = now + 5
+            
+            # Sleeps until the next job is due, or returns at once on stop()
+            self._stop_event.wait(max(min(job[1] for job in jobs) - time.monotonic(), 0))
     
-    def _alerting_loop(self):
-        """Background alerting loop."""
-        while self.running:
-            try:
-                self._evaluate_alert_rules()
-                self._process_alerts()
-                time.sleep(self.config.get("alert_evaluation_interval", 10))
-            except Exception as e:
-                logger.error(f"Error in alerting loop: {e}")
-                time.sleep(5)
+    def _monitoring_tick(self):
+        self._collect_system_metrics()
+        self._update_agent_performance_scores()
+        self.trace_collector.flush()
+    
+    def _alerting_tick(self):
+        self._evaluate_alert_rules()
+        self._process_alerts()
     
     def _collect_system_metrics(self):
         """Collect system resource metrics."""
@@ -967,6 +1167,10 @@ class ObservabilitySystem:
             # Record to Prometheus
             self.prometheus_exporter.record_system_metric(system_metrics)
             
+            self.metrics.gauge("system_cpu_percent").set(cpu_percent)
+            self.metrics.gauge("system_memory_percent").set(memory.percent)
+            self.metrics.gauge("system_disk_percent").set(disk.percent)
+            
             # Add to anomaly detection
             self.anomaly_detector.add_value("cpu_percent", cpu_percent)
             self.anomaly_detector.add_value("memory_percent", memory.percent)
@@ -1229,6 +1433,15 @@ class ObservabilitySystem:
         # Record to Prometheus
         self.prometheus_exporter.record_task_metric(task_metrics)
         
+        task_type = task_metrics.task_type
+        self.metrics.histogram("task_duration_ms", task_type=task_type).record(task_metrics.duration_ms)
+        self.metrics.counter("tasks_total", task_type=task_type, status=status).inc()
+        self.metrics.counter("task_tokens", task_type=task_type).inc(tokens_used)
+        self.metrics.counter("task_cost_usd", task_type=task_type).inc(cost_usd)
+        
+        # Feed the "Anomalous Response Time" rule
+        self.anomaly_detector.add_value("task_duration", task_metrics.duration_ms)
+        
         # Record error if applicable
         if not success and error_type:
             self.prometheus_exporter.record_error(error_type, "task_execution")
@@ -1308,7 +1521,8 @@ class ObservabilitySystem:
                     "task_metrics": [asdict(m) for m in self.task_metrics.values()],
                     "agent_metrics": [asdict(m) for m in self.agent_metrics.values()],
                     "system_metrics": [asdict(m) for m in self.system_metrics_history],
-                    "alerts": [asdict(a) for a in self.active_alerts.values()]
+                    "alerts": [asdict(a) for a in self.active_alerts.values()],
+                    "registry": self.metrics.snapshot()
                 }, default=str, indent=2)
         elif format == "prometheus" and PROMETHEUS_AVAILABLE:
             return generate_latest(self.prometheus_exporter.registry)
@@ -0,0 +1,420 @@
+"""
+Online anomaly detection for metric streams.
+
+Every structure here is updated in O(1) per value (amortized for the
+sliding-window extremes), so checking a metric never rescans its history:
+
+- WindowedStats keeps mean/variance over a sliding window with Welford's
+  update and its inverse for the value that falls out of the window, plus
+  monotonic deques for the window minimum and maximum.
+- Ewma tracks an exponentially weighted mean and variance, which follow
+  level shifts faster than a long window does.
+- P2Quantile estimates a quantile with the P-square algorithm in five
+  markers instead of storing and sorting values.
+- HalfSpaceTrees scores multi-metric samples against the mass profile of
+  the previous window of samples, for correlated anomalies that no single
+  metric's z-score reveals.
+
+OnlineAnomalyDetector bundles the per-metric pieces behind a name-keyed API.
+"""
+
+import math
+import random
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Quantiles tracked for every metric
+DEFAULT_QUANTILES = (0.5, 0.95, 0.99)
+
+
+class WindowedStats:
+    """Mean, variance, min and max over the last `window_size` values."""
+
+    __slots__ = ("window_size", "values", "mean", "_m2", "_index", "_mins", "_maxs", "_evictions")
+
+    def __init__(self, window_size: int):
+        if window_size < 1:
+            raise ValueError("window_size must be at least 1")
+        self.window_size = window_size
+        self.values: Deque[float] = deque()
+        self.mean = 0.0
+        self._m2 = 0.0
+        self._index = 0
+        # (index, value) pairs; the front is the current min/max
+        self._mins: Deque[Tuple[int, float]] = deque()
+        self._maxs: Deque[Tuple[int, float]] = deque()
+        self._evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def push(self, value: float):
+        value = float(value)
+        if len(self.values) == self.window_size:
+            self._evict(self.values.popleft())
+
+        self.values.append(value)
+        count = len(self.values)
+        delta = value - self.mean
+        self.mean += delta / count
+        self._m2 += delta * (value - self.mean)
+
+        index = self._index
+        self._index += 1
+        while self._mins and self._mins[-1][1] >= value:
+            self._mins.pop()
+        self._mins.append((index, value))
+        while self._maxs and self._maxs[-1][1] <= value:
+            self._maxs.pop()
+        self._maxs.append((index, value))
+        oldest = index - count + 1
+        if self._mins[0][0] < oldest:
+            self._mins.popleft()
+        if self._maxs[0][0] < oldest:
+            self._maxs.popleft()
+
+    def _evict(self, value: float):
+        count = len(self.values)  # already excludes the evicted value
+        if count == 0:
+            self.mean = self._m2 = 0.0
+            return
+        delta = value - self.mean
+        self.mean -= delta / count
+        self._m2 -= delta * (value - self.mean)
+
+        # Removal accumulates rounding error; re-derive exactly once per
+        # window of evictions, which keeps the amortized cost O(1)
+        self._evictions += 1
+        if self._evictions >= self.window_size:
+            self._evictions = 0
+            self.mean = math.fsum(self.values) / count
+            self._m2 = math.fsum((v - self.mean) ** 2 for v in self.values)
+
+    @property
+    def variance(self) -> float:
+        """Population variance of the window."""
+        return max(self._m2, 0.0) / len(self.values) if self.values else 0.0
+
+    @property
+    def sample_variance(self) -> float:
+        count = len(self.values)
+        return max(self._m2, 0.0) / (count - 1) if count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    @property
+    def minimum(self) -> Optional[float]:
+        return self._mins[0][1] if self._mins else None
+
+    @property
+    def maximum(self) -> Optional[float]:
+        return self._maxs[0][1] if self._maxs else None
+
+
+class Ewma:
+    """Exponentially weighted mean and variance."""
+
+    __slots__ = ("alpha", "mean", "variance", "count")
+
+    def __init__(self, alpha: float = 0.1):
+        if not 0 < alpha <= 1:
+            raise ValueError("alpha must be in (0, 1]")
+        self.alpha = alpha
+        self.mean = 0.0
+        self.variance = 0.0
+        self.count = 0
+
+    def update(self, value: float):
+        self.count += 1
+        if self.count == 1:
+            self.mean = float(value)
+            return
+        delta = value - self.mean
+        increment = self.alpha * delta
+        self.mean += increment
+        self.variance = (1 - self.alpha) * (self.variance + delta * increment)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+
+class P2Quantile:
+    """Streaming quantile estimate (Jain & Chlamtac's P-square algorithm)."""
+
+    __slots__ = ("q", "count", "_heights", "_positions", "_desired", "_increments")
+
+    def __init__(self, q: float):
+        if not 0 < q < 1:
+            raise ValueError("q must be in (0, 1)")
+        self.q = q
+        self.count = 0
+        self._heights: List[float] = []
+        self._positions = [1.0, 2.0, 3.0, 4.0, 5.0]
+        self._desired = [1.0, 1 + 2 * q, 1 + 4 * q, 3 + 2 * q, 5.0]
+        self._increments = [0.0, q / 2, q, (1 + q) / 2, 1.0]
+
+    def update(self, value: float):
+        value = float(value)
+        self.count += 1
+        heights = self._heights
+        if self.count <= 5:
+            heights.append(value)
+            heights.sort()
+            return
+
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = 0
+            while value >= heights[cell + 1]:
+                cell += 1
+
+        positions = self._positions
+        for i in range(cell + 1, 5):
+            positions[i] += 1
+        desired = self._desired
+        for i in range(5):
+            desired[i] += self._increments[i]
+
+        for i in (1, 2, 3):
+            offset = desired[i] - positions[i]
+            if ((offset >= 1 and positions[i + 1] - positions[i] > 1) or
+                    (offset <= -1 and positions[i - 1] - positions[i] < -1)):
+                step = 1 if offset > 0 else -1
+                height = self._parabolic(i, step)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = heights[i] + step * (heights[i + step] - heights[i]) / (positions[i + step] - positions[i])
+                heights[i] = height
+                positions[i] += step
+
+    def _parabolic(self, i: int, step: int) -> float:
+        h, n = self._heights, self._positions
+        return h[i] + step / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + step) * (h[i + 1] - h[i]) / (n[i + 1] - n[i]) +
+            (n[i + 1] - n[i] - step) * (h[i] - h[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    @property
+    def value(self) -> Optional[float]:
+        if not self._heights:
+            return None
+        if self.count <= 5:
+            # Exact while there are too few values for the markers
+            ordered = self._heights
+            return ordered[min(len(ordered) - 1, int(round(self.q * (len(ordered) - 1))))]
+        return self._heights[2]
+
+
+class MetricStream:
+    """Online statistics for one metric."""
+
+    __slots__ = ("window", "ewma", "quantiles")
+
+    def __init__(self, window_size: int, ewma_alpha: float = 0.1,
+                 quantiles: Iterable[float] = DEFAULT_QUANTILES):
+        self.window = WindowedStats(window_size)
+        self.ewma = Ewma(ewma_alpha)
+        self.quantiles = {q: P2Quantile(q) for q in quantiles}
+
+    def update(self, value: float):
+        self.window.push(value)
+        self.ewma.update(value)
+        for estimator in self.quantiles.values():
+            estimator.update(value)
+
+    @property
+    def count(self) -> int:
+        return len(self.window)
+
+    def zscore(self, value: float) -> float:
+        """Absolute z-score against the window; 0 when the window has no spread."""
+        std = self.window.std
+        return abs(value - self.window.mean) / std if std > 0 else 0.0
+
+    def ewma_zscore(self, value: float) -> float:
+        std = self.ewma.std
+        return abs(value - self.ewma.mean) / std if std > 0 else 0.0
+
+    def summary(self) -> Dict[str, float]:
+        if not self.window.values:
+            return {}
+        summary = {
+            "mean": self.window.mean,
+            "std": self.window.std,
+            "min": self.window.minimum,
+            "max": self.window.maximum,
+            "ewma_mean": self.ewma.mean,
+            "ewma_std": self.ewma.std
+        }
+        for q, estimator in self.quantiles.items():
+            summary[f"p{q * 100:g}"] = estimator.value
+        return summary
+
+
+class OnlineAnomalyDetector:
+    """Per-metric z-score detection over sliding windows with O(1) updates."""
+
+    def __init__(self, window_size: int = 100, threshold_factor: float = 3.0,
+                 min_samples: int = 10, ewma_alpha: float = 0.1,
+                 quantiles: Iterable[float] = DEFAULT_QUANTILES):
+        self.window_size = window_size
+        self.threshold_factor = threshold_factor
+        self.min_samples = min_samples
+        self.ewma_alpha = ewma_alpha
+        self.quantiles = tuple(quantiles)
+        self.streams: Dict[str, MetricStream] = {}
+
+    def stream(self, metric_name: str) -> MetricStream:
+        stream = self.streams.get(metric_name)
+        if stream is None:
+            stream = self.streams[metric_name] = MetricStream(
+                self.window_size, self.ewma_alpha, self.quantiles
+            )
+        return stream
+
+    def update(self, metric_name: str, value: float):
+        self.stream(metric_name).update(value)
+
+    def update_many(self, metrics: Dict[str, float]):
+        for metric_name, value in metrics.items():
+            self.stream(metric_name).update(value)
+
+    def zscore(self, metric_name: str, value: float) -> Optional[float]:
+        """z-score of `value`, or None until the metric has `min_samples` values."""
+        stream = self.streams.get(metric_name)
+        if stream is None or stream.count < self.min_samples:
+            return None
+        return stream.zscore(value)
+
+    def is_anomaly(self, metric_name: str, value: float) -> bool:
+        score = self.zscore(metric_name, value)
+        return score is not None and score > self.threshold_factor
+
+    def statistics(self, metric_name: str) -> Dict[str, float]:
+        stream = self.streams.get(metric_name)
+        return stream.summary() if stream else {}
+
+
+class HalfSpaceTrees:
+    """
+    Streaming multi-metric anomaly scores (Tan, Ting & Liu's half-space trees).
+
+    Each tree splits a randomly perturbed unit workspace in half per level.
+    Node masses counted over the latest window become the reference profile
+    when the window fills, so learning and scoring cost n_trees * height
+    steps regardless of history length. Raw metric values are mapped onto
+    the unit interval with per-feature EWMA statistics, so callers pass
+    metrics as they are.
+    """
+
+    def __init__(self, feature_names: Sequence[str], n_trees: int = 25, height: int = 8,
+                 window_size: int = 250, scale_alpha: float = 0.01, seed: int = 42):
+        if not feature_names:
+            raise ValueError("HalfSpaceTrees needs at least one feature")
+        self.feature_names = list(feature_names)
+        self.n_trees = n_trees
+        self.height = height
+        self.window_size = window_size
+        self.size_limit = 0.1 * window_size
+        self.samples_seen = 0
+        self.windows_completed = 0
+        self.scalers = {name: Ewma(scale_alpha) for name in self.feature_names}
+
+        rng = random.Random(seed)
+        dims = len(self.feature_names)
+        node_count = 2 ** (height + 1) - 1
+        self._split_features: List[List[int]] = []
+        self._split_values: List[List[float]] = []
+        for _ in range(n_trees):
+            lows, highs = [], []
+            for _ in range(dims):
+                centre = rng.random()
+                spread = 2 * max(centre, 1 - centre)
+                lows.append(centre - spread)
+                highs.append(centre + spread)
+            features = [0] * node_count
+            values = [0.0] * node_count
+            self._build(0, 0, lows, highs, features, values, rng)
+            self._split_features.append(features)
+            self._split_values.append(values)
+
+        self._reference = [[0] * node_count for _ in range(n_trees)]
+        self._latest = [[0] * node_count for _ in range(n_trees)]
+
+    def _build(self, node: int, depth: int, lows: List[float], highs: List[float],
+               features: List[int], values: List[float], rng: random.Random):
+        if depth == self.height:
+            return
+        feature = rng.randrange(len(lows))
+        split = (lows[feature] + highs[feature]) / 2
+        features[node], values[node] = feature, split
+        saved_low, saved_high = lows[feature], highs[feature]
+        highs[feature] = split
+        self._build(2 * node + 1, depth + 1, lows, highs, features, values, rng)
+        highs[feature], lows[feature] = saved_high, split
+        self._build(2 * node + 2, depth + 1, lows, highs, features, values, rng)
+        lows[feature] = saved_low
+
+    @property
+    def ready(self) -> bool:
+        """True once a full window has been learned as the reference profile."""
+        return self.windows_completed > 0
+
+    def _unit_vector(self, metrics: Dict[str, float]) -> List[float]:
+        vector = []
+        for name in self.feature_names:
+            scaler = self.scalers[name]
+            value = metrics.get(name)
+            if value is None or scaler.count < 2 or scaler.std == 0:
+                vector.append(0.5)
+                continue
+            # +-4 standard deviations span the unit interval
+            unit = 0.5 + (value - scaler.mean) / (8 * scaler.std)
+            vector.append(0.0 if unit < 0 else 1.0 if unit > 1 else unit)
+        return vector
+
+    def learn(self, metrics: Dict[str, float]):
+        vector = self._unit_vector(metrics)
+        for name in self.feature_names:
+            value = metrics.get(name)
+            if value is not None:
+                self.scalers[name].update(value)
+
+        height = self.height
+        for features, values, latest in zip(self._split_features, self._split_values, self._latest):
+            node = 0
+            for _ in range(height):
+                latest[node] += 1
+                node = 2 * node + 1 if vector[features[node]] < values[node] else 2 * node + 2
+            latest[node] += 1
+
+        self.samples_seen += 1
+        if self.samples_seen % self.window_size == 0:
+            self._reference, self._latest = self._latest, self._reference
+            for masses in self._latest:
+                masses[:] = [0] * len(masses)
+            self.windows_completed += 1
+
+    def score(self, metrics: Dict[str, float]) -> float:
+        """Anomaly score in [0, 1]; higher means the sample sits in sparser space."""
+        if not self.ready:
+            return 0.0
+        vector = self._unit_vector(metrics)
+        height, size_limit = self.height, self.size_limit
+        total = 0.0
+        for features, values, reference in zip(self._split_features, self._split_values, self._reference):
+            node = depth = 0
+            while depth < height and reference[node] > size_limit:
+                node = 2 * node + 1 if vector[features[node]] < values[node] else 2 * node + 2
+                depth += 1
+            total += reference[node] * 2 ** depth
+        # A sample in a region as dense as the whole window scores ~window per tree
+        mass = total / (self.n_trees * self.window_size)
+        return 1.0 - min(mass, 1.0)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Caption Parser
+==============
+
+Single-pass streaming parser that turns WebVTT or SRT captions into plain
+spoken text. Lines are consumed one at a time (a file object or any line
+iterator works), so large caption files never have to be held in memory.
+
+YouTube auto-generated captions roll: every cue repeats the previous line
+(first with per-word timing tags, then plain) before adding new words. The
+parser drops those repeats so each spoken word appears once.
+"""
+
+import re
+from typing import Iterable, List
+
+# Inline markup and non-speech annotations, removed in one pass:
+# <c>/<00:00:01.000> tags, {\an8} styling, [Music], (inaudible)
+_MARKUP_PATTERN = re.compile(r'<[^>]*>|\{[^}]*\}|\[[^\]]*\]|\([^)]*\)')
+
+_ENTITIES = (('&gt;', '>'), ('&lt;', '<'), ('&nbsp;', ' '), ('&amp;', '&'))
+
+# Blocks in a VTT file that carry no caption text
+_METADATA_BLOCKS = ('WEBVTT', 'NOTE', 'STYLE', 'REGION')
+
+
+def clean_caption_line(line: str) -> str:
+    """Strip markup and annotations from one caption line and normalize whitespace."""
+    if '<' in line or '{' in line or '[' in line or '(' in line:
+        line = _MARKUP_PATTERN.sub('', line)
+    if '&' in line:
+        for entity, char in _ENTITIES:
+            line = line.replace(entity, char)
+    return ' '.join(line.split())
+
+
+def _overlap(previous: List[str], words: List[str]) -> int:
+    """
+    Number of leading words of `words` that repeat the previous caption line.
+
+    Rolling captions repeat the whole previous line, either verbatim or as
+    the start of a longer line. Partial overlaps are left alone so words that
+    are genuinely spoken twice survive; a one-word line only counts as
+    repeated when the new line is identical to it.
+    """
+    size = len(previous)
+    if words[:size] == previous and (size >= 2 or len(words) == size):
+        return size
+    return 0
+
+
+def parse_captions(lines: Iterable[str], dedupe_rolling: bool = True) -> str:
+    """Extract spoken text from VTT/SRT caption lines in a single pass."""
+    pieces: List[str] = []
+    previous: List[str] = []
+    in_cue = False
+    in_metadata = False
+
+    for raw_line in lines:
+        line = raw_line.strip()
+
+        if not line:
+            # Blank line ends a cue or metadata block
+            in_cue = False
+            in_metadata = False
+            continue
+
+        if in_metadata:
+            continue
+
+        if '-->' in line:
+            in_cue = True
+            continue
+
+        if not in_cue:
+            if line.startswith(_METADATA_BLOCKS):
+                in_metadata = True
+            # Otherwise a cue identifier (SRT sequence number) or header line
+            continue
+
+        text = clean_caption_line(line)
+        if not text:
+            continue
+
+        words = text.split(' ')
+        if dedupe_rolling and previous:
+            skip = _overlap(previous, words)
+            previous = words
+            if skip:
+                words = words[skip:]
+                if not words:
+                    continue
+                text = ' '.join(words)
+        else:
+            previous = words
+
+        pieces.append(text)
+
+    return ' '.join(pieces)
+
+
+def parse_caption_file(path: str, dedupe_rolling: bool = True, encoding: str = 'utf-8') -> str:
+    """Stream a caption file from disk through parse_captions."""
+    with open(path, 'r', encoding=encoding, errors='replace') as f:
+        return parse_captions(f, dedupe_rolling=dedupe_rolling)
+
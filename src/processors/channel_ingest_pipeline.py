@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Channel Ingest Pipeline
+=======================
+
+Staged producer/consumer pipeline for importing a channel's videos:
+
+    listing -> dedupe -> transcript -> AI analysis -> write
+
+Stages are connected by bounded queues and each stage has its own pool of
+workers, so transcripts for later videos are fetched while earlier ones are
+being analyzed and written. Calls to each upstream API (YouTube, Gemini,
+Notion) are paced by a shared AdaptiveRateLimiter that speeds up while calls
+succeed and backs off multiplicatively when the API throttles. Completed
+stages are checkpointed per video, so a crashed run resumes mid-channel
+without repeating analysis or writes.
+"""
+
+import asyncio
+import functools
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Any, Optional, Callable, Awaitable
+
+try:
+    from loguru import logger
+except ImportError:
+    import logging
+    logger = logging.getLogger(__name__)
+
+
+STAGES = ('dedupe', 'transcript', 'analysis', 'write')
+
+DEFAULT_STAGE_WORKERS = {
+    'dedupe': 1,
+    'transcript': 3,
+    'analysis': 2,
+    'write': 2
+}
+
+# Default pacing per upstream API in requests per second
+DEFAULT_API_RATES = {
+    'youtube': 1.0,
+    'gemini': 0.5,
+    'notion': 3.0
+}
+
+
+def is_rate_limited(error: Any) -> bool:
+    """Whether an exception or error message indicates upstream throttling."""
+    text = str(error).lower()
+    return any(marker in text for marker in (
+        '429', 'too many requests', 'rate limit', 'ratelimit', 'quota', 'resource exhausted', 'resource_exhausted'
+    ))
+
+
+class AdaptiveRateLimiter:
+    """
+    AIMD pacing for one upstream API.
+
+    Calls are spaced 1/rate seconds apart. Every successful call raises the
+    rate by `increase` (up to max_rate); a throttled call multiplies it by
+    `decrease` (down to min_rate) and blocks new calls for Retry-After, or one
+    interval if the API gave none. on_throttle may be called from worker
+    threads.
+    """
+
+    def __init__(self, name: str, rate: float = 1.0, min_rate: float = 0.05,
+                 max_rate: Optional[float] = None, increase: float = 0.05, decrease: float = 0.5):
+        self.name = name
+        self.initial_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate or rate * 4
+        self.increase = increase
+        self.decrease = decrease
+
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self._blocked_until = 0.0
+
+        self.calls = 0
+        self.throttles = 0
+        self.total_wait = 0.0
+
+    async def acquire(self):
+        """Wait for this caller's slot."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot, self._blocked_until)
+            self._next_slot = slot + 1.0 / self.rate
+            self.calls += 1
+        delay = slot - now
+        if delay > 0:
+            self.total_wait += delay
+            await asyncio.sleep(delay)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self, retry_after: Optional[float] = None):
+        with self._lock:
+            self.throttles += 1
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            pause = retry_after if retry_after is not None else 1.0 / self.rate
+            now = time.monotonic()
+            self._blocked_until = max(self._blocked_until, now + pause)
+            self._next_slot = max(self._next_slot, self._blocked_until)
+        logger.warning(f"{self.name} throttled; pacing at {self.rate:.2f} req/s, pausing {pause:.1f}s")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'rate': self.rate,
+            'calls': self.calls,
+            'throttles': self.throttles,
+            'total_wait': self.total_wait
+        }
+
+
+def build_rate_limiters(config: Optional[Dict[str, Any]] = None) -> Dict[str, AdaptiveRateLimiter]:
+    """Limiters for each upstream API; `config` maps API name to AdaptiveRateLimiter kwargs."""
+    config = config or {}
+    limiters = {}
+    for api, rate in DEFAULT_API_RATES.items():
+        options = {'rate': rate, **config.get(api, {})}
+        limiters[api] = AdaptiveRateLimiter(api, **options)
+    return limiters
+
+
+class ChannelIngestPipeline:
+    """Runs one channel's videos through the staged pipeline."""
+
+    def __init__(self, processor, channel: Dict[str, Any], stage_workers: Optional[Dict[str, int]] = None,
+                 queue_size: int = 4, max_throttle_retries: int = 3):
+        self.processor = processor
+        self.channel = channel
+        self.channel_id = channel['channel_id']
+        self.stage_workers = {**DEFAULT_STAGE_WORKERS, **(stage_workers or {})}
+        self.queue_size = queue_size
+        self.max_throttle_retries = max_throttle_retries
+
+        self.checkpoints: Dict[str, Dict[str, Any]] = {}
+        self.succeeded: Dict[str, bool] = {}
+        self.stats = defaultdict(int)
+        self.result: Dict[str, Any] = {}
+
+    async def run(self, videos: List[Dict[str, Any]], result: Dict[str, Any]) -> Dict[str, bool]:
+        """
+        Process `videos`, updating the channel `result` counters in place.
+
+        Returns video_id -> succeeded for the sync watermark.
+        """
+        self.result = result
+        self.checkpoints = self.processor.sync_store.get_checkpoints(self.channel_id)
+        if self.checkpoints:
+            logger.info(f"♻️ Resuming {self.channel['name']}: {len(self.checkpoints)} videos checkpointed")
+
+        handlers = {
+            'dedupe': self._dedupe,
+            'transcript': self._transcript,
+            'analysis': self._analyze,
+            'write': self._write
+        }
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in STAGES]
+        workers = []
+        for index, stage in enumerate(STAGES):
+            next_queue = queues[index + 1] if index + 1 < len(queues) else None
+            for _ in range(max(1, self.stage_workers.get(stage, 1))):
+                workers.append(asyncio.create_task(
+                    self._worker(stage, handlers[stage], queues[index], next_queue)
+                ))
+
+        try:
+            # Listing stage: feed videos in (bounded queues apply backpressure)
+            for video in videos:
+                await queues[0].put({'video': video})
+
+            # Each stage has received everything once the one before it is drained
+            for queue in queues:
+                await queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        done = [video_id for video_id, ok in self.succeeded.items() if ok]
+        self.processor.sync_store.clear_checkpoints(self.channel_id, done)
+        return self.succeeded
+
+    async def _worker(self, stage: str, handler: Callable[[Dict[str, Any]], Awaitable[Optional[Dict[str, Any]]]],
+                      queue: asyncio.Queue, next_queue: Optional[asyncio.Queue]):
+        while True:
+            item = await queue.get()
+            try:
+                item = await handler(item)
+                if item is not None and next_queue is not None:
+                    await next_queue.put(item)
+            except Exception as e:
+                video = item['video']
+                logger.error(f"Error in {stage} stage for {video.get('title', 'Unknown')}: {e}")
+                self.result["errors"].append(f"Video processing error: {str(e)}")
+                self.succeeded[video['video_id']] = False
+            finally:
+                queue.task_done()
+
+    async def _call_api(self, api: str, call: Callable[[], Awaitable[Any]],
+                        throttled: Callable[[Any], bool] = lambda result: False, fallback: Any = None) -> Any:
+        """
+        Make a paced call, retrying after backoff while the call itself was throttled.
+
+        Throttling is judged from this call's own outcome, never from the shared
+        limiter: a rate-limit exception, or a result for which `throttled` is true.
+        Other exceptions propagate. A call still throttled after the last retry
+        returns its last result, or `fallback` if it raised.
+        """
+        limiter = self.processor.rate_limiters[api]
+        result = fallback
+        for attempt in range(self.max_throttle_retries + 1):
+            await limiter.acquire()
+            try:
+                result = await call()
+            except Exception as e:
+                if not is_rate_limited(e):
+                    raise
+                result = fallback
+            else:
+                if not throttled(result):
+                    limiter.on_success()
+                    return result
+            self.stats[f'{api}_throttle_retries'] += 1
+        return result
+
+    def _finish(self, item: Dict[str, Any], success: bool):
+        self.succeeded[item['video']['video_id']] = success
+
+    async def _dedupe(self, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        video = item['video']
+        checkpoint = self.checkpoints.get(video['video_id'])
+        if checkpoint and checkpoint['stage'] == 'written':
+            logger.debug(f"    Written before interruption, skipping: {video['title'][:50]}")
+            self._finish(item, True)
+            return None
+
+        existing_page = await self.processor._get_existing_video_page(video['url'], video['title'])
+        if existing_page:
+            processing_status = existing_page.get('properties', {}).get('Processing Status', {}).get('select', {}).get('name', '')
+            if processing_status == 'Completed':
+                logger.debug(f"    Already processed with AI, skipping: {video['title'][:50]}")
+                self._finish(item, True)
+                return None
+            logger.debug(f"    Exists but missing AI analysis, updating: {video['title'][:50]}")
+        else:
+            logger.debug(f"    New video, importing: {video['title'][:50]}")
+            self.result["new_videos"] += 1
+
+        item['existing'] = existing_page is not None
+        if checkpoint and checkpoint['stage'] == 'analyzed':
+            item['ai_analysis'] = checkpoint['payload']
+            self.stats['analysis_resumed'] += 1
+        return item
+
+    async def _transcript(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        if 'ai_analysis' in item:
+            return item
+
+        loop = asyncio.get_running_loop()
+        url = item['video']['url']
+        item['transcript'] = await self._call_api(
+            'youtube',
+            lambda: loop.run_in_executor(
+                self.processor.transcript_executor,
+                functools.partial(self.processor._extract_transcript, url, raise_throttled=True)
+            )
+        )
+        return item
+
+    async def _analyze(self, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if 'ai_analysis' in item:
+            return item
+
+        video = item['video']
+        ai_analysis = await self._call_api(
+            'gemini',
+            lambda: self.processor._process_video_with_ai(
+                video['url'], video['title'], video, self.channel['hashtags'], transcript=item['transcript']
+            ),
+            lambda analysis: analysis.get('rate_limited', False)
+        )
+        item['ai_analysis'] = ai_analysis
+        item.pop('transcript', None)
+        if ai_analysis.get('success') and not ai_analysis.get('rate_limited'):
+            self.processor.sync_store.checkpoint(self.channel_id, video['video_id'], 'analyzed', ai_analysis)
+        return item
+
+    async def _write(self, item: Dict[str, Any]) -> None:
+        video = item['video']
+        imported = await self._call_api(
+            'notion',
+            lambda: self.processor.import_video_to_knowledge_hub(
+                video, self.channel['name'], self.channel['hashtags'], ai_analysis=item['ai_analysis'],
+                raise_throttled=True
+            ),
+            fallback=False
+        )
+        if imported:
+            self.processor.sync_store.checkpoint(self.channel_id, video['video_id'], 'written')
+            self.result["imported_videos"] += 1
+            action = "Updated" if item['existing'] else "Imported"
+            logger.debug(f"    {action} successfully: {video['title'][:50]}")
+        else:
+            logger.warning(f"    Failed to process: {video['title'][:50]}")
+            self.result["errors"].append(f"Failed to process: {video['title']}")
+        self._finish(item, bool(imported))
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats)
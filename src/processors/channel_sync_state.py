@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Channel Sync State
+==================
+
+Persisted per-channel sync watermarks for incremental YouTube channel
+processing. Each channel remembers its uploads playlist, the newest video
+that has been fully processed and the ETag of the first playlist page, so a
+processing cycle only fetches and imports videos published since the last
+successful sync.
+
+Per-video checkpoints record how far each video of an in-progress run got
+(analysis results included), so a crashed run resumes mid-channel.
+"""
+
+import json
+import sqlite3
+import threading
+from dataclasses import dataclass, asdict, fields
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+try:
+    from loguru import logger
+except ImportError:
+    import logging
+    logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ChannelSyncState:
+    """Sync watermark for a single channel."""
+    channel_id: str
+    uploads_playlist_id: Optional[str] = None
+    last_video_id: Optional[str] = None
+    last_published_at: Optional[str] = None  # ISO 8601 publishedAt of last_video_id
+    playlist_etag: Optional[str] = None
+    videos_synced: int = 0
+    last_synced_at: Optional[str] = None
+    last_full_sync_at: Optional[str] = None
+
+    @property
+    def has_watermark(self) -> bool:
+        return bool(self.last_video_id or self.last_published_at)
+
+
+class ChannelSyncStore:
+    """SQLite-backed store of ChannelSyncState rows."""
+
+    def __init__(self, db_path: str = "youtube_sync.db"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._initialize_database()
+
+    def _initialize_database(self):
+        """Initialize SQLite database for persistent storage."""
+        with self._lock:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS channel_sync_state (
+                    channel_id TEXT PRIMARY KEY,
+                    uploads_playlist_id TEXT,
+                    last_video_id TEXT,
+                    last_published_at TEXT,
+                    playlist_etag TEXT,
+                    videos_synced INTEGER DEFAULT 0,
+                    last_synced_at TEXT,
+                    last_full_sync_at TEXT
+                )
+            ''')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS video_checkpoints (
+                    channel_id TEXT NOT NULL,
+                    video_id TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    payload TEXT,
+                    updated_at TEXT,
+                    PRIMARY KEY (channel_id, video_id)
+                )
+            ''')
+            self._conn.commit()
+
+    def get(self, channel_id: str) -> ChannelSyncState:
+        """Get the sync state for a channel (empty state if never synced)."""
+        columns = [f.name for f in fields(ChannelSyncState)]
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(columns)} FROM channel_sync_state WHERE channel_id = ?",
+                (channel_id,)
+            ).fetchone()
+
+        if row is None:
+            return ChannelSyncState(channel_id=channel_id)
+        return ChannelSyncState(**dict(zip(columns, row)))
+
+    def save(self, state: ChannelSyncState):
+        """Insert or replace a channel's sync state."""
+        data = asdict(state)
+        columns = list(data)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO channel_sync_state ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' for _ in columns)})",
+                [data[c] for c in columns]
+            )
+            self._conn.commit()
+
+    def advance(self, state: ChannelSyncState, videos: List[Dict[str, Any]],
+                succeeded: Dict[str, bool], full_sync: bool = False) -> ChannelSyncState:
+        """
+        Move the watermark forward over the videos that were processed.
+
+        `videos` is in uploads-feed order (newest first). They are walked
+        oldest to newest and the watermark stops before the first failure, so
+        failed videos (and anything newer) are fetched again next cycle.
+        Returns the saved state.
+        """
+        ordered = list(reversed(videos))
+        processed = 0
+        for video in ordered:
+            if not succeeded.get(video['video_id']):
+                break
+            state.last_video_id = video['video_id']
+            state.last_published_at = video.get('published_date') or state.last_published_at
+            processed += 1
+
+        if processed < len(ordered):
+            # The first page changed but was not fully consumed; force it to be re-read
+            state.playlist_etag = None
+
+        now = datetime.now().isoformat()
+        state.videos_synced += processed
+        state.last_synced_at = now
+        if full_sync and ordered and processed == len(ordered):
+            state.last_full_sync_at = now
+
+        self.save(state)
+        logger.info(f"Sync watermark for {state.channel_id}: {state.last_video_id} "
+                    f"({state.last_published_at}), {processed}/{len(ordered)} videos")
+        return state
+
+    def checkpoint(self, channel_id: str, video_id: str, stage: str, payload: Any = None):
+        """Record that a video of an in-progress run completed `stage`."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO video_checkpoints (channel_id, video_id, stage, payload, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (channel_id, video_id, stage,
+                 json.dumps(payload) if payload is not None else None,
+                 datetime.now().isoformat())
+            )
+            self._conn.commit()
+
+    def get_checkpoints(self, channel_id: str) -> Dict[str, Dict[str, Any]]:
+        """video_id -> {'stage', 'payload'} for a channel's in-progress run."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT video_id, stage, payload FROM video_checkpoints WHERE channel_id = ?",
+                (channel_id,)
+            ).fetchall()
+        return {
+            video_id: {'stage': stage, 'payload': json.loads(payload) if payload else None}
+            for video_id, stage, payload in rows
+        }
+
+    def clear_checkpoints(self, channel_id: str, video_ids: Optional[List[str]] = None):
+        """Drop checkpoints for the given videos (all of the channel's if None)."""
+        with self._lock:
+            if video_ids is None:
+                self._conn.execute("DELETE FROM video_checkpoints WHERE channel_id = ?", (channel_id,))
+            else:
+                self._conn.executemany(
+                    "DELETE FROM video_checkpoints WHERE channel_id = ? AND video_id = ?",
+                    [(channel_id, video_id) for video_id in video_ids]
+                )
+            self._conn.commit()
+
+    def reset(self, channel_id: str):
+        """Forget a channel's watermark so the next sync is a full resync."""
+        with self._lock:
+            self._conn.execute("DELETE FROM channel_sync_state WHERE channel_id = ?", (channel_id,))
+            self._conn.execute("DELETE FROM video_checkpoints WHERE channel_id = ?", (channel_id,))
+            self._conn.commit()
+
+    def all_states(self) -> List[ChannelSyncState]:
+        """Sync state of every known channel."""
+        columns = [f.name for f in fields(ChannelSyncState)]
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {', '.join(columns)} FROM channel_sync_state").fetchall()
+        return [ChannelSyncState(**dict(zip(columns, row))) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
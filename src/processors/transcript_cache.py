@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Transcript Cache
+================
+
+Content-addressed on-disk cache of parsed video transcripts. Entries are
+keyed by a hash of (video ID, caption language, caption source) so a manual
+English track and an auto-generated one are cached independently, and a
+video whose analysis failed is re-analyzed without downloading its captions
+again. Videos with no usable captions are remembered for a shorter period.
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+try:
+    from loguru import logger
+except ImportError:
+    import logging
+    logger = logging.getLogger(__name__)
+
+
+# Extraction preference order: manual tracks first, then auto-generated
+CAPTION_LANGUAGES = ['en', 'en-US', 'en-GB']
+CAPTION_PREFERENCES: List[Tuple[str, str]] = (
+    [(lang, 'manual') for lang in CAPTION_LANGUAGES] +
+    [(lang, 'auto') for lang in CAPTION_LANGUAGES]
+)
+
+_UNAVAILABLE = ('', 'none')
+
+
+class TranscriptCache:
+    """Directory of JSON transcript entries addressed by video/language/source."""
+
+    def __init__(self, cache_dir: str = "transcript_cache", ttl_seconds: Optional[float] = None,
+                 unavailable_ttl_seconds: float = 86400):
+        self.cache_dir = Path(cache_dir)
+        self.ttl_seconds = ttl_seconds
+        self.unavailable_ttl_seconds = unavailable_ttl_seconds
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(video_id: str, language: str, source: str) -> str:
+        return hashlib.sha256(f"{video_id}\0{language}\0{source}".encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _read(self, key: str, ttl_seconds: Optional[float]) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable transcript cache entry {key[:8]}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+        if ttl_seconds is not None and time.time() - entry.get('stored_at', 0) >= ttl_seconds:
+            path.unlink(missing_ok=True)
+            return None
+        return entry
+
+    def _write(self, key: str, entry: Dict[str, Any]):
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            path.parent.mkdir(exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write transcript cache entry {key[:8]}: {e}")
+            tmp_path.unlink(missing_ok=True)
+
+    def get(self, video_id: str, language: str, source: str) -> Optional[str]:
+        """Cached transcript for one caption track."""
+        entry = self._read(self.make_key(video_id, language, source), self.ttl_seconds)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry['transcript']
+
+    def find(self, video_id: str, preferences: List[Tuple[str, str]] = CAPTION_PREFERENCES) -> Optional[Tuple[str, str, str]]:
+        """Best cached (transcript, language, source) for a video, in preference order."""
+        for language, source in preferences:
+            entry = self._read(self.make_key(video_id, language, source), self.ttl_seconds)
+            if entry is not None:
+                self.hits += 1
+                return entry['transcript'], language, source
+        self.misses += 1
+        return None
+
+    def put(self, video_id: str, language: str, source: str, transcript: str):
+        self._write(self.make_key(video_id, language, source), {
+            'video_id': video_id,
+            'language': language,
+            'source': source,
+            'transcript': transcript,
+            'stored_at': time.time()
+        })
+
+    def mark_unavailable(self, video_id: str):
+        """Remember that a video has no usable captions."""
+        self.put(video_id, *_UNAVAILABLE, transcript=None)
+
+    def is_unavailable(self, video_id: str) -> bool:
+        """Whether the video recently had no usable captions."""
+        return self._read(self.make_key(video_id, *_UNAVAILABLE), self.unavailable_ttl_seconds) is not None
+
+    def purge_expired(self) -> int:
+        """Remove expired entries. Returns the number removed."""
+        now = time.time()
+        removed = 0
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+                ttl = self.unavailable_ttl_seconds if entry.get('transcript') is None else self.ttl_seconds
+                if ttl is not None and now - entry.get('stored_at', 0) >= ttl:
+                    path.unlink()
+                    removed += 1
+            except (OSError, ValueError):
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'cache_dir': str(self.cache_dir),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Video Dedupe Index
+==================
+
+In-memory duplicate detection for Knowledge Hub video imports. The index is
+bulk-loaded from the Knowledge Hub once per processing cycle and answers:
+
+- exact matches by YouTube video ID or URL (dict lookups)
+- exact matches by normalized title
+- near-duplicate titles via an inverted index over title words with prefix
+  filtering, so only titles sharing a selective word with the query are
+  compared with titles_are_similar instead of the whole library
+"""
+
+import hashlib
+import re
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+
+_VIDEO_ID_PATTERN = re.compile(r'(?:[?&]v=|youtu\.be/|/shorts/|/embed/|/live/)([A-Za-z0-9_-]{11})')
+
+
+def extract_video_id(url: str) -> Optional[str]:
+    """Extract the 11-character video ID from any common YouTube URL form."""
+    if not url:
+        return None
+    match = _VIDEO_ID_PATTERN.search(url)
+    return match.group(1) if match else None
+
+
+def normalize_title(title: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace."""
+    title = title.lower()
+    title = re.sub(r'[^\w\s]', '', title)
+    return re.sub(r'\s+', ' ', title).strip()
+
+
+def titles_are_similar(title1: str, title2: str, threshold: float = 0.70) -> bool:
+    """Check if two titles are similar enough to be considered duplicates."""
+    norm_title1 = normalize_title(title1)
+    norm_title2 = normalize_title(title2)
+
+    # Exact match after normalization
+    if norm_title1 == norm_title2:
+        return True
+
+    # Calculate similarity using word overlap
+    words1 = set(norm_title1.split())
+    words2 = set(norm_title2.split())
+
+    if not words1 or not words2:
+        return False
+
+    # Jaccard similarity (intersection over union)
+    intersection = len(words1 & words2)
+    jaccard_similarity = intersection / len(words1 | words2)
+
+    # Overlap percentage (how much of the shorter title is in the longer one)
+    overlap_percentage = intersection / min(len(words1), len(words2))
+
+    # Consider titles similar if either metric passes threshold
+    return jaccard_similarity >= threshold or overlap_percentage >= threshold
+
+
+def required_overlap(size: int, threshold: float) -> Optional[int]:
+    """Fewest shared words for a title of `size` words to pass the overlap test as the shorter title."""
+    for shared in range(1, size + 1):
+        if shared / size >= threshold:
+            return shared
+    return None
+
+
+class TitleTokenIndex:
+    """
+    Inverted index over title words returning every title that can pass
+    titles_are_similar against a query.
+
+    Jaccard similarity never exceeds the overlap ratio, so a pair passes only
+    if the shorter title shares at least required_overlap(len(shorter))
+    words with the longer one. By pigeonhole that means:
+
+    - a title at least as long as the query contains one of the query's
+      len(query) - required + 1 rarest words, probed in the full postings
+    - a shorter title has one of its own len(title) - required + 1 prefix
+      words (in a fixed hash order) in the query, probed in the prefix postings
+    """
+
+    def __init__(self, threshold: float = 0.70):
+        self.threshold = threshold
+        self._sizes: Dict[str, int] = {}
+        self._postings: Dict[str, Set[str]] = defaultdict(set)  # word -> keys
+        self._prefixes: Dict[str, Set[str]] = defaultdict(set)  # prefix word -> keys
+        self._token_hashes: Dict[str, int] = {}
+
+    def _hash_token(self, token: str) -> int:
+        value = self._token_hashes.get(token)
+        if value is None:
+            value = int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+            self._token_hashes[token] = value
+        return value
+
+    def insert(self, key: str, tokens: Set[str]):
+        if not tokens:
+            return
+        self._sizes[key] = len(tokens)
+        for token in tokens:
+            self._postings[token].add(key)
+        required = required_overlap(len(tokens), self.threshold)
+        if required is not None:
+            for token in sorted(tokens, key=self._hash_token)[:len(tokens) - required + 1]:
+                self._prefixes[token].add(key)
+
+    def query(self, tokens: Set[str]) -> Set[str]:
+        """Keys whose titles share enough words with `tokens` to pass the overlap test."""
+        candidates: Set[str] = set()
+        size = len(tokens)
+        required = required_overlap(size, self.threshold) if tokens else None
+        if required is None:
+            return candidates
+
+        sizes, postings, prefixes = self._sizes, self._postings, self._prefixes
+        rarest = sorted(tokens, key=lambda token: len(postings.get(token, ())))
+        for token in rarest[:size - required + 1]:
+            candidates.update(key for key in postings.get(token, ()) if sizes[key] >= size)
+        for token in tokens:
+            candidates.update(key for key in prefixes.get(token, ()) if sizes[key] < size)
+        return candidates
+
+    def clear(self):
+        self._sizes.clear()
+        self._postings.clear()
+        self._prefixes.clear()
+
+
+class VideoDedupeIndex:
+    """Lookup tables over the videos already in the Knowledge Hub."""
+
+    def __init__(self, similarity_threshold: float = 0.70):
+        self.similarity_threshold = similarity_threshold
+        self._words = TitleTokenIndex(similarity_threshold)
+
+        self._pages: Dict[str, Dict[str, Any]] = {}   # record key -> page
+        self._titles: Dict[str, str] = {}             # record key -> title
+        self._by_video_id: Dict[str, str] = {}
+        self._by_url: Dict[str, str] = {}
+        self._by_title: Dict[str, str] = {}
+
+        self.loaded_at: Optional[datetime] = None
+        self.stats = defaultdict(int)
+
+    @property
+    def loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def load(self, pages: List[Dict[str, Any]]):
+        """Replace the index contents with a full set of Knowledge Hub pages."""
+        self.clear()
+        for page in pages:
+            self.add_page(page)
+        self.loaded_at = datetime.now()
+
+    def add_page(self, page: Dict[str, Any]):
+        """Index a Notion page from the Knowledge Hub (URL and Name properties)."""
+        props = page.get('properties', {})
+        url = props.get('URL', {}).get('url') or ''
+        title_parts = props.get('Name', {}).get('title') or []
+        title = ''.join(part.get('plain_text', '') for part in title_parts)
+        self.add(url, title, page)
+
+    def add(self, url: str, title: str, page: Dict[str, Any]):
+        """Index a video by URL and title."""
+        key = page.get('id') or url or title
+        if not key:
+            return
+
+        self._pages[key] = page
+        self._titles[key] = title
+
+        if url:
+            self._by_url[url] = key
+            video_id = extract_video_id(url)
+            if video_id:
+                self._by_video_id[video_id] = key
+
+        if title:
+            normalized = normalize_title(title)
+            self._by_title.setdefault(normalized, key)
+            self._words.insert(key, set(normalized.split()))
+
+    def find_page(self, url: str) -> Optional[Dict[str, Any]]:
+        """Existing page for a video URL (matched by video ID or exact URL)."""
+        video_id = extract_video_id(url)
+        key = (self._by_video_id.get(video_id) if video_id else None) or self._by_url.get(url)
+        return self._pages.get(key) if key else None
+
+    def find_duplicate(self, url: str, title: Optional[str] = None) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        Find an existing video matching by ID/URL, exact title or similar title.
+
+        Returns (match_type, page) or None.
+        """
+        self.stats['lookups'] += 1
+
+        page = self.find_page(url)
+        if page is not None:
+            self.stats['url_matches'] += 1
+            return 'url', page
+
+        if not title:
+            return None
+
+        normalized = normalize_title(title)
+        key = self._by_title.get(normalized)
+        if key:
+            self.stats['title_matches'] += 1
+            return 'title', self._pages[key]
+
+        candidates = self._words.query(set(normalized.split()))
+        self.stats['similarity_candidates'] += len(candidates)
+        for key in candidates:
+            if titles_are_similar(title, self._titles[key], self.similarity_threshold):
+                self.stats['similar_matches'] += 1
+                return 'similar', self._pages[key]
+
+        return None
+
+    def clear(self):
+        self._pages.clear()
+        self._titles.clear()
+        self._by_video_id.clear()
+        self._by_url.clear()
+        self._by_title.clear()
+        self._words.clear()
+        self.loaded_at = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats['lookups']
+        return {
+            'videos': len(self._pages),
+            'loaded_at': self.loaded_at.isoformat() if self.loaded_at else None,
+            'average_candidates': self.stats['similarity_candidates'] / lookups if lookups else 0.0,
+            **self.stats
+        }
@@ -11,6 +11,7 @@ import os
 import asyncio
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 try:
@@ -36,6 +37,24 @@ except ImportError:
     DATABASE_VIEW_MANAGER_AVAILABLE = False
     logger.warning("Channel database view manager not available")
 
+try:
+    from .channel_sync_state import ChannelSyncStore, ChannelSyncState
+    from .video_dedupe_index import VideoDedupeIndex, titles_are_similar, extract_video_id
+    from .transcript_cache import TranscriptCache, CAPTION_LANGUAGES, CAPTION_PREFERENCES
+    from .caption_parser import parse_captions, parse_caption_file
+    from .channel_ingest_pipeline import ChannelIngestPipeline, build_rate_limiters, is_rate_limited
+    from ..integrations.notion_async_client import AsyncNotionClient, NotionAPIError
+except ImportError:
+    from channel_sync_state import ChannelSyncStore, ChannelSyncState
+    from video_dedupe_index import VideoDedupeIndex, titles_are_similar, extract_video_id
+    from transcript_cache import TranscriptCache, CAPTION_LANGUAGES, CAPTION_PREFERENCES
+    from caption_parser import parse_captions, parse_caption_file
+    from channel_ingest_pipeline import ChannelIngestPipeline, build_rate_limiters, is_rate_limited
+    from notion_async_client import AsyncNotionClient, NotionAPIError
+
+# Sentinel: the caller did not fetch a transcript
+_TRANSCRIPT_NOT_FETCHED = object()
+
 
 class YouTubeChannelProcessor:
     """
@@ -63,10 +82,11 @@ class YouTubeChannelProcessor:
             os.getenv("NOTION_KNOWLEDGE_DATABASE_ID")
         )
         
-        self.headers = {
-            "Content-Type": "application/json",
-            "Notion-Version": "2022-06-28"
-        }
+        # Shared non-blocking Notion client (pooled connections, 429 backoff)
+        self.notion = AsyncNotionClient.shared(
+            self.config.get("api", {}).get("notion", {}).get("api_key") or
+            self.config.get("notion", {}).get("api_key")
+        )
         
         # YouTube API configuration
         self.google_api_key = (
@@ -74,6 +94,32 @@ class YouTubeChannelProcessor:
             os.getenv("GOOGLE_API_KEY")
         )
         
+        # Incremental sync: per-channel watermarks so each cycle only handles new uploads
+        youtube_config = self.config.get("youtube", {})
+        self.force_full_resync = youtube_config.get("force_full_resync", False)
+        self.sync_store = ChannelSyncStore(youtube_config.get("sync_db_path", "youtube_sync.db"))
+        
+        # Local duplicate detection, bulk-loaded from the Knowledge Hub once per cycle
+        self.dedupe_index = VideoDedupeIndex()
+        self._dedupe_index_failed = False
+        
+        # Parsed transcripts cached on disk by video ID and caption track
+        self.transcript_cache = TranscriptCache(youtube_config.get("transcript_cache_dir", "transcript_cache"))
+        
+        # Staged ingest pipeline: per-stage worker counts, channel concurrency and
+        # adaptive per-API pacing shared by every channel in a cycle
+        pipeline_config = youtube_config.get("pipeline", {})
+        self.stage_workers = pipeline_config.get("stage_workers", {})
+        self.channel_concurrency = max(1, pipeline_config.get("channel_concurrency", 2))
+        self.pipeline_queue_size = pipeline_config.get("queue_size", 4)
+        self.rate_limiters = build_rate_limiters(pipeline_config.get("rate_limits"))
+        self.notion.add_throttle_listener(self.rate_limiters['notion'].on_throttle)
+        transcript_workers = self.stage_workers.get("transcript", 3)
+        self.transcript_executor = ThreadPoolExecutor(
+            max_workers=transcript_workers * self.channel_concurrency,
+            thread_name_prefix="yt-transcript"
+        )
+        
         # Initialize database view manager
         self.view_manager = None
         if DATABASE_VIEW_MANAGER_AVAILABLE:
@@ -100,18 +146,12 @@ class YouTubeChannelProcessor:
                 }
             }
             
-            response = requests.post(
-                headers=self.headers,
-                json=query_data,
-                timeout=10
-            )
-            
-            if response.status_code != 200:
-                logger.error(f"Failed to query channels: {response.status_code}")
+            try:
+                results = await self.notion.query_all(self.channels_db_id, **query_data)
+            except NotionAPIError as e:
+                logger.error(f"Failed to query channels: {e.status}")
                 return []
             
-            results = response.json().get('results', [])
-            
             channels = []
             for page in results:
                 props = page['properties']
@@ -142,6 +182,9 @@ class YouTubeChannelProcessor:
                 if props.get('Hashtags', {}).get('select'):
                     channel_data['hashtags'] = [props['Hashtags']['select']['name']]
                 
+                # Optional checkbox to ignore the sync watermark for this run
+                channel_data['force_full_resync'] = props.get('Full Resync', {}).get('checkbox', False)
+                
                 channels.append(channel_data)
             
             logger.info(f"Found {len(channels)} channels to process")
@@ -467,16 +510,12 @@ class YouTubeChannelProcessor:
         """Update empty channel fields with metadata from YouTube."""
         try:
             # First get current page data to check what fields are empty
-            response = requests.get(
-                headers=self.headers,
-                timeout=10
-            )
-            
-            if response.status_code != 200:
-                logger.error(f"Failed to get current page data: {response.status_code}")
+            try:
+                current_page = await self.notion.retrieve_page(page_id)
+            except NotionAPIError as e:
+                logger.error(f"Failed to get current page data: {e.status}")
                 return False
             
-            current_page = response.json()
             current_props = current_page.get('properties', {})
             
             # Prepare updates for empty fields only
@@ -573,17 +612,12 @@ class YouTubeChannelProcessor:
             
             # Apply updates if any
             if len(updates) > 1:  # More than just Last Updated
-                update_response = requests.patch(
-                    headers=self.headers,
-                    json={"properties": updates},
-                    timeout=15
-                )
-                
-                if update_response.status_code == 200:
+                try:
+                    await self.notion.update_page(page_id, updates)
                     logger.info(f"✅ Updated {len(updates)} channel fields successfully")
                     return True
-                else:
-                    logger.error(f"Failed to update channel fields: {update_response.status_code}")
+                except NotionAPIError as e:
+                    logger.error(f"Failed to update channel fields: {e.status}")
                     return False
             else:
                 logger.info("ℹ️ All channel fields already populated, no updates needed")
@@ -593,13 +627,29 @@ class YouTubeChannelProcessor:
             logger.error(f"Error updating channel fields: {e}")
             return False
     
-    async def get_channel_videos(self, channel_id: str) -> List[Dict[str, Any]]:
-        """Get all videos from a YouTube channel with fallback methods."""
+    def _is_past_watermark(self, video_id: str, published_at: str, sync_state: Optional[ChannelSyncState]) -> bool:
+        """Whether a feed entry is at or older than the channel's sync watermark."""
+        if not sync_state or not sync_state.has_watermark:
+            return False
+        if video_id == sync_state.last_video_id:
+            return True
+        # Covers the watermark video having been deleted or made private
+        return bool(published_at and sync_state.last_published_at and published_at <= sync_state.last_published_at)
+    
+    async def get_channel_videos(self, channel_id: str, sync_state: Optional[ChannelSyncState] = None) -> List[Dict[str, Any]]:
+        """
+        Get videos from a YouTube channel with fallback methods.
+        
+        With a sync_state carrying a watermark only videos newer than it are
+        returned (newest first); without one the whole channel is fetched.
+        The uploads playlist ID and first-page ETag are recorded on sync_state.
+        """
         
         # Method 1: Try YouTube API first
         if self.google_api_key:
             try:
                 import googleapiclient.discovery
+                import googleapiclient.errors
                 
                 youtube = googleapiclient.discovery.build(
                     "youtube", "v3", developerKey=self.google_api_key
@@ -607,34 +657,68 @@ class YouTubeChannelProcessor:
                 
                 logger.info(f"🔍 Fetching videos via YouTube API for channel: {channel_id}")
                 
-                # Get channel's uploads playlist
-                channels_response = youtube.channels().list(
-                    part="contentDetails",
-                    id=channel_id
-                ).execute()
-                
-                if not channels_response['items']:
-                    logger.error(f"Channel not found: {channel_id}")
-                    return await self._get_channel_videos_fallback(channel_id)
-                
-                uploads_playlist_id = channels_response['items'][0]['contentDetails']['relatedPlaylists']['uploads']
+                # Get channel's uploads playlist (remembered between syncs)
+                uploads_playlist_id = sync_state.uploads_playlist_id if sync_state else None
+                if not uploads_playlist_id:
+                    channels_response = youtube.channels().list(
+                        part="contentDetails",
+                        id=channel_id
+                    ).execute()
+                    
+                    if not channels_response['items']:
+                        logger.error(f"Channel not found: {channel_id}")
+                        return await self._get_channel_videos_fallback(channel_id, sync_state)
+                    
+                    uploads_playlist_id = channels_response['items'][0]['contentDetails']['relatedPlaylists']['uploads']
+                    if sync_state:
+                        sync_state.uploads_playlist_id = uploads_playlist_id
                 
-                # Get ALL videos from uploads playlist (no limit)
+                incremental = bool(sync_state and sync_state.has_watermark)
                 videos = []
                 next_page_token = None
                 
-                logger.info(f"🔄 Fetching ALL videos from channel {channel_id} (no limit)")
+                if incremental:
+                    logger.info(f"🔄 Fetching videos newer than {sync_state.last_video_id} from channel {channel_id}")
+                else:
+                    logger.info(f"🔄 Fetching ALL videos from channel {channel_id} (no limit)")
                 
-                while True:  # Continue until all videos are fetched
-                    playlist_response = youtube.playlistItems().list(
+                while True:  # Continue until all new videos are fetched
+                    playlist_request = youtube.playlistItems().list(
                         part="snippet",
                         playlistId=uploads_playlist_id,
                         maxResults=50,  # Maximum per request (YouTube API limit)
                         pageToken=next_page_token
-                    ).execute()
+                    )
+                    
+                    # An unchanged first page means nothing was uploaded since the last sync
+                    if incremental and next_page_token is None and sync_state.playlist_etag:
+                        playlist_request.headers['If-None-Match'] = sync_state.playlist_etag
+                    
+                    try:
+                        playlist_response = playlist_request.execute()
+                    except googleapiclient.errors.HttpError as http_error:
+                        if http_error.resp.status == 304:
+                            logger.info(f"✅ Uploads playlist unchanged for channel {channel_id}")
+                            return []
+                        raise
+                    
+                    if next_page_token is None and sync_state:
+                        sync_state.playlist_etag = playlist_response.get('etag')
+                    
+                    # Keep only entries newer than the watermark
+                    new_items = []
+                    reached_watermark = False
+                    for item in playlist_response['items']:
+                        snippet = item['snippet']
+                        if self._is_past_watermark(snippet['resourceId']['videoId'], snippet.get('publishedAt'), sync_state):
+                            reached_watermark = True
+                            break
+                        new_items.append(item)
                     
                     # Get video IDs for duration lookup
-                    video_ids = [item['snippet']['resourceId']['videoId'] for item in playlist_response['items']]
+                    video_ids = [item['snippet']['resourceId']['videoId'] for item in new_items]
+                    if not video_ids:
+                        break
                     
                     # Get video details including duration
                     videos_details = youtube.videos().list(
@@ -650,7 +734,7 @@ class YouTubeChannelProcessor:
                         duration_seconds = self._parse_youtube_duration(duration_iso)
                         duration_map[video_id] = duration_seconds
                     
-                    for item in playlist_response['items']:
+                    for item in new_items:
                         snippet = item['snippet']
                         video_id = snippet['resourceId']['videoId']
                         
@@ -672,25 +756,28 @@ class YouTubeChannelProcessor:
                         videos.append(video_data)
                     
                     next_page_token = playlist_response.get('nextPageToken')
-                    if not next_page_token:
+                    if reached_watermark or not next_page_token:
                         break
                 
-                logger.info(f"✅ Found {len(videos)} videos via YouTube API (ALL videos from channel)")
+                if incremental:
+                    logger.info(f"✅ Found {len(videos)} new videos via YouTube API since last sync")
+                else:
+                    logger.info(f"✅ Found {len(videos)} videos via YouTube API (ALL videos from channel)")
                 return videos
                 
             except Exception as e:
                 error_str = str(e)
                 if "quota" in error_str.lower() or "403" in error_str:
                     logger.warning(f"🚫 YouTube API quota exceeded, using fallback method")
-                    return await self._get_channel_videos_fallback(channel_id)
+                    return await self._get_channel_videos_fallback(channel_id, sync_state)
                 else:
                     logger.error(f"YouTube API error: {e}")
-                    return await self._get_channel_videos_fallback(channel_id)
+                    return await self._get_channel_videos_fallback(channel_id, sync_state)
         else:
             logger.warning("No Google API key - using fallback method")
-            return await self._get_channel_videos_fallback(channel_id)
+            return await self._get_channel_videos_fallback(channel_id, sync_state)
     
-    async def _get_channel_videos_fallback(self, channel_id: str) -> List[Dict[str, Any]]:
+    async def _get_channel_videos_fallback(self, channel_id: str, sync_state: Optional[ChannelSyncState] = None) -> List[Dict[str, Any]]:
         """Get channel videos using yt-dlp as fallback when API is exhausted."""
         try:
             import yt_dlp
@@ -738,6 +825,10 @@ class YouTubeChannelProcessor:
                     title = entry.get('title', 'Unknown Title')
                     duration = entry.get('duration', 0)
                     
+                    # Entries are newest first; stop at the sync watermark
+                    if sync_state and sync_state.has_watermark and video_id == sync_state.last_video_id:
+                        break
+                    
                     # Include all videos (shorts filter removed as requested)
                     
                     # Create video data structure
@@ -801,6 +892,13 @@ class YouTubeChannelProcessor:
         if not self.knowledge_db_id:
             return False
         
+        # Served from the local index when it is available
+        if await self._ensure_dedupe_index():
+            match = self.dedupe_index.find_duplicate(video_url, video_title)
+            if match:
+                logger.debug(f"Video exists ({match[0]} match): {video_title}")
+            return match is not None
+        
         try:
             # Check by URL first (most reliable)
             url_query = {
@@ -812,17 +910,10 @@ class YouTubeChannelProcessor:
                 }
             }
             
-            response = requests.post(
-                headers=self.headers,
-                json=url_query,
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                results = response.json().get('results', [])
-                if len(results) > 0:
-                    logger.debug(f"Video exists (URL match): {video_title}")
-                    return True
+            results = (await self.notion.query_database(self.knowledge_db_id, page_size=1, **url_query)).get('results', [])
+            if len(results) > 0:
+                logger.debug(f"Video exists (URL match): {video_title}")
+                return True
             
             # If no URL match and we have a title, check by title
             if video_title:
@@ -835,17 +926,10 @@ class YouTubeChannelProcessor:
                     }
                 }
                 
-                response = requests.post(
-                    headers=self.headers,
-                    json=title_query,
-                    timeout=10
-                )
-                
-                if response.status_code == 200:
-                    results = response.json().get('results', [])
-                    if len(results) > 0:
-                        logger.debug(f"Video exists (title match): {video_title}")
-                        return True
+                results = (await self.notion.query_database(self.knowledge_db_id, page_size=1, **title_query)).get('results', [])
+                if len(results) > 0:
+                    logger.debug(f"Video exists (title match): {video_title}")
+                    return True
                 
                 # Also check for similar titles (to catch minor variations)
                 similar_title_query = {
@@ -857,24 +941,17 @@ class YouTubeChannelProcessor:
                     }
                 }
                 
-                response = requests.post(
-                    headers=self.headers,
-                    json=similar_title_query,
-                    timeout=10
-                )
-                
-                if response.status_code == 200:
-                    results = response.json().get('results', [])
-                    for result in results:
-                        props = result.get('properties', {})
-                        name_prop = props.get('Name', {})
-                        if name_prop.get('title'):
-                            existing_title = name_prop['title'][0]['plain_text']
-                            
-                            # Check for very similar titles (accounting for small differences)
-                            if self._titles_are_similar(video_title, existing_title):
-                                logger.debug(f"Video exists (similar title): {video_title} ~ {existing_title}")
-                                return True
+                results = (await self.notion.query_database(self.knowledge_db_id, **similar_title_query)).get('results', [])
+                for result in results:
+                    props = result.get('properties', {})
+                    name_prop = props.get('Name', {})
+                    if name_prop.get('title'):
+                        existing_title = name_prop['title'][0]['plain_text']
+                        
+                        # Check for very similar titles (accounting for small differences)
+                        if self._titles_are_similar(video_title, existing_title):
+                            logger.debug(f"Video exists (similar title): {video_title} ~ {existing_title}")
+                            return True
             
             return False
             
@@ -884,49 +961,53 @@ class YouTubeChannelProcessor:
     
     def _titles_are_similar(self, title1: str, title2: str, threshold: float = 0.70) -> bool:
         """Check if two titles are similar enough to be considered duplicates."""
-        import re
-        
-        # Normalize titles for comparison
-        def normalize_title(title):
-            # Convert to lowercase
-            title = title.lower()
-            # Remove special characters and extra spaces
-            title = re.sub(r'[^\w\s]', '', title)
-            title = re.sub(r'\s+', ' ', title).strip()
-            return title
-        
-        norm_title1 = normalize_title(title1)
-        norm_title2 = normalize_title(title2)
+        return titles_are_similar(title1, title2, threshold)
+    
+    async def load_dedupe_index(self) -> bool:
+        """Bulk-load every Knowledge Hub page into the local dedupe index."""
+        if not self.knowledge_db_id:
+            return False
         
-        # Exact match after normalization
-        if norm_title1 == norm_title2:
+        try:
+            try:
+                pages = await self.notion.query_all(self.knowledge_db_id)
+            except NotionAPIError as e:
+                logger.error(f"Failed to load Knowledge Hub for dedupe index: {e.status}")
+                self._dedupe_index_failed = True
+                return False
+            
+            self.dedupe_index.load(pages)
+            self._dedupe_index_failed = False
+            logger.info(f"📚 Dedupe index loaded with {len(self.dedupe_index)} Knowledge Hub videos")
             return True
-        
-        # Calculate similarity using word overlap
-        words1 = set(norm_title1.split())
-        words2 = set(norm_title2.split())
-        
-        if not words1 or not words2:
+            
+        except Exception as e:
+            logger.error(f"Error loading dedupe index: {e}")
+            self._dedupe_index_failed = True
             return False
+    
+    async def _ensure_dedupe_index(self) -> bool:
+        """
+        Load the dedupe index if this cycle has not loaded it yet.
         
-        # Calculate Jaccard similarity (intersection over union)
-        intersection = len(words1.intersection(words2))
-        union = len(words1.union(words2))
-        
-        jaccard_similarity = intersection / union if union > 0 else 0
-        
-        # Also calculate overlap percentage (how much of the shorter title is in the longer one)
-        min_words = min(len(words1), len(words2))
-        overlap_percentage = intersection / min_words if min_words > 0 else 0
-        
-        # Consider titles similar if either metric passes threshold
-        return jaccard_similarity >= threshold or overlap_percentage >= threshold
+        Returns False (callers fall back to remote queries) if loading failed;
+        the next cycle's load_dedupe_index retries.
+        """
+        if self.dedupe_index.loaded:
+            return True
+        if self._dedupe_index_failed:
+            return False
+        return await self.load_dedupe_index()
     
     async def _get_existing_video_page(self, video_url: str, video_title: str = None) -> Optional[Dict[str, Any]]:
         """Get existing video page data if it exists."""
         if not self.knowledge_db_id:
             return None
         
+        # Served from the local index when it is available
+        if await self._ensure_dedupe_index():
+            return self.dedupe_index.find_page(video_url)
+        
         try:
             # Check by URL first (most reliable)
             url_query = {
@@ -938,16 +1019,9 @@ class YouTubeChannelProcessor:
                 }
             }
             
-            response = requests.post(
-                headers=self.headers,
-                json=url_query,
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                results = response.json().get('results', [])
-                if len(results) > 0:
-                    return results[0]  # Return first matching page
+            results = (await self.notion.query_database(self.knowledge_db_id, page_size=1, **url_query)).get('results', [])
+            if len(results) > 0:
+                return results[0]  # Return first matching page
             
             return None
             
@@ -1000,8 +1074,29 @@ class YouTubeChannelProcessor:
         except:
             return False
     
-    def _extract_transcript(self, video_url: str, retry_count: int = 3) -> Optional[str]:
-        """Extract actual closed captions from YouTube video using yt-dlp."""
+    def _extract_transcript(self, video_url: str, retry_count: int = 3, raise_throttled: bool = False) -> Optional[str]:
+        """
+        Extract actual closed captions from YouTube video using yt-dlp.
+        
+        Parsed transcripts are cached on disk per video and caption track, so
+        re-running a video (e.g. after a failed analysis) does not download
+        its captions again. When YouTube throttles, the rate limiter backs off
+        and None is returned, or the error is re-raised with raise_throttled.
+        """
+        video_id = extract_video_id(video_url)
+        if video_id:
+            cached = self.transcript_cache.find(video_id)
+            if cached:
+                transcript_text, language, source = cached
+                logger.info(f"📦 Using cached captions ({source}_{language}) for {video_id}")
+                return transcript_text
+            if self.transcript_cache.is_unavailable(video_id):
+                logger.info(f"📦 No English captions for {video_id} (cached)")
+                return None
+        
+        # Video metadata from an earlier attempt is reused; only the caption download is retried
+        info = None
+        
         for attempt in range(retry_count):
             try:
                 if attempt > 0:
@@ -1016,13 +1111,12 @@ class YouTubeChannelProcessor:
                 import yt_dlp
                 import tempfile
                 import os
-                import re
                 
                 # Configure yt-dlp to extract captions only
                 ydl_opts = {
                     'writesubtitles': True,
                     'writeautomaticsub': True,
-                    'subtitleslangs': ['en', 'en-US', 'en-GB'],
+                    'subtitleslangs': CAPTION_LANGUAGES,
                     'skip_download': True,
                     'quiet': True,
                     'no_warnings': True,
@@ -1035,77 +1129,66 @@ class YouTubeChannelProcessor:
                     
                     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                         try:
-                            # Extract info and download captions
-                            info = ydl.extract_info(video_url, download=False)
-                            video_id = info.get('id', 'unknown')
+                            # Extract info (captions are downloaded separately below)
+                            if info is None:
+                                info = ydl.extract_info(video_url, download=False)
+                            video_id = info.get('id') or video_id or 'unknown'
                             
                             # Check if captions are available
-                            subtitles = info.get('subtitles', {})
-                            automatic_captions = info.get('automatic_captions', {})
-                            
-                            logger.info(f"📋 Available manual subtitles: {list(subtitles.keys())}")
-                            logger.info(f"📋 Available auto captions: {list(automatic_captions.keys())}")
-                            
-                            # Try to get English captions (manual first, then auto)
-                            caption_data = None
-                            caption_source = "none"
+                            tracks = {
+                                'manual': info.get('subtitles', {}),
+                                'auto': info.get('automatic_captions', {})
+                            }
                             
-                            # Priority order: manual en, auto en, manual en-*, auto en-*
-                            for lang_code in ['en', 'en-US', 'en-GB']:
-                                if lang_code in subtitles:
-                                    caption_data = subtitles[lang_code]
-                                    caption_source = f"manual_{lang_code}"
-                                    break
+                            logger.info(f"📋 Available manual subtitles: {list(tracks['manual'].keys())}")
+                            logger.info(f"📋 Available auto captions: {list(tracks['auto'].keys())}")
                             
-                            if not caption_data:
-                                for lang_code in ['en', 'en-US', 'en-GB']:
-                                    if lang_code in automatic_captions:
-                                        caption_data = automatic_captions[lang_code]
-                                        caption_source = f"auto_{lang_code}"
-                                        break
+                            # Priority order: manual en, en-US, en-GB, then auto
+                            language, source = next(
+                                ((lang, src) for lang, src in CAPTION_PREFERENCES if lang in tracks[src]),
+                                (None, None)
+                            )
                             
-                            if not caption_data:
+                            if not language:
                                 logger.warning(f"No English captions found for video: {video_id}")
-                                continue
+                                self.transcript_cache.mark_unavailable(video_id)
+                                return None
                             
+                            caption_source = f"{source}_{language}"
                             logger.info(f"✅ Found captions: {caption_source}")
                             
+                            cached_text = self.transcript_cache.get(video_id, language, source)
+                            if cached_text:
+                                return cached_text
+                            
                             # Download the caption file (prefer vtt format)
                             ydl_opts_download = ydl_opts.copy()
                             ydl_opts_download['writesubtitles'] = True
-                            ydl_opts_download['writeautomaticsub'] = caption_source.startswith('auto')
+                            ydl_opts_download['writeautomaticsub'] = source == 'auto'
+                            ydl_opts_download['subtitleslangs'] = [language]
                             ydl_opts_download['subtitlesformat'] = 'vtt'
                             
                             with yt_dlp.YoutubeDL(ydl_opts_download) as ydl_download:
                                 ydl_download.download([video_url])
                             
-                            # Find and read the caption file
+                            # Find the caption file
                             caption_files = []
                             for file in os.listdir(temp_dir):
-                                if file.endswith('.vtt') and video_id in file:
+                                if file.endswith(('.vtt', '.srt')) and video_id in file:
                                     caption_files.append(os.path.join(temp_dir, file))
                             
                             if not caption_files:
                                 logger.warning(f"No caption files downloaded for: {video_id}")
                                 continue
                             
-                            # Read the VTT file and extract text
+                            # Stream the caption file through the parser
                             caption_file = caption_files[0]
                             logger.info(f"📄 Reading caption file: {os.path.basename(caption_file)}")
-                            
-                            with open(caption_file, 'r', encoding='utf-8') as f:
-                                vtt_content = f.read()
-                            
-                            # Parse VTT content and extract spoken text
-                            transcript_text = self._parse_vtt_content(vtt_content)
+                            transcript_text = parse_caption_file(caption_file)
                             
                             if transcript_text and len(transcript_text) > 50:
                                 logger.info(f"✅ Real captions extracted successfully ({len(transcript_text)} characters)")
-                                
-# DEMO CODE REMOVED: # Log sample for verification
-# DEMO CODE REMOVED: sample = transcript_text[:200] + "..." if len(transcript_text) > 200 else transcript_text
-# DEMO CODE REMOVED: logger.info(f"📝 Sample: {sample}")
-                                
+                                self.transcript_cache.put(video_id, language, source, transcript_text)
                                 return transcript_text
                             else:
                                 logger.warning(f"Extracted text too short: {len(transcript_text) if transcript_text else 0} chars")
@@ -1113,10 +1196,18 @@ class YouTubeChannelProcessor:
                                 
                         except Exception as extraction_error:
                             logger.warning(f"yt-dlp extraction failed: {extraction_error}")
+                            if is_rate_limited(extraction_error):
+                                raise  # handled below, without retrying blind
                             continue
                             
             except Exception as e:
                 logger.warning(f"Attempt {attempt + 1}/{retry_count} failed: {e}")
+                if is_rate_limited(e):
+                    # Let the caller's rate limiter back off instead of retrying blind
+                    self.rate_limiters['youtube'].on_throttle()
+                    if raise_throttled:
+                        raise
+                    return None
                 if attempt < retry_count - 1:
                     continue
         
@@ -1126,62 +1217,21 @@ class YouTubeChannelProcessor:
     
     def _parse_vtt_content(self, vtt_content: str) -> str:
         """Parse VTT subtitle content and extract clean spoken text."""
-        import re
-        
-        # Split into lines and process
-        lines = vtt_content.split('\n')
-        text_lines = []
-        
-        # Skip VTT header and extract text lines
-        in_cue = False
-        for line in lines:
-            line = line.strip()
-            
-            # Skip empty lines and VTT headers
-            if not line or line.startswith('WEBVTT') or line.startswith('NOTE'):
-                continue
-            
-            # Skip timestamp lines (format: 00:00:00.000 --> 00:00:00.000)
-            if '-->' in line and re.match(r'\d{2}:\d{2}:\d{2}\.\d{3}', line):
-                in_cue = True
-                continue
-            
-            # Skip cue settings lines
-            if in_cue and (line.startswith('align:') or line.startswith('position:') or line.startswith('size:')):
-                continue
-            
-            # This should be caption text
-            if in_cue and line:
-                # Clean up VTT formatting tags
-                cleaned_line = re.sub(r'<[^>]+>', '', line)  # Remove HTML tags
-                cleaned_line = re.sub(r'\{[^}]+\}', '', cleaned_line)  # Remove formatting
-                
-                # Clean up common caption artifacts
-                cleaned_line = cleaned_line.replace('&gt;', '>').replace('&lt;', '<').replace('&amp;', '&')
-                cleaned_line = re.sub(r'\[.*?\]', '', cleaned_line)  # Remove [Music], [Applause], etc.
-                cleaned_line = re.sub(r'\(.*?\)', '', cleaned_line)  # Remove (inaudible), etc.
-                
-                if cleaned_line.strip():
-                    text_lines.append(cleaned_line.strip())
-                    
-            # Reset for next cue
-            if not line:
-                in_cue = False
-        
-        # Join all text and clean up
-        full_text = ' '.join(text_lines)
-        
-        # Final cleanup
-        full_text = re.sub(r'\s+', ' ', full_text)  # Multiple spaces to single
-        full_text = full_text.strip()
-        
-        return full_text
+        return parse_captions(vtt_content.splitlines())
     
-    async def _process_video_with_ai(self, video_url: str, video_title: str, video_metadata: Dict[str, Any] = None, hashtags: List[str] = None) -> Dict[str, Any]:
-        """Process video content with AI analysis using Gemini."""
+    async def _process_video_with_ai(self, video_url: str, video_title: str, video_metadata: Dict[str, Any] = None, hashtags: List[str] = None,
+                                     transcript: Optional[str] = _TRANSCRIPT_NOT_FETCHED) -> Dict[str, Any]:
+        """
+        Process video content with AI analysis using Gemini.
+        
+        Pass `transcript` when it has already been fetched (None meaning no
+        captions are available); otherwise it is extracted here.
+        """
+        loop = asyncio.get_running_loop()
         try:
             # First try to extract transcript
-            transcript = self._extract_transcript(video_url)
+            if transcript is _TRANSCRIPT_NOT_FETCHED:
+                transcript = await loop.run_in_executor(self.transcript_executor, self._extract_transcript, video_url)
             
             # Use Gemini 2.0 Flash for native video analysis
             import google.generativeai as genai
@@ -1306,11 +1356,11 @@ class YouTubeChannelProcessor:
                 if transcript:
                     logger.info(f"🤖 Analyzing video with transcript ({len(transcript)} chars): {video_title}")
                     # For transcript analysis, just send the prompt (transcript is already in prompt)
-                    response = model.generate_content(analysis_prompt)
+                    response = await loop.run_in_executor(None, model.generate_content, analysis_prompt)
                 else:
                     logger.info(f"🤖 Sending video to Gemini for visual analysis: {video_url}")
                     # For video analysis, send both URL and prompt
-                    response = model.generate_content([video_url, analysis_prompt])
+                    response = await loop.run_in_executor(None, model.generate_content, [video_url, analysis_prompt])
                 
                 if response and response.text:
                     logger.info(f"📄 Received response from Gemini ({len(response.text)} chars)")
@@ -1393,6 +1443,10 @@ class YouTubeChannelProcessor:
                 logger.error(f"   Video URL: {video_url}")
                 logger.error(f"   Error type: {type(gemini_error).__name__}")
                 
+                rate_limited = is_rate_limited(gemini_error)
+                if rate_limited:
+                    self.rate_limiters['gemini'].on_throttle()
+                
                 # Fallback: Create basic analysis based on title and description
                 return {
                     "success": True,
@@ -1416,7 +1470,8 @@ class YouTubeChannelProcessor:
                         "transcript_available": False,
                         "priority": "Medium"
                     },
-                    "priority": "Medium"
+                    "priority": "Medium",
+                    "rate_limited": rate_limited
                 }
                 
         except Exception as e:
@@ -1426,8 +1481,16 @@ class YouTubeChannelProcessor:
                 "error": str(e)
             }
     
-    async def import_video_to_knowledge_hub(self, video: Dict[str, Any], channel_name: str, hashtags: List[str]) -> bool:
-        """Import a video to the Knowledge Hub database with full AI analysis."""
+    async def import_video_to_knowledge_hub(self, video: Dict[str, Any], channel_name: str, hashtags: List[str],
+                                            ai_analysis: Optional[Dict[str, Any]] = None,
+                                            raise_throttled: bool = False) -> bool:
+        """
+        Import a video to the Knowledge Hub database with full AI analysis.
+        
+        The analysis is run here unless a precomputed `ai_analysis` is passed.
+        Notion errors return False, except that with raise_throttled a write
+        rejected for rate limiting raises its NotionAPIError.
+        """
         if not self.knowledge_db_id:
             logger.error("No Knowledge Hub database ID configured")
             return False
@@ -1439,7 +1502,8 @@ class YouTubeChannelProcessor:
             existing_page = await self._get_existing_video_page(video['url'], video['title'])
             
             # Process the video content with AI (include full video metadata for context)
-            ai_analysis = await self._process_video_with_ai(video['url'], video['title'], video, hashtags)
+            if ai_analysis is None:
+                ai_analysis = await self._process_video_with_ai(video['url'], video['title'], video, hashtags)
             
             # Use channel hashtags and add AI-generated content hashtags
             clean_hashtags = [tag for tag in hashtags if tag and tag.strip()]
@@ -1674,42 +1738,46 @@ class YouTubeChannelProcessor:
             if existing_page:
                 # Update existing page
                 page_id = existing_page['id']
-                response = requests.patch(
-                    headers=self.headers,
-                    json={"properties": properties},
-                    timeout=15
-                )
-                
-                if response.status_code == 200:
-                    logger.debug(f"Successfully updated existing video: {video['title'][:50]}...")
-                    return True
-                else:
-                    logger.error(f"Failed to update video: {response.status_code} - {response.text}")
+                try:
+                    page = await self.notion.update_page(page_id, properties)
+                except NotionAPIError as e:
+                    if raise_throttled and e.status == 429:
+                        raise
+                    logger.error(f"Failed to update video: {e}")
                     return False
+                
+                logger.debug(f"Successfully updated existing video: {video['title'][:50]}...")
+                self.dedupe_index.add_page(page)
+                return True
             else:
                 # Create new page
-                response = requests.post(
-                    headers=self.headers,
-                    json={
-                        "parent": {"database_id": self.knowledge_db_id},
-                        "properties": properties
-                    },
-                    timeout=15
-                )
-                
-                if response.status_code == 200:
-                    logger.debug(f"Successfully imported new video: {video['title'][:50]}...")
-                    return True
-                else:
-                    logger.error(f"Failed to import video: {response.status_code} - {response.text}")
+                try:
+                    page = await self.notion.create_page({"database_id": self.knowledge_db_id}, properties)
+                except NotionAPIError as e:
+                    if raise_throttled and e.status == 429:
+                        raise
+                    logger.error(f"Failed to import video: {e}")
                     return False
+                
+                logger.debug(f"Successfully imported new video: {video['title'][:50]}...")
+                self.dedupe_index.add_page(page)
+                return True
             
         except Exception as e:
+            if raise_throttled and isinstance(e, NotionAPIError) and e.status == 429:
+                raise
             logger.error(f"Error importing video: {e}")
             return False
     
-    async def process_channel(self, channel: Dict[str, Any]) -> Dict[str, Any]:
-        """Process all videos from a single channel."""
+    async def process_channel(self, channel: Dict[str, Any], force_full_resync: bool = False) -> Dict[str, Any]:
+        """
+        Process new videos from a single channel.
+        
+        Only videos uploaded since the channel's sync watermark are fetched and
+        imported. A full resync (every video) happens on the first sync, when
+        force_full_resync is passed, when the channel's "Full Resync" checkbox
+        is set, or when youtube.force_full_resync is configured.
+        """
         logger.info(f"Processing channel: {channel['name']}")
         logger.info(f"  Channel URL: {channel['url']}")
         logger.info(f"  Resolved Channel ID: {channel['channel_id']}")
@@ -1719,6 +1787,8 @@ class YouTubeChannelProcessor:
             "total_videos": 0,
             "new_videos": 0,
             "imported_videos": 0,
+            "sync_mode": "incremental",
+            "full_resync_requested": bool(channel.get('force_full_resync')),
             "errors": []
         }
         
@@ -1746,54 +1816,45 @@ class YouTubeChannelProcessor:
             else:
                 logger.warning(f"⚠️ Could not retrieve channel metadata")
             
-            # Get all videos from channel
-            videos = await self.get_channel_videos(channel['channel_id'])
+            # Load the sync watermark (a fresh state forces a full resync)
+            sync_state = self.sync_store.get(channel['channel_id'])
+            if force_full_resync or channel.get('force_full_resync') or self.force_full_resync:
+                logger.info(f"🔁 Full resync requested for {channel['name']}")
+                sync_state = ChannelSyncState(
+                    channel_id=channel['channel_id'],
+                    uploads_playlist_id=sync_state.uploads_playlist_id,
+                    videos_synced=sync_state.videos_synced
+                )
+            full_sync = not sync_state.has_watermark
+            result["sync_mode"] = "full" if full_sync else "incremental"
+            
+            # Get new videos from channel (all of them on a full sync)
+            videos = await self.get_channel_videos(channel['channel_id'], sync_state=sync_state)
             result["total_videos"] = len(videos)
             
             if not videos:
-                logger.warning(f"No videos found for channel: {channel['name']}")
+                if full_sync:
+                    logger.warning(f"No videos found for channel: {channel['name']}")
+                else:
+                    logger.info(f"No new videos for channel: {channel['name']}")
+                self.sync_store.advance(sync_state, [], {})
                 return result
             
             logger.info(f"Processing {len(videos)} videos from {channel['name']}")
             
-            # Process each video  
-            for i, video in enumerate(videos, 1):
-                try:
-                    logger.debug(f"  Video {i}/{len(videos)}: {video['title'][:50]}...")
-                    
-                    # Check if video exists and needs AI analysis
-                    existing_page = await self._get_existing_video_page(video['url'], video['title'])
-                    
-                    if existing_page:
-                        # Video exists - check if it needs AI analysis update
-                        processing_status = existing_page.get('properties', {}).get('Processing Status', {}).get('select', {}).get('name', '')
-                        if processing_status == 'Completed':
-                            logger.debug(f"    Already processed with AI, skipping")
-                            continue
-                        else:
-                            logger.debug(f"    Exists but missing AI analysis, updating...")
-                    else:
-                        logger.debug(f"    New video, importing...")
-                        result["new_videos"] += 1
-                    
-                    # Import/Update video in Knowledge Hub with AI analysis
-                    if await self.import_video_to_knowledge_hub(video, channel['name'], channel['hashtags']):
-                        result["imported_videos"] += 1
-                        action = "Updated" if existing_page else "Imported"
-                        logger.debug(f"    {action} successfully")
-                    else:
-                        logger.warning(f"    Failed to process")
-                        result["errors"].append(f"Failed to process: {video['title']}")
-                    
-                    # Small delay to avoid rate limits
-                    await asyncio.sleep(0.5)
-                    
-                except Exception as e:
-                    logger.error(f"Error processing video {video.get('title', 'Unknown')}: {e}")
-                    result["errors"].append(f"Video processing error: {str(e)}")
+            # Run the videos through the staged pipeline; video_id -> processed successfully (drives the watermark)
+            pipeline = ChannelIngestPipeline(
+                self, channel,
+                stage_workers=self.stage_workers,
+                queue_size=self.pipeline_queue_size
+            )
+            succeeded = await pipeline.run(videos, result)
             
             logger.info(f"Channel processing complete: {result['imported_videos']}/{result['new_videos']} new videos imported")
             
+            # Persist the watermark up to the newest video with no failures before it
+            self.sync_store.advance(sync_state, videos, succeeded, full_sync=full_sync)
+            
             # Add filtered database view to channel page
             if self.view_manager and result['imported_videos'] > 0:
                 try:
@@ -1833,6 +1894,7 @@ class YouTubeChannelProcessor:
             # Add processing notes if stats provided
             if stats:
                 notes = f"Processed: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+                notes += f"Sync: {stats.get('sync_mode', 'full')}\n"
                 notes += f"Total videos: {stats.get('total_videos', 0)}\n"
                 notes += f"New videos: {stats.get('new_videos', 0)}\n"
                 notes += f"Imported: {stats.get('imported_videos', 0)}\n"
@@ -1844,14 +1906,13 @@ class YouTubeChannelProcessor:
                 properties["Notes"] = {
                     "rich_text": [{"text": {"content": notes}}]
                 }
+                
+                # A requested full resync is a one-off
+                if stats.get('full_resync_requested'):
+                    properties["Full Resync"] = {"checkbox": False}
             
-            response = requests.patch(
-                headers=self.headers,
-                json={"properties": properties},
-                timeout=10
-            )
-            
-            return response.status_code == 200
+            await self.notion.update_page(page_id, properties)
+            return True
             
         except Exception as e:
             logger.error(f"Error updating channel status: {e}")
@@ -1880,36 +1941,42 @@ class YouTubeChannelProcessor:
             
             logger.info(f"Processing {len(channels)} marked channels")
             
-            # Process each channel
-            for i, channel in enumerate(channels, 1):
-                logger.info(f"📺 Processing channel {i}/{len(channels)}: {channel['name']}")
-                
-                try:
-                    # Process the channel
-                    channel_result = await self.process_channel(channel)
-                    
-                    # Update channel status
-                    success = len(channel_result["errors"]) == 0
-                    await self.update_channel_status(channel['page_id'], success, channel_result)
-                    
-                    # Update totals
-                    result["channels_processed"] += 1
-                    result["total_videos_imported"] += channel_result["imported_videos"]
-                    
-                    if channel_result["errors"]:
-                        result["errors"].extend(channel_result["errors"])
-                    
-                    logger.info(f"✅ Channel completed: {channel_result['imported_videos']} videos imported")
-                    
-                except Exception as e:
-                    logger.error(f"Failed to process channel {channel['name']}: {e}")
-                    result["errors"].append(f"Channel {channel['name']}: {str(e)}")
+            # Refresh the local dedupe index once for the whole cycle
+            await self.load_dedupe_index()
+            
+            # Process channels concurrently; per-API rate limiters are shared across them
+            semaphore = asyncio.Semaphore(self.channel_concurrency)
+            
+            async def run_channel(i: int, channel: Dict[str, Any]):
+                async with semaphore:
+                    logger.info(f"📺 Processing channel {i}/{len(channels)}: {channel['name']}")
                     
-                    # Still update status to uncheck the box
-                    await self.update_channel_status(channel['page_id'], False)
-                
-                # Delay between channels
-                await asyncio.sleep(2)
+                    try:
+                        # Process the channel
+                        channel_result = await self.process_channel(channel)
+                        
+                        # Update channel status
+                        success = len(channel_result["errors"]) == 0
+                        await self.update_channel_status(channel['page_id'], success, channel_result)
+                        
+                        # Update totals
+                        result["channels_processed"] += 1
+                        result["total_videos_imported"] += channel_result["imported_videos"]
+                        
+                        if channel_result["errors"]:
+                            result["errors"].extend(channel_result["errors"])
+                        
+                        logger.info(f"✅ Channel completed: {channel_result['imported_videos']} videos imported")
+                        
+                    except Exception as e:
+                        logger.error(f"Failed to process channel {channel['name']}: {e}")
+                        result["errors"].append(f"Channel {channel['name']}: {str(e)}")
+                        
+                        # Still update status to uncheck the box
+                        await self.update_channel_status(channel['page_id'], False)
+            
+            await asyncio.gather(*(run_channel(i, channel) for i, channel in enumerate(channels, 1)))
+            result["rate_limits"] = {api: limiter.get_stats() for api, limiter in self.rate_limiters.items()}
             
             result["end_time"] = datetime.now()
             duration = (result["end_time"] - result["start_time"]).total_seconds()
@@ -6,6 +6,9 @@ import uuid
 import sqlite3
 import pickle
 import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from typing import Dict, List, Any, Optional, Union, AsyncGenerator, Callable, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field
@@ -22,6 +25,8 @@ from loguru import logger
 import threading
 import queue
 
+from ..monitoring.online_detection import HalfSpaceTrees, OnlineAnomalyDetector
+
 
 class ErrorSeverity(Enum):
     CRITICAL = "critical"
@@ -280,6 +285,24 @@ class PatternRecognizer:
         return True
 
 
+def _fit_isolation_forest(rows: List[Dict[str, float]], feature_names: List[str],
+                          contamination: float) -> Tuple[StandardScaler, IsolationForest]:
+    """Fit scaler and forest on metric rows; runs in a worker process."""
+    training_data = np.array(
+        [[row.get(name, np.nan) for name in feature_names] for row in rows],
+        dtype=float
+    )
+    # Metrics missing from a row take that metric's mean rather than 0
+    column_means = np.nan_to_num(np.nanmean(training_data, axis=0))
+    missing = np.isnan(training_data)
+    training_data[missing] = np.take(column_means, np.nonzero(missing)[1])
+
+    scaler = StandardScaler()
+    isolation_forest = IsolationForest(contamination=contamination, random_state=42)
+    isolation_forest.fit(scaler.fit_transform(training_data))
+    return scaler, isolation_forest
+
+
 class AnomalyDetector:
     """Detects anomalies in system metrics and behavior."""
     
@@ -306,15 +329,59 @@ class AnomalyDetector:
         # Historical data for training
         self.historical_metrics = deque(maxlen=10000)
         self.is_trained = False
+        
+        # Per-metric running statistics, updated in O(1) per sample
+        self.online_stats = OnlineAnomalyDetector(
+            window_size=config.get('statistics_window', 10000),
+            threshold_factor=config.get('z_score_threshold', 3.0),
+            min_samples=10
+        )
+        
+        # Feature schema: metric names in first-seen order, append-only so a
+        # column keeps its meaning across refits
+        self.feature_names: List[str] = []
+        self.model_features: List[str] = []
+        
+        # Refits run in a worker process so the event loop never blocks on them
+        self.retrain_interval = config.get('retrain_interval', 100)
+        self.samples_since_fit = 0
+        self.retrain_executor: Optional[ProcessPoolExecutor] = None
+        self.retrain_task: Optional[asyncio.Task] = None
+        
+        # Optional streaming model for anomalies across metrics
+        self.half_space_trees: Optional[HalfSpaceTrees] = None
+        self.use_half_space_trees = config.get('half_space_trees', False)
+        self.half_space_threshold = config.get('half_space_threshold', 0.8)
     
     def add_metrics(self, metrics: Dict[str, float], timestamp: datetime):
         """Add metrics data point for analysis."""
-        metrics_with_time = {**metrics, 'timestamp': timestamp.timestamp()}
-        self.historical_metrics.append(metrics_with_time)
+        numeric = {
+            name: value for name, value in metrics.items()
+            if name != 'timestamp' and isinstance(value, (int, float))
+        }
+        for name in numeric:
+            if name not in self.online_stats.streams:
+                self.feature_names.append(name)
+        self.online_stats.update_many(numeric)
+        
+        if self.use_half_space_trees:
+            if self.half_space_trees is None:
+                self.half_space_trees = HalfSpaceTrees(
+                    self.feature_names,
+                    window_size=self.config.get('half_space_window', 250)
+                )
+            self.half_space_trees.learn(numeric)
         
-        # Retrain periodically
-        if len(self.historical_metrics) % 100 == 0:
-            asyncio.create_task(self._retrain_models())
+        self.historical_metrics.append({**numeric, 'timestamp': timestamp.timestamp()})
+        
+        # Retrain periodically, one refit at a time
+        self.samples_since_fit += 1
+        if self.samples_since_fit >= self.retrain_interval and self.retrain_task is None:
+            try:
+                self.retrain_task = asyncio.get_running_loop().create_task(self._retrain_models())
+            except RuntimeError:
+                return  # No event loop to refit on; try again on a later sample
+            self.samples_since_fit = 0
     
     async def detect_anomalies(self, current_metrics: Dict[str, float]) -> List[Anomaly]:
         """Detect anomalies in current metrics."""
@@ -333,6 +400,9 @@ class AnomalyDetector:
             ml_anomalies = self._detect_ml_anomalies(current_metrics)
             anomalies.extend(ml_anomalies)
         
+        if self.half_space_trees is not None and self.half_space_trees.ready:
+            anomalies.extend(self._detect_streaming_anomalies(current_metrics))
+        
         # Correlation anomalies
         correlation_anomalies = self._detect_correlation_anomalies(current_metrics)
         anomalies.extend(correlation_anomalies)
@@ -351,30 +421,24 @@ class AnomalyDetector:
             if metric_name == 'timestamp':
                 continue
             
-            historical_values = [m.get(metric_name, 0) for m in self.historical_metrics if metric_name in m]
-            
-            if len(historical_values) < 10:
+            z_score = self.online_stats.zscore(metric_name, current_value)
+            if z_score is None:
                 continue
             
-            mean_val = np.mean(historical_values)
-            std_val = np.std(historical_values)
-            
-            if std_val > 0:
-                z_score = abs((current_value - mean_val) / std_val)
-                
-                if z_score > 3:  # 3-sigma rule
-                    anomaly = Anomaly(
-                        anomaly_id=str(uuid.uuid4()),
-                        timestamp=datetime.now(),
-                        anomaly_type=AnomalyType.STATISTICAL,
-                        severity=ErrorSeverity.HIGH if z_score > 4 else ErrorSeverity.MEDIUM,
-                        description=f"Statistical anomaly in {metric_name}: z-score={z_score:.2f}",
-                        affected_metrics=[metric_name],
-                        confidence_score=min(z_score / 4.0, 1.0),
-                        deviation_score=z_score,
-                        context={'z_score': z_score, 'mean': mean_val, 'std': std_val}
-                    )
-                    anomalies.append(anomaly)
+            if z_score > self.online_stats.threshold_factor:  # 3-sigma rule by default
+                window = self.online_stats.streams[metric_name].window
+                anomaly = Anomaly(
+                    anomaly_id=str(uuid.uuid4()),
+                    timestamp=datetime.now(),
+                    anomaly_type=AnomalyType.STATISTICAL,
+                    severity=ErrorSeverity.HIGH if z_score > 4 else ErrorSeverity.MEDIUM,
+                    description=f"Statistical anomaly in {metric_name}: z-score={z_score:.2f}",
+                    affected_metrics=[metric_name],
+                    confidence_score=min(z_score / 4.0, 1.0),
+                    deviation_score=z_score,
+                    context={'z_score': z_score, 'mean': window.mean, 'std': window.std}
+                )
+                anomalies.append(anomaly)
         
         return anomalies
     
@@ -409,16 +473,19 @@ class AnomalyDetector:
         anomalies = []
         
         try:
-            # Prepare feature vector
-            feature_names = [k for k in metrics.keys() if k != 'timestamp']
-            features = np.array([[metrics.get(k, 0) for k in feature_names]])
+            # Prepare feature vector in the trained model's schema
+            feature_names = self.model_features
+            features = np.array([[
+                metrics[k] if k in metrics else self.online_stats.streams[k].window.mean
+                for k in feature_names
+            ]])
             
             # Scale features
             features_scaled = self.scaler.transform(features)
             
             # Isolation Forest prediction
             anomaly_score = self.isolation_forest.decision_function(features_scaled)[0]
-            is_anomaly = self.isolation_forest.predict(features_scaled)[0] == -1
+            is_anomaly = anomaly_score < 0  # Same cut as predict(), without scoring twice
             
             if is_anomaly:
                 anomaly = Anomaly(
@@ -465,35 +532,65 @@ class AnomalyDetector:
         
         return anomalies
     
+    def _detect_streaming_anomalies(self, metrics: Dict[str, float]) -> List[Anomaly]:
+        """Score the sample against the half-space trees' mass profile."""
+        score = self.half_space_trees.score(metrics)
+        if score <= self.half_space_threshold:
+            return []
+        
+        return [Anomaly(
+            anomaly_id=str(uuid.uuid4()),
+            timestamp=datetime.now(),
+            anomaly_type=AnomalyType.PATTERN_BASED,
+            severity=ErrorSeverity.HIGH if score > 0.95 else ErrorSeverity.MEDIUM,
+            description=f"Streaming model anomaly: score={score:.3f}",
+            affected_metrics=list(self.half_space_trees.feature_names),
+            confidence_score=score,
+            deviation_score=score,
+            context={'half_space_score': score}
+        )]
+    
     async def _retrain_models(self):
-        """Retrain ML models with historical data."""
+        """Retrain ML models with historical data in a worker process."""
         try:
             if len(self.historical_metrics) < 100:
                 return
             
-            # Prepare training data
-            feature_names = set()
-            for metrics in self.historical_metrics:
-                feature_names.update(k for k in metrics.keys() if k != 'timestamp')
-            
-            feature_names = sorted(list(feature_names))
-            
-            training_data = []
-            for metrics in self.historical_metrics:
-                features = [metrics.get(k, 0) for k in feature_names]
-                training_data.append(features)
+            # Snapshot on the loop; matrix building and fitting happen in the worker
+            rows = list(self.historical_metrics)
+            feature_names = list(self.feature_names)
             
-            training_data = np.array(training_data)
+            if self.retrain_executor is None:
+                self.retrain_executor = ProcessPoolExecutor(
+                    max_workers=1, mp_context=multiprocessing.get_context('spawn')
+                )
             
-            # Fit scaler and models
-            training_data_scaled = self.scaler.fit_transform(training_data)
-            self.isolation_forest.fit(training_data_scaled)
+            loop = asyncio.get_running_loop()
+            self.scaler, self.isolation_forest = await loop.run_in_executor(
+                self.retrain_executor, _fit_isolation_forest,
+                rows, feature_names, self.config.get('contamination', 0.1)
+            )
+            self.model_features = feature_names
             
             self.is_trained = True
-            logger.info("Anomaly detection models retrained")
+            logger.info(f"Anomaly detection models retrained on {len(rows)} samples")
             
+        except BrokenProcessPool as e:
+            logger.error(f"Model retraining worker died: {e}")
+            self.retrain_executor = None
         except Exception as e:
             logger.error(f"Model retraining failed: {e}")
+        finally:
+            self.retrain_task = None
+    
+    def close(self):
+        """Stop the retraining worker process."""
+        if self.retrain_task is not None:
+            self.retrain_task.cancel()
+            self.retrain_task = None
+        if self.retrain_executor is not None:
+            self.retrain_executor.shutdown(wait=False, cancel_futures=True)
+            self.retrain_executor = None
 
 
 class FailurePredictor:
@@ -1408,5 +1505,7 @@ class ErrorDetector:
         for process_id in list(self.monitored_processes.keys()):
             await self.stop_monitoring(process_id)
         
+        self.anomaly_detector.close()
+        
         # Clear streams
         await self.error_stream.clear()
\ No newline at end of file
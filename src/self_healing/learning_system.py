@@ -8,19 +8,22 @@ import time
 import uuid
 from typing import Dict, List, Any, Optional, Union, Tuple, Set
 from datetime import datetime, timedelta
-from dataclasses import dataclass, field, asdict
+from dataclasses import dataclass, field, asdict, replace
 from enum import Enum
 from collections import defaultdict, deque
 from pathlib import Path
 import statistics
-from sklearn.cluster import DBSCAN, KMeans
+import heapq
+import math
+import random
+import re
+from sklearn.cluster import DBSCAN, KMeans, MiniBatchKMeans
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingRegressor
 from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.preprocessing import StandardScaler
 from loguru import logger
 import threading
-import copy
 
 
 class ExperienceType(Enum):
@@ -127,58 +130,101 @@ class LearningMetrics:
 class ExperienceProcessor:
     """Process and analyze experiences for pattern extraction."""
     
-    def __init__(self):
+    FEATURE_NAMES = (
+        'execution_time', 'accuracy', 'efficiency', 'memory_mb', 'cpu_percent',
+        'action_count', 'recovery_count', 'success', 'complexity', 'confidence'
+    )
+    EFFICIENCY_FEATURE = FEATURE_NAMES.index('efficiency')
+    SUCCESS_FEATURE = FEATURE_NAMES.index('success')
+    
+    def __init__(self, n_clusters: int = 8):
         self.vectorizer = TfidfVectorizer(max_features=1000, stop_words='english')
         self.feature_scaler = StandardScaler()
-# DEMO CODE REMOVED: self.clustering_model = DBSCAN(eps=0.3, min_samples=3)
+        self.n_clusters = n_clusters
+        self.clustering_model = MiniBatchKMeans(n_clusters=n_clusters, n_init=3, random_state=42)
+        self.clustering_fitted = False
+        self.unfitted_features: Optional[np.ndarray] = None
         self.success_predictor = RandomForestClassifier(n_estimators=100, random_state=42)
         self.efficiency_predictor = GradientBoostingRegressor(n_estimators=100, random_state=42)
     
+    @staticmethod
+    def feature_vector(exp: Experience) -> Tuple[float, ...]:
+        """Numerical features for one experience, in FEATURE_NAMES order."""
+        return (
+            exp.execution_time,
+            exp.metrics.get('accuracy', 0.0),
+            exp.metrics.get('efficiency', 0.0),
+            exp.resource_usage.get('memory_mb', 0.0),
+            exp.resource_usage.get('cpu_percent', 0.0),
+            len(exp.actions_taken),
+            len(exp.recovery_actions),
+            1 if exp.success else 0,
+            exp.metrics.get('complexity', 0.0),
+            exp.metrics.get('confidence', 0.0)
+        )
+    
     def extract_features(self, experiences: List[Experience]) -> np.ndarray:
         """Extract numerical features from experiences."""
-        features = []
+        features = np.empty((len(experiences), len(self.FEATURE_NAMES)))
         
-        for exp in experiences:
-            feature_vector = [
-                exp.execution_time,
-                exp.metrics.get('accuracy', 0.0),
-                exp.metrics.get('efficiency', 0.0),
-                exp.resource_usage.get('memory_mb', 0.0),
-                exp.resource_usage.get('cpu_percent', 0.0),
-                len(exp.actions_taken),
-                len(exp.recovery_actions),
-                1 if exp.success else 0,
-                exp.metrics.get('complexity', 0.0),
-                exp.metrics.get('confidence', 0.0)
-            ]
-            features.append(feature_vector)
-        
-        return np.array(features)
-    
-    def cluster_experiences(self, experiences: List[Experience]) -> Dict[int, List[Experience]]:
+        for row, exp in enumerate(experiences):
+            features[row] = self.feature_vector(exp)
+        
+        return features
+    
+    def update_clusters(self, features: np.ndarray):
+        """Fold newly recorded experiences into the scaler and cluster centroids."""
+        if self.unfitted_features is not None:
+            features = np.vstack([self.unfitted_features, features])
+            self.unfitted_features = None
+        
+        if not len(features):
+            return
+        
+        # The first mini-batch has to seed every centroid
+        if not self.clustering_fitted and len(features) < self.n_clusters:
+            self.unfitted_features = features
+            return
+        
+        self.feature_scaler.partial_fit(features)
+        self.clustering_model.partial_fit(self.feature_scaler.transform(features))
+        self.clustering_fitted = True
+    
+    def cluster_experiences(self, experiences: List[Experience],
+                            features: Optional[np.ndarray] = None) -> Dict[int, List[Experience]]:
         """Cluster similar experiences together."""
-        if len(experiences) < 3:
+        if len(experiences) < 3 or not self.clustering_fitted:
             return {0: experiences}
         
-        features = self.extract_features(experiences)
-        features_scaled = self.feature_scaler.fit_transform(features)
+        if features is None:
+            features = self.extract_features(experiences)
         
-        cluster_labels = self.clustering_model.fit_predict(features_scaled)
+        cluster_labels = self.clustering_model.predict(self.feature_scaler.transform(features))
         
         clusters = defaultdict(list)
         for i, label in enumerate(cluster_labels):
-            clusters[label].append(experiences[i])
+            clusters[int(label)].append(experiences[i])
         
         return dict(clusters)
     
-    def identify_success_patterns(self, experiences: List[Experience]) -> List[Pattern]:
+    def _select(self, experiences: List[Experience], features: np.ndarray,
+                rows: np.ndarray) -> Tuple[List[Experience], np.ndarray]:
+        return [experiences[i] for i in rows], features[rows]
+    
+    def identify_success_patterns(self, experiences: List[Experience],
+                                  features: Optional[np.ndarray] = None) -> List[Pattern]:
         """Identify patterns that lead to success."""
-        successful_experiences = [exp for exp in experiences if exp.success]
+        if features is None:
+            features = self.extract_features(experiences)
+        
+        successful_experiences, successful_features = self._select(
+            experiences, features, np.flatnonzero(features[:, self.SUCCESS_FEATURE] > 0)
+        )
         
         if len(successful_experiences) < 2:
             return []
         
-        clusters = self.cluster_experiences(successful_experiences)
+        clusters = self.cluster_experiences(successful_experiences, successful_features)
         patterns = []
         
         for cluster_id, cluster_experiences in clusters.items():
@@ -194,14 +240,20 @@ class ExperienceProcessor:
         
         return patterns
     
-    def identify_failure_patterns(self, experiences: List[Experience]) -> List[Pattern]:
+    def identify_failure_patterns(self, experiences: List[Experience],
+                                  features: Optional[np.ndarray] = None) -> List[Pattern]:
         """Identify patterns that lead to failure."""
-        failed_experiences = [exp for exp in experiences if not exp.success]
+        if features is None:
+            features = self.extract_features(experiences)
+        
+        failed_experiences, failed_features = self._select(
+            experiences, features, np.flatnonzero(features[:, self.SUCCESS_FEATURE] == 0)
+        )
         
         if len(failed_experiences) < 2:
             return []
         
-        clusters = self.cluster_experiences(failed_experiences)
+        clusters = self.cluster_experiences(failed_experiences, failed_features)
         patterns = []
         
         for cluster_id, cluster_experiences in clusters.items():
@@ -217,19 +269,22 @@ class ExperienceProcessor:
         
         return patterns
     
-    def identify_efficiency_patterns(self, experiences: List[Experience]) -> List[Pattern]:
+    def identify_efficiency_patterns(self, experiences: List[Experience],
+                                     features: Optional[np.ndarray] = None) -> List[Pattern]:
         """Identify patterns that lead to high efficiency."""
+        if features is None:
+            features = self.extract_features(experiences)
+        
         # Sort by efficiency metrics
-        efficient_experiences = sorted(
-            experiences, 
-            key=lambda x: x.metrics.get('efficiency', 0.0), 
-            reverse=True
-        )[:len(experiences)//3]  # Top 33% most efficient
+        efficient_experiences, efficient_features = self._select(
+            experiences, features,
+            np.argsort(-features[:, self.EFFICIENCY_FEATURE], kind='stable')[:len(experiences)//3]
+        )  # Top 33% most efficient
         
         if len(efficient_experiences) < 2:
             return []
         
-        clusters = self.cluster_experiences(efficient_experiences)
+        clusters = self.cluster_experiences(efficient_experiences, efficient_features)
         patterns = []
         
         for cluster_id, cluster_experiences in clusters.items():
@@ -526,12 +581,329 @@ class StrategyOptimizer:
         return parameters
 
 
+class ExperienceStore:
+    """Reservoir-sampled experience set backed by SQLite, with a preallocated feature matrix."""
+    
+    def __init__(self, db_path: str, agent_id: str, capacity: int = 10000):
+        self.db_path = db_path
+        self.agent_id = agent_id
+        self.capacity = max(int(capacity), 1)
+        
+        # Row i of features always describes slots[i]
+        self.features = np.zeros((self.capacity, len(ExperienceProcessor.FEATURE_NAMES)))
+        self.slots: List[Experience] = []
+        self.index: Dict[str, int] = {}
+        
+        # Feature rows recorded since the last take_pending(), sampled in or not
+        self.pending: deque = deque(maxlen=self.capacity)
+        self.seen = 0
+        self.rng = random.Random()
+        
+        self._initialize_database()
+        self._load()
+    
+    def _initialize_database(self):
+        """Initialize reservoir membership table."""
+        conn = sqlite3.connect(self.db_path)
+        
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS experience_reservoir (
+                agent_id TEXT,
+                slot INTEGER,
+                experience_id TEXT,
+                PRIMARY KEY (agent_id, slot)
+            )
+        ''')
+        
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_experiences_agent ON experiences (agent_id)
+        ''')
+        
+        conn.commit()
+        conn.close()
+    
+    def _load(self):
+        """Restore the reservoir persisted for this agent."""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            self.seen = conn.execute(
+                'SELECT COUNT(*) FROM experiences WHERE agent_id = ?', (self.agent_id,)
+            ).fetchone()[0]
+            
+            rows = conn.execute('''
+                SELECT r.slot, e.experience_id, e.timestamp, e.experience_type, e.agent_id,
+                       e.task_context, e.actions_taken, e.outcomes, e.metrics, e.success,
+                       e.execution_time, e.resource_usage, e.error_info, e.recovery_actions,
+                       e.collaboration_data, e.metadata
+                FROM experience_reservoir r
+                JOIN experiences e ON e.experience_id = r.experience_id
+                WHERE r.agent_id = ?
+                ORDER BY r.slot
+            ''', (self.agent_id,)).fetchall()
+            
+            for row in rows[:self.capacity]:
+                self._place(len(self.slots), self._experience_from_row(row[1:]))
+            
+            # Slots must stay dense; renumber if the capacity shrank or rows went missing
+            if len(rows) > self.capacity or any(row[0] != slot for slot, row in enumerate(rows)):
+                conn.execute('DELETE FROM experience_reservoir WHERE agent_id = ?', (self.agent_id,))
+                conn.executemany(
+                    'INSERT INTO experience_reservoir (agent_id, slot, experience_id) VALUES (?, ?, ?)',
+                    [(self.agent_id, slot, exp.experience_id) for slot, exp in enumerate(self.slots)]
+                )
+                conn.commit()
+        finally:
+            conn.close()
+        
+        self.seen = max(self.seen, len(self.slots))
+        self.pending.extend(self.features[:len(self.slots)])
+        
+        if self.slots:
+            logger.info(f"Restored {len(self.slots)} of {self.seen} experiences for agent {self.agent_id}")
+    
+    @staticmethod
+    def _experience_from_row(row: Tuple) -> Experience:
+        (experience_id, timestamp, experience_type, agent_id, task_context, actions_taken,
+         outcomes, metrics, success, execution_time, resource_usage, error_info,
+         recovery_actions, collaboration_data, metadata) = row
+        
+        return Experience(
+            experience_id=experience_id,
+            timestamp=datetime.fromisoformat(timestamp),
+            experience_type=ExperienceType(experience_type),
+            agent_id=agent_id,
+            task_context=json.loads(task_context),
+            actions_taken=json.loads(actions_taken),
+            outcomes=json.loads(outcomes),
+            metrics=json.loads(metrics),
+            success=bool(success),
+            execution_time=execution_time,
+            resource_usage=json.loads(resource_usage),
+            error_info=json.loads(error_info) if error_info else None,
+            recovery_actions=json.loads(recovery_actions),
+            collaboration_data=json.loads(collaboration_data) if collaboration_data else None,
+            metadata=json.loads(metadata)
+        )
+    
+    def _place(self, slot: int, experience: Experience):
+        if slot == len(self.slots):
+            self.slots.append(experience)
+        else:
+            del self.index[self.slots[slot].experience_id]
+            self.slots[slot] = experience
+        
+        self.index[experience.experience_id] = slot
+        self.features[slot] = ExperienceProcessor.feature_vector(experience)
+    
+    def add(self, experience: Experience) -> Optional[Experience]:
+        """
+        Persist an experience and sample it into memory (Algorithm R).
+        
+        Every experience is written to the experiences table; memory keeps a uniform
+        sample of at most capacity of them. Returns the experience evicted, if any.
+        """
+        self.seen += 1
+        evicted = None
+        
+        if len(self.slots) < self.capacity:
+            slot = len(self.slots)
+        else:
+            slot = self.rng.randrange(self.seen)
+            if slot < self.capacity:
+                evicted = self.slots[slot]
+            else:
+                slot = None
+        
+        if slot is not None:
+            self._place(slot, experience)
+            self.pending.append(self.features[slot].copy())
+        else:
+            self.pending.append(np.array(ExperienceProcessor.feature_vector(experience), dtype=float))
+        
+        self._store(experience, slot)
+        return evicted
+    
+    def _store(self, experience: Experience, slot: Optional[int]):
+        """Store experience and its reservoir slot in one transaction."""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                conn.execute('''
+                    INSERT INTO experiences
+                    (experience_id, timestamp, experience_type, agent_id, task_context,
+                     actions_taken, outcomes, metrics, success, execution_time,
+                     resource_usage, error_info, recovery_actions, collaboration_data, metadata)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    experience.experience_id,
+                    experience.timestamp.isoformat(),
+                    experience.experience_type.value,
+                    experience.agent_id,
+                    json.dumps(experience.task_context),
+                    json.dumps(experience.actions_taken),
+                    json.dumps(experience.outcomes),
+                    json.dumps(experience.metrics),
+                    1 if experience.success else 0,
+                    experience.execution_time,
+                    json.dumps(experience.resource_usage),
+                    json.dumps(experience.error_info) if experience.error_info else None,
+                    json.dumps(experience.recovery_actions),
+                    json.dumps(experience.collaboration_data) if experience.collaboration_data else None,
+                    json.dumps(experience.metadata)
+                ))
+                
+                if slot is not None:
+                    conn.execute('''
+                        INSERT OR REPLACE INTO experience_reservoir (agent_id, slot, experience_id)
+                        VALUES (?, ?, ?)
+                    ''', (self.agent_id, slot, experience.experience_id))
+        except Exception as e:
+            logger.error(f"Failed to store experience: {e}")
+        finally:
+            conn.close()
+    
+    def take_pending(self) -> np.ndarray:
+        """Feature rows recorded since the previous call."""
+        pending = np.array(self.pending, dtype=float).reshape(-1, self.features.shape[1])
+        self.pending.clear()
+        return pending
+    
+    def snapshot(self) -> Tuple[List[Experience], np.ndarray]:
+        """Sampled experiences with their feature rows."""
+        return list(self.slots), self.features[:len(self.slots)].copy()
+    
+    def get(self, experience_id: str) -> Optional[Experience]:
+        slot = self.index.get(experience_id)
+        return self.slots[slot] if slot is not None else None
+    
+    def values(self) -> List[Experience]:
+        return list(self.slots)
+    
+    def __contains__(self, experience_id: str) -> bool:
+        return experience_id in self.index
+    
+    def __len__(self) -> int:
+        return len(self.slots)
+
+
+class KnowledgeIndex:
+    """Inverted index over knowledge entries for BM25 and applicability lookups."""
+    
+    TOKEN_PATTERN = re.compile(r"[a-z0-9_]+")
+    
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.contexts: Dict[str, Set[str]] = defaultdict(set)
+        self.doc_lengths: Dict[str, int] = {}
+        self.doc_terms: Dict[str, Dict[str, int]] = {}
+        self.doc_contexts: Dict[str, Set[str]] = {}
+        self.total_length = 0
+        self.lock = threading.Lock()
+    
+    @classmethod
+    def tokenize(cls, value: Any) -> List[str]:
+        """Split a value's string form into lowercase word tokens."""
+        return cls.TOKEN_PATTERN.findall(str(value).lower())
+    
+    def add(self, entry: KnowledgeEntry):
+        """Index an entry, replacing any previous version with the same id."""
+        terms = defaultdict(int)
+        for token in self.tokenize(entry.content):
+            terms[token] += 1
+        contexts = set(entry.applicability_contexts)
+        
+        with self.lock:
+            self._remove(entry.entry_id)
+            
+            for token, count in terms.items():
+                self.postings[token][entry.entry_id] = count
+            for context in contexts:
+                self.contexts[context].add(entry.entry_id)
+            
+            self.doc_terms[entry.entry_id] = dict(terms)
+            self.doc_contexts[entry.entry_id] = contexts
+            self.doc_lengths[entry.entry_id] = sum(terms.values())
+            self.total_length += self.doc_lengths[entry.entry_id]
+    
+    def remove(self, entry_id: str):
+        """Drop an entry from the index."""
+        with self.lock:
+            self._remove(entry_id)
+    
+    def _remove(self, entry_id: str):
+        if entry_id not in self.doc_terms:
+            return
+        
+        for token in self.doc_terms.pop(entry_id):
+            posting = self.postings[token]
+            posting.pop(entry_id, None)
+            if not posting:
+                del self.postings[token]
+        
+        for context in self.doc_contexts.pop(entry_id):
+            entry_ids = self.contexts[context]
+            entry_ids.discard(entry_id)
+            if not entry_ids:
+                del self.contexts[context]
+        
+        self.total_length -= self.doc_lengths.pop(entry_id)
+    
+    def search(self, context: Dict[str, Any]) -> Dict[str, Tuple[int, float]]:
+        """
+        Score the entries that share a token or applicability context with the query.
+        
+        Returns entry_id -> (matched applicability contexts, BM25 similarity in [0, 1]).
+        BM25 is normalised by the best score any entry could reach for these query terms.
+        """
+        context_str = str(context)
+        query_terms = set(self.tokenize(context_str))
+        
+        with self.lock:
+            doc_count = len(self.doc_lengths)
+            if not doc_count:
+                return {}
+            
+            avg_length = self.total_length / doc_count or 1.0
+            text_scores: Dict[str, float] = defaultdict(float)
+            max_score = 0.0
+            
+            for token in query_terms:
+                posting = self.postings.get(token)
+                if not posting:
+                    continue
+                
+                idf = math.log(1.0 + (doc_count - len(posting) + 0.5) / (len(posting) + 0.5))
+                max_score += idf * (self.k1 + 1.0)
+                
+                for entry_id, count in posting.items():
+                    length_norm = 1.0 - self.b + self.b * self.doc_lengths[entry_id] / avg_length
+                    text_scores[entry_id] += idf * count * (self.k1 + 1.0) / (count + self.k1 * length_norm)
+            
+            # The tag vocabulary is small, so substring matching stays per tag rather than per entry
+            context_matches: Dict[str, int] = defaultdict(int)
+            for applicable_context, entry_ids in self.contexts.items():
+                if applicable_context in context_str:
+                    for entry_id in entry_ids:
+                        context_matches[entry_id] += 1
+        
+        return {
+            entry_id: (
+                context_matches.get(entry_id, 0),
+                text_scores.get(entry_id, 0.0) / max_score if max_score else 0.0
+            )
+            for entry_id in set(text_scores) | set(context_matches)
+        }
+
+
 class KnowledgeManager:
     """Manage knowledge base and cross-agent learning."""
     
     def __init__(self, db_path: str):
         self.db_path = db_path
         self.knowledge_entries: Dict[str, KnowledgeEntry] = {}
+        self.knowledge_index = KnowledgeIndex()
         self.best_practices: Dict[str, List[str]] = defaultdict(list)
         self.anti_patterns: Dict[str, List[str]] = defaultdict(list)
         self._initialize_database()
@@ -582,6 +954,7 @@ class KnowledgeManager:
     def add_knowledge_entry(self, entry: KnowledgeEntry):
         """Add new knowledge entry."""
         self.knowledge_entries[entry.entry_id] = entry
+        self.knowledge_index.add(entry)
         
         # Store in database
         conn = sqlite3.connect(self.db_path)
@@ -652,41 +1025,28 @@ class KnowledgeManager:
     
     def get_relevant_knowledge(self, context: Dict[str, Any], limit: int = 10) -> List[KnowledgeEntry]:
         """Get knowledge entries relevant to the given context."""
-        relevant_entries = []
-        
-        context_str = json.dumps(context, sort_keys=True)
+        scored = []
         
-        for entry in self.knowledge_entries.values():
-            # Calculate relevance based on context similarity
-            relevance = self._calculate_context_relevance(entry, context)
+        # Only entries sharing a token or applicability context can clear the threshold
+        for entry_id, (context_matches, text_similarity) in self.knowledge_index.search(context).items():
+            entry = self.knowledge_entries.get(entry_id)
+            if entry is None:
+                continue
             
+            relevance = self._calculate_context_relevance(entry, context_matches, text_similarity)
             if relevance > 0.3:  # Threshold for relevance
-                entry_copy = copy.deepcopy(entry)
-                entry_copy.relevance_score = relevance
-                relevant_entries.append(entry_copy)
+                scored.append((relevance, entry))
         
-        # Sort by relevance and return top entries
-        relevant_entries.sort(key=lambda x: x.relevance_score, reverse=True)
-        return relevant_entries[:limit]
+        # Entries are shared, so hand back shallow copies carrying the query's relevance
+        return [
+            replace(entry, relevance_score=relevance)
+            for relevance, entry in heapq.nlargest(limit, scored, key=lambda item: item[0])
+        ]
     
-    def _calculate_context_relevance(self, entry: KnowledgeEntry, context: Dict[str, Any]) -> float:
-        """Calculate how relevant a knowledge entry is to the given context."""
-        relevance_score = 0.0
-        
-        # Check applicability contexts
-        for applicable_context in entry.applicability_contexts:
-            if applicable_context in str(context):
-                relevance_score += 0.3
-        
-        # Check content similarity
-        context_keywords = set(str(context).lower().split())
-        entry_keywords = set(str(entry.content).lower().split())
-        
-        if context_keywords and entry_keywords:
-            intersection = context_keywords.intersection(entry_keywords)
-            union = context_keywords.union(entry_keywords)
-            jaccard_similarity = len(intersection) / len(union)
-            relevance_score += jaccard_similarity * 0.4
+    def _calculate_context_relevance(self, entry: KnowledgeEntry, context_matches: int,
+                                     text_similarity: float) -> float:
+        """Combine index matches for an entry into a relevance score."""
+        relevance_score = context_matches * 0.3 + text_similarity * 0.4
         
         # Factor in evidence strength
         relevance_score *= entry.evidence_strength
@@ -696,6 +1056,7 @@ class KnowledgeManager:
     def transfer_knowledge_to_agent(self, agent_id: str, context: Dict[str, Any]) -> Dict[str, Any]:
         """Transfer relevant knowledge to another agent."""
         relevant_knowledge = self.get_relevant_knowledge(context)
+        context_str = str(context).lower()
         
         transfer_package = {
             'agent_id': agent_id,
@@ -703,11 +1064,11 @@ class KnowledgeManager:
             'knowledge_entries': [asdict(entry) for entry in relevant_knowledge],
             'best_practices': {
                 category: practices for category, practices in self.best_practices.items()
-                if any(keyword in str(context).lower() for keyword in category.lower().split())
+                if any(keyword in context_str for keyword in category.lower().split())
             },
             'anti_patterns': {
                 category: patterns for category, patterns in self.anti_patterns.items()
-                if any(keyword in str(context).lower() for keyword in category.lower().split())
+                if any(keyword in context_str for keyword in category.lower().split())
             }
         }
         
@@ -722,14 +1083,13 @@ class LearningSystem:
         self.agent_id = config.get('agent_id', str(uuid.uuid4()))
         
         # Core components
-        self.experience_processor = ExperienceProcessor()
+        self.experience_processor = ExperienceProcessor(config.get('n_clusters', 8))
         self.strategy_optimizer = StrategyOptimizer()
         self.knowledge_manager = KnowledgeManager(
             config.get('knowledge_db_path', 'knowledge_base.db')
         )
         
         # Storage
-        self.experiences: Dict[str, Experience] = {}
         self.patterns: Dict[str, Pattern] = {}
         self.strategy_updates: List[StrategyUpdate] = []
         
@@ -746,6 +1106,10 @@ class LearningSystem:
         self.db_path = config.get('learning_db_path', 'learning_system.db')
         self._initialize_database()
         
+        # Experiences are persisted in full but only a bounded sample is kept in memory
+        self.experiences = ExperienceStore(self.db_path, self.agent_id, self.max_experiences)
+        self.metrics.total_experiences = self.experiences.seen
+        
         # Thread safety
         self.learning_lock = threading.RLock()
         
@@ -838,13 +1202,10 @@ class LearningSystem:
                     metadata=execution_result.get('metadata', {})
                 )
                 
-                # Store experience
-                self.experiences[experience.experience_id] = experience
+                # Store experience in the database and the in-memory sample
+                self.experiences.add(experience)
                 self.metrics.total_experiences += 1
                 
-                # Store in database
-                await self._store_experience(experience)
-                
                 # Trigger learning if we have enough new experiences
                 if self.metrics.total_experiences % self.learning_frequency == 0:
                     await self._trigger_learning_session()
@@ -858,15 +1219,19 @@ class LearningSystem:
         """Extract learning patterns from recorded experiences."""
         try:
             with self.learning_lock:
-                experiences_list = list(self.experiences.values())
+                # Only experiences recorded since the last session update the clusters
+                self.experience_processor.update_clusters(self.experiences.take_pending())
+                
+                experiences_list, features = self.experiences.snapshot()
                 
                 if len(experiences_list) < self.min_pattern_support:
                     return []
                 
                 # Extract different types of patterns
-                success_patterns = self.experience_processor.identify_success_patterns(experiences_list)
-                failure_patterns = self.experience_processor.identify_failure_patterns(experiences_list)
-                efficiency_patterns = self.experience_processor.identify_efficiency_patterns(experiences_list)
+                processor = self.experience_processor
+                success_patterns = processor.identify_success_patterns(experiences_list, features)
+                failure_patterns = processor.identify_failure_patterns(experiences_list, features)
+                efficiency_patterns = processor.identify_efficiency_patterns(experiences_list, features)
                 
                 all_patterns = success_patterns + failure_patterns + efficiency_patterns
                 
@@ -1144,42 +1509,10 @@ class LearningSystem:
         }
     
     # Database storage methods
-    async def _store_experience(self, experience: Experience):
-        """Store experience in database."""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            conn.execute('''
-                INSERT INTO experiences
-                (experience_id, timestamp, experience_type, agent_id, task_context,
-                 actions_taken, outcomes, metrics, success, execution_time,
-                 resource_usage, error_info, recovery_actions, collaboration_data, metadata)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                experience.experience_id,
-                experience.timestamp.isoformat(),
-                experience.experience_type.value,
-                experience.agent_id,
-                json.dumps(experience.task_context),
-                json.dumps(experience.actions_taken),
-                json.dumps(experience.outcomes),
-                json.dumps(experience.metrics),
-                1 if experience.success else 0,
-                experience.execution_time,
-                json.dumps(experience.resource_usage),
-                json.dumps(experience.error_info) if experience.error_info else None,
-                json.dumps(experience.recovery_actions),
-                json.dumps(experience.collaboration_data) if experience.collaboration_data else None,
-                json.dumps(experience.metadata)
-            ))
-            conn.commit()
-            conn.close()
-        except Exception as e:
-            logger.error(f"Failed to store experience: {e}")
-    
     async def _store_pattern(self, pattern: Pattern):
         """Store pattern in database."""
+        conn = sqlite3.connect(self.db_path)
         try:
-            conn = sqlite3.connect(self.db_path)
             conn.execute('''
                 INSERT OR REPLACE INTO patterns
                 (pattern_id, pattern_type, pattern_name, description, conditions,
@@ -1206,14 +1539,15 @@ class LearningSystem:
                 json.dumps(list(pattern.tags))
             ))
             conn.commit()
-            conn.close()
         except Exception as e:
             logger.error(f"Failed to store pattern: {e}")
+        finally:
+            conn.close()
     
     async def _store_strategy_update(self, update: StrategyUpdate):
         """Store strategy update in database."""
+        conn = sqlite3.connect(self.db_path)
         try:
-            conn = sqlite3.connect(self.db_path)
             conn.execute('''
                 INSERT INTO strategy_updates
                 (strategy_id, update_type, old_parameters, new_parameters,
@@ -1231,9 +1565,10 @@ class LearningSystem:
                 datetime.now().isoformat()
             ))
             conn.commit()
-            conn.close()
         except Exception as e:
             logger.error(f"Failed to store strategy update: {e}")
+        finally:
+            conn.close()
     
     # Public utility methods
     def get_learning_statistics(self) -> Dict[str, Any]:
@@ -7,6 +7,7 @@ code execution, validation, and dynamic tool management.
 
 from .file_system import SecureFileSystemManager, FileOperation, SecurityLevel, SandboxConfig
 from .code_executor import CodeExecutor, ExecutionLanguage, ExecutionStatus, ResourceLimits, ExecutionResult
+from .resource_accounting import ResourceUsage
 from .validation import ValidationFramework, ValidationLevel, TestType, ValidationResult, TestResults
 from .tool_registry import (
     ToolRegistry, 
@@ -37,6 +38,7 @@ __all__ = [
     "ExecutionStatus", 
     "ResourceLimits",
     "ExecutionResult",
+    "ResourceUsage",
     
     # Validation
     "ValidationFramework",
@@ -1,4 +1,5 @@
 import asyncio
+import hashlib
 import json
 import os
 import re
@@ -9,10 +10,13 @@ import traceback
 import signal
 import shutil
 import subprocess
+import threading
+import functools
 from pathlib import Path
 from typing import Dict, List, Any, Optional, Union, AsyncGenerator, Tuple
 from datetime import datetime, timedelta
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, astuple, replace
+from collections import OrderedDict
 from enum import Enum
 from contextlib import asynccontextmanager
 import psutil
@@ -21,6 +25,10 @@ from loguru import logger
 import ast
 import resource
 
+from .sandbox_pool import SandboxPool, set_soft_limit
+from .safety_scanner import scan_python, scan_javascript
+from .resource_accounting import ResourceUsage, CgroupAccounting, run_accounted, summarize_usage
+
 
 class ExecutionLanguage(Enum):
     PYTHON = "python"
@@ -84,6 +92,7 @@ class ExecutionResult:
     network_activity: Dict[str, Any] = field(default_factory=dict)
     error_analysis: Optional[Dict[str, Any]] = None
     performance_profile: Optional[Dict[str, Any]] = None
+    resource_usage: Optional[ResourceUsage] = None
 
 
 @dataclass
@@ -97,10 +106,16 @@ class CodeValidationResult:
 class DangerousPatternDetector:
     """Detect dangerous patterns in code before execution."""
     
-    def __init__(self, security_level: SecurityLevel = SecurityLevel.MEDIUM):
+    def __init__(self, security_level: SecurityLevel = SecurityLevel.MEDIUM, cache_size: int = 1024):
         self.security_level = security_level
         
-        # Dangerous patterns by category
+        # Verdicts by code hash, so retries and batches of the same snippet skip rescanning
+        self.cache_size = cache_size
+        self._verdict_cache: "OrderedDict[str, CodeValidationResult]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        
+        # Dangerous patterns by category (regex fallback for Python that does not parse)
         self.patterns = {
             'system_calls': [
                 r'os\.system\s*\(',
@@ -161,6 +176,34 @@ class DangerousPatternDetector:
 
     def validate_code(self, code: str, language: ExecutionLanguage) -> CodeValidationResult:
         """Validate code for dangerous patterns."""
+        key = hashlib.sha256(f"{language.value}\0{code}".encode('utf-8')).hexdigest()
+        cached = self._verdict_cache.get(key)
+        if cached is not None:
+            self.cache_hits += 1
+            self._verdict_cache.move_to_end(key)
+            return replace(cached, detected_patterns=list(cached.detected_patterns),
+                           recommendations=list(cached.recommendations))
+        
+        self.cache_misses += 1
+        result = self._scan(code, language)
+        
+        self._verdict_cache[key] = result
+        if len(self._verdict_cache) > self.cache_size:
+            self._verdict_cache.popitem(last=False)
+        return replace(result, detected_patterns=list(result.detected_patterns),
+                       recommendations=list(result.recommendations))
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Verdict cache statistics."""
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            'size': len(self._verdict_cache),
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'hit_rate': self.cache_hits / lookups if lookups else 0.0
+        }
+
+    def _scan(self, code: str, language: ExecutionLanguage) -> CodeValidationResult:
         detected_patterns = []
         risk_level = "low"
         
@@ -194,23 +237,13 @@ class DangerousPatternDetector:
 
     def _validate_python_code(self, code: str) -> List[str]:
         """Validate Python code specifically."""
-        detected = []
-        
-        # Try to parse AST for deeper analysis
+        # Single AST pass with import aliases resolved
         try:
-            tree = ast.parse(code)
-            for node in ast.walk(tree):
-                if isinstance(node, ast.Call):
-                    if isinstance(node.func, ast.Name):
-                        if node.func.id in ['eval', 'exec', 'compile', '__import__']:
-                            detected.append(f"system_calls: {node.func.id}")
-                    elif isinstance(node.func, ast.Attribute):
-                        if node.func.attr in ['system', 'popen']:
-                            detected.append(f"system_calls: {node.func.attr}")
-        except SyntaxError:
-            detected.append("syntax_error: Invalid Python syntax")
-        
-        # Pattern-based detection
+            return scan_python(code)
+        except (SyntaxError, ValueError):
+            detected = ["syntax_error: Invalid Python syntax"]
+        
+        # Code that does not parse falls back to pattern-based detection
         for category, patterns in self.compiled_patterns.items():
             for pattern in patterns:
                 if pattern.search(code):
@@ -245,25 +278,8 @@ class DangerousPatternDetector:
 
     def _validate_javascript_code(self, code: str) -> List[str]:
         """Validate JavaScript/Node.js code."""
-        detected = []
-        
-        js_patterns = [
-            r'require\s*\(\s*["\']fs["\']',
-            r'require\s*\(\s*["\']child_process["\']',
-            r'require\s*\(\s*["\']os["\']',
-            r'eval\s*\(',
-            r'Function\s*\(',
-            r'process\.exit',
-            r'process\.env',
-            r'global\.',
-            r'Buffer\.',
-        ]
-        
-        for pattern in js_patterns:
-            if re.search(pattern, code, re.IGNORECASE):
-                detected.append(f"javascript_risk: {pattern}")
-        
-        return detected
+        # Tokenizer pass: strings, comments and regex literals never match
+        return scan_javascript(code)
 
     def _assess_safety(self, detected_patterns: List[str], risk_level: str) -> bool:
         """Assess if code is safe based on security level."""
@@ -356,6 +372,18 @@ class CodeExecutor:
         self.base_workdir = Path(config.get("workdir", tempfile.gettempdir())) / "code_executor"
         self.base_workdir.mkdir(parents=True, exist_ok=True)
         
+        # Warm interpreter pools for local execution, keyed by language and resource limits
+        pool_config = config.get("worker_pool", {})
+        self.use_worker_pool = pool_config.get("enabled", True)
+        self.worker_pool_size = max(1, pool_config.get("size", min(4, os.cpu_count() or 1)))
+        self.worker_max_runs = pool_config.get("max_runs_per_worker", 100)
+        self.worker_pool_dir = self.base_workdir.with_name("code_executor_pool")
+        self.worker_pools: Dict[Tuple[ExecutionLanguage, tuple], SandboxPool] = {}
+        
+        # Per-run cgroups give exact accounting when a delegated cgroup v2 directory is configured
+        cgroup_root = config.get("resource_accounting", {}).get("cgroup_root")
+        self.cgroups = CgroupAccounting(cgroup_root) if cgroup_root else None
+        
         # Language configurations
         self.language_configs = {
             ExecutionLanguage.PYTHON: {
@@ -534,8 +562,14 @@ class CodeExecutor:
             task_coroutine = self._execute_code(code, execution_env, None, limits)
             execution_tasks.append(task_coroutine)
         
-        # Execute all tasks concurrently
-        results = await asyncio.gather(*execution_tasks, return_exceptions=True)
+        # Execute concurrently, never more at once than there are warm workers
+        semaphore = asyncio.Semaphore(self.worker_pool_size)
+        
+        async def run_bounded(task_coroutine):
+            async with semaphore:
+                return await task_coroutine
+        
+        results = await asyncio.gather(*(run_bounded(t) for t in execution_tasks), return_exceptions=True)
         
         # Handle exceptions
         processed_results = []
@@ -731,6 +765,11 @@ class CodeExecutor:
         exec_workdir.mkdir(parents=True, exist_ok=True)
         
         try:
+            # Snippets a warm worker can take skip interpreter startup
+            pool = self._get_worker_pool(env.language, limits, code)
+            if pool is not None:
+                return await self._execute_pooled(pool, execution_id, code, env, exec_workdir)
+            
             # Write code to file
             code_file = exec_workdir / f"code{lang_config['file_extension']}"
             with open(code_file, 'w') as f:
@@ -746,58 +785,42 @@ class CodeExecutor:
             else:
                 raise ValueError(f"Local execution not supported for {env.language}")
             
-            # Set resource limits
+            # Set resource limits (soft limits, within the inherited hard limits)
             def set_limits():
                 # Memory limit
-                resource.setrlimit(resource.RLIMIT_AS, (limits.max_memory_mb * 1024 * 1024, -1))
+                set_soft_limit(resource.RLIMIT_AS, limits.max_memory_mb * 1024 * 1024)
                 # CPU time limit
-                resource.setrlimit(resource.RLIMIT_CPU, (limits.max_execution_time, -1))
+                set_soft_limit(resource.RLIMIT_CPU, limits.max_execution_time)
                 # Process limit
-                resource.setrlimit(resource.RLIMIT_NPROC, (limits.max_processes, -1))
+                set_soft_limit(resource.RLIMIT_NPROC, limits.max_processes)
                 # File descriptor limit
-                resource.setrlimit(resource.RLIMIT_NOFILE, (limits.max_file_descriptors, -1))
-            
-            # Execute process
-            start_time = time.time()
+                set_soft_limit(resource.RLIMIT_NOFILE, limits.max_file_descriptors)
             
+            # Execute process, reaping it ourselves to collect its rusage
+            stop_event = threading.Event()
+            run = functools.partial(
+                run_accounted, cmd, str(exec_workdir), {**os.environ, **env.environment_variables},
+                preexec_fn=set_limits, timeout=limits.max_execution_time,
+                cgroups=self.cgroups, stop_event=stop_event
+            )
             try:
-                process = await asyncio.create_subprocess_exec(
-                    *cmd,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE,
-                    cwd=exec_workdir,
-                    env={**os.environ, **env.environment_variables},
-                    preexec_fn=set_limits
-                )
-                
-                # Wait for completion with timeout
-                stdout, stderr = await asyncio.wait_for(
-                    process.communicate(),
-                    timeout=limits.max_execution_time
-                )
-                
-                execution_time = time.time() - start_time
-                exit_code = process.returncode
-                status = ExecutionStatus.COMPLETED if exit_code == 0 else ExecutionStatus.FAILED
-                
-            except asyncio.TimeoutError:
-                execution_time = time.time() - start_time
-                if process:
-                    process.kill()
-                    await process.wait()
-                
-                stdout = b""
-                stderr = b"Execution timeout"
+                accounted = await asyncio.get_running_loop().run_in_executor(None, run)
+            except asyncio.CancelledError:
+                stop_event.set()
+                raise
+            
+            usage = accounted.usage
+            execution_time = usage.wall_time_s
+            if accounted.timed_out:
+                stdout_str = ""
+                stderr_str = "Execution timeout"
                 exit_code = -1
                 status = ExecutionStatus.TIMEOUT
-            
-            # Decode output
-            stdout_str = stdout.decode('utf-8', errors='replace') if stdout else ""
-            stderr_str = stderr.decode('utf-8', errors='replace') if stderr else ""
-            
-            # Monitor resource usage (simplified)
-            memory_peak = 0.0
-            cpu_usage = 0.0
+            else:
+                stdout_str = accounted.stdout.decode('utf-8', errors='replace')
+                stderr_str = accounted.stderr.decode('utf-8', errors='replace')
+                exit_code = accounted.exit_code
+                status = ExecutionStatus.COMPLETED if exit_code == 0 else ExecutionStatus.FAILED
             
             # Check for file changes
             files_created, files_modified = await self._scan_file_changes(exec_workdir)
@@ -809,16 +832,75 @@ class CodeExecutor:
                 stdout=stdout_str,
                 stderr=stderr_str,
                 execution_time=execution_time,
-                memory_peak_mb=memory_peak,
-                cpu_usage_percent=cpu_usage,
+                memory_peak_mb=usage.peak_rss_mb,
+                cpu_usage_percent=usage.cpu_percent,
                 files_created=files_created,
-                files_modified=files_modified
+                files_modified=files_modified,
+                resource_usage=usage
             )
             
         finally:
             # Cleanup
             shutil.rmtree(exec_workdir, ignore_errors=True)
 
+    def _get_worker_pool(self, language: ExecutionLanguage, limits: ResourceLimits,
+                         code: str) -> Optional[SandboxPool]:
+        """Warm worker pool for a snippet, or None if it must run in a fresh process."""
+        if not self.use_worker_pool or language.value not in SandboxPool.LANGUAGES:
+            return None
+        if not SandboxPool.supports(language.value, code):
+            return None
+        
+        key = (language, astuple(limits))
+        pool = self.worker_pools.get(key)
+        if pool is None:
+            pool = SandboxPool(
+                language.value, limits, self.worker_pool_dir,
+                size=self.worker_pool_size, max_runs=self.worker_max_runs
+            )
+            self.worker_pools[key] = pool
+        return pool
+
+    async def _execute_pooled(self, pool: SandboxPool, execution_id: str, code: str,
+                              env: ExecutionEnvironment, exec_workdir: Path) -> ExecutionResult:
+        """Execute code in a warm sandbox worker."""
+        start_time = time.time()
+        reply = await pool.execute(code, str(exec_workdir), env.environment_variables)
+        execution_time = time.time() - start_time
+        
+        usage = None
+        if reply.get('rusage'):
+            usage = ResourceUsage.from_rusage(reply['rusage'], execution_time, reply.get('child_processes', 0))
+        
+        if reply['timed_out']:
+            exit_code = -1
+            status = ExecutionStatus.TIMEOUT
+        else:
+            exit_code = reply['exit_code']
+            status = ExecutionStatus.COMPLETED if exit_code == 0 else ExecutionStatus.FAILED
+        
+        files_created, files_modified = await self._scan_file_changes(exec_workdir)
+        
+        return ExecutionResult(
+            execution_id=execution_id,
+            status=status,
+            exit_code=exit_code,
+            stdout=reply['stdout'],
+            stderr=reply['stderr'],
+            execution_time=execution_time,
+            memory_peak_mb=usage.peak_rss_mb if usage else 0.0,
+            cpu_usage_percent=usage.cpu_percent if usage else 0.0,
+            files_created=files_created,
+            files_modified=files_modified,
+            resource_usage=usage
+        )
+
+    async def close(self):
+        """Stop all warm sandbox workers."""
+        for pool in self.worker_pools.values():
+            await pool.close()
+        self.worker_pools.clear()
+
     async def _scan_file_changes(self, workdir: Path) -> Tuple[List[str], List[str]]:
         """Scan for created and modified files in working directory."""
         created_files = []
@@ -928,6 +1010,16 @@ class CodeExecutor:
         
         profile['efficiency_score'] = (time_score + memory_score + success_score) / 3
         
+        # Measured CPU tells compute-bound runs from ones that mostly waited
+        usage = result.resource_usage
+        if usage and usage.wall_time_s > 1.0:
+            if usage.cpu_percent >= 90:
+                profile['bottlenecks'].append('CPU-bound')
+                profile['optimizations'].append('Reduce computational work or parallelize')
+            elif usage.cpu_percent < 10:
+                profile['bottlenecks'].append('Mostly idle (waiting on I/O, sleep or subprocesses)')
+        
+        
         return profile
 
     def _store_execution_result(self, result: ExecutionResult):
@@ -965,7 +1057,8 @@ class CodeExecutor:
                 'total_executions': 0,
                 'success_rate': 0.0,
                 'average_execution_time': 0.0,
-                'average_memory_usage': 0.0
+                'average_memory_usage': 0.0,
+                'resource_usage': summarize_usage([])
             }
         
         total = len(self.execution_history)
@@ -980,7 +1073,10 @@ class CodeExecutor:
             'average_execution_time': avg_time,
             'average_memory_usage': avg_memory,
             'active_executions': len(self.active_executions),
-            'docker_available': self.use_docker
+            'docker_available': self.use_docker,
+            'validation_cache': self.pattern_detector.get_cache_stats(),
+            'resource_usage': summarize_usage([r.resource_usage for r in self.execution_history if r.resource_usage]),
+            'worker_pools': [pool.get_stats() for pool in self.worker_pools.values()]
         }
 
     async def cleanup_old_executions(self, max_age_hours: int = 24) -> int:
@@ -0,0 +1,357 @@
+"""
+Per-execution resource accounting for sandboxed code runs.
+
+Measurements come from the kernel rather than from sampling the process:
+
+- rusage from wait4() on the reaped process gives CPU user/system time,
+  peak RSS and block I/O for the run and every descendant it waited for.
+- When a delegated cgroup v2 directory is configured, each run gets its own
+  child cgroup and its cpu.stat, memory.peak, io.stat and pids.peak
+  override the rusage figures. This also covers descendants that were
+  never waited for.
+
+Without cgroups, the number of child processes is counted by walking the
+process tree while the run is alive.
+"""
+
+import os
+import selectors
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from loguru import logger
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+# How often a running process tree is checked for new children
+SAMPLE_INTERVAL = 0.05
+
+# ru_inblock/ru_oublock count 512-byte blocks
+_BLOCK_SIZE = 512
+
+
+@dataclass
+class ResourceUsage:
+    """Resources consumed by one execution."""
+    wall_time_s: float = 0.0
+    cpu_user_s: float = 0.0
+    cpu_system_s: float = 0.0
+    peak_rss_mb: float = 0.0
+    io_read_bytes: int = 0
+    io_write_bytes: int = 0
+    child_processes: int = 0
+    source: str = "none"  # rusage, cgroup or none
+
+    @property
+    def cpu_time_s(self) -> float:
+        return self.cpu_user_s + self.cpu_system_s
+
+    @property
+    def cpu_percent(self) -> float:
+        """CPU time as a percentage of wall time (above 100 when several cores were busy)."""
+        return 100.0 * self.cpu_time_s / self.wall_time_s if self.wall_time_s > 0 else 0.0
+
+    @classmethod
+    def from_rusage(cls, usage: Any, wall_time_s: float, child_processes: int = 0) -> "ResourceUsage":
+        """Build from a resource.struct_rusage or a dict with the same ru_* fields."""
+        if isinstance(usage, dict):
+            get = usage.get
+        else:
+            get = lambda name: getattr(usage, name, 0)
+        return cls(
+            wall_time_s=wall_time_s,
+            cpu_user_s=float(get("ru_utime") or 0.0),
+            cpu_system_s=float(get("ru_stime") or 0.0),
+            # ru_maxrss is in kilobytes on Linux
+            peak_rss_mb=(get("ru_maxrss") or 0) / 1024,
+            io_read_bytes=int(get("ru_inblock") or 0) * _BLOCK_SIZE,
+            io_write_bytes=int(get("ru_oublock") or 0) * _BLOCK_SIZE,
+            child_processes=child_processes,
+            source="rusage"
+        )
+
+
+class DescendantCounter:
+    """Counts distinct descendant processes of a running process by sampling its tree."""
+
+    def __init__(self, root_pid: int, skip_direct_children: bool = False):
+        self.root_pid = root_pid
+        self.skip_direct_children = skip_direct_children
+        self.seen: Set[int] = set()
+        self._root = None
+        if PSUTIL_AVAILABLE:
+            try:
+                self._root = psutil.Process(root_pid)
+            except psutil.Error:
+                pass
+
+    def sample(self):
+        if self._root is None:
+            return
+        try:
+            children = self._root.children(recursive=True)
+        except psutil.Error:
+            return
+        if self.skip_direct_children:
+            direct = {child.pid for child in self._root.children()} if children else set()
+            self.seen.update(child.pid for child in children if child.pid not in direct)
+        else:
+            self.seen.update(child.pid for child in children)
+
+    @property
+    def count(self) -> int:
+        return len(self.seen)
+
+
+class CgroupAccounting:
+    """Per-run child cgroups under a delegated cgroup v2 directory."""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.available = (self.root / "cgroup.procs").exists() and os.access(self.root, os.W_OK)
+        if not self.available:
+            logger.warning(f"cgroup v2 accounting unavailable at {self.root}; using rusage")
+
+    def create(self) -> Optional[Path]:
+        if not self.available:
+            return None
+        path = self.root / f"exec-{uuid.uuid4().hex[:12]}"
+        try:
+            path.mkdir()
+            return path
+        except OSError as e:
+            logger.debug(f"Failed to create cgroup {path}: {e}")
+            return None
+
+    @staticmethod
+    def joiner(path: Path) -> Callable[[], None]:
+        """preexec_fn step that moves the new process into the cgroup."""
+        procs = str(path / "cgroup.procs")
+
+        def join():
+            with open(procs, "w") as f:
+                f.write("0")
+
+        return join
+
+    @staticmethod
+    def _read_keyed(path: Path) -> Dict[str, int]:
+        values: Dict[str, int] = {}
+        try:
+            for line in path.read_text().splitlines():
+                key, _, value = line.partition(" ")
+                if value.strip().isdigit():
+                    values[key] = int(value)
+        except OSError:
+            pass
+        return values
+
+    @staticmethod
+    def _read_int(path: Path) -> Optional[int]:
+        try:
+            return int(path.read_text().strip())
+        except (OSError, ValueError):
+            return None
+
+    def apply(self, path: Path, usage: ResourceUsage):
+        """Override `usage` with whatever counters the cgroup exposes."""
+        cpu = self._read_keyed(path / "cpu.stat")
+        if "user_usec" in cpu:
+            usage.cpu_user_s = cpu["user_usec"] / 1e6
+            usage.cpu_system_s = cpu.get("system_usec", 0) / 1e6
+            usage.source = "cgroup"
+
+        peak = self._read_int(path / "memory.peak")
+        if peak is not None:
+            usage.peak_rss_mb = peak / (1024 * 1024)
+
+        try:
+            io_lines = (path / "io.stat").read_text().splitlines()
+        except OSError:
+            io_lines = None
+        if io_lines is not None:
+            read_bytes = write_bytes = 0
+            for line in io_lines:
+                for field in line.split()[1:]:
+                    key, _, value = field.partition("=")
+                    if key == "rbytes":
+                        read_bytes += int(value)
+                    elif key == "wbytes":
+                        write_bytes += int(value)
+            usage.io_read_bytes, usage.io_write_bytes = read_bytes, write_bytes
+
+        pids_peak = self._read_int(path / "pids.peak")
+        if pids_peak is not None:
+            usage.child_processes = max(0, pids_peak - 1)
+
+    def remove(self, path: Path):
+        # Stragglers the run left behind keep the cgroup busy; kill them first
+        kill_file = path / "cgroup.kill"
+        if kill_file.exists():
+            try:
+                kill_file.write_text("1")
+            except OSError:
+                pass
+        for _ in range(20):
+            try:
+                path.rmdir()
+                return
+            except FileNotFoundError:
+                return
+            except OSError:
+                time.sleep(0.01)
+        logger.debug(f"Leaving busy cgroup {path}")
+
+
+@dataclass
+class AccountedRun:
+    """Outcome of run_accounted."""
+    exit_code: int
+    stdout: bytes
+    stderr: bytes
+    timed_out: bool
+    cancelled: bool
+    usage: ResourceUsage
+
+
+def run_accounted(cmd: List[str], cwd: str, env: Dict[str, str],
+                  preexec_fn: Optional[Callable[[], None]] = None,
+                  timeout: Optional[float] = None,
+                  cgroups: Optional[CgroupAccounting] = None,
+                  stop_event: Optional[threading.Event] = None) -> AccountedRun:
+    """
+    Run a command to completion and measure what it consumed.
+
+    Blocking; call it from an executor thread. The process gets its own
+    session so a timeout or `stop_event` kills everything it started.
+    """
+    cgroup = cgroups.create() if cgroups else None
+    setup = preexec_fn
+    if cgroup is not None:
+        join = CgroupAccounting.joiner(cgroup)
+
+        def setup():
+            join()
+            if preexec_fn:
+                preexec_fn()
+
+    start = time.monotonic()
+    deadline = start + timeout if timeout else None
+    try:
+        process = subprocess.Popen(
+            cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            cwd=cwd, env=env, preexec_fn=setup, start_new_session=True
+        )
+    except BaseException:
+        if cgroup is not None:
+            cgroups.remove(cgroup)
+        raise
+
+    counter = DescendantCounter(process.pid)
+    next_sample = start
+    output = {process.stdout: [], process.stderr: []}
+    status = rusage = None
+    timed_out = cancelled = False
+    wall_time = 0.0
+
+    try:
+        with selectors.DefaultSelector() as selector:
+            for pipe in output:
+                selector.register(pipe, selectors.EVENT_READ)
+
+            while status is None or selector.get_map():
+                if deadline is not None and time.monotonic() >= deadline:
+                    timed_out = True
+                    break
+                if stop_event is not None and stop_event.is_set():
+                    cancelled = True
+                    break
+
+                if selector.get_map():
+                    for key, _ in selector.select(SAMPLE_INTERVAL):
+                        chunk = os.read(key.fd, 65536)
+                        if chunk:
+                            output[key.fileobj].append(chunk)
+                        else:
+                            selector.unregister(key.fileobj)
+                else:
+                    time.sleep(SAMPLE_INTERVAL)
+
+                if status is None:
+                    now = time.monotonic()
+                    if now >= next_sample:
+                        counter.sample()
+                        next_sample = now + SAMPLE_INTERVAL
+                    pid, wait_status, wait_rusage = os.wait4(process.pid, os.WNOHANG)
+                    if pid:
+                        status, rusage = wait_status, wait_rusage
+                        wall_time = time.monotonic() - start
+
+        if timed_out or cancelled:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            if status is None:
+                _, status, rusage = os.wait4(process.pid, 0)
+                wall_time = time.monotonic() - start
+    finally:
+        if status is None:
+            # Interrupted by an exception; don't leave the process running
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            _, status, rusage = os.wait4(process.pid, 0)
+        # Reaped here, so Popen must not wait for it again
+        process.returncode = os.waitstatus_to_exitcode(status)
+        process.stdout.close()
+        process.stderr.close()
+
+        usage = ResourceUsage.from_rusage(rusage, wall_time or time.monotonic() - start, counter.count)
+        if cgroup is not None:
+            cgroups.apply(cgroup, usage)
+            cgroups.remove(cgroup)
+
+    return AccountedRun(
+        exit_code=process.returncode,
+        stdout=b"".join(output[process.stdout]),
+        stderr=b"".join(output[process.stderr]),
+        timed_out=timed_out,
+        cancelled=cancelled,
+        usage=usage
+    )
+
+
+def summarize_usage(usages: List[ResourceUsage]) -> Dict[str, Any]:
+    """Aggregate resource usage across executions for statistics."""
+    if not usages:
+        return {'measured_executions': 0}
+
+    count = len(usages)
+    sources: Dict[str, int] = {}
+    for usage in usages:
+        sources[usage.source] = sources.get(usage.source, 0) + 1
+
+    return {
+        'measured_executions': count,
+        'total_cpu_user_s': sum(u.cpu_user_s for u in usages),
+        'total_cpu_system_s': sum(u.cpu_system_s for u in usages),
+        'average_cpu_percent': sum(u.cpu_percent for u in usages) / count,
+        'average_peak_rss_mb': sum(u.peak_rss_mb for u in usages) / count,
+        'max_peak_rss_mb': max(u.peak_rss_mb for u in usages),
+        'total_io_read_bytes': sum(u.io_read_bytes for u in usages),
+        'total_io_write_bytes': sum(u.io_write_bytes for u in usages),
+        'total_child_processes': sum(u.child_processes for u in usages),
+        'sources': sources
+    }
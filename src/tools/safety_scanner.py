@@ -0,0 +1,621 @@
+"""
+Static safety scanners for Python and JavaScript snippets.
+
+Each scanner makes a single pass over the parsed code, rather than
+running a regex over the raw text. Because of that:
+
+- String contents and comments never match: "http." inside a message is
+  not a network call.
+- Import aliases are resolved. `import subprocess as sp; sp.run(...)`,
+  `from os import system as s` and `const { exec: run } =
+  require('child_process')` are reported under their real names.
+
+Findings are "category: name" strings using the DangerousPatternDetector
+categories, so risk levels and recommendations work unchanged.
+"""
+
+import ast
+import re
+from typing import Dict, List, Optional, Tuple
+
+
+# Python rules. Names are fully qualified after alias resolution.
+
+_PY_CALLS: Dict[str, str] = {
+    'eval': 'system_calls',
+    'exec': 'system_calls',
+    'compile': 'system_calls',
+    '__import__': 'system_calls',
+    'os.system': 'system_calls',
+    'os.popen': 'system_calls',
+    'pty.spawn': 'system_calls',
+    'globals': 'environment_manipulation',
+    'locals': 'environment_manipulation',
+    'os.putenv': 'environment_manipulation',
+    'os.unsetenv': 'environment_manipulation',
+    'shutil.rmtree': 'file_operations',
+    'shutil.move': 'file_operations',
+    'shutil.copy': 'file_operations',
+    'shutil.copy2': 'file_operations',
+    'shutil.copyfile': 'file_operations',
+    'shutil.copytree': 'file_operations',
+    'os.remove': 'file_operations',
+    'os.unlink': 'file_operations',
+    'os.rmdir': 'file_operations',
+    'os.removedirs': 'file_operations',
+    'os.rename': 'file_operations',
+    'os.renames': 'file_operations',
+    'os.replace': 'file_operations',
+    'os.truncate': 'file_operations',
+    'os.open': 'file_operations',
+    'os.setuid': 'privilege_escalation',
+    'os.setgid': 'privilege_escalation',
+    'os.seteuid': 'privilege_escalation',
+    'os.setegid': 'privilege_escalation',
+    'os.setreuid': 'privilege_escalation',
+    'os.setregid': 'privilege_escalation',
+    'os.chmod': 'privilege_escalation',
+    'os.chown': 'privilege_escalation',
+    'os.lchown': 'privilege_escalation',
+    'os.fchmod': 'privilege_escalation',
+    'os.fchown': 'privilege_escalation',
+    'shutil.chown': 'privilege_escalation',
+}
+
+_PY_CALL_PREFIXES: Tuple[Tuple[str, str], ...] = (
+    ('subprocess.', 'system_calls'),
+    ('os.exec', 'system_calls'),
+    ('os.spawn', 'system_calls'),
+    ('os.posix_spawn', 'system_calls'),
+    ('asyncio.create_subprocess_', 'process_manipulation'),
+)
+
+# Attribute reads that matter even without a call
+_PY_ATTRIBUTES: Dict[str, str] = {
+    'os.environ': 'environment_manipulation',
+    'os.environb': 'environment_manipulation',
+    'sys.path': 'environment_manipulation',
+    'sys.modules': 'environment_manipulation',
+}
+
+_PY_NAMES: Dict[str, str] = {
+    '__builtins__': 'environment_manipulation',
+    '__import__': 'system_calls',
+}
+
+# Introspection attributes used to climb out of a restricted namespace, on any object
+_PY_ESCAPE_ATTRIBUTES: Dict[str, str] = {
+    '__subclasses__': 'system_calls',
+    '__globals__': 'environment_manipulation',
+    '__builtins__': 'environment_manipulation',
+    '__import__': 'system_calls',
+}
+
+# Importing these modules at all is reported
+_PY_MODULES: Dict[str, str] = {
+    'socket': 'network_operations',
+    'urllib': 'network_operations',
+    'urllib3': 'network_operations',
+    'requests': 'network_operations',
+    'http': 'network_operations',
+    'httpx': 'network_operations',
+    'aiohttp': 'network_operations',
+    'ftplib': 'network_operations',
+    'smtplib': 'network_operations',
+    'poplib': 'network_operations',
+    'imaplib': 'network_operations',
+    'telnetlib': 'network_operations',
+    'paramiko': 'network_operations',
+    'asyncssh': 'network_operations',
+    'websockets': 'network_operations',
+    'importlib': 'environment_manipulation',
+    'builtins': 'environment_manipulation',
+    'ctypes': 'system_calls',
+    'threading': 'process_manipulation',
+    '_thread': 'process_manipulation',
+    'multiprocessing': 'process_manipulation',
+    'concurrent': 'process_manipulation',
+    'signal': 'process_manipulation',
+}
+
+# pathlib-style methods that destroy files, whatever object they are called on
+_PY_DESTRUCTIVE_METHODS = {'unlink', 'rmdir'}
+
+# Commands passed to a shell or subprocess that escalate privileges
+_PRIVILEGED_COMMANDS = {'sudo', 'su', 'doas', 'chmod', 'chown', 'setuid'}
+
+_WRITE_MODE_CHARS = set('wax+')
+
+
+def _add(findings: Dict[str, None], category: str, name: str):
+    findings[f"{category}: {name}"] = None
+
+
+# Last component of every _PY_ATTRIBUTES entry, to skip resolving unrelated attributes
+_PY_ATTRIBUTE_TAILS = {name.rsplit('.', 1)[-1] for name in _PY_ATTRIBUTES} | set(_PY_ESCAPE_ATTRIBUTES)
+
+
+# Node types with nothing to scan beneath them
+_PY_LEAVES = (ast.expr_context, ast.operator, ast.unaryop, ast.cmpop, ast.boolop)
+
+
+class _PythonScan:
+    """Classifies the nodes of one parsed module, imports first."""
+
+    def __init__(self):
+        self.aliases: Dict[str, str] = {}
+        self.star_modules: List[str] = []
+        self.findings: Dict[str, None] = {}
+
+    def _import_module(self, module: str):
+        root = module.split('.')[0]
+        category = _PY_MODULES.get(root)
+        if category:
+            _add(self.findings, category, module)
+
+    def run(self, tree: ast.AST) -> List[str]:
+        # One walk buckets the nodes of interest; aliases are module-wide, so
+        # imports are applied before anything that might use them
+        imports, calls, attributes, names = [], [], [], []
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            kind = type(node)
+            for field in node._fields:
+                value = getattr(node, field, None)
+                if type(value) is list:
+                    stack.extend(item for item in value if isinstance(item, ast.AST))
+                elif isinstance(value, ast.AST) and not isinstance(value, _PY_LEAVES):
+                    stack.append(value)
+            if kind is ast.Call:
+                calls.append(node)
+            elif kind is ast.Attribute:
+                if node.attr in _PY_ATTRIBUTE_TAILS:
+                    attributes.append(node)
+            elif kind is ast.Name:
+                names.append(node)
+            elif kind is ast.Import or kind is ast.ImportFrom:
+                imports.append(node)
+
+        for node in imports:
+            if type(node) is ast.Import:
+                self.visit_Import(node)
+            else:
+                self.visit_ImportFrom(node)
+        for node in calls:
+            self.visit_Call(node)
+        for node in attributes:
+            self.visit_Attribute(node)
+
+        # `from os import environ` makes a bare name an attribute read
+        watched = dict(_PY_NAMES)
+        watched.update((alias, _PY_ATTRIBUTES[target]) for alias, target in self.aliases.items()
+                       if target in _PY_ATTRIBUTES)
+        for node in names:
+            if node.id in watched:
+                _add(self.findings, watched[node.id], self.aliases.get(node.id, node.id))
+        return list(self.findings)
+
+    def visit_Import(self, node: ast.Import):
+        for alias in node.names:
+            self._import_module(alias.name)
+            if alias.asname:
+                self.aliases[alias.asname] = alias.name
+            else:
+                root = alias.name.split('.')[0]
+                self.aliases[root] = root
+
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        if not node.module or node.level:
+            return
+        self._import_module(node.module)
+        for alias in node.names:
+            if alias.name == '*':
+                self.star_modules.append(node.module)
+            else:
+                self.aliases[alias.asname or alias.name] = f"{node.module}.{alias.name}"
+
+    def resolve(self, node: ast.AST) -> Optional[str]:
+        """Fully-qualified dotted name for a Name/Attribute chain, if it has one."""
+        if isinstance(node, ast.Name):
+            return self.aliases.get(node.id, node.id)
+        if isinstance(node, ast.Attribute):
+            base = self.resolve(node.value)
+            return f"{base}.{node.attr}" if base else None
+        if isinstance(node, ast.Call) and self.resolve(node.func) == 'getattr' and len(node.args) >= 2:
+            # getattr(os, "system") is os.system
+            base = self.resolve(node.args[0])
+            attr = node.args[1]
+            if base and isinstance(attr, ast.Constant) and isinstance(attr.value, str):
+                return f"{base}.{attr.value}"
+        return None
+
+    def _call_category(self, name: str) -> Optional[str]:
+        category = _PY_CALLS.get(name)
+        if category:
+            return category
+        for prefix, prefix_category in _PY_CALL_PREFIXES:
+            if name.startswith(prefix):
+                return prefix_category
+        return None
+
+    def visit_Call(self, node: ast.Call):
+        name = self.resolve(node.func)
+        if name is not None:
+            category = self._call_category(name)
+            if category is None and '.' not in name:
+                # A bare name may come from `from module import *`
+                for module in self.star_modules:
+                    category = self._call_category(f"{module}.{name}")
+                    if category:
+                        name = f"{module}.{name}"
+                        break
+            if category:
+                _add(self.findings, category, name)
+                if category == 'system_calls' and node.args:
+                    self._check_command(node.args[0])
+
+            if name in ('open', 'io.open', 'builtins.open', 'codecs.open'):
+                self._check_open(node)
+            elif name == 'getattr' and len(node.args) >= 2:
+                # getattr(obj, "__globals__") on an object resolve() cannot name
+                attr = node.args[1]
+                if isinstance(attr, ast.Constant) and attr.value in _PY_ESCAPE_ATTRIBUTES:
+                    _add(self.findings, _PY_ESCAPE_ATTRIBUTES[attr.value], f".{attr.value}")
+
+        if (isinstance(node.func, ast.Attribute) and node.func.attr in _PY_DESTRUCTIVE_METHODS
+                and (name is None or self._call_category(name) is None)):
+            _add(self.findings, 'file_operations', f".{node.func.attr}()")
+
+    def _check_command(self, arg: ast.AST):
+        """Flag shell/subprocess commands that start with a privileged program."""
+        if isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+            words = arg.value.split()
+        elif isinstance(arg, (ast.List, ast.Tuple)) and arg.elts and isinstance(arg.elts[0], ast.Constant):
+            words = [str(arg.elts[0].value)]
+        else:
+            return
+        if words and words[0] in _PRIVILEGED_COMMANDS:
+            _add(self.findings, 'privilege_escalation', words[0])
+
+    def _check_open(self, node: ast.Call):
+        mode = node.args[1] if len(node.args) >= 2 else None
+        for keyword in node.keywords:
+            if keyword.arg == 'mode':
+                mode = keyword.value
+        if mode is None:
+            return  # read-only
+        if isinstance(mode, ast.Constant) and isinstance(mode.value, str):
+            if _WRITE_MODE_CHARS & set(mode.value):
+                _add(self.findings, 'file_operations', f"open(mode={mode.value!r})")
+        else:
+            _add(self.findings, 'file_operations', "open(mode=<dynamic>)")
+
+    def visit_Attribute(self, node: ast.Attribute):
+        if node.attr in _PY_ESCAPE_ATTRIBUTES:
+            _add(self.findings, _PY_ESCAPE_ATTRIBUTES[node.attr], f".{node.attr}")
+            return
+        name = self.resolve(node)
+        if name:
+            for attribute, category in _PY_ATTRIBUTES.items():
+                if name == attribute or name.startswith(attribute + '.'):
+                    _add(self.findings, category, attribute)
+                    break
+
+
+def scan_python(code: str) -> List[str]:
+    """Findings for Python source. Raises SyntaxError if it does not parse."""
+    return _PythonScan().run(ast.parse(code))
+
+
+# JavaScript rules
+
+_JS_MODULES: Dict[str, str] = {
+    'child_process': 'system_calls',
+    'vm': 'system_calls',
+    'fs': 'file_operations',
+    'net': 'network_operations',
+    'http': 'network_operations',
+    'https': 'network_operations',
+    'http2': 'network_operations',
+    'dgram': 'network_operations',
+    'tls': 'network_operations',
+    'dns': 'network_operations',
+    'os': 'environment_manipulation',
+    'module': 'environment_manipulation',
+    'worker_threads': 'process_manipulation',
+    'cluster': 'process_manipulation',
+}
+
+_JS_CALLS: Dict[str, str] = {
+    'eval': 'system_calls',
+    'Function': 'system_calls',
+    'process.binding': 'system_calls',
+    'process.dlopen': 'system_calls',
+    'fetch': 'network_operations',
+    'XMLHttpRequest': 'network_operations',
+    'WebSocket': 'network_operations',
+    'process.exit': 'process_manipulation',
+    'process.kill': 'process_manipulation',
+    'process.abort': 'process_manipulation',
+}
+
+_JS_MEMBERS: Dict[str, str] = {
+    'process.env': 'environment_manipulation',
+    'global': 'environment_manipulation',
+    'globalThis': 'environment_manipulation',
+}
+
+# Every finding needs one of these words; code without any is skipped untokenized
+_JS_TRIGGERS = re.compile(
+    r'\b(?:require|import|eval|Function|constructor|process|global|globalThis|fetch|XMLHttpRequest|WebSocket)\b'
+)
+
+# Whitespace and comments are consumed as the prefix of the following token
+_JS_TOKEN = re.compile(r'''
+    (?:\s+|//[^\n]*|/\*.*?(?:\*/|\Z))*
+    (?:
+    (?P<string>"(?:\\.|[^"\\\n])*"?|'(?:\\.|[^'\\\n])*'?)
+  | (?P<template>`)
+  | (?P<name>[A-Za-z_$][\w$]*)
+  | (?P<number>\d[\w.]*)
+  | (?P<punct>\?\.|=>|\.\.\.|[{}()\[\];,.:=?<>!+\-*/%&|^~@#])
+  | (?P<other>.)
+  | (?P<end>\Z)
+    )
+''', re.VERBOSE | re.DOTALL)
+
+_JS_REGEX_LITERAL = re.compile(r'/(?:\\.|\[(?:\\.|[^\]\\\n])*\]|[^/\\\n\[])+/[A-Za-z]*')
+
+# After these, a "/" starts a regex literal rather than a division
+_JS_REGEX_KEYWORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void', 'throw', 'yield', 'await'}
+
+Token = Tuple[str, str]
+
+_JS_DOTS = (('punct', '.'), ('punct', '?.'))
+
+
+def _template_end(code: str, pos: int, tokens: List[Token]) -> int:
+    """Consume a template literal body starting after its backtick; tokenize ${} expressions."""
+    length = len(code)
+    while pos < length:
+        char = code[pos]
+        if char == '\\':
+            pos += 2
+        elif char == '`':
+            return pos + 1
+        elif char == '$' and code.startswith('${', pos):
+            pos = _tokenize_js(code, pos + 2, tokens, stop_at_brace=True)
+        else:
+            pos += 1
+    return pos
+
+
+def _tokenize_js(code: str, pos: int, tokens: List[Token], stop_at_brace: bool = False) -> int:
+    """Append (kind, text) tokens for significant JS tokens; returns the end position."""
+    depth = 0
+    length = len(code)
+    while pos < length:
+        match = _JS_TOKEN.match(code, pos)
+        kind = match.lastgroup
+        if kind == 'end':
+            return match.end()
+        text = match.group(kind)
+        end = match.end()
+        pos = match.start(kind)
+
+        if kind == 'template':
+            tokens.append(('string', ''))
+            pos = _template_end(code, end, tokens)
+            continue
+
+        if kind == 'punct' and text == '/':
+            previous = tokens[-1] if tokens else None
+            if (previous is None or (previous[0] == 'punct' and previous[1] not in (')', ']', '}'))
+                    or (previous[0] == 'name' and previous[1] in _JS_REGEX_KEYWORDS)):
+                literal = _JS_REGEX_LITERAL.match(code, pos)
+                if literal:
+                    tokens.append(('regex', ''))
+                    pos = literal.end()
+                    continue
+
+        if kind == 'string':
+            text = text[1:-1] if len(text) >= 2 and text[-1] == text[0] else text[1:]
+        elif kind == 'punct' and stop_at_brace:
+            if text == '{':
+                depth += 1
+            elif text == '}':
+                if depth == 0:
+                    return end
+                depth -= 1
+
+        tokens.append((kind, text))
+        pos = end
+    return pos
+
+
+def _normalize_module(module: str) -> str:
+    if module.startswith('node:'):
+        module = module[5:]
+    return module.split('/')[0]
+
+
+class _JavaScriptScan:
+    """Scan over significant tokens, tracking require/import bindings."""
+
+    def __init__(self, tokens: List[Token]):
+        self.tokens = tokens
+        self.aliases: Dict[str, str] = {}
+        self.findings: Dict[str, None] = {}
+
+    def token(self, index: int) -> Token:
+        return self.tokens[index] if 0 <= index < len(self.tokens) else ('', '')
+
+    def _import_module(self, module: str) -> str:
+        module = _normalize_module(module)
+        category = _JS_MODULES.get(module)
+        if category:
+            _add(self.findings, category, module)
+        return module
+
+    def _bind_require(self, start: int, module: str):
+        """Record the binding on the left of `... = require('module')` (tokens end at `start`)."""
+        if self.token(start - 1) != ('punct', '='):
+            return
+        target = self.token(start - 2)
+        if target[0] == 'name':
+            self.aliases[target[1]] = module
+        elif target == ('punct', '}'):
+            # Walk back to the destructuring pattern's opening brace
+            index = start - 3
+            while index >= 0 and self.token(index) != ('punct', '{'):
+                index -= 1
+            self._bind_destructured(index + 1, start - 2, module)
+
+    def _bind_destructured(self, begin: int, end: int, module: str):
+        """Bind `{ a, b: c }` / `{ a, b as c }` names in tokens[begin:end] to module members."""
+        index = begin
+        while index < end:
+            kind, text = self.token(index)
+            if kind == 'name':
+                local = text
+                if self.token(index + 1) in (('punct', ':'), ('name', 'as')) and self.token(index + 2)[0] == 'name':
+                    local = self.token(index + 2)[1]
+                    index += 2
+                self.aliases[local] = f"{module}.{text}"
+            index += 1
+
+    def _parse_import(self, index: int) -> int:
+        """Handle an ES import statement starting at tokens[index] ('import')."""
+        following = self.token(index + 1)
+        if following == ('punct', '('):
+            return index + 1  # dynamic import(), handled as a call
+        if following[0] == 'string':
+            self._import_module(following[1])
+            return index + 2
+
+        end = index + 1
+        while end < len(self.tokens) and self.token(end) != ('name', 'from') and self.token(end) != ('punct', ';'):
+            end += 1
+        if self.token(end) != ('name', 'from') or self.token(end + 1)[0] != 'string':
+            return end
+        module = self._import_module(self.token(end + 1)[1])
+
+        cursor = index + 1
+        while cursor < end:
+            kind, text = self.token(cursor)
+            if (kind, text) == ('punct', '*') and self.token(cursor + 1) == ('name', 'as'):
+                self.aliases[self.token(cursor + 2)[1]] = module
+                cursor += 3
+            elif (kind, text) == ('punct', '{'):
+                close = cursor
+                while close < end and self.token(close) != ('punct', '}'):
+                    close += 1
+                self._bind_destructured(cursor + 1, close, module)
+                cursor = close + 1
+            elif kind == 'name':
+                self.aliases[text] = module  # default import
+                cursor += 1
+            else:
+                cursor += 1
+        return end + 2
+
+    def _is_member_require(self, index: int) -> bool:
+        """True for `.require(` / `?.require(` starting at the dot at tokens[index]."""
+        return (
+            self.token(index) in _JS_DOTS
+            and self.token(index + 1) == ('name', 'require')
+            and self.token(index + 2) == ('punct', '(')
+        )
+
+    def _member_chain(self, index: int) -> Tuple[List[str], int]:
+        """Dotted name parts starting at a name token, and the index after the chain.
+
+        The chain stops before a `.require(` call so that run() treats it like a bare require.
+        """
+        parts = [self.token(index)[1]]
+        index += 1
+        while (self.token(index) in _JS_DOTS and self.token(index + 1)[0] == 'name'
+               and not self._is_member_require(index)):
+            parts.append(self.token(index + 1)[1])
+            index += 2
+        return parts, index
+
+    def _chain_start(self, index: int) -> int:
+        """Index of the first name in the dotted chain ending at tokens[index]."""
+        while self.token(index - 1) in _JS_DOTS and self.token(index - 2)[0] == 'name':
+            index -= 2
+        return index
+
+    def _report(self, name: str, is_call: bool):
+        for table in ((_JS_CALLS, _JS_MEMBERS) if is_call else (_JS_MEMBERS,)):
+            for rule, category in table.items():
+                if name == rule or name.startswith(rule + '.'):
+                    _add(self.findings, category, rule)
+                    return
+
+    def _check_constructor(self):
+        """`x.constructor` / `x['constructor']` reaches Function, and through it the host realm, from any value."""
+        for index, (kind, text) in enumerate(self.tokens):
+            if text != 'constructor':
+                continue
+            if ((kind == 'name' and self.token(index - 1) in _JS_DOTS)
+                    or (kind == 'string' and self.token(index - 1) == ('punct', '[')
+                        and self.token(index + 1) == ('punct', ']'))):
+                _add(self.findings, 'system_calls', '.constructor')
+                return
+
+    def run(self) -> List[str]:
+        self._check_constructor()
+        index = 0
+        count = len(self.tokens)
+        while index < count:
+            kind, text = self.tokens[index]
+
+            # Member names are part of a chain already reported, except
+            # `module.require('x')` / `process.mainModule.require('x')`
+            if kind != 'name' or (self.token(index - 1) in _JS_DOTS and not self._is_member_require(index - 1)):
+                index += 1
+                continue
+
+            if text == 'import':
+                next_index = self._parse_import(index)
+                if next_index != index + 1:
+                    index = next_index
+                    continue
+
+            if text in ('require', 'import') and self.token(index + 1) == ('punct', '('):
+                argument = self.token(index + 2)
+                if argument[0] == 'string' and self.token(index + 3) == ('punct', ')'):
+                    module = self._import_module(argument[1])
+                    self._bind_require(self._chain_start(index), module)
+                    # require('child_process').exec(...)
+                    after = index + 4
+                    parts = [module]
+                    while self.token(after) in _JS_DOTS and self.token(after + 1)[0] == 'name':
+                        parts.append(self.token(after + 1)[1])
+                        after += 2
+                    self._report('.'.join(parts), self.token(after) == ('punct', '('))
+                    index = after
+                else:
+                    _add(self.findings, 'environment_manipulation', f"{text}(<dynamic>)")
+                    index += 2
+                continue
+
+            parts, after = self._member_chain(index)
+            root = self.aliases.get(parts[0])
+            if root is not None:
+                parts = root.split('.') + parts[1:]
+            self._report('.'.join(parts), self.token(after) == ('punct', '('))
+            index = after
+
+        return list(self.findings)
+
+
+def scan_javascript(code: str) -> List[str]:
+    """Findings for JavaScript/Node.js source."""
+    if not _JS_TRIGGERS.search(code):
+        return []
+    tokens: List[Token] = []
+    _tokenize_js(code, 0, tokens)
+    return _JavaScriptScan(tokens).run()
@@ -0,0 +1,416 @@
+"""
+Warm interpreter worker pools for local code execution.
+
+Starting a Python or Node.js interpreter costs tens of milliseconds, which
+dominates short validation snippets. A SandboxPool keeps a few resource-
+limited interpreters running per language and feeds them code over a pipe:
+
+- Python workers are fork servers: the warm interpreter forks a fresh child
+  for every snippet, so runs never share state and rlimits (CPU seconds,
+  address space) apply per run. The child shuts down like an interpreter
+  would, joining non-daemon threads and running atexit handlers.
+- Node.js workers evaluate each snippet in a new vm context holding only
+  per-run objects, built inside that context so none of them leads back to
+  the worker's realm: a captured console and a stand-in `process` with env,
+  argv and cwd(). Snippets that need anything shared with the worker
+  (require, host globals such as Buffer, other process members) or that
+  schedule asynchronous work are not poolable and run in a fresh process.
+
+Requests are one JSON line on the worker's stdin; replies are one JSON line
+on its stdout prefixed with a per-worker sentinel, so stray output can never
+be mistaken for a reply. Workers are recycled after max_runs snippets, after
+a timeout, or when a run breaches its resource limits.
+"""
+
+import asyncio
+import json
+import os
+import re
+import resource
+import shutil
+import signal
+import sys
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from .resource_accounting import DescendantCounter, SAMPLE_INTERVAL
+
+
+# Fork server run by `python -c`; argv[1] is the reply sentinel
+_PYTHON_WORKER = r'''
+import atexit, json, linecache, os, sys, traceback
+for _module in ("json", "re", "math", "collections", "itertools", "functools", "datetime", "typing"):
+    __import__(_module)
+
+SENTINEL = sys.argv[1]
+reply = os.fdopen(os.dup(1), "w")
+
+def run(request):
+    out_path, err_path = request["stdout_path"], request["stderr_path"]
+    pid = os.fork()
+    if pid == 0:
+        exit_code = 1
+        try:
+            os.close(reply.fileno())
+            os.chdir(request["cwd"])
+            os.environ.update(request["env"])
+            devnull = os.open(os.devnull, os.O_RDONLY)
+            os.dup2(devnull, 0)
+            os.dup2(os.open(out_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 1)
+            os.dup2(os.open(err_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 2)
+            filename = os.path.join(request["cwd"], "code.py")
+            source = request["code"]
+            linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
+            sys.argv = [filename]
+            namespace = {"__name__": "__main__", "__file__": filename, "__builtins__": __builtins__}
+            try:
+                exec(compile(source, filename, "exec"), namespace)
+                exit_code = 0
+            except SystemExit as e:
+                if e.code is None or isinstance(e.code, int):
+                    exit_code = e.code or 0
+                else:
+                    print(e.code, file=sys.stderr)
+            except BaseException as e:
+                # Drop this worker's own frame from the traceback
+                traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+            # Interpreter shutdown: wait for non-daemon threads, then run atexit handlers
+            threading = sys.modules.get("threading")
+            if threading:
+                for thread in threading.enumerate():
+                    if thread is not threading.current_thread() and not thread.daemon:
+                        thread.join()
+            atexit._run_exitfuncs()
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(exit_code)
+
+    _, status, usage = os.wait4(pid, 0)
+    outputs = []
+    for path in (out_path, err_path):
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                outputs.append(f.read())
+            os.unlink(path)
+        except OSError:
+            outputs.append("")
+    exit_code = os.waitstatus_to_exitcode(status)
+    return {"exit_code": exit_code, "stdout": outputs[0], "stderr": outputs[1],
+            "signal": -exit_code if exit_code < 0 else 0,
+            "rusage": {"ru_utime": usage.ru_utime, "ru_stime": usage.ru_stime, "ru_maxrss": usage.ru_maxrss,
+                       "ru_inblock": usage.ru_inblock, "ru_oublock": usage.ru_oublock}}
+
+for line in sys.stdin:
+    response = run(json.loads(line))
+    reply.write(SENTINEL + " " + json.dumps(response) + "\n")
+    reply.flush()
+'''
+
+# vm-context evaluator run by `node -e`; argv[1] is the reply sentinel
+_NODE_WORKER = r'''
+"use strict";
+const fs = require("fs"), path = require("path"), readline = require("readline"), util = require("util");
+const vm = require("vm");
+const SENTINEL = process.argv[1];
+// Evaluated inside each new context, so the per-run globals it builds carry only that context's
+// prototypes; the worker's own functions (and their Function constructor) stay unreachable
+const SETUP = `(function (sink, json) {
+  "use strict";
+  const info = JSON.parse(json), cwd = info.cwd;
+  const write = (stream) => function (...args) {
+    const failure = sink(stream, args);
+    if (failure !== undefined) throw new TypeError(failure);
+  };
+  globalThis.console = { log: write(1), info: write(1), debug: write(1), warn: write(2), error: write(2) };
+  globalThis.process = { env: info.env, argv: info.argv, platform: info.platform, arch: info.arch,
+                         version: info.version, versions: info.versions, cwd: () => cwd };
+  globalThis.module = { exports: {} };
+  globalThis.exports = module.exports;
+  globalThis.__filename = info.filename;
+  globalThis.__dirname = cwd;
+})`;
+const rl = readline.createInterface({ input: process.stdin });
+rl.on("line", (line) => {
+  const request = JSON.parse(line);
+  const out = [], err = [];
+  // customInspect would hand the worker's own inspect() to snippet code, and a worker-realm
+  // error must not propagate into the context either: its message is rethrown from there instead
+  const sink = (stream, args) => {
+    try {
+      (stream === 1 ? out : err).push(util.formatWithOptions({ customInspect: false }, ...args) + "\n");
+    } catch (e) {
+      if (e instanceof Error) return String(e.message);
+      throw e;
+    }
+  };
+  const info = JSON.stringify({
+    env: Object.assign({}, process.env, request.env), argv: [process.execPath], platform: process.platform,
+    arch: process.arch, version: process.version, versions: process.versions, cwd: request.cwd,
+    filename: path.join(request.cwd, "code.js")
+  });
+  const before = process.resourceUsage();
+  let exitCode = 0;
+  try {
+    const context = vm.createContext();
+    vm.runInContext(SETUP, context)(sink, info);
+    vm.runInContext(request.code, context, { filename: "code.js" });
+  } catch (e) {
+    err.push(((e && e.stack) || String(e)) + "\n");
+    exitCode = 1;
+  }
+  // The run shares the worker process: CPU and I/O are deltas, maxRSS is the worker's high-water mark
+  const after = process.resourceUsage();
+  const rusage = { ru_utime: (after.userCPUTime - before.userCPUTime) / 1e6,
+                   ru_stime: (after.systemCPUTime - before.systemCPUTime) / 1e6, ru_maxrss: after.maxRSS,
+                   ru_inblock: after.fsRead - before.fsRead, ru_oublock: after.fsWrite - before.fsWrite };
+  const reply = { exit_code: exitCode, stdout: out.join(""), stderr: err.join(""), signal: 0,
+                  rss_mb: process.memoryUsage().rss / 1048576, rusage };
+  fs.writeSync(1, SENTINEL + " " + JSON.stringify(reply) + "\n");
+});
+'''
+
+# Node snippets that need the worker's own modules and globals, or that outlive a
+# synchronous vm run (timers, promises, callback APIs reached through require)
+_NODE_UNPOOLABLE = re.compile(
+    r'\b(?:require|import|Buffer|URL|URLSearchParams|TextEncoder|TextDecoder|'
+    r'setTimeout|setInterval|setImmediate|queueMicrotask|Promise|async|await)\b'
+    r'|\.\s*(?:then|catch|finally)\s*\('
+    r'|\bprocess\b(?!\s*\.\s*(?:env|argv|platform|arch|versions?|cwd)\b)'
+)
+
+# Per-run rlimit signals; a worker whose child died of these is recycled
+_LIMIT_SIGNALS = {signal.SIGXCPU, signal.SIGKILL, signal.SIGSEGV}
+
+_MAX_REPLY_BYTES = 64 * 1024 * 1024
+
+
+def set_soft_limit(kind: int, value: int):
+    """Lower a soft rlimit, keeping it within the inherited hard limit."""
+    _, hard = resource.getrlimit(kind)
+    if hard != resource.RLIM_INFINITY:
+        value = min(value, hard)
+    resource.setrlimit(kind, (value, hard))
+
+
+class SandboxWorker:
+    """One warm interpreter process."""
+
+    def __init__(self, language: str, limits, scratch_dir: Path):
+        self.language = language
+        self.limits = limits
+        self.scratch_dir = scratch_dir
+        self.sentinel = uuid.uuid4().hex
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.runs = 0
+        self.broken = False
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None and not self.broken
+
+    def _command(self) -> List[str]:
+        if self.language == "python":
+            return [sys.executable, "-u", "-c", _PYTHON_WORKER, self.sentinel]
+        return ["node", f"--max-old-space-size={self.limits.max_memory_mb}", "-e", _NODE_WORKER, self.sentinel]
+
+    def _set_limits(self):
+        limits = self.limits
+        if self.language == "python":
+            # V8 reserves far more address space than it uses; Node is capped via --max-old-space-size
+            set_soft_limit(resource.RLIMIT_AS, limits.max_memory_mb * 1024 * 1024)
+            # Inherited by each forked child, whose CPU clock starts at zero
+            set_soft_limit(resource.RLIMIT_CPU, limits.max_execution_time)
+        set_soft_limit(resource.RLIMIT_NPROC, limits.max_processes)
+        set_soft_limit(resource.RLIMIT_NOFILE, limits.max_file_descriptors)
+
+    async def start(self):
+        self.scratch_dir.mkdir(parents=True, exist_ok=True)
+        self.process = await asyncio.create_subprocess_exec(
+            *self._command(),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            cwd=str(self.scratch_dir),
+            start_new_session=True,
+            preexec_fn=self._set_limits,
+            limit=_MAX_REPLY_BYTES
+        )
+
+    async def run(self, code: str, cwd: str, env: Dict[str, str], timeout: float) -> Dict[str, Any]:
+        """Run one snippet. Raises asyncio.TimeoutError (after killing the worker) on timeout."""
+        self.runs += 1
+        run_id = uuid.uuid4().hex
+        request = {
+            "code": code,
+            "cwd": cwd,
+            "env": env,
+            "stdout_path": str(self.scratch_dir / f"{run_id}.out"),
+            "stderr_path": str(self.scratch_dir / f"{run_id}.err")
+        }
+        self.process.stdin.write((json.dumps(request) + "\n").encode("utf-8"))
+
+        # Python runs are forked children of the worker, so only their own children count
+        counter = DescendantCounter(self.process.pid, skip_direct_children=self.language == "python")
+        sampler = asyncio.create_task(self._sample_children(counter))
+        try:
+            reply = await asyncio.wait_for(self._read_reply(), timeout=timeout)
+        except asyncio.TimeoutError:
+            await self.kill()
+            raise
+        finally:
+            sampler.cancel()
+        reply["child_processes"] = counter.count
+        return reply
+
+    @staticmethod
+    async def _sample_children(counter: DescendantCounter):
+        while True:
+            await asyncio.sleep(SAMPLE_INTERVAL)
+            counter.sample()
+
+    async def _read_reply(self) -> Dict[str, Any]:
+        await self.process.stdin.drain()
+        prefix = (self.sentinel + " ").encode("ascii")
+        stray: List[bytes] = []
+        while True:
+            line = await self.process.stdout.readline()
+            if not line:
+                self.broken = True
+                return {"exit_code": -1, "stdout": b"".join(stray).decode("utf-8", errors="replace"),
+                        "stderr": "Sandbox worker exited unexpectedly", "signal": 0}
+            if line.startswith(prefix):
+                reply = json.loads(line[len(prefix):])
+                if stray:
+                    reply["stdout"] = b"".join(stray).decode("utf-8", errors="replace") + reply["stdout"]
+                return reply
+            stray.append(line)
+
+    async def kill(self):
+        self.broken = True
+        if self.process and self.process.returncode is None:
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            await self.process.wait()
+        shutil.rmtree(self.scratch_dir, ignore_errors=True)
+
+
+class SandboxPool:
+    """Fixed-size pool of warm workers for one language and set of resource limits."""
+
+    LANGUAGES = ("python", "nodejs")
+
+    def __init__(self, language: str, limits, base_dir: Path, size: int = 2, max_runs: int = 100):
+        if language not in self.LANGUAGES:
+            raise ValueError(f"No sandbox worker for {language}")
+        self.language = language
+        self.limits = limits
+        self.base_dir = Path(base_dir)
+        self.size = size
+        self.max_runs = max_runs
+
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(size)
+        self._workers: List[SandboxWorker] = []
+        self._closed = False
+
+        self.stats = {
+            "runs": 0,
+            "workers_started": 0,
+            "recycled": 0,
+            "timeouts": 0
+        }
+
+    @classmethod
+    def supports(cls, language: str, code: str) -> bool:
+        """Whether a snippet can run in a pooled worker of `language`."""
+        if language == "python":
+            return True
+        if language == "nodejs":
+            return not _NODE_UNPOOLABLE.search(code)
+        return False
+
+    async def _checkout(self) -> SandboxWorker:
+        while not self._idle.empty():
+            worker = self._idle.get_nowait()
+            if worker.alive:
+                return worker
+            self._discard(worker)
+
+        worker = SandboxWorker(self.language, self.limits, self.base_dir / f"worker_{uuid.uuid4().hex[:8]}")
+        await worker.start()
+        self._workers.append(worker)
+        self.stats["workers_started"] += 1
+        return worker
+
+    def _discard(self, worker: SandboxWorker):
+        if worker in self._workers:
+            self._workers.remove(worker)
+
+    async def _recycle(self, worker: SandboxWorker):
+        self.stats["recycled"] += 1
+        await worker.kill()
+        self._discard(worker)
+
+    async def execute(self, code: str, cwd: str, env: Optional[Dict[str, str]] = None,
+                      timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Run a snippet in a warm worker.
+
+        Returns the worker reply (exit_code, stdout, stderr, signal, rusage,
+        child_processes) with 'timed_out' set; a negative exit_code is the
+        signal that killed the run.
+        """
+        timeout = timeout or self.limits.max_execution_time
+        async with self._slots:
+            if self._closed:
+                raise RuntimeError("Sandbox pool is closed")
+            worker = await self._checkout()
+            self.stats["runs"] += 1
+            try:
+                reply = await worker.run(code, cwd, env or {}, timeout)
+            except asyncio.TimeoutError:
+                self.stats["timeouts"] += 1
+                await self._recycle(worker)
+                return {"exit_code": -1, "stdout": "", "stderr": "Execution timeout", "signal": 0, "timed_out": True}
+            except BaseException:
+                await self._recycle(worker)
+                raise
+
+            reply["timed_out"] = False
+            if self._should_recycle(worker, reply):
+                await self._recycle(worker)
+            else:
+                self._idle.put_nowait(worker)
+            return reply
+
+    def _should_recycle(self, worker: SandboxWorker, reply: Dict[str, Any]) -> bool:
+        if not worker.alive or worker.runs >= self.max_runs:
+            return True
+        if reply.get("signal") in _LIMIT_SIGNALS or "MemoryError" in reply.get("stderr", ""):
+            return True
+        return reply.get("rss_mb", 0) > self.limits.max_memory_mb
+
+    async def close(self):
+        """Stop every worker."""
+        self._closed = True
+        for worker in list(self._workers):
+            await worker.kill()
+        self._workers.clear()
+        while not self._idle.empty():
+            self._idle.get_nowait()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "language": self.language,
+            "size": self.size,
+            "live_workers": sum(1 for w in self._workers if w.alive),
+            **self.stats
+        }
@@ -0,0 +1,20 @@
+"""
+Shared test setup.
+
+The src package __init__ files import the whole agent stack, including
+optional dependencies, so src and its subpackages are registered bare here:
+tests import the modules they exercise (src.core.shared_memory, ...)
+without pulling in everything else.
+"""
+
+import os
+import sys
+import types
+
+_SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+for _name in ("src", "src.core", "src.models", "src.monitoring", "src.self_healing"):
+    if _name not in sys.modules:
+        _package = types.ModuleType(_name)
+        _package.__path__ = [os.path.join(_SRC_DIR, *_name.split(".")[1:])]
+        sys.modules[_name] = _package
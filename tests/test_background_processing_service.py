@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Scheduling and persistence behaviour of the background processing service
+"""
+
+import importlib
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FINAL = ("completed", "failed", "cancelled")
+
+
+@pytest.fixture
+def bps(tmp_path, monkeypatch):
+    """The service module, with every database it opens under tmp_path"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(ROOT)
+    return importlib.import_module("background_processing_service")
+
+
+@pytest.fixture
+def make_service(bps):
+    services = []
+
+    def make(**kwargs):
+        service = bps.BackgroundProcessingService(**kwargs)
+        service.register_job_handler("ok", lambda params, progress: params.get("value"))
+        service.register_job_handler("fail", lambda params, progress: 1 / 0)
+        services.append(service)
+        return service
+
+    yield make
+    for service in services:
+        if service.is_running:
+            service.stop_service()
+        service.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def submit(service, job_type="ok", **kwargs):
+    reply = service.submit_job(job_type, f"{job_type} job", "", kwargs.pop("parameters", {}), **kwargs)
+    assert reply["success"], reply
+    return reply["job_id"]
+
+
+def is_final(job):
+    if job.status.value == "failed":
+        # A failure is retried automatically until the retries run out
+        return job.retry_count >= job.max_retries or job.error.startswith("Dependency job")
+    return job.status.value in FINAL
+
+
+def wait_for(service, job_id, timeout=10.0):
+    """Wait until a job has ended and its final state is saved"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        stored = service._load_stored_job(job_id)
+        if stored and is_final(stored) and is_final(service._find_job(job_id)):
+            return service.get_job_status(job_id)["job"]
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish: {service.get_job_status(job_id)}")
+
+
+class TestFinishedJobsOutOfMemory:
+    """Finished jobs evicted from memory, or not loaded at startup, are still found in storage"""
+
+    def test_dependency_on_evicted_completed_job(self, make_service):
+        service = make_service()
+        service.start_service()
+        first = submit(service)
+        wait_for(service, first)
+        del service.jobs[first]
+
+        second = submit(service, dependencies=[first], parameters={"value": 2})
+        assert wait_for(service, second)["status"] == "completed"
+
+    def test_dependency_on_evicted_failed_job_is_rejected(self, make_service):
+        service = make_service()
+        service.start_service()
+        failed = submit(service, "fail")
+        wait_for(service, failed)
+        del service.jobs[failed]
+
+        reply = service.submit_job("ok", "after", "", {}, dependencies=[failed])
+        assert reply == {"success": False, "error": f"Dependency job failed: {failed}"}
+
+    def test_retry_after_restart_finds_failed_jobs(self, make_service):
+        service = make_service()
+        exhausted = submit(service, "fail")
+        cancelled = submit(service)
+        blocked = submit(service, dependencies=[cancelled])
+        service.cancel_job(cancelled)
+        service.start_service()
+        wait_for(service, exhausted)
+        assert wait_for(service, blocked)["retry_count"] == 0
+        service.stop_service()
+
+        restarted = make_service()
+        restarted.start_service()
+        assert exhausted not in restarted.jobs and blocked not in restarted.jobs
+        assert restarted.retry_job(exhausted) == {"success": False, "error": "Maximum retries exceeded"}
+        assert restarted.retry_job(blocked)["success"]
+        # The retried job still depends on a job that was cancelled in the previous run
+        job = wait_for(restarted, blocked)
+        assert (job["status"], job["error"]) == ("failed", f"Dependency job cancelled: {cancelled}")
+
+    def test_cancel_evicted_jobs(self, make_service):
+        service = make_service()
+        service.start_service()
+        completed, failed = submit(service), submit(service, "fail")
+        wait_for(service, completed)
+        wait_for(service, failed)
+        service.jobs.clear()
+
+        assert service.cancel_job(completed) == {"success": False, "error": "Job already completed"}
+        assert service.cancel_job(failed)["success"]
+        assert service.get_job_status(failed)["job"]["status"] == "cancelled"
+        assert service.cancel_job("missing") == {"success": False, "error": "Job not found"}
+
+
+def gated(service):
+    """Register a "gated" job type whose jobs block until the returned event is set"""
+    gate = threading.Event()
+    service.register_job_handler("gated", lambda params, progress: gate.wait(10))
+    return gate
+
+
+def wait_until(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.01)
+
+
+class TestDependencies:
+    """Dependents wait for their dependencies and fail with them"""
+
+    def test_dependent_runs_after_its_dependency_completes(self, make_service):
+        service = make_service()
+        gate = gated(service)
+        service.start_service()
+        first = submit(service, "gated")
+        second = submit(service, dependencies=[first], parameters={"value": 2})
+        wait_until(lambda: service.jobs[first].status.value == "running")
+
+        assert service.jobs[second].status.value == "pending"
+        assert service.waiting_jobs == {second: {first}}
+        gate.set()
+        job = wait_for(service, second)
+        assert (job["status"], job["result"]) == ("completed", 2)
+        assert service.jobs[second].started_at >= service.jobs[first].completed_at
+        assert service.waiting_jobs == {} and service.dependents == {}
+
+    def test_failed_dependency_fails_the_chain(self, make_service):
+        service = make_service()
+        gate = gated(service)
+        failing = submit(service, "fail", dependencies=[submit(service, "gated")])
+        middle = submit(service, dependencies=[failing])
+        last = submit(service, dependencies=[middle])
+        service.start_service()
+        gate.set()
+
+        assert wait_for(service, last)["error"] == f"Dependency job failed: {middle}"
+        assert service.get_job_status(middle)["job"]["error"] == f"Dependency job failed: {failing}"
+        # The dependents failed once, after the failing job's retries ran out
+        assert service.jobs[failing].retry_count == service.jobs[failing].max_retries
+        assert service.jobs[middle].retry_count == 0
+        assert service.waiting_jobs == {} and service.dependents == {}
+
+
+class TestStopAndRestart:
+    """Jobs that have not run by the time the service stops are run after a restart"""
+
+    def test_unstarted_job_is_requeued_on_stop(self, make_service):
+        service = make_service(max_concurrent_jobs=1)
+        gate = threading.Event()
+        # Occupy the executor's only thread so the dispatched job waits in its queue
+        service.executor.submit(gate.wait, 10)
+        service.start_service()
+        job_id = submit(service, parameters={"value": 1})
+        wait_until(lambda: job_id in service.futures)
+
+        service.stop_service()
+        gate.set()
+        assert service.jobs[job_id].status.value == "pending"
+        assert service.jobs[job_id].started_at is None
+        assert service.current_jobs == 0 and service.futures == {}
+        assert service._load_stored_job(job_id).status.value == "pending"
+
+        service.start_service()
+        assert wait_for(service, job_id)["status"] == "completed"
+
+    def test_unstarted_job_runs_in_a_new_service(self, make_service):
+        service = make_service(max_concurrent_jobs=1)
+        gate = threading.Event()
+        service.executor.submit(gate.wait, 10)
+        service.start_service()
+        job_id = submit(service, parameters={"value": 1})
+        wait_until(lambda: job_id in service.futures)
+        service.stop_service()
+        gate.set()
+
+        restarted = make_service()
+        restarted.start_service()
+        assert wait_for(restarted, job_id)["result"] == 1
+
+    def test_job_running_at_shutdown_starts_over(self, bps, make_service):
+        service = make_service()
+        job_id = submit(service, parameters={"value": 3})
+        job = service.jobs[job_id]
+        job.status = bps.JobStatus.RUNNING
+        service._save_job(job)  # as if the process died while the job ran
+
+        restarted = make_service()
+        restarted.start_service()
+        job = wait_for(restarted, job_id)
+        assert (job["status"], job["result"]) == ("completed", 3)
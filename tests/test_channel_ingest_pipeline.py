@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Throttle handling of the channel ingest pipeline's paced API calls
+"""
+
+import asyncio
+import os
+import sys
+import types
+
+import pytest
+
+# channel_ingest_pipeline is stdlib-only; import it directly rather than through the src package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "processors"))
+
+from channel_ingest_pipeline import ChannelIngestPipeline, build_rate_limiters
+
+
+def make_pipeline():
+    limiters = build_rate_limiters({api: {"rate": 1000.0} for api in ("youtube", "gemini", "notion")})
+    processor = types.SimpleNamespace(rate_limiters=limiters)
+    return ChannelIngestPipeline(processor, {"channel_id": "c1", "name": "Channel", "hashtags": []},
+                                 max_throttle_retries=2)
+
+
+def scripted(outcomes):
+    """A call returning (or raising) the next outcome each time, counting its attempts."""
+    attempts = []
+
+    async def call():
+        attempts.append(None)
+        outcome = outcomes[min(len(attempts), len(outcomes)) - 1]
+        if isinstance(outcome, BaseException):
+            raise outcome
+        if callable(outcome):
+            return outcome()
+        return outcome
+
+    return call, attempts
+
+
+class TestCallApi:
+    """Throttling is judged from the call's own outcome"""
+
+    def test_ordinary_failure_is_not_retried_when_another_call_throttles(self):
+        pipeline = make_pipeline()
+        limiter = pipeline.processor.rate_limiters["notion"]
+
+        def concurrent_throttle():
+            limiter.on_throttle(0.0)  # a 429 seen by another worker during this call
+            return False
+
+        call, attempts = scripted([concurrent_throttle])
+        assert asyncio.run(pipeline._call_api("notion", call, fallback=False)) is False
+        assert len(attempts) == 1
+        assert pipeline.get_stats() == {}
+
+    def test_rate_limit_exception_is_retried_then_falls_back(self):
+        pipeline = make_pipeline()
+        call, attempts = scripted([RuntimeError("HTTP Error 429: Too Many Requests")])
+        assert asyncio.run(pipeline._call_api("youtube", call)) is None
+        assert len(attempts) == 3
+        assert pipeline.get_stats() == {"youtube_throttle_retries": 3}
+
+    def test_rate_limit_exception_then_success(self):
+        pipeline = make_pipeline()
+        call, attempts = scripted([RuntimeError("quota exceeded"), "transcript"])
+        assert asyncio.run(pipeline._call_api("youtube", call)) == "transcript"
+        assert len(attempts) == 2
+
+    def test_other_exceptions_propagate(self):
+        pipeline = make_pipeline()
+        call, attempts = scripted([ValueError("bad caption file")])
+        with pytest.raises(ValueError):
+            asyncio.run(pipeline._call_api("youtube", call))
+        assert len(attempts) == 1
+
+    def test_throttled_result_is_retried(self):
+        pipeline = make_pipeline()
+        call, attempts = scripted([{"rate_limited": True}, {"rate_limited": False, "success": True}])
+        result = asyncio.run(pipeline._call_api("gemini", call, lambda analysis: analysis.get("rate_limited", False)))
+        assert result == {"rate_limited": False, "success": True}
+        assert len(attempts) == 2
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Reservoir-sampled experience memory of the learning system
+"""
+
+import asyncio
+import sqlite3
+
+import numpy as np
+import pytest
+
+from src.self_healing.learning_system import ExperienceProcessor, LearningSystem
+
+
+@pytest.fixture
+def make_system(tmp_path):
+    def make(agent_id="agent-1", max_experiences=5):
+        return LearningSystem({
+            "agent_id": agent_id,
+            "max_experiences": max_experiences,
+            "learning_frequency": 10 ** 6,  # keep learning sessions out of these tests
+            "learning_db_path": str(tmp_path / "learning.db"),
+            "knowledge_db_path": str(tmp_path / "knowledge.db"),
+        })
+
+    return make
+
+
+def record(system, count, start=0):
+    async def run():
+        for index in range(start, start + count):
+            await system.record_experience({
+                "success": index % 2 == 0,
+                "execution_time": float(index),
+                "metrics": {"quality": index / 100},
+                "task_context": {"n": index},
+            })
+
+    asyncio.run(run())
+
+
+def sample(system):
+    return [exp.experience_id for exp in system.experiences.values()]
+
+
+class TestReservoir:
+    """Memory keeps a bounded sample while storage keeps everything"""
+
+    def test_sample_is_bounded(self, make_system):
+        system = make_system()
+        record(system, 20)
+        assert len(system.experiences) == 5
+        assert system.experiences.seen == system.metrics.total_experiences == 20
+        with sqlite3.connect(system.db_path) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM experiences").fetchone()[0] == 20
+
+    def test_features_follow_their_slots(self, make_system):
+        system = make_system()
+        record(system, 20)
+        experiences, features = system.experiences.snapshot()
+        for experience, row in zip(experiences, features):
+            assert tuple(row) == ExperienceProcessor.feature_vector(experience)
+
+
+class TestRestore:
+    """A restarted system resumes with the sample it had"""
+
+    def test_restart_restores_the_sample(self, make_system):
+        system = make_system()
+        record(system, 20)
+        _, features = system.experiences.snapshot()
+
+        restarted = make_system()
+        assert sample(restarted) == sample(system)
+        assert np.array_equal(restarted.experiences.snapshot()[1], features)
+        assert restarted.experiences.seen == restarted.metrics.total_experiences == 20
+        # Restored rows are handed to the clusterer as new data
+        assert len(restarted.experiences.take_pending()) == 5
+
+    def test_sampling_continues_from_the_stored_count(self, make_system):
+        record(make_system(), 20)
+        restarted = make_system()
+        draws = []
+        randrange = restarted.experiences.rng.randrange
+
+        def tracked(stop):
+            draws.append(stop)
+            return randrange(stop)
+
+        restarted.experiences.rng.randrange = tracked
+        record(restarted, 10, start=20)
+        # Each later experience replaces a slot with probability capacity / seen
+        assert draws == list(range(21, 31))
+
+    def test_smaller_capacity_keeps_the_first_slots(self, make_system):
+        system = make_system()
+        record(system, 20)
+        kept = sample(system)[:3]
+
+        shrunk = make_system(max_experiences=3)
+        assert sample(shrunk) == kept
+        with sqlite3.connect(shrunk.db_path) as conn:
+            slots = conn.execute(
+                "SELECT slot, experience_id FROM experience_reservoir WHERE agent_id = ? ORDER BY slot",
+                ("agent-1",)
+            ).fetchall()
+        assert slots == list(enumerate(kept))
+
+        # Restarting with the original capacity grows the sample again from there
+        grown = make_system()
+        record(grown, 2, start=20)
+        assert len(grown.experiences) == 5 and sample(grown)[:3] == kept
+
+    def test_missing_rows_are_renumbered(self, make_system):
+        system = make_system()
+        record(system, 5)
+        dropped = sample(system)[1]
+        with sqlite3.connect(system.db_path) as conn:
+            conn.execute("DELETE FROM experiences WHERE experience_id = ?", (dropped,))
+
+        restarted = make_system()
+        assert dropped not in restarted.experiences
+        assert [restarted.experiences.index[eid] for eid in sample(restarted)] == [0, 1, 2, 3]
+        record(restarted, 1, start=5)
+        assert len(restarted.experiences) == 5
+
+    def test_agents_keep_separate_samples(self, make_system):
+        first = make_system("agent-1")
+        record(first, 8)
+        second = make_system("agent-2")
+        record(second, 3)
+
+        assert sample(make_system("agent-1")) == sample(first)
+        assert sample(make_system("agent-2")) == sample(second)
+        assert make_system("agent-2").experiences.seen == 3
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Delta flushing of the metrics registry to SQLite rollups
+"""
+
+import sqlite3
+
+import pytest
+
+from src.monitoring.metrics_registry import MetricsFlusher, MetricsRegistry
+
+NOW = 1_700_000_000.0
+
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+
+@pytest.fixture
+def flusher(registry, tmp_path):
+    flusher = MetricsFlusher(registry, str(tmp_path / "metrics.db"), resolutions={60: 86400})
+    yield flusher
+    flusher.close()
+
+
+def failing_once(flusher):
+    """Make the next flush's transaction fail after its rollups are written."""
+    calls = []
+
+    def writer(conn):
+        calls.append(None)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+
+    flusher.add_writer(writer)
+    return calls
+
+
+def rollup(flusher, name):
+    rows = flusher.read_rollups([name], 60, NOW - 3600)
+    assert len(rows) <= 1
+    return rows[0] if rows else None
+
+
+class TestFlush:
+    """Each flush writes what changed since the previous one"""
+
+    def test_counter_deltas_accumulate(self, registry, flusher):
+        requests = registry.counter("requests", route="/")
+        requests.inc(5)
+        assert flusher.flush(NOW) == 1
+        requests.inc(2)
+        assert flusher.flush(NOW + 1) == 1
+        assert flusher.flush(NOW + 2) == 0  # nothing changed
+        assert rollup(flusher, "requests").total == 7
+
+    def test_histogram_deltas_accumulate(self, registry, flusher):
+        latency = registry.histogram("latency")
+        for value in (1.0, 2.0):
+            latency.record(value)
+        flusher.flush(NOW)
+        latency.record(4.0)
+        flusher.flush(NOW + 1)
+
+        row = rollup(flusher, "latency")
+        assert (row.count, row.total) == (3, 7.0)
+        assert row.histogram.count == 3
+
+
+class TestFailedFlush:
+    """A rolled-back flush restores the delta baselines, so nothing is lost or counted twice"""
+
+    def test_counter_is_neither_lost_nor_double_counted(self, registry, flusher):
+        requests = registry.counter("requests")
+        requests.inc(10)
+        failing_once(flusher)
+
+        with pytest.raises(sqlite3.OperationalError):
+            flusher.flush(NOW)
+        assert rollup(flusher, "requests") is None
+
+        requests.inc(1)
+        flusher.flush(NOW + 1)
+        assert rollup(flusher, "requests").total == 11
+
+    def test_histogram_is_neither_lost_nor_double_counted(self, registry, flusher):
+        latency = registry.histogram("latency")
+        latency.record(1.0)
+        flusher.flush(NOW)
+        latency.record(2.0)
+        failing_once(flusher)
+
+        with pytest.raises(sqlite3.OperationalError):
+            flusher.flush(NOW + 1)
+        latency.record(4.0)
+        flusher.flush(NOW + 2)
+
+        row = rollup(flusher, "latency")
+        assert (row.count, row.total, row.histogram.count) == (3, 7.0, 3)
+
+    def test_metric_first_seen_in_a_failed_flush(self, registry, flusher):
+        failing_once(flusher)
+        registry.counter("errors").inc(3)
+        with pytest.raises(sqlite3.OperationalError):
+            flusher.flush(NOW)
+
+        flusher.flush(NOW + 1)
+        assert rollup(flusher, "errors").total == 3
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Early vote termination and per-task state of the 1-3-1 orchestrator
+"""
+
+import asyncio
+import itertools
+import random
+import types
+
+import pytest
+
+from src.core.orchestrator import ConsensusManager, Orchestrator, WorkflowPhase
+from src.models.schemas import VoteType
+
+# Every way one outstanding vote can be cast, as far as consensus is concerned
+CASTS = [(VoteType.APPROVE, 0.0), (VoteType.APPROVE, 0.5), (VoteType.APPROVE, 1.0),
+         (VoteType.REJECT, 0.4), (VoteType.MODIFY, 0.7), (VoteType.ABSTAIN, 0.9)]
+
+
+def vote(vote_type, confidence):
+    return types.SimpleNamespace(vote_type=vote_type, confidence=confidence)
+
+
+def approvals(*confidences):
+    return [vote(VoteType.APPROVE, c) for c in confidences]
+
+
+def select(manager, votes_by_proposal):
+    """The orchestrator's selection rule: best score with consensus, else best score."""
+    scores = {
+        proposal_id: manager.calculate_consensus(votes)[:2]
+        for proposal_id, votes in votes_by_proposal.items() if votes
+    }
+    with_consensus = {pid: score for pid, (ok, score) in scores.items() if ok}
+    candidates = with_consensus or {pid: score for pid, (_, score) in scores.items()}
+    return max(candidates, key=candidates.get) if candidates else None
+
+
+class TestDecidedProposal:
+    """decided_proposal only stops voting when the outcome can no longer change"""
+
+    def test_unanimous_leader_is_decided(self):
+        manager = ConsensusManager(min_votes=3, consensus_threshold=0.6)
+        tallies = {"a": (approvals(0.9, 0.9, 0.9), 1), "b": ([vote(VoteType.REJECT, 0.5)] * 3, 1)}
+        assert manager.decided_proposal(tallies) == "a"
+
+    def test_rival_that_can_still_catch_up_keeps_voting_open(self):
+        manager = ConsensusManager(min_votes=3, consensus_threshold=0.6)
+        tallies = {"a": (approvals(0.6, 0.6, 0.6), 1), "b": (approvals(0.5, 0.5), 2)}
+        assert manager.decided_proposal(tallies) is None
+
+    def test_too_few_votes_is_never_decided(self):
+        manager = ConsensusManager(min_votes=3, consensus_threshold=0.6)
+        assert manager.decided_proposal({"a": (approvals(1.0, 1.0), 5)}) is None
+
+    def test_nothing_to_decide(self):
+        assert ConsensusManager().decided_proposal({"a": ([], 0)}) is None
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_decision_holds_for_every_remaining_vote(self, seed):
+        rng = random.Random(seed)
+        manager = ConsensusManager(min_votes=2, consensus_threshold=0.6)
+        decided = 0
+        for _ in range(300):
+            tallies = {
+                pid: ([vote(*rng.choice(CASTS)) for _ in range(rng.randint(0, 4))], rng.randint(0, 2))
+                for pid in "abc"[:rng.randint(1, 3)]
+            }
+            winner = manager.decided_proposal(tallies)
+            if winner is None:
+                continue
+            decided += 1
+
+            # Stopping now selects the winner ...
+            assert select(manager, {pid: votes for pid, (votes, _) in tallies.items()}) == winner
+            # ... and so would waiting for every outstanding vote, however it is cast
+            slots = [pid for pid, (_, pending) in tallies.items() for _ in range(pending)]
+            for casts in itertools.product(CASTS, repeat=len(slots)):
+                final = {pid: list(votes) for pid, (votes, _) in tallies.items()}
+                for pid, cast in zip(slots, casts):
+                    final[pid].append(vote(*cast))
+                assert select(manager, final) == winner
+        assert decided  # the scenarios exercise early termination at all
+
+
+class _Memory:
+    def __init__(self, fail=False, block=False):
+        self.fail = fail
+        self.block = block
+
+    async def store(self, key, *args, **kwargs):
+        if self.block and key.startswith("task_"):
+            await asyncio.sleep(10)
+        if self.fail and key.startswith("task_"):
+            raise RuntimeError("storage unavailable")
+
+
+def task_context(task_id):
+    return types.SimpleNamespace(task_id=task_id, description="test", task_type="test", dict=lambda: {})
+
+
+class TestWorkflowState:
+    """Per-task state is dropped when process_task returns, keeping a bounded history of final phases"""
+
+    def test_finished_tasks_leave_only_their_final_phase(self):
+        orchestrator = Orchestrator(types.SimpleNamespace(agents={}), _Memory(fail=True),
+                                    {"workflow_history_size": 2})
+
+        async def run():
+            for index in range(3):
+                await orchestrator.process_task(task_context(f"t{index}"))
+
+        asyncio.run(run())
+        assert orchestrator.workflow_state == {}
+        assert dict(orchestrator.finished_phases) == {"t1": WorkflowPhase.FAILED, "t2": WorkflowPhase.FAILED}
+        assert orchestrator._task_phase("t2") == WorkflowPhase.FAILED
+
+    def test_cancelled_task_is_dropped(self):
+        orchestrator = Orchestrator(types.SimpleNamespace(agents={}), _Memory(block=True))
+
+        async def run():
+            task = asyncio.create_task(orchestrator.process_task(task_context("t")))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(run())
+        assert orchestrator.workflow_state == {}
+        assert "t" in orchestrator.finished_phases
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+FIFO token-bucket RateLimiter
+"""
+
+import asyncio
+import time
+
+from src.core.agent_base import RateLimiter, TokenBucket
+
+
+def drained(max_requests=2, window_seconds=0.1, max_tokens=None):
+    """A limiter with its request bucket just emptied (one request refills every window/max seconds)."""
+    limiter = RateLimiter(max_requests, window_seconds, max_tokens)
+    limiter.request_bucket.tokens = 0
+    return limiter
+
+
+class TestTokenBucket:
+    """Continuous refill"""
+
+    def test_refills_proportionally(self):
+        bucket = TokenBucket(10, 1.0)
+        now = bucket.updated_at
+        bucket.consume(10)
+        assert bucket.time_until_available(5, now) == 0.5
+        assert bucket.time_until_available(5, now + 0.5) == 0.0
+
+    def test_oversized_request_waits_for_a_full_bucket(self):
+        bucket = TokenBucket(10, 1.0)
+        now = bucket.updated_at
+        bucket.consume(3)
+        assert bucket.time_until_available(50, now) == 0.3
+
+
+class TestRateLimiter:
+    """Waiters are granted strictly in arrival order and cancellation frees their place"""
+
+    def test_acquire_respects_the_limit(self):
+        async def scenario():
+            limiter = RateLimiter(2, 60)
+            return [await limiter.acquire() for _ in range(3)]
+
+        assert asyncio.run(scenario()) == [True, True, False]
+
+    def test_waiters_are_served_fifo(self):
+        async def scenario():
+            limiter = drained()
+            order = []
+
+            async def wait(name):
+                await limiter.wait_for_availability()
+                order.append(name)
+
+            tasks = []
+            for name in "abcd":
+                tasks.append(asyncio.create_task(wait(name)))
+                await asyncio.sleep(0)
+            await asyncio.gather(*tasks)
+            return order, limiter.get_stats()
+
+        order, stats = asyncio.run(scenario())
+        assert order == list("abcd")
+        assert stats["queued_waiters"] == 0 and stats["granted"] == 4
+
+    def test_heavy_waiter_is_not_overtaken(self):
+        async def scenario():
+            limiter = drained(max_requests=100, window_seconds=1, max_tokens=100)
+            limiter.request_bucket.tokens = 100
+            limiter.token_bucket.tokens = 0
+            order = []
+
+            async def wait(name, tokens):
+                await limiter.wait_for_availability(tokens)
+                order.append(name)
+
+            heavy = asyncio.create_task(wait("heavy", 20))
+            await asyncio.sleep(0)
+            light = asyncio.create_task(wait("light", 1))
+            await asyncio.sleep(0)
+            # Queued waiters also block the non-waiting path
+            assert not await limiter.acquire(1)
+            await asyncio.gather(heavy, light)
+            return order
+
+        assert asyncio.run(scenario()) == ["heavy", "light"]
+
+    def test_cancelled_waiter_gives_up_its_place(self):
+        async def scenario():
+            limiter = drained(max_requests=1, window_seconds=0.2)
+            head = asyncio.create_task(limiter.wait_for_availability())
+            await asyncio.sleep(0)
+            second = asyncio.create_task(limiter.wait_for_availability())
+            await asyncio.sleep(0)
+
+            started = time.monotonic()
+            head.cancel()
+            await second
+            return time.monotonic() - started, limiter.get_stats()
+
+        elapsed, stats = asyncio.run(scenario())
+        # The second waiter takes the first refill rather than waiting a further interval
+        assert elapsed < 0.35
+        assert stats["granted"] == 1 and stats["queued_waiters"] == 0
+
+    def test_reset_releases_waiters(self):
+        async def scenario():
+            limiter = drained(max_requests=2, window_seconds=3600)
+            waiters = [asyncio.create_task(limiter.wait_for_availability()) for _ in range(2)]
+            await asyncio.sleep(0)
+            limiter.reset()
+            await asyncio.wait_for(asyncio.gather(*waiters), timeout=1)
+            return limiter.get_stats()["granted"]
+
+        assert asyncio.run(scenario()) == 2
+
+    def test_shared_limiters_take_the_strictest_limit(self):
+        first = RateLimiter.shared("test-provider", 10, 60)
+        second = RateLimiter.shared("test-provider", 4, 60, max_tokens=1000)
+        assert first is second
+        assert (first.max_requests, first.request_bucket.capacity, first.max_tokens) == (4, 4, 1000)
+        RateLimiter._shared.pop("test-provider")
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Tests for the AST/token safety scanners used by the code executor
+"""
+
+import os
+import sys
+
+import pytest
+
+# safety_scanner is stdlib-only; import it directly rather than through the src package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "tools"))
+
+from safety_scanner import scan_javascript, scan_python
+
+
+class TestJavaScriptRequire:
+    """require() in all its call forms"""
+
+    @pytest.mark.parametrize("code", [
+        "require('child_process').execSync('id')",
+        "module.require('child_process').execSync('id')",
+        "process.mainModule.require('child_process')",
+        "process?.mainModule?.require('child_process')",
+        "const cp = module.require('child_process'); cp.exec('id')",
+        "const { exec: run } = process.mainModule.require('child_process'); run('id')",
+        "import * as cp from 'child_process'; cp.spawn('ls')",
+    ])
+    def test_child_process_is_flagged(self, code):
+        assert "system_calls: child_process" in scan_javascript(code)
+
+    def test_dynamic_member_require_is_flagged(self):
+        assert scan_javascript("foo.require(name)") == ["environment_manipulation: require(<dynamic>)"]
+
+    def test_similar_member_names_are_ignored(self):
+        assert scan_javascript("obj.required('fs'); obj.requireAll") == []
+
+
+class TestJavaScriptConstructorEscape:
+    """.constructor reaches Function, and through it the host realm"""
+
+    @pytest.mark.parametrize("code", [
+        "console.log.constructor('return process')()",
+        "this.constructor.constructor('return process')()",
+        "const J = console.log.constructor('return JSON')(); J.stringify = () => ''",
+        "({})['constructor']['constructor']('return this')()",
+        "x?.constructor",
+    ])
+    def test_constructor_access_is_flagged(self, code):
+        assert "system_calls: .constructor" in scan_javascript(code)
+
+    @pytest.mark.parametrize("code", [
+        "class A { constructor() { this.x = 1 } }",
+        "console.log('a.constructor')",
+    ])
+    def test_declarations_and_strings_are_ignored(self, code):
+        assert scan_javascript(code) == []
+
+
+class TestJavaScriptAliases:
+    """Bindings resolve to the module members they alias"""
+
+    @pytest.mark.parametrize("code", [
+        "import proc from 'process'; proc.exit(1)",
+        "const proc = module.require('process'); proc.exit(1)",
+        "const { exit: bye } = require('process'); bye(1)",
+    ])
+    def test_alias_resolves_to_real_name(self, code):
+        assert scan_javascript(code) == ["process_manipulation: process.exit"]
+
+
+class TestJavaScriptNonCode:
+    """Strings, comments and regex literals never match"""
+
+    @pytest.mark.parametrize("code", [
+        "console.log('require(\"fs\")')",
+        "// require('child_process')\nconst x = 1",
+        "/* process.exit(1) */ const y = 2",
+        "const r = /require\\('net'\\)/; const s = 'process.env'",
+    ])
+    def test_no_findings(self, code):
+        assert scan_javascript(code) == []
+
+    def test_division_is_not_a_regex(self):
+        assert scan_javascript("x = a / b / c; process.kill(1)") == ["process_manipulation: process.kill"]
+
+    def test_template_expressions_are_scanned(self):
+        assert scan_javascript("const msg = `${require('fs')}`") == ["file_operations: fs"]
+
+
+class TestPython:
+    """Python aliases, strings and comments"""
+
+    @pytest.mark.parametrize("code, finding", [
+        ("import subprocess as sp\nsp.run(['ls'])", "system_calls: subprocess.run"),
+        ("from os import system as s\ns('id')", "system_calls: os.system"),
+    ])
+    def test_alias_resolves_to_real_name(self, code, finding):
+        assert finding in scan_python(code)
+
+    @pytest.mark.parametrize("code, finding", [
+        ("o = __import__; o('os')", "system_calls: __import__"),
+        ("().__class__.__base__.__subclasses__()", "system_calls: .__subclasses__"),
+        ("f = lambda: 0\nf.__globals__['os']", "environment_manipulation: .__globals__"),
+        ("getattr(print, '__globals__')", "environment_manipulation: .__globals__"),
+        ("len.__self__.__builtins__", "environment_manipulation: .__builtins__"),
+        ("b = __builtins__", "environment_manipulation: __builtins__"),
+    ])
+    def test_namespace_escapes_are_flagged(self, code, finding):
+        assert finding in scan_python(code)
+
+    def test_strings_and_comments_are_ignored(self):
+        assert scan_python("print('subprocess.run')  # os.system") == []
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Pooled sandbox workers must behave like a fresh interpreter
+"""
+
+import asyncio
+import importlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import types
+from pathlib import Path
+
+import pytest
+
+# Load src/tools as a bare package so its __init__ (which pulls in the whole agent stack) is skipped
+_TOOLS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "tools")
+_package = types.ModuleType("_sandbox_tools")
+_package.__path__ = [_TOOLS_DIR]
+sys.modules.setdefault("_sandbox_tools", _package)
+SandboxPool = importlib.import_module("_sandbox_tools.sandbox_pool").SandboxPool
+
+LIMITS = types.SimpleNamespace(
+    max_memory_mb=512, max_execution_time=10, max_processes=64, max_file_descriptors=256
+)
+
+COLD_COMMANDS = {"python": [sys.executable, "-c"], "nodejs": ["node", "-e"]}
+
+
+def run_cold(language, code, cwd):
+    result = subprocess.run(COLD_COMMANDS[language] + [code], cwd=cwd, capture_output=True, text=True, timeout=30)
+    return result.returncode, result.stdout
+
+
+def run_pooled(language, snippets, cwd):
+    async def run_all():
+        pool = SandboxPool(language, LIMITS, Path(cwd) / "workers", size=1)
+        try:
+            return [await pool.execute(code, cwd) for code in snippets]
+        finally:
+            await pool.close()
+    return asyncio.run(run_all())
+
+
+@pytest.fixture
+def workdir():
+    path = tempfile.mkdtemp()
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+PYTHON_SNIPPETS = [
+    "print('main')",
+    "import threading, time\n"
+    "threading.Thread(target=lambda: (time.sleep(0.2), print('thread'))).start()\n"
+    "print('main')",
+    "import atexit\natexit.register(lambda: print('bye'))\nprint('main')",
+    "import atexit, sys\natexit.register(lambda: print('bye'))\nsys.exit(3)",
+]
+
+
+@pytest.mark.parametrize("code", PYTHON_SNIPPETS)
+def test_python_pooled_matches_cold(code, workdir):
+    reply, = run_pooled("python", [code], workdir)
+    assert (reply["exit_code"], reply["stdout"]) == run_cold("python", code, workdir)
+
+
+node_required = pytest.mark.skipif(shutil.which("node") is None, reason="node is not installed")
+
+NODE_POOLED = [
+    "console.log('main', 1 + 1)",
+    "console.log(process.env.HOME !== undefined, process.argv.length)",
+    "Array.prototype.extra = 1; console.log([].extra)",
+]
+
+
+@node_required
+@pytest.mark.parametrize("code", NODE_POOLED)
+def test_node_pooled_matches_cold(code, workdir):
+    assert SandboxPool.supports("nodejs", code)
+    reply, = run_pooled("nodejs", [code], workdir)
+    assert (reply["exit_code"], reply["stdout"]) == run_cold("nodejs", code, workdir)
+
+
+@node_required
+def test_node_runs_do_not_share_state(workdir):
+    replies = run_pooled("nodejs", [
+        "Array.prototype.extra = 1; process.env.LEAK = 'x'; globalThis.leak = 1",
+        "console.log([].extra, process.env.LEAK, typeof leak)",
+        "const J = console.log.constructor('return JSON')(); const o = J.stringify; "
+        "J.stringify = function(x){ if (x && x.stdout !== undefined) x.stdout = 'HIJACKED\\n'; "
+        "return o.apply(this, arguments); }; console.log('ok')",
+        "console.log('victim output')",
+    ], workdir)
+    assert replies[1]["stdout"] == "undefined undefined undefined\n"
+    assert replies[3]["stdout"] == "victim output\n"
+
+
+@node_required
+@pytest.mark.parametrize("attack", [
+    "process.cwd.constructor('return this')().JSON.stringify = () => '{}'",
+    "exports.constructor.constructor('Array.prototype.join = () => \"HIJACKED\"')()",
+    "console.log({ [Symbol.for('nodejs.util.inspect.custom')]: (d, o, inspect) => "
+    "inspect.constructor('return JSON')().stringify = () => '' })",
+])
+def test_node_runs_cannot_reach_the_worker(attack, workdir):
+    replies = run_pooled("nodejs", [attack, "console.log('victim output')"], workdir)
+    assert replies[1]["stdout"] == "victim output\n"
+
+
+@pytest.mark.parametrize("code", [
+    "require('fs').readFileSync = () => 'hacked'",
+    "const fs = require('fs'); fs.readFile(__filename, (e, d) => console.log(d))",
+    "require('http').get('http://localhost')",
+    "fetchThing().then(v => console.log(v))",
+    "new Promise(r => r(1))",
+    "setTimeout(() => console.log('late'), 10)",
+    "process.stdout.write('x')",
+    "const p = process; p.exit(2)",
+    "console.log(Buffer.from('a'))",
+])
+def test_node_shared_or_async_snippets_run_cold(code):
+    assert not SandboxPool.supports("nodejs", code)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Write-behind behaviour of MemoryDatabase
+"""
+
+import sqlite3
+
+import pytest
+
+from src.core.shared_memory import MemoryDatabase
+from src.models.schemas import MemoryEntry
+
+
+@pytest.fixture
+def db(tmp_path):
+    # A long interval keeps the writer thread out of the way; tests flush explicitly
+    database = MemoryDatabase(str(tmp_path / "memory.db"), flush_interval=3600)
+    yield database
+    database.close()
+
+
+def stored_row(db, key):
+    """(value, access_count) as committed to disk, bypassing the write-behind queue."""
+    conn = sqlite3.connect(db.db_path)
+    try:
+        row = conn.execute("SELECT entry_id, access_count FROM memory_entries WHERE key = ?", (key,)).fetchone()
+    finally:
+        conn.close()
+    return row
+
+
+def failing_once(db, during=None):
+    """Make the next batch write fail, running `during` while it is in flight."""
+    write_rows = db._write_rows
+    calls = []
+
+    def write(stores, accesses):
+        calls.append(len(stores))
+        if len(calls) == 1:
+            if during:
+                during()
+            raise sqlite3.OperationalError("disk I/O error")
+        write_rows(stores, accesses)
+
+    db._write_rows = write
+    return calls
+
+
+class TestWriteBehind:
+    """Queued writes are visible before they are flushed"""
+
+    def test_read_your_writes(self, db):
+        db.store_entry(MemoryEntry(key="k", value={"v": 1}))
+        assert stored_row(db, "k") is None
+        assert db.get_entry("k").value == {"v": 1}
+        assert db.flush() == 1
+        assert stored_row(db, "k")[1] == 1  # the read before the flush is counted
+
+    def test_newer_store_supersedes_queued_one(self, db):
+        db.store_entry(MemoryEntry(key="k", value={"v": 1}))
+        db.store_entry(MemoryEntry(key="k", value={"v": 2}))
+        db.flush()
+        assert db.get_entry("k").value == {"v": 2}
+
+
+class TestFailedFlush:
+    """A batch that fails to write is requeued, not dropped"""
+
+    def test_failed_batch_is_requeued(self, db):
+        entry = MemoryEntry(key="k", value={"v": 1})
+        db.store_entry(entry)
+        failing_once(db)
+
+        assert db.flush() == 0
+        assert stored_row(db, "k") is None
+        assert db.get_entry("k").value == {"v": 1}
+        assert db.flush() > 0
+        assert stored_row(db, "k")[0] == entry.entry_id
+
+    def test_store_during_failed_flush_wins(self, db):
+        db.store_entry(MemoryEntry(key="k", value={"v": 1}))
+        newer = MemoryEntry(key="k", value={"v": 2})
+        failing_once(db, during=lambda: db.store_entry(newer))
+
+        db.flush()
+        db.flush()
+        assert stored_row(db, "k")[0] == newer.entry_id
+        assert db.get_entry("k").value == {"v": 2}
+
+    def test_access_bumps_survive_a_failed_flush(self, db):
+        db.store_entry(MemoryEntry(key="k", value={"v": 1}))
+        db.flush()
+        db.get_entry("k")
+        failing_once(db, during=lambda: db.get_entry("k"))
+
+        db.flush()
+        db.flush()
+        assert stored_row(db, "k")[1] == 2
+
+
+class TestInFlightReads:
+    """Rows being written by flush() are still served"""
+
+    def test_in_flight_entry_is_readable(self, db):
+        db.store_entry(MemoryEntry(key="k", value={"v": 1}))
+        seen = []
+        write_rows = db._write_rows
+
+        def write(stores, accesses):
+            seen.append(db.get_entry("k"))
+            write_rows(stores, accesses)
+
+        db._write_rows = write
+        db.flush()
+        assert seen[0] is not None and seen[0].value == {"v": 1}
+
+        # The in-flight read is counted once its row has landed
+        db._write_rows = write_rows
+        db.flush()
+        assert stored_row(db, "k")[1] == 1
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-memory Knowledge Hub dedupe index
+"""
+
+import os
+import random
+import sys
+
+import pytest
+
+# video_dedupe_index is stdlib-only; import it directly rather than through the src package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "processors"))
+
+from video_dedupe_index import VideoDedupeIndex, extract_video_id, titles_are_similar
+
+VOCABULARY = [f"word{i}" for i in range(60)] + ["the", "how", "to", "a", "of", "in"]
+
+
+def page(key, url="", title=""):
+    return {
+        "id": key,
+        "properties": {"URL": {"url": url}, "Name": {"title": [{"plain_text": title}]}}
+    }
+
+
+def random_title(rng, size):
+    return " ".join(rng.choice(VOCABULARY) for _ in range(size))
+
+
+class TestExactMatches:
+    """Video ID, URL and normalized title lookups"""
+
+    def test_video_id_matches_any_url_form(self):
+        index = VideoDedupeIndex()
+        index.load([page("p1", "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=1", "Song")])
+        assert index.find_duplicate("https://youtu.be/dQw4w9WgXcQ") == ("url", index._pages["p1"])
+
+    def test_normalized_title_match(self):
+        index = VideoDedupeIndex()
+        index.load([page("p1", "https://example.com/a", "How To: Build a Van!")])
+        assert index.find_duplicate("https://example.com/b", "how to build a van")[0] == "title"
+
+    @pytest.mark.parametrize("url, video_id", [
+        ("https://www.youtube.com/shorts/abcdefghijk", "abcdefghijk"),
+        ("https://www.youtube.com/embed/abcdefghijk?x=1", "abcdefghijk"),
+        ("https://example.com/watch", None),
+    ])
+    def test_extract_video_id(self, url, video_id):
+        assert extract_video_id(url) == video_id
+
+
+class TestSimilarTitles:
+    """Every title titles_are_similar accepts is found"""
+
+    def test_short_title_contained_in_long_one(self):
+        index = VideoDedupeIndex()
+        long_title = "complete guide to solar power wiring for a camper van conversion"
+        index.load([page("p1", "https://example.com/a", long_title)])
+        assert index.find_duplicate("https://example.com/b", "solar power wiring") == ("similar", index._pages["p1"])
+
+    def test_long_query_against_short_title(self):
+        index = VideoDedupeIndex()
+        index.load([page("p1", "https://example.com/a", "solar wiring")])
+        match = index.find_duplicate("https://example.com/b", "the ultimate solar wiring guide for beginners")
+        assert match == ("similar", index._pages["p1"])
+
+    def test_dissimilar_title_is_not_matched(self):
+        index = VideoDedupeIndex()
+        index.load([page("p1", "https://example.com/a", "solar power wiring for vans")])
+        assert index.find_duplicate("https://example.com/b", "cooking pasta at home") is None
+
+    @pytest.mark.parametrize("seed", range(4))
+    def test_recall_matches_pairwise_check(self, seed):
+        rng = random.Random(seed)
+        titles = [random_title(rng, rng.randint(1, 12)) for _ in range(300)]
+        index = VideoDedupeIndex()
+        index.load([page(f"p{i}", f"https://example.com/{i}", title) for i, title in enumerate(titles)])
+
+        for _ in range(200):
+            query = random_title(rng, rng.randint(1, 12))
+            expected = {f"p{i}" for i, title in enumerate(titles) if titles_are_similar(query, title)}
+            found = index._words.query(set(query.split()))
+            assert expected <= found
+            assert (index.find_duplicate("https://example.com/new", query) is not None) == bool(expected)
+
+    def test_candidates_are_a_fraction_of_the_library(self):
+        rng = random.Random(7)
+        index = VideoDedupeIndex()
+        index.load([
+            page(f"p{i}", f"https://example.com/{i}", " ".join(f"w{rng.randrange(5000)}" for _ in range(8)))
+            for i in range(2000)
+        ])
+        for _ in range(50):
+            index.find_duplicate("https://example.com/new", " ".join(f"w{rng.randrange(5000)}" for _ in range(8)))
+        assert index.get_stats()["average_candidates"] < 20